@@ -4,7 +4,6 @@ Assembles repositories and services with database connection
 """
 from fastapi import Depends
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import Optional
 
 from core.database import get_db
 from repositories.admin_repository import AdminRepository
@@ -17,10 +16,12 @@ from repositories.invitation_repository import InvitationRepository
 from repositories.password_reset_repository import PasswordResetRepository
 from repositories.onboarding_progress_repository import OnboardingProgressRepository
 from repositories.kpi_repository import KPIRepository, ManagerKPIRepository
+from repositories.store_daily_kpi_repository import StoreDailyKpiRepository
 from repositories.diagnostic_repository import DiagnosticRepository
 from repositories.manager_diagnostic_repository import ManagerDiagnosticRepository
 from repositories.manager_diagnostic_results_repository import ManagerDiagnosticResultsRepository
 from repositories.achievement_notification_repository import AchievementNotificationRepository
+from repositories.notification_repository import NotificationRepository
 from repositories.interview_note_repository import InterviewNoteRepository
 from repositories.debrief_repository import DebriefRepository
 from repositories.objective_repository import ObjectiveRepository
@@ -48,6 +49,7 @@ from repositories.ai_message_repository import AIMessageRepository
 from repositories.ai_usage_log_repository import AIUsageLogRepository
 from services.auth_service import AuthService
 from services.kpi_service import KPIService
+from services.kpi_sync_service import KPISyncService
 from services.ai_service import AIService
 from services.store_service import StoreService
 from services.gerant_service import GerantService
@@ -68,7 +70,8 @@ ConflictService = RelationshipService
 from services.competence_service import CompetenceService
 from services.admin_service import AdminService
 from services.payment_service import PaymentService
-from services.stripe_client import StripeClient
+from services.stripe_client import StripeClient, get_stripe_gateway
+from services.stripe_webhook_queue import StripeWebhookQueue, get_stripe_webhook_queue as get_webhook_queue
 
 
 # ===== SERVICE DEPENDENCIES =====
@@ -101,6 +104,16 @@ def get_kpi_service(db: AsyncIOMotorDatabase = Depends(get_db)) -> KPIService:
     )
 
 
+def get_kpi_sync_service(db: AsyncIOMotorDatabase = Depends(get_db)) -> KPISyncService:
+    """
+    Get KPISyncService instance (integrations /kpi/sync). Repos assembled here.
+    """
+    return KPISyncService(
+        kpi_repo=KPIRepository(db),
+        user_repo=UserRepository(db),
+    )
+
+
 def get_ai_service() -> AIService:
     """
     Get AIService instance (no database needed)
@@ -159,6 +172,7 @@ def get_gerant_service(db: AsyncIOMotorDatabase = Depends(get_db)) -> GerantServ
         manager_kpi_repo=ManagerKPIRepository(db),
         billing_profile_repo=BillingProfileRepository(db),
         system_log_repo=SystemLogRepository(db),
+        store_daily_kpi_repo=StoreDailyKpiRepository(db),
     )
 
 
@@ -189,11 +203,12 @@ def get_notification_service(
     db: AsyncIOMotorDatabase = Depends(get_db)
 ) -> NotificationService:
     """
-    Get NotificationService instance. Repo assembled here.
+    Get NotificationService instance. Repos assembled here.
     Défini avant get_manager_service car ce dernier en dépend.
     """
     return NotificationService(
         achievement_notification_repo=AchievementNotificationRepository(db),
+        notification_repo=NotificationRepository(db),
     )
 
 
@@ -227,6 +242,7 @@ def get_manager_kpi_service(
         kpi_repo=KPIRepository(db),
         manager_kpi_repo=ManagerKPIRepository(db),
         team_bilan_repo=TeamBilanRepository(db),
+        store_daily_kpi_repo=StoreDailyKpiRepository(db),
     )
 
 
@@ -336,19 +352,17 @@ def get_api_key_service(db: AsyncIOMotorDatabase = Depends(get_db)) -> APIKeySer
     return APIKeyService(api_key_repo=APIKeyRepository(db))
 
 
-_stripe_client: Optional[StripeClient] = None
-
-
 def get_stripe_client() -> StripeClient:
     """
-    Get (or lazily create) the StripeClient singleton.
+    Get the async Stripe gateway singleton (one HTTP pool per worker).
     Sets stripe.api_key once. Subsequent calls return the same instance.
     """
-    global _stripe_client
-    if _stripe_client is None:
-        from core.config import settings
-        _stripe_client = StripeClient(api_key=settings.STRIPE_API_KEY or "")
-    return _stripe_client
+    return get_stripe_gateway()
+
+
+def get_stripe_webhook_queue(db: AsyncIOMotorDatabase = Depends(get_db)) -> StripeWebhookQueue:
+    """Per-worker Stripe webhook work queue (stripe_events); its consumer is started in lifespan."""
+    return get_webhook_queue(db)
 
 
 def get_payment_service(
@@ -7,11 +7,12 @@ from fastapi import APIRouter, Depends, Query, Request, Body
 from typing import List, Dict, Optional
 from datetime import datetime, timezone
 from pydantic import BaseModel, EmailStr
-from api.dependencies import get_admin_service
-from core.constants import QUERY_PAGE_NUM_DESC, QUERY_PAGE_SIZE_DESC
+from api.dependencies import get_admin_service, get_stripe_webhook_queue
+from core.constants import QUERY_CURSOR_DESC, QUERY_PAGE_NUM_DESC, QUERY_PAGE_SIZE_DESC
 from core.exceptions import NotFoundError, ValidationError
 from core.security import get_super_admin
 from services.admin_service import AdminService
+from services.stripe_webhook_queue import StripeWebhookQueue
 from models.chat import ChatRequest
 from config.limits import MAX_PAGE_SIZE
 import logging
@@ -30,6 +31,11 @@ class BulkStatusUpdate(BaseModel):
     status: str
 
 
+class StripeEventReplay(BaseModel):
+    event_ids: Optional[List[str]] = None
+    status: Optional[str] = None
+
+
 @router.get("/stats")
 async def get_superadmin_stats(
     admin_service: AdminService = Depends(get_admin_service),
@@ -98,10 +104,11 @@ async def get_audit_logs(
     days: int = Query(7, ge=1, le=365, description="Nombre de jours à remonter"),
     action: Optional[str] = Query(None, description="Filtrer par type d'action"),
     admin_emails: Optional[str] = Query(None, description="Emails admin séparés par des virgules"),
+    cursor: Optional[str] = Query(None, description=QUERY_CURSOR_DESC),
     admin_service: AdminService = Depends(get_admin_service),
     current_admin: dict = Depends(get_super_admin)
 ):
-    """Récupère les logs d'audit administrateur (paginé: items, total, page, size, pages)."""
+    """Récupère les logs d'audit administrateur (paginé: items, total, page, size, pages ; avec cursor: items, size, next_cursor, has_more, total)."""
     hours = days * 24
     emails_list = None
     if admin_emails:
@@ -111,7 +118,8 @@ async def get_audit_logs(
         page=page,
         size=size,
         action=action,
-        admin_emails=emails_list
+        admin_emails=emails_list,
+        cursor=cursor
     )
 
 
@@ -122,16 +130,18 @@ async def get_system_logs(
     hours: int = Query(24, ge=1, le=168),
     level: Optional[str] = Query(None, description="Filtrer par niveau (info, warning, error)"),
     type: Optional[str] = Query(None, description="Filtrer par type"),
+    cursor: Optional[str] = Query(None, description=QUERY_CURSOR_DESC),
     admin_service: AdminService = Depends(get_admin_service),
     current_admin: dict = Depends(get_super_admin)
 ):
-    """Récupère les logs système (paginé: items, total, page, size, pages)."""
+    """Récupère les logs système (paginé: items, total, page, size, pages ; avec cursor: items, size, next_cursor, has_more, total)."""
     return await admin_service.get_system_logs(
         hours=hours,
         page=page,
         size=size,
         level=level,
-        type_filter=type
+        type_filter=type,
+        cursor=cursor
     )
 
 
@@ -144,6 +154,77 @@ async def get_health(
     return await admin_service.health_check()
 
 
+@router.get("/ws-stats")
+async def get_ws_stats(current_admin: dict = Depends(get_super_admin)):
+    """Compteurs WebSocket temps réel par store (worker courant) : connexions, file, lag, drops"""
+    from core.ws_manager import ws_manager
+    return ws_manager.stats()
+
+
+@router.get("/ai-cache-stats")
+async def get_ai_cache_stats(current_admin: dict = Depends(get_super_admin)):
+    """Cache des réponses IA : hits / misses / tokens économisés par fonctionnalité (worker courant + plateforme)"""
+    from core.ai_response_cache import get_ai_response_cache
+    cache = get_ai_response_cache()
+    return {"worker": cache.stats(), "global": await cache.global_stats()}
+
+
+@router.get("/ai-governor-stats")
+async def get_ai_governor_stats(current_admin: dict = Depends(get_super_admin)):
+    """Gouverneur IA : appels en cours, file d'attente par tenant, disjoncteur partagé"""
+    from core.ai_governor import get_ai_governor
+    return await get_ai_governor().stats()
+
+
+@router.get("/password-hasher-stats")
+async def get_password_hasher_stats(current_admin: dict = Depends(get_super_admin)):
+    """Hachage des mots de passe : file d'attente, rejets, temps d'attente et de hachage"""
+    from core.password_hasher import get_password_hasher
+    return get_password_hasher().stats()
+
+
+@router.get("/auth-cache-stats")
+async def get_auth_cache_stats(current_admin: dict = Depends(get_super_admin)):
+    """Cache d'authentification du worker : hits, invalidations reçues, entrées"""
+    from core.auth_context_cache import get_auth_context_cache
+    return get_auth_context_cache().stats()
+
+
+@router.get("/log-pipeline-stats")
+async def get_log_pipeline_stats(current_admin: dict = Depends(get_super_admin)):
+    """Pipeline de logs du worker : file d'écriture, enregistrements abandonnés"""
+    from core.logging import pipeline_stats
+    return pipeline_stats()
+
+
+@router.get("/stripe-webhook-queue")
+async def get_stripe_webhook_queue_metrics(
+    webhook_queue: StripeWebhookQueue = Depends(get_stripe_webhook_queue),
+    current_admin: dict = Depends(get_super_admin)
+):
+    """File des webhooks Stripe : événements en attente / en échec, âge du plus ancien, latence p50/p95"""
+    return await webhook_queue.metrics()
+
+
+@router.post("/stripe-webhook-queue/replay")
+async def replay_stripe_events(
+    replay: StripeEventReplay = Body(...),
+    webhook_queue: StripeWebhookQueue = Depends(get_stripe_webhook_queue),
+    current_admin: dict = Depends(get_super_admin)
+):
+    """Remet en file des événements Stripe stockés (par event_ids et/ou statut, ex. failed)"""
+    filters: Dict = {}
+    if replay.event_ids:
+        filters["event_id"] = {"$in": replay.event_ids}
+    if replay.status:
+        filters["status"] = replay.status
+    if not filters:
+        raise ValidationError("Préciser event_ids ou status")
+    requeued = await webhook_queue.requeue(filters)
+    logger.warning(f"Stripe events replayed by {current_admin.get('email')}: {requeued} ({filters})")
+    return {"requeued": requeued}
+
+
 @router.post("/subscription/resolve-duplicates")
 async def resolve_duplicates(
     request: Request,
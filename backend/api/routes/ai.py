@@ -2,6 +2,7 @@
 from fastapi import APIRouter, Depends, Request
 from typing import Dict, List, Union
 
+from core.ai_stream import event_stream_response, wants_event_stream
 from core.exceptions import ValidationError
 from services.ai_service import AIService, AIDataService
 from api.dependencies import get_ai_service, get_ai_data_service
@@ -103,10 +104,15 @@ async def generate_seller_bilan(
         ai_data_service: AI data service instance
         
     Returns:
-        Performance bilan
+        Performance bilan (SSE with ?stream=true: deltas then the same JSON as `result`)
     """
-    return await ai_data_service.generate_seller_bilan_with_data(
-        seller_id=current_user['id'],
-        seller_data=current_user,
-        days=30
-    )
+    async def _generate() -> Dict:
+        return await ai_data_service.generate_seller_bilan_with_data(
+            seller_id=current_user['id'],
+            seller_data=current_user,
+            days=30
+        )
+
+    if wants_event_stream(request):
+        return event_stream_response(_generate)
+    return await _generate()
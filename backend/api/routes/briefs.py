@@ -12,6 +12,7 @@ import logging
 from api.dependencies import get_ai_service, get_manager_service, get_store_service
 from api.dependencies_rate_limiting import rate_limit
 from api.schemas.common import EMPTY_BRIEFS_RESPONSE
+from core.ai_stream import event_stream_response, wants_event_stream
 from core.constants import (
     ERR_ACCES_REFUSE,
     QUERY_STORE_ID_POUR_GERANT,
@@ -184,6 +185,8 @@ async def generate_morning_brief(
     - **store_id**: ID du magasin (optionnel, pour gérant visualisant un magasin spécifique)
     - Récupère automatiquement les stats du magasin d'hier
     - Retourne un brief formaté en Markdown
+    - **stream=true** (ou Accept: text/event-stream) : texte transmis en SSE au fil de la génération,
+      puis événement `result` avec la même réponse JSON
     """
     if current_user.get("role") not in ["manager", "gerant", "super_admin"]:
         raise ForbiddenError("Seuls les managers peuvent générer des briefs matinaux")
@@ -200,95 +203,103 @@ async def generate_morning_brief(
         except Exception as e:
             logger.error("Erreur lors de la sauvegarde de l'objectif CA: %s", e)
 
-    if brief_request.stats and isinstance(brief_request.stats, dict):
-        stats = brief_request.stats
-    else:
+    async def _generate() -> Dict:
+        # Cache check: si pas de contexte custom, retourner le brief déjà généré aujourd'hui
+        # (pré-généré la nuit par services.brief_pregeneration_service) avant tout calcul de stats
+        if not brief_request.comments and final_store_id:
+            try:
+                cached_brief = await manager_service.get_cached_morning_brief(final_store_id)
+                if cached_brief:
+                    logger.info("Cache hit: morning brief store=%s", final_store_id)
+                    return {
+                        "success": True,
+                        "brief": cached_brief.get("brief", ""),
+                        "structured": cached_brief.get("structured"),
+                        "brief_id": cached_brief.get("brief_id"),
+                        "date": cached_brief.get("date", ""),
+                        "data_date": cached_brief.get("data_date"),
+                        "store_name": cached_brief.get("store_name", store_name),
+                        "manager_name": cached_brief.get("manager_name", manager_name),
+                        "has_context": False,
+                        "generated_at": cached_brief.get("generated_at", ""),
+                        "fallback": cached_brief.get("fallback", False),
+                        "cached": True,
+                    }
+            except Exception as _e:
+                logger.warning("Cache check failed for morning brief: %s", _e)
+
+        if brief_request.stats and isinstance(brief_request.stats, dict):
+            stats = brief_request.stats
+        else:
+            try:
+                stats = await manager_service.get_yesterday_stats_for_brief(final_store_id, user_id)
+            except Exception as e:
+                logger.warning("get_yesterday_stats_for_brief failed, using empty stats: %s", e)
+                stats = _default_brief_stats()
+        if not isinstance(stats, dict):
+            stats = _default_brief_stats()
+        data_date = stats.get("data_date")
+
+        # Fetch team DISC profiles for personalised brief tone
+        team_disc_profiles = []
         try:
-            stats = await manager_service.get_yesterday_stats_for_brief(final_store_id, user_id)
+            team_disc_profiles = await manager_service.get_team_disc_profiles(final_store_id)
         except Exception as e:
-            logger.warning("get_yesterday_stats_for_brief failed, using empty stats: %s", e)
-            stats = _default_brief_stats()
-    if not isinstance(stats, dict):
-        stats = _default_brief_stats()
-    data_date = stats.get("data_date")
+            logger.warning("Could not fetch team DISC profiles for brief: %s", e)
 
-    # Cache check: si pas de contexte custom, retourner le brief déjà généré aujourd'hui
-    if not brief_request.comments and final_store_id:
         try:
-            cached_brief = await manager_service.get_cached_morning_brief(final_store_id)
-            if cached_brief:
-                logger.info("Cache hit: morning brief store=%s", final_store_id)
-                return {
-                    "success": True,
-                    "brief": cached_brief.get("brief", ""),
-                    "brief_id": cached_brief.get("brief_id"),
-                    "date": cached_brief.get("date", ""),
-                    "data_date": cached_brief.get("data_date"),
-                    "store_name": cached_brief.get("store_name", store_name),
-                    "manager_name": cached_brief.get("manager_name", manager_name),
-                    "has_context": False,
-                    "generated_at": cached_brief.get("generated_at", ""),
-                    "fallback": cached_brief.get("fallback", False),
-                    "cached": True,
+            result = await ai_service.generate_morning_brief(
+                stats=stats,
+                manager_name=manager_name,
+                store_name=store_name,
+                context=brief_request.comments,
+                data_date=data_date,
+                objective_daily=brief_request.objective_daily,
+                team_disc_profiles=team_disc_profiles,
+                business_context=store.get("business_context") if store else None,
+            )
+
+            if result.get("success"):
+                brief_id = str(uuid4())
+                brief_record = {
+                    "brief_id": brief_id,
+                    "store_id": final_store_id,
+                    "manager_id": user_id,
+                    "manager_name": manager_name,
+                    "store_name": store_name,
+                    "brief": result.get("brief"),
+                    "structured": result.get("structured"),
+                    "date": result.get("date"),
+                    "data_date": result.get("data_date"),
+                    "has_context": result.get("has_context", False),
+                    "context": brief_request.comments,
+                    "generated_at": datetime.now(timezone.utc).isoformat(),
+                    "fallback": result.get("fallback", False)
                 }
-        except Exception as _e:
-            logger.warning("Cache check failed for morning brief: %s", _e)
-
-    # Fetch team DISC profiles for personalised brief tone
-    team_disc_profiles = []
-    try:
-        team_disc_profiles = await manager_service.get_team_disc_profiles(final_store_id)
-    except Exception as e:
-        logger.warning("Could not fetch team DISC profiles for brief: %s", e)
-
-    try:
-        result = await ai_service.generate_morning_brief(
-            stats=stats,
-            manager_name=manager_name,
-            store_name=store_name,
-            context=brief_request.comments,
-            data_date=data_date,
-            objective_daily=brief_request.objective_daily,
-            team_disc_profiles=team_disc_profiles,
-            business_context=store.get("business_context") if store else None,
-        )
-
-        if result.get("success"):
-            brief_id = str(uuid4())
-            brief_record = {
-                "brief_id": brief_id,
-                "store_id": final_store_id,
-                "manager_id": user_id,
-                "manager_name": manager_name,
-                "store_name": store_name,
-                "brief": result.get("brief"),
-                "date": result.get("date"),
-                "data_date": result.get("data_date"),
-                "has_context": result.get("has_context", False),
-                "context": brief_request.comments,
-                "generated_at": datetime.now(timezone.utc).isoformat(),
-                "fallback": result.get("fallback", False)
-            }
-            try:
-                await manager_service.create_morning_brief(
-                    brief_record, final_store_id, user_id
-                )
-                result["brief_id"] = brief_id
-            except (ValueError, Exception) as e:
-                logger.error("Error saving brief to history: %s", e)
-
-        # Garantir les champs requis pour MorningBriefResponse (éviter 500 si le service omet generated_at)
-        if isinstance(result, dict) and not result.get("generated_at"):
-            result["generated_at"] = datetime.now(timezone.utc).isoformat()
-        return result
-    except BusinessLogicError:
-        raise
-    except Exception as e:
-        logger.exception(
-            "Morning brief generation failed",
-            extra={"store_id": final_store_id, "user_id": user_id, "manager_name": manager_name, "store_name": store_name}
-        )
-        raise BusinessLogicError(f"Erreur lors de la génération du brief matinal: {str(e)}")
+                try:
+                    await manager_service.create_morning_brief(
+                        brief_record, final_store_id, user_id
+                    )
+                    result["brief_id"] = brief_id
+                except (ValueError, Exception) as e:
+                    logger.error("Error saving brief to history: %s", e)
+
+            # Garantir les champs requis pour MorningBriefResponse (éviter 500 si le service omet generated_at)
+            if isinstance(result, dict) and not result.get("generated_at"):
+                result["generated_at"] = datetime.now(timezone.utc).isoformat()
+            return result
+        except BusinessLogicError:
+            raise
+        except Exception as e:
+            logger.exception(
+                "Morning brief generation failed",
+                extra={"store_id": final_store_id, "user_id": user_id, "manager_name": manager_name, "store_name": store_name}
+            )
+            raise BusinessLogicError(f"Erreur lors de la génération du brief matinal: {str(e)}")
+
+    if wants_event_stream(request):
+        return event_stream_response(_generate, response_model=MorningBriefResponse)
+    return await _generate()
 
 
 @router.get("/morning/preview")
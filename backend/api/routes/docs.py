@@ -1,16 +1,16 @@
 """Documentation Routes - PDF generation for API documentation"""
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
 from fastapi.responses import Response
 
 from core.exceptions import AppException, NotFoundError, BusinessLogicError
-from typing import Dict
-import os
-import markdown
-try:
-    from xhtml2pdf import pisa
-except ImportError:
-    pisa = None
-import io
+from core.pdf_renderer import (
+    PdfRenderError,
+    etag_matches,
+    format_etag,
+    get_pdf_renderer,
+    pdf_engine_available,
+)
+from typing import Dict, Optional
 import logging
 
 import aiofiles
@@ -21,167 +21,67 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/docs", tags=["Documentation"])
 
+INTEGRATIONS_PDF_TITLE = "Notice API Intégrations"
+
+
+def _pdf_headers(etag: str, filename: str) -> Dict[str, str]:
+    return {
+        "Content-Disposition": f"attachment; filename={filename}",
+        "ETag": etag,
+        # Authentifié : cache navigateur uniquement, revalidé à chaque fois (304 si inchangé)
+        "Cache-Control": "private, no-cache",
+        "Access-Control-Expose-Headers": "Content-Disposition, Content-Type, Content-Length, ETag",
+    }
+
 
 @router.get("/integrations.pdf")
 async def get_integrations_pdf(
-    current_user: Dict = Depends(get_current_gerant)
+    current_user: Dict = Depends(get_current_gerant),
+    if_none_match: Optional[str] = Header(default=None),
 ):
     """
     Generate and download the API Integrations notice as PDF.
     Requires gérant authentication.
+
+    Rendered once per content (process pool + memory/disk cache),
+    answered 304 when the client's ETag matches.
     """
-    if pisa is None:
+    if not pdf_engine_available():
         logger.error("xhtml2pdf library not available. Please install: pip install xhtml2pdf")
         raise BusinessLogicError(
             "PDF generation library not available. Please install xhtml2pdf. Check server logs for details."
         )
-    
+
     try:
         # Get the markdown file path - docs/ is at project root, one level above backend/
         from core.config import ROOT_DIR
         md_path = ROOT_DIR.parent / "docs" / "NOTICE_API_INTEGRATIONS.md"
-        
+
         if not md_path.exists():
             raise NotFoundError(f"Documentation file not found at {md_path}")
-        
+
         # Read markdown file (async to avoid blocking the event loop)
         async with aiofiles.open(md_path, "r", encoding="utf-8") as f:
             md_content = await f.read()
-        
-        # Convert markdown to HTML
-        html_content = markdown.markdown(
-            md_content,
-            extensions=['extra', 'codehilite', 'tables', 'toc']
-        )
-        
-        # Add CSS styling for PDF
-        styled_html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    font-size: 11pt;
-                    line-height: 1.6;
-                    color: #333;
-                    margin: 20px;
-                }}
-                h1 {{
-                    color: #4F46E5;
-                    border-bottom: 3px solid #4F46E5;
-                    padding-bottom: 10px;
-                    page-break-after: avoid;
-                }}
-                h2 {{
-                    color: #6366F1;
-                    margin-top: 30px;
-                    page-break-after: avoid;
-                }}
-                h3 {{
-                    color: #818CF8;
-                    margin-top: 20px;
-                    page-break-after: avoid;
-                }}
-                h4 {{
-                    color: #A5B4FC;
-                    margin-top: 15px;
-                    page-break-after: avoid;
-                }}
-                code {{
-                    background-color: #F3F4F6;
-                    padding: 2px 6px;
-                    border-radius: 3px;
-                    font-family: 'Courier New', monospace;
-                    font-size: 10pt;
-                }}
-                pre {{
-                    background-color: #1F2937;
-                    color: #F9FAFB;
-                    padding: 15px;
-                    border-radius: 5px;
-                    overflow-x: auto;
-                    page-break-inside: avoid;
-                }}
-                pre code {{
-                    background-color: transparent;
-                    color: inherit;
-                    padding: 0;
-                }}
-                table {{
-                    border-collapse: collapse;
-                    width: 100%;
-                    margin: 15px 0;
-                    page-break-inside: avoid;
-                }}
-                th, td {{
-                    border: 1px solid #D1D5DB;
-                    padding: 8px;
-                    text-align: left;
-                }}
-                th {{
-                    background-color: #F3F4F6;
-                    font-weight: bold;
-                }}
-                blockquote {{
-                    border-left: 4px solid #4F46E5;
-                    padding-left: 15px;
-                    margin: 15px 0;
-                    color: #6B7280;
-                    font-style: italic;
-                }}
-                a {{
-                    color: #4F46E5;
-                    text-decoration: none;
-                }}
-                ul, ol {{
-                    margin: 10px 0;
-                    padding-left: 30px;
-                }}
-                li {{
-                    margin: 5px 0;
-                }}
-                .page-break {{
-                    page-break-before: always;
-                }}
-            </style>
-        </head>
-        <body>
-            {html_content}
-        </body>
-        </html>
-        """
-        
-        # Convert HTML to PDF
-        pdf_buffer = io.BytesIO()
-        pisa_status = pisa.CreatePDF(
-            styled_html,
-            dest=pdf_buffer,
-            encoding='utf-8'
-        )
-        
-        if pisa_status.err:
-            logger.error(f"PDF generation error: {pisa_status.err}")
-            raise BusinessLogicError("Failed to generate PDF")
-        
-        pdf_buffer.seek(0)
-        pdf_content = pdf_buffer.read()
-        
-        # Return PDF response with proper headers
+
+        filename = "NOTICE_API_INTEGRATIONS.pdf"
+        renderer = get_pdf_renderer()
+        etag = format_etag(renderer.markdown_key(md_content, INTEGRATIONS_PDF_TITLE))
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=_pdf_headers(etag, filename))
+
+        pdf = await renderer.render_markdown(md_content, INTEGRATIONS_PDF_TITLE)
         return Response(
-            content=pdf_content,
+            content=pdf.content,
             media_type="application/pdf",
-            headers={
-                "Content-Disposition": "attachment; filename=NOTICE_API_INTEGRATIONS.pdf",
-                "Content-Type": "application/pdf",
-                "Access-Control-Expose-Headers": "Content-Disposition, Content-Type, Content-Length"
-            }
+            headers=_pdf_headers(pdf.etag, filename),
         )
-        
+
     except AppException:
         raise
+    except PdfRenderError as e:
+        logger.error(f"PDF generation error: {e}")
+        raise BusinessLogicError("Failed to generate PDF")
     except Exception as e:
         logger.error(f"Error generating PDF: {e}")
         raise BusinessLogicError(f"Failed to generate PDF: {str(e)}")
-
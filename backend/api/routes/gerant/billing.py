@@ -9,11 +9,11 @@ import logging
 
 from core.exceptions import AppException, NotFoundError, ValidationError
 from core.security import get_current_gerant
-from core.config import settings
 from services.gerant_service import GerantService
 from services.vat_service import validate_vat_number, calculate_vat_rate, is_eu_country
 from models.billing import BillingProfileCreate, BillingProfileUpdate
-from api.dependencies import get_gerant_service
+from services.stripe_client import StripeClient
+from api.dependencies import get_gerant_service, get_stripe_client
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +48,7 @@ async def create_billing_profile(
     profile_data: BillingProfileCreate,
     current_user: dict = Depends(get_current_gerant),
     gerant_service: GerantService = Depends(get_gerant_service),
+    stripe_client: StripeClient = Depends(get_stripe_client),
 ):
     """
     Crée ou met à jour le profil de facturation B2B du gérant.
@@ -142,8 +143,6 @@ async def create_billing_profile(
             logger.info(f"Profil de facturation créé pour gérant {gerant_id}")
 
         try:
-            stripe.api_key = settings.STRIPE_API_KEY
-
             gerant = await gerant_service.get_gerant_by_id(gerant_id, include_password=False)
             stripe_customer_id = gerant.get('stripe_customer_id')
 
@@ -175,7 +174,7 @@ async def create_billing_profile(
                         "value": billing_profile["vat_number"]
                     }]
 
-                stripe.Customer.modify(stripe_customer_id, **customer_update_data)
+                await stripe_client.modify_customer(stripe_customer_id, **customer_update_data)
                 logger.info(f"Stripe Customer {stripe_customer_id} mis à jour avec le profil de facturation")
             else:
                 logger.warning(f"Gérant {gerant_id} n'a pas de customer Stripe, impossible de synchroniser")
@@ -200,6 +199,7 @@ async def update_billing_profile(
     profile_data: BillingProfileUpdate,
     current_user: dict = Depends(get_current_gerant),
     gerant_service: GerantService = Depends(get_gerant_service),
+    stripe_client: StripeClient = Depends(get_stripe_client),
 ):
     """
     Met à jour partiellement le profil de facturation B2B.
@@ -286,8 +286,6 @@ async def update_billing_profile(
         updated_profile = await gerant_service.get_billing_profile_by_gerant(gerant_id)
 
         try:
-            stripe.api_key = settings.STRIPE_API_KEY
-
             gerant = await gerant_service.get_gerant_by_id(gerant_id, include_password=False)
             stripe_customer_id = gerant.get('stripe_customer_id')
 
@@ -310,7 +308,7 @@ async def update_billing_profile(
                         "value": updated_profile["vat_number"]
                     }]
 
-                stripe.Customer.modify(stripe_customer_id, **customer_update)
+                await stripe_client.modify_customer(stripe_customer_id, **customer_update)
                 logger.info(f"Stripe Customer {stripe_customer_id} mis à jour")
 
         except stripe.StripeError as e:
@@ -11,7 +11,8 @@ from core.exceptions import AppException, ValidationError
 from core.security import get_current_gerant
 from core.config import settings
 from services.gerant_service import GerantService
-from api.dependencies import get_gerant_service
+from services.stripe_client import StripeClient
+from api.dependencies import get_gerant_service, get_stripe_client
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +39,7 @@ async def get_invoices(
     current_user: dict = Depends(get_current_gerant),
     limit: int = Query(24, ge=1, le=100),
     starting_after: Optional[str] = None,
+    stripe_client: StripeClient = Depends(get_stripe_client),
 ):
     """
     Fetch the gérant's Stripe invoices (most recent first).
@@ -50,7 +52,6 @@ async def get_invoices(
     if not stripe_customer_id:
         return {"invoices": [], "has_more": False}
 
-    stripe.api_key = settings.STRIPE_API_KEY
     try:
         params = {
             "customer": stripe_customer_id,
@@ -60,7 +61,7 @@ async def get_invoices(
         if starting_after:
             params["starting_after"] = starting_after
 
-        result = stripe.Invoice.list(**params)
+        result = await stripe_client.list_invoices(**params)
 
         invoices = []
         for inv in result.data:
@@ -69,8 +70,8 @@ async def get_invoices(
             sub = inv.get("subscription")
             if sub and hasattr(sub, "metadata"):
                 plan_key = sub.metadata.get("plan")
-            if not plan_key and sub and hasattr(sub, "items") and sub.items.data:
-                qty = sub.items.data[0].get("quantity", 1)
+            if not plan_key and sub and sub.get("items") and sub["items"].data:
+                qty = sub["items"].data[0].get("quantity", 1)
                 plan_key = "enterprise" if qty >= 16 else ("professional" if qty >= 6 else "starter")
             plan_names = {"starter": "Small Team", "professional": "Medium Team", "enterprise": "Large Team"}
             plan_label = plan_names.get(plan_key, "") if plan_key else ""
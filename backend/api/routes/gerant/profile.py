@@ -13,7 +13,8 @@ from core.exceptions import AppException, NotFoundError, ValidationError, Forbid
 from core.security import get_current_gerant
 from services.gerant_service import GerantService
 from services.manager_service import APIKeyService
-from api.dependencies import get_gerant_service, get_api_key_service
+from services.stripe_client import StripeClient
+from api.dependencies import get_gerant_service, get_api_key_service, get_stripe_client
 from middleware.log_sanitizer import neutralize_for_log
 from email_service import send_staff_email_update_confirmation, send_staff_email_update_alert
 from fastapi import BackgroundTasks
@@ -196,6 +197,7 @@ async def update_gerant_profile(
     update_data: Dict,
     current_user: dict = Depends(get_current_gerant),
     gerant_service: GerantService = Depends(get_gerant_service),
+    stripe_client: StripeClient = Depends(get_stripe_client),
 ):
     """
     Update gérant profile information.
@@ -264,7 +266,7 @@ async def update_gerant_profile(
             stripe_customer_id = user.get('stripe_customer_id')
             if stripe_customer_id:
                 try:
-                    stripe.Customer.modify(
+                    await stripe_client.modify_customer(
                         stripe_customer_id,
                         email=user_updates['email']
                     )
@@ -311,7 +313,7 @@ async def change_gerant_password(
         Success message
     """
     try:
-        from core.security import verify_password, get_password_hash
+        from core.password_hasher import get_password_hasher
 
         gerant_id = current_user['id']
         old_password = password_data.get('old_password')
@@ -332,11 +334,12 @@ async def change_gerant_password(
             raise NotFoundError(ERR_UTILISATEUR_NON_TROUVE)
 
         # Verify old password
-        if not verify_password(old_password, user.get('password', '')):
+        hasher = get_password_hasher()
+        if not await hasher.verify(old_password, user.get('password', '')):
             raise UnauthorizedError("Ancien mot de passe incorrect")
 
         # Hash new password
-        hashed_password = get_password_hash(new_password)
+        hashed_password = await hasher.hash(new_password)
 
         # Update password
         await gerant_service.update_gerant_user_one(
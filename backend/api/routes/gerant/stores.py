@@ -1,11 +1,12 @@
 """
 Gérant store routes: stores CRUD, store detail, KPI routes, bulk-import.
 """
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from pydantic import BaseModel
 from datetime import datetime, timezone
 from typing import Dict, List
 
+from core.ai_stream import event_stream_response, wants_event_stream
 from core.constants import ERR_ACCES_REFUSE_MAGASIN, MONGO_GROUP, MONGO_MATCH
 from core.exceptions import AppException, NotFoundError, ValidationError, ForbiddenError
 from core.security import get_current_gerant, get_gerant_or_manager
@@ -336,6 +337,7 @@ async def update_store_business_context(
 
 @router.post("/stores/{store_id}/analyze-store-kpis")
 async def analyze_store_kpis_gerant(
+    request: Request,
     store_id: str,
     analysis_data: dict,
     current_user: Dict = Depends(get_current_gerant),
@@ -351,9 +353,15 @@ async def analyze_store_kpis_gerant(
     stores = await gerant_service.get_all_stores(current_user["id"])
     if not any(s.get("id") == store_id for s in stores):
         raise ForbiddenError(ERR_ACCES_REFUSE_MAGASIN)
-    return await run_store_kpi_analysis(
-        store_id, analysis_data, manager_service, kpi_service, ai_service
-    )
+
+    async def _generate() -> Dict:
+        return await run_store_kpi_analysis(
+            store_id, analysis_data, manager_service, kpi_service, ai_service
+        )
+
+    if wants_event_stream(request):
+        return event_stream_response(_generate)
+    return await _generate()
 
 
 # ===== BULK IMPORT STORES =====
@@ -128,7 +128,7 @@ async def switch_billing_interval(
                 new_price_id = settings.STRIPE_PRICE_ID_YEARLY if new_interval == 'year' else settings.STRIPE_PRICE_ID_MONTHLY
 
                 # CRITICAL: Modify subscription with new price
-                updated_subscription = stripe_client.modify_subscription(
+                updated_subscription = await stripe_client.modify_subscription(
                     stripe_subscription_id,
                     items=[{
                         'id': stripe_subscription_item_id,
@@ -144,7 +144,7 @@ async def switch_billing_interval(
                 # Get proration from Stripe API only (no server-side calculation)
                 proration_amount = 0.0
                 try:
-                    upcoming = stripe_client.upcoming_invoice(stripe_subscription_id)
+                    upcoming = await stripe_client.upcoming_invoice(stripe_subscription_id)
                     proration_amount = upcoming.get('amount_due', 0) / 100
                 except Exception as e:
                     logger.warning(f"Could not get proration: {e}")
@@ -366,7 +366,7 @@ async def cancel_subscription(
         try:
             if cancel_immediately:
                 # Cancel immediately - Stripe will handle proration/refund
-                canceled_subscription = stripe_client.delete_subscription(stripe_subscription_id)
+                canceled_subscription = await stripe_client.delete_subscription(stripe_subscription_id)
 
                 await gerant_service.update_subscription_by_stripe_id(
                     stripe_subscription_id,
@@ -396,7 +396,7 @@ async def cancel_subscription(
                 }
             else:
                 # Cancel at period end - keep access until end of billing period
-                updated_subscription = stripe_client.modify_subscription(
+                updated_subscription = await stripe_client.modify_subscription(
                     stripe_subscription_id,
                     cancel_at_period_end=True,
                 )
@@ -591,7 +591,7 @@ async def reactivate_subscription(
 
         try:
             # Reactivate subscription in Stripe
-            updated_stripe_subscription = stripe_client.modify_subscription(
+            updated_stripe_subscription = await stripe_client.modify_subscription(
                 stripe_subscription_id,
                 cancel_at_period_end=False,
             )
@@ -4,6 +4,7 @@ Subscription seats routes: update-seats, preview (unified), seats/preview (legac
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 from typing import Optional
+import asyncio
 import stripe
 import logging
 
@@ -247,26 +248,26 @@ async def preview_subscription_update(
                 stripe_customer_id = gerant.get('stripe_customer_id') if gerant else None
 
                 if stripe_customer_id:
-                    # Get current subscription details from Stripe
-                    current_stripe_sub = stripe_client.retrieve_subscription(stripe_subscription_id)
-                    current_quantity = current_stripe_sub['items']['data'][0]['quantity']
-
                     # Preview new subscription with updated quantity/interval
                     new_price_id = settings.STRIPE_PRICE_ID_YEARLY if new_interval == 'year' else settings.STRIPE_PRICE_ID_MONTHLY
 
-                    # Use Stripe Invoice.create_preview for accurate amounts
-                    preview_invoice = stripe_client.create_invoice_preview(
-                        customer_id=stripe_customer_id,
-                        subscription_id=stripe_subscription_id,
-                        subscription_details={
-                            'items': [{
-                                'id': stripe_subscription_item_id,
-                                'price': new_price_id,
-                                'quantity': new_seats,
-                            }],
-                            'proration_behavior': 'create_prorations',
-                        },
+                    # Current subscription (cached read) and Invoice.create_preview in parallel
+                    current_stripe_sub, preview_invoice = await asyncio.gather(
+                        stripe_client.retrieve_subscription(stripe_subscription_id),
+                        stripe_client.create_invoice_preview(
+                            customer_id=stripe_customer_id,
+                            subscription_id=stripe_subscription_id,
+                            subscription_details={
+                                'items': [{
+                                    'id': stripe_subscription_item_id,
+                                    'price': new_price_id,
+                                    'quantity': new_seats,
+                                }],
+                                'proration_behavior': 'create_prorations',
+                            },
+                        ),
                     )
+                    current_quantity = current_stripe_sub['items']['data'][0]['quantity']
 
                     # Extract amounts from Stripe (in cents, convert to euros)
                     proration_estimate = round(preview_invoice.amount_due / 100, 2)
@@ -389,17 +390,20 @@ async def preview_seat_change(
                     stripe_customer_id = gerant.get('stripe_customer_id') if gerant else None
 
                     if stripe_customer_id:
-                        # Call Stripe's Invoice preview API for accurate proration
-                        preview_invoice = stripe_client.create_invoice_preview(
-                            customer_id=stripe_customer_id,
-                            subscription_id=stripe_subscription_id,
-                            subscription_details={
-                                'items': [{
-                                    'id': stripe_subscription_item_id,
-                                    'quantity': new_seats,
-                                }],
-                                'proration_behavior': 'create_prorations',
-                            },
+                        # Stripe's Invoice preview API (accurate proration) + current subscription, in parallel
+                        preview_invoice, current_stripe_sub = await asyncio.gather(
+                            stripe_client.create_invoice_preview(
+                                customer_id=stripe_customer_id,
+                                subscription_id=stripe_subscription_id,
+                                subscription_details={
+                                    'items': [{
+                                        'id': stripe_subscription_item_id,
+                                        'quantity': new_seats,
+                                    }],
+                                    'proration_behavior': 'create_prorations',
+                                },
+                            ),
+                            stripe_client.retrieve_subscription(stripe_subscription_id),
                         )
 
                         # Extract amounts from Stripe (in cents, convert to euros)
@@ -411,8 +415,7 @@ async def preview_seat_change(
                                 new_monthly_cost = round(line.amount / 100, 2) / new_seats if new_seats > 0 else 0
                                 break
 
-                        # Get current subscription for comparison
-                        current_stripe_sub = stripe_client.retrieve_subscription(stripe_subscription_id)
+                        # Current subscription for comparison
                         if current_stripe_sub['items']['data']:
                             current_price_amount = current_stripe_sub['items']['data'][0]['price']['unit_amount']
                             current_quantity = current_stripe_sub['items']['data'][0]['quantity']
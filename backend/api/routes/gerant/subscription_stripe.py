@@ -53,7 +53,7 @@ async def create_billing_portal_session(
         raise ValidationError("Aucun compte de facturation Stripe associé à ce compte")
 
     try:
-        session = stripe_client.create_billing_portal_session(
+        session = await stripe_client.create_billing_portal_session(
             customer_id=stripe_customer_id,
             return_url=data.return_url,
         )
@@ -180,7 +180,7 @@ async def create_gerant_checkout_session(
             stripe_sub_id = existing_sub.get('stripe_subscription_id')
             if stripe_sub_id:
                 try:
-                    stripe_sub = stripe_client.retrieve_subscription(stripe_sub_id)
+                    stripe_sub = await stripe_client.retrieve_subscription(stripe_sub_id)
                     if stripe_sub.status in ['active', 'trialing']:
                         active_count += 1
                         active_stripe_ids.append(stripe_sub_id)
@@ -207,7 +207,7 @@ async def create_gerant_checkout_session(
         # Créer ou récupérer le client Stripe
         if stripe_customer_id:
             try:
-                customer = stripe_client.retrieve_customer(stripe_customer_id)
+                customer = await stripe_client.retrieve_customer(stripe_customer_id)
                 if customer.get('deleted'):
                     stripe_customer_id = None
                 logger.info(f"Réutilisation du client Stripe: {stripe_customer_id}")
@@ -216,7 +216,7 @@ async def create_gerant_checkout_session(
                 logger.warning(f"Client Stripe introuvable, création d'un nouveau")
 
         if not stripe_customer_id:
-            customer = stripe_client.create_customer(
+            customer = await stripe_client.create_customer(
                 email=current_user['email'],
                 name=current_user['name'],
                 metadata={'gerant_id': current_user['id'], 'role': 'gerant'},
@@ -269,7 +269,7 @@ async def create_gerant_checkout_session(
 
         # Créer la session de checkout avec metadata complète
         try:
-            session = stripe_client.create_checkout_session(
+            session = await stripe_client.create_checkout_session(
             customer=stripe_customer_id,
             client_reference_id=f"gerant_{current_user['id']}_{correlation_id}",  # For correlation
             payment_method_types=['card'],
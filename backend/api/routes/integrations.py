@@ -1,5 +1,5 @@
 """Integration Routes - API Keys and External Systems - Clean Architecture.
-Phase 0: Zero Repo in Route - services only (StoreService, GerantService, KPIService, IntegrationService).
+Phase 0: Zero Repo in Route - services only (StoreService, GerantService, KPISyncService, IntegrationService).
 Phase 2: Exceptions métier (NotFoundError, ValidationError)."""
 from fastapi import APIRouter, Depends, Header, Query
 from typing import Dict, Optional, List
@@ -8,7 +8,10 @@ from uuid import uuid4
 import asyncio
 import logging
 from core.constants import QUERY_PAGE_NUM_DESC, QUERY_PAGE_SIZE_DESC
-from core.exceptions import NotFoundError, ValidationError, ForbiddenError, ConflictError, BusinessLogicError
+from config.limits import KPI_SYNC_MAX_ENTRIES
+from core.exceptions import (
+    AppException, NotFoundError, ValidationError, ForbiddenError, ConflictError, BusinessLogicError,
+)
 from core.cache import invalidate_store_cache
 from core.audit import log_action
 from core.database import get_db
@@ -16,13 +19,14 @@ from models.integrations import (
     APIKeyCreate, KPISyncRequest, APIStoreCreate,
     APIManagerCreate, APISellerCreate, APIUserUpdate
 )
-from services.kpi_service import KPIService
+from services.kpi_sync_service import KPISyncService
 from services.integration_service import IntegrationService
 from services.store_service import StoreService
 from services.gerant_service import GerantService
-from api.dependencies import get_kpi_service, get_integration_service, get_store_service, get_gerant_service
+from api.dependencies import get_kpi_sync_service, get_integration_service, get_store_service, get_gerant_service
+from core.password_hasher import get_password_hasher
 from core.security import (
-    get_current_gerant, get_password_hash, require_active_space, get_api_key_from_headers,
+    get_current_gerant, require_active_space, get_api_key_from_headers,
     verify_integration_api_key, verify_integration_store_access,
 )
 
@@ -201,7 +205,7 @@ async def create_manager(
         "id": manager_id,
         "name": manager_data.name,
         "email": manager_data.email,
-        "password": get_password_hash(temp_password),
+        "password": await get_password_hasher().hash(temp_password),
         "role": "manager",
         "status": "active",
         "phone": manager_data.phone,
@@ -276,7 +280,7 @@ async def create_seller(
         "id": seller_id,
         "name": seller_data.name,
         "email": seller_data.email,
-        "password": get_password_hash(temp_password),
+        "password": await get_password_hasher().hash(temp_password),
         "role": "seller",
         "status": "active",
         "phone": seller_data.phone,
@@ -456,149 +460,99 @@ async def delete_user(
 async def sync_kpi_data(
     data: KPISyncRequest,
     api_key: Dict = Depends(verify_api_key),
-    kpi_service: KPIService = Depends(get_kpi_service),
+    kpi_sync_service: KPISyncService = Depends(get_kpi_sync_service),
     gerant_service: GerantService = Depends(get_gerant_service),
     db=Depends(get_db),
 ):
     """
-    Sync KPI data from external systems. Phase 0 Vague 2: no db.
+    Sync KPI data from external systems.
     Full path: /api/integrations/kpi/sync
+
+    Set-based engine (KPISyncService): entries are processed in bounded chunks,
+    each chunk costs 1 seller lookup ($in) + 1 existing-keys lookup + 1 bulk_write,
+    whatever the number of entries. Per-chunk timings are returned in "chunks".
+    A failing chunk does not stop the others: the response is then "partial"
+    with entries_failed (and an "error" on the failed chunks).
     """
+    gerant_id = api_key.get("user_id")
+    if gerant_id:
+        await gerant_service.check_gerant_active_access(gerant_id)
+
+    if len(data.kpi_entries) > KPI_SYNC_MAX_ENTRIES:
+        raise ValidationError(
+            f"Maximum {KPI_SYNC_MAX_ENTRIES} KPI entries per request. Received {len(data.kpi_entries)}."
+        )
+
+    # Verify permissions
+    if "write:kpi" not in api_key.get('permissions', []):
+        raise ForbiddenError("Insufficient permissions")
+
     try:
-        gerant_id = api_key.get("user_id")
-        if gerant_id:
-            await gerant_service.check_gerant_active_access(gerant_id)
-        
-        # Limit to 100 items per request
-        if len(data.kpi_entries) > 100:
-            raise ValidationError(f"Maximum 100 KPI entries per request. Received {len(data.kpi_entries)}.")
-        
-        # Verify permissions
-        if "write:kpi" not in api_key.get('permissions', []):
-            raise ForbiddenError("Insufficient permissions")
-        
-        # Process entries via bulk operations
-        from pymongo import InsertOne, UpdateOne
-        seller_operations = []
-        entries_created = 0
-        entries_updated = 0
-        affected_store_ids = set()
-        
-        for entry in data.kpi_entries:
-            if not entry.seller_id:
-                logger.warning(f"Skipping entry without seller_id: {entry}")
-                continue
-                
-            # Use entry-level date/store_id if provided, otherwise use root-level
-            entry_date = entry.date or data.date
-            entry_store_id = entry.store_id or data.store_id
-            
-            # Validate that we have both date and store_id
-            if not entry_date:
-                raise BusinessLogicError(f"Date is required for seller_id {entry.seller_id}. Provide it either at root level or in each kpi_entry.")
-            if not entry_store_id:
-                raise BusinessLogicError(f"store_id is required for seller_id {entry.seller_id}. Provide it either at root level or in each kpi_entry.")
-            
-            try:
-                seller = await gerant_service.get_user_by_id(entry.seller_id)
-                if not seller:
-                    logger.warning(f"Seller {entry.seller_id} not found in database, but continuing with KPI creation")
-                elif seller.get("role") != "seller":
-                    logger.warning("User %s is not a seller, continuing", entry.seller_id)
-            except Exception:
-                logger.warning("Error checking seller %s, continuing anyway", entry.seller_id)
-            
-            # Check if exists
-            try:
-                existing = await kpi_service.get_kpi_by_seller_and_date(
-                    entry.seller_id,
-                    entry_date,
-                )
-            except Exception as find_error:
-                logger.error(
-                    "Error finding existing KPI for seller %s date %s: %s",
-                    entry.seller_id, entry_date, find_error,
-                    exc_info=True,
-                )
-                raise
-            
-            kpi_data = {
-                "ca_journalier": entry.ca_journalier,
-                "nb_ventes": entry.nb_ventes,
-                "nb_articles": entry.nb_articles,
-                "nb_prospects": entry.prospects or 0,
-                "nb_clients": entry.nb_ventes or 0,  # clients = ventes (cohérent avec la saisie manuelle)
-                "source": "api",
-                "locked": True,
-                "updated_at": datetime.now(timezone.utc)
-            }
-            
-            if existing:
-                # Ensure store_id is included in update
-                kpi_data["store_id"] = entry_store_id
-                seller_operations.append(UpdateOne(
-                    {"seller_id": entry.seller_id, "date": entry_date},
-                    {"$set": kpi_data}
-                ))
-                entries_updated += 1
-            else:
-                kpi_data.update({
-                    "id": str(uuid4()),
-                    "seller_id": entry.seller_id,
-                    "store_id": entry_store_id,  # CRITICAL: Add store_id for dashboard aggregation
-                    "date": entry_date,
-                    "created_at": datetime.now(timezone.utc)
-                })
-                seller_operations.append(InsertOne(kpi_data))
-                entries_created += 1
-            if entry_store_id:
-                affected_store_ids.add(entry_store_id)
-
-        # Execute bulk operations
-        if seller_operations:
-            try:
-                result = await kpi_service.bulk_write_kpis(seller_operations)
-                logger.info("Bulk write completed: %s", result)
-                for sid in affected_store_ids:
-                    try:
-                        await invalidate_store_cache(sid)
-                    except Exception:
-                        pass  # fallback silencieux
-                # Audit log (fire-and-forget)
-                asyncio.create_task(log_action(
-                    db=db,
-                    user_id=api_key.get("user_id", "api"),
-                    user_role="api",
-                    action="kpi_sync",
-                    resource_type="kpi_entry",
-                    details={
-                        "entries_created": entries_created,
-                        "entries_updated": entries_updated,
-                        "store_ids": list(affected_store_ids),
-                    },
-                ))
-            except Exception as bulk_error:
-                logger.error("Bulk write failed: %s", bulk_error, exc_info=True)
-                raise ValidationError(f"Failed to write KPI data to database: {str(bulk_error)}")
-        else:
-            logger.warning("No seller operations to execute - all entries may have been skipped")
-            return {
-                "status": "warning",
-                "message": "No KPI entries were processed. Check that seller_id values are valid.",
-                "entries_created": 0,
-                "entries_updated": 0,
-                "total": 0
-            }
-        
-        logger.info(f"KPI sync completed: {entries_created} created, {entries_updated} updated")
-        return {
-            "status": "success",
-            "entries_created": entries_created,
-            "entries_updated": entries_updated,
-            "total": entries_created + entries_updated
-        }
+        result = await kpi_sync_service.sync_entries(
+            data.kpi_entries,
+            default_date=data.date,
+            default_store_id=data.store_id,
+        )
     except AppException:
         raise
+    except Exception as bulk_error:
+        logger.error("Bulk write failed: %s", bulk_error, exc_info=True)
+        raise ValidationError(f"Failed to write KPI data to database: {str(bulk_error)}")
+
+    if not result["chunks"]:
+        logger.warning("No seller operations to execute - all entries may have been skipped")
+        return {
+            "status": "warning",
+            "message": "No KPI entries were processed. Check that seller_id values are valid.",
+            "entries_created": 0,
+            "entries_updated": 0,
+            "total": 0
+        }
+
+    # Avant toute réponse d'erreur : un lot en échec n'annule pas les lots déjà écrits
+    for sid in result["store_ids"]:
+        try:
+            await invalidate_store_cache(sid)
+        except Exception:
+            pass  # fallback silencieux
+
+    failed_errors = [c["error"] for c in result["chunks"] if "error" in c]
+    if failed_errors and not result["total"]:
+        raise ValidationError(f"Failed to write KPI data to database: {failed_errors[0]}")
+
+    # Audit log (fire-and-forget)
+    asyncio.create_task(log_action(
+        db=db,
+        user_id=api_key.get("user_id", "api"),
+        user_role="api",
+        action="kpi_sync",
+        resource_type="kpi_entry",
+        details={
+            "entries_created": result["entries_created"],
+            "entries_updated": result["entries_updated"],
+            "entries_failed": result["entries_failed"],
+            "store_ids": result["store_ids"],
+        },
+    ))
+
+    logger.info(
+        "KPI sync completed: %d created, %d updated, %d failed in %d chunk(s)",
+        result["entries_created"], result["entries_updated"], result["entries_failed"], len(result["chunks"]),
+    )
+    response = {
+        "status": "partial" if failed_errors else "success",
+        "entries_created": result["entries_created"],
+        "entries_updated": result["entries_updated"],
+        "total": result["total"],
+        "chunks": result["chunks"],
+    }
+    if failed_errors:
+        response["entries_failed"] = result["entries_failed"]
+        response["message"] = (
+            f"{result['entries_failed']} KPI entries could not be written; "
+            "the sync is idempotent, resend the payload to retry."
+        )
+    return response
 
 
 # Legacy endpoint alias for backward compatibility with N8N
@@ -606,8 +560,9 @@ async def sync_kpi_data(
 async def sync_kpi_data_legacy(
     data: KPISyncRequest,
     api_key: Dict = Depends(verify_api_key),
-    kpi_service: KPIService = Depends(get_kpi_service),
+    kpi_sync_service: KPISyncService = Depends(get_kpi_sync_service),
     gerant_service: GerantService = Depends(get_gerant_service),
+    db=Depends(get_db),
 ):
-    """Legacy endpoint for N8N compatibility. Phase 0 Vague 2: no db."""
-    return await sync_kpi_data(data, api_key, kpi_service, gerant_service)
+    """Legacy endpoint for N8N compatibility."""
+    return await sync_kpi_data(data, api_key, kpi_sync_service, gerant_service, db)
@@ -2,7 +2,6 @@
 Internal job endpoints — called by Railway Cron service.
 Secured by X-Internal-Key header (INTERNAL_JOB_KEY env var).
 """
-import asyncio
 import logging
 from fastapi import APIRouter, Depends, Header, HTTPException
 from core.config import settings
@@ -19,6 +18,18 @@ def _verify_key(x_internal_key: str = Header(..., alias="X-Internal-Key")):
         raise HTTPException(status_code=403, detail="Forbidden")
 
 
+async def _dispatch(db, items, builder, label: str) -> dict:
+    """Render one e-mail per item and send them through the bulk dispatcher."""
+    from core.email_dispatcher import build_email_dispatcher
+    from services.email_jobs import build_job_messages
+
+    messages = build_job_messages(items, builder)
+    report = await build_email_dispatcher(db).dispatch(messages)
+    failed = report.failed + (len(items) - len(messages))
+    logger.info("%s: sent=%d failed=%d in %.0f ms", label, report.sent, failed, report.duration_ms)
+    return {"sent": report.sent, "failed": failed, "total": len(items)}
+
+
 # ── Weekly gérant recap ────────────────────────────────────────────────────
 @router.post("/weekly-gerant-recap", dependencies=[Depends(_verify_key)])
 async def run_weekly_gerant_recap(db=Depends(get_db)):
@@ -27,30 +38,10 @@ async def run_weekly_gerant_recap(db=Depends(get_db)):
     Should be triggered every Monday at 08:00.
     """
     from services.jobs_service import JobsService
-    from services.email_jobs import send_weekly_gerant_recap
-
-    service = JobsService(db)
-    recaps = await service.compute_weekly_gerant_recaps()
+    from services.email_jobs import build_weekly_gerant_recap
 
-    sent, failed = 0, 0
-    for recap in recaps:
-        try:
-            ok = await asyncio.to_thread(
-                send_weekly_gerant_recap,
-                recap["email"],
-                recap["name"],
-                recap,
-            )
-            if ok:
-                sent += 1
-            else:
-                failed += 1
-        except Exception:
-            logger.exception("Failed to send recap to %s", recap.get("email"))
-            failed += 1
-
-    logger.info("weekly-gerant-recap: sent=%d failed=%d", sent, failed)
-    return {"sent": sent, "failed": failed, "total": len(recaps)}
+    recaps = await JobsService(db).compute_weekly_gerant_recaps()
+    return await _dispatch(db, recaps, build_weekly_gerant_recap, "weekly-gerant-recap")
 
 
 # ── Silent seller alerts ───────────────────────────────────────────────────
@@ -62,27 +53,7 @@ async def run_silent_seller_alerts(db=Depends(get_db)):
     Should be triggered Mon-Fri at 08:00.
     """
     from services.jobs_service import JobsService
-    from services.email_jobs import send_silent_seller_alert
-
-    service = JobsService(db)
-    alerts = await service.compute_silent_seller_alerts()
-
-    sent, failed = 0, 0
-    for alert in alerts:
-        try:
-            ok = await asyncio.to_thread(
-                send_silent_seller_alert,
-                alert["email"],
-                alert["name"],
-                alert,
-            )
-            if ok:
-                sent += 1
-            else:
-                failed += 1
-        except Exception:
-            logger.exception("Failed to send alert to %s", alert.get("email"))
-            failed += 1
+    from services.email_jobs import build_silent_seller_alert
 
-    logger.info("silent-seller-alerts: sent=%d failed=%d", sent, failed)
-    return {"sent": sent, "failed": failed, "total": len(alerts)}
+    alerts = await JobsService(db).compute_silent_seller_alerts()
+    return await _dispatch(db, alerts, build_silent_seller_alert, "silent-seller-alerts")
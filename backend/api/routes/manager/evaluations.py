@@ -8,7 +8,7 @@ from fastapi import APIRouter, Depends, Query, Request
 from pydantic import BaseModel
 
 from config.limits import MAX_PAGE_SIZE
-from core.constants import QUERY_STORE_ID_REQUIS_GERANT
+from core.constants import QUERY_CURSOR_DESC, QUERY_STORE_ID_REQUIS_GERANT
 from core.exceptions import AppException, NotFoundError, ValidationError
 from api.routes.manager.dependencies import get_store_context, get_store_context_required, get_verified_seller
 from api.routes.manager.response_utils import pagination_dict
@@ -94,13 +94,14 @@ async def get_seller_debriefs(
     request: Request,
     page: int = 1,
     size: int = 50,
+    cursor: Optional[str] = Query(None, description=QUERY_CURSOR_DESC),
     seller: dict = Depends(get_verified_seller),
     manager_service: ManagerService = Depends(get_manager_service),
 ):
     """Get paginated debriefs for a specific seller. Access verified via get_verified_seller."""
     seller_id = seller.get("id")
     result = await manager_service.get_debriefs_by_seller_paginated(
-        seller_id, page=page, size=size
+        seller_id, page=page, size=size, cursor=cursor
     )
     return {
         "debriefs": result.items,
@@ -29,6 +29,7 @@ from api.dependencies import (
 from services.competence_service import CompetenceService
 from api.dependencies_rate_limiting import rate_limit
 from core.security import verify_seller_store_access
+from utils.kpi_pipeline import TEAM_KPI_PERIODS, comparison_periods
 from models.pagination import PaginatedResponse, PaginationParams
 from services.manager_service import ManagerService
 from services.manager import ManagerKpiService
@@ -88,24 +89,12 @@ async def get_dates_with_data(
 ):
     """Get list of dates that have KPI data for the store (calendar highlighting)."""
     resolved_store_id = context.get("resolved_store_id")
-    query = {"store_id": resolved_store_id}
+    date_filter = None
     if year and month:
         start_date = f"{year}-{month:02d}-01"
         end_date = f"{year}-{month + 1:02d}-01" if month != 12 else f"{year + 1}-01-01"
-        query["date"] = {"$gte": start_date, "$lt": end_date}
-    dates = await kpi_service.get_kpi_distinct_dates(query)
-    manager_dates = await kpi_service.get_manager_kpi_distinct_dates(query)
-    all_dates = sorted(set(dates) | set(manager_dates))
-    locked_query = {**query, "locked": True}
-    locked_dates = await kpi_service.get_kpi_distinct_dates(locked_query)
-    locked_sellers_by_date = await kpi_service.get_locked_seller_ids_by_date(
-        resolved_store_id, date_filter=query.get("date")
-    )
-    return {
-        "dates": all_dates,
-        "lockedDates": sorted(locked_dates),
-        "lockedSellersByDate": locked_sellers_by_date,
-    }
+        date_filter = {"$gte": start_date, "$lt": end_date}
+    return await kpi_service.get_store_calendar(resolved_store_id, date_filter)
 
 
 @router.get("/available-years")
@@ -117,17 +106,7 @@ async def get_available_years(
 ):
     """Get list of years that have KPI data for the store."""
     resolved_store_id = context.get("resolved_store_id")
-    dates = await kpi_service.get_kpi_distinct_dates({"store_id": resolved_store_id})
-    manager_dates = await kpi_service.get_manager_kpi_distinct_dates({"store_id": resolved_store_id})
-    all_dates = set(dates) | set(manager_dates)
-    years = set()
-    for date_str in all_dates:
-        if date_str and len(date_str) >= 4:
-            try:
-                years.add(int(date_str[:4]))
-            except Exception:
-                pass
-    return {"years": sorted(list(years), reverse=True)}
+    return {"years": await kpi_service.get_store_available_years(resolved_store_id)}
 
 
 # ===== MANAGER KPI =====
@@ -370,16 +349,17 @@ async def get_team_kpi_metrics(
     manager_service: ManagerService = Depends(get_manager_service),
 ) -> dict:
     """
-    Métriques KPI agrégées pour toute l'équipe en un seul appel.
+    Métriques KPI agrégées pour toute l'équipe en un seul appel (une seule agrégation).
     Remplace N appels /seller/{id}/kpi-metrics → 1 seul POST.
 
     Body: { "seller_ids": [...], "days": 30 }
           ou { "seller_ids": [...], "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD" }
+          + optionnel "compare": ["previous", "last_year"]
 
     Retourne: { seller_id: { ca, ventes, articles, prospects, panier_moyen, ... } }
+    Avec "compare": { "periods": { current|previous|last_year: {start_date, end_date} },
+                      "metrics": { current|previous|last_year: { seller_id: {...} } } }
     """
-    import asyncio
-
     resolved_store_id = context.get("resolved_store_id")
     if not resolved_store_id:
         raise ValidationError(ERR_STORE_ID_REQUIS)
@@ -389,6 +369,9 @@ async def get_team_kpi_metrics(
         raise ValidationError("seller_ids doit être un tableau non vide")
     if len(seller_ids) > 200:
         raise ValidationError("Maximum 200 vendeurs par requête")
+    compare = payload.get("compare") or []
+    if not isinstance(compare, list) or not set(compare) <= set(TEAM_KPI_PERIODS[1:]):
+        raise ValidationError(f"compare doit être une liste parmi {list(TEAM_KPI_PERIODS[1:])}")
 
     # Validation dates
     start_date: Optional[str] = payload.get("start_date")
@@ -415,12 +398,15 @@ async def get_team_kpi_metrics(
     if invalid:
         raise ValidationError(f"Certains vendeurs n'appartiennent pas à ce magasin: {invalid}")
 
-    # Pipeline en parallèle pour tous les sellers validés
-    results = await asyncio.gather(*[
-        manager_service.get_seller_kpi_metrics(sid, start_date, end_date)
-        for sid in valid_ids
-    ])
-    return {sid: metrics for sid, metrics in zip(valid_ids, results)}
+    all_periods = comparison_periods(start_date, end_date)
+    periods = {name: all_periods[name] for name in ("current", *compare)}
+    metrics = await manager_service.get_team_kpi_metrics(sorted(valid_ids), periods)
+    if not compare:
+        return metrics["current"]
+    return {
+        "periods": {name: {"start_date": start, "end_date": end} for name, (start, end) in periods.items()},
+        "metrics": metrics,
+    }
 
 
 @router.post("/team/seller-profiles", dependencies=[rate_limit("60/minute")])
@@ -433,14 +419,12 @@ async def get_team_seller_profiles(
     competence_service: CompetenceService = Depends(get_competence_service),
 ) -> dict:
     """
-    Batch: radar scores + niveau pour N vendeurs en 1 seul appel.
+    Batch: radar scores + niveau pour N vendeurs en 1 seul appel (2 requêtes au total).
     Remplace N×2 appels /seller/{id}/stats + /seller/{id}/diagnostic.
 
     Body: { "seller_ids": ["id1", "id2", ...] }
     Retourne: { seller_id: { avg_radar_scores: {...}, niveau: str|null, has_diagnostic: bool } }
     """
-    import asyncio as _asyncio
-
     resolved_store_id = context.get("resolved_store_id")
     if not resolved_store_id:
         raise ValidationError(ERR_STORE_ID_REQUIS)
@@ -454,27 +438,26 @@ async def get_team_seller_profiles(
     valid_sellers = await manager_service.get_users_by_ids_and_store(
         seller_ids, resolved_store_id, role="seller", limit=100, projection={"_id": 0, "id": 1}
     )
-    valid_ids = {s["id"] for s in valid_sellers}
+    valid_ids = sorted({s["id"] for s in valid_sellers})
 
     _DISC_TO_STYLE = {'D': 'Dynamique', 'I': 'Convivial', 'S': 'Empathique', 'C': 'Stratège'}
 
-    async def get_profile(sid: str):
-        diagnostic = await manager_service.get_diagnostic_by_seller(sid)
-        debriefs = await manager_service.get_debriefs_by_seller(sid, limit=5)
+    diagnostics, debriefs = await manager_service.get_team_profile_sources(valid_ids, debrief_limit=5)
+    profiles = {}
+    for sid in valid_ids:
+        diagnostic = diagnostics.get(sid)
         avg_radar_scores = await competence_service.calculate_seller_performance_scores(
-            seller_id=sid, diagnostic=diagnostic, debriefs=debriefs
+            seller_id=sid, diagnostic=diagnostic, debriefs=debriefs.get(sid, [])
         )
         raw_style = diagnostic.get("style") if diagnostic else None
         normalized_style = _DISC_TO_STYLE.get(str(raw_style).upper(), raw_style) if raw_style else None
-        return sid, {
+        profiles[sid] = {
             "avg_radar_scores": avg_radar_scores,
             "niveau": diagnostic.get("level") if diagnostic else None,
             "has_diagnostic": bool(diagnostic),
             "style": normalized_style,
         }
-
-    results = await _asyncio.gather(*[get_profile(sid) for sid in valid_ids])
-    return dict(results)
+    return profiles
 
 
 @router.get("/kpi-entries/{seller_id}", dependencies=[rate_limit("200/minute")])
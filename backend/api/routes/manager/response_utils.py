@@ -16,7 +16,15 @@ def pagination_dict(
     """
     Build a standard pagination dict from a result object or from keyword args.
     Use for JSON responses in manager list endpoints.
+    Keyset results (CursorPaginatedResponse) give total, size, next_cursor, has_more.
     """
+    if result is not None and hasattr(result, "next_cursor"):
+        return {
+            "total": result.total,
+            "size": result.size,
+            "next_cursor": result.next_cursor,
+            "has_more": result.has_more,
+        }
     if result is not None:
         return {
             "total": result.total,
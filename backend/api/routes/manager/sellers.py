@@ -338,11 +338,12 @@ async def get_seller_debriefs(
 ):
     """
     Get paginated debriefs for a specific seller. Access via get_verified_seller (same store).
-    Uses PaginationParams (page, size) to avoid loading massive lists into memory.
+    Uses PaginationParams (page, size) to avoid loading massive lists into memory;
+    ?cursor= switches to keyset pagination (next_cursor in "pagination").
     """
     seller_id = seller.get("id")
     result = await manager_service.get_debriefs_by_seller_paginated(
-        seller_id, page=pagination.page, size=pagination.size
+        seller_id, page=pagination.page, size=pagination.size, cursor=pagination.cursor
     )
     return {
         "debriefs": result.items,
@@ -169,16 +169,13 @@ async def get_dates_with_data(
 ):
     """Get list of dates that have KPI data for the store (calendar highlighting)."""
     resolved_store_id = context.get("resolved_store_id")
-    query = {"store_id": resolved_store_id}
+    date_filter = None
     if year and month:
         start_date = f"{year}-{month:02d}-01"
         end_date = f"{year + 1}-01-01" if month == 12 else f"{year}-{month + 1:02d}-01"
-        query["date"] = {"$gte": start_date, "$lt": end_date}
-    dates = await manager_service.get_kpi_distinct_dates(query)
-    manager_dates = await manager_service.get_manager_kpi_distinct_dates(query)
-    all_dates = sorted(set(dates) | set(manager_dates))
-    locked_dates = await manager_service.get_kpi_distinct_dates({**query, "locked": True})
-    return {"dates": all_dates, "lockedDates": sorted(locked_dates)}
+        date_filter = {"$gte": start_date, "$lt": end_date}
+    calendar = await manager_service.get_store_calendar(resolved_store_id, date_filter)
+    return {"dates": calendar["dates"], "lockedDates": calendar["lockedDates"]}
 
 
 @router.get("/available-years")
@@ -190,17 +187,7 @@ async def get_available_years(
 ):
     """Get list of years that have KPI data for the store."""
     resolved_store_id = context.get("resolved_store_id")
-    dates = await manager_service.get_kpi_distinct_dates({"store_id": resolved_store_id})
-    manager_dates = await manager_service.get_manager_kpi_distinct_dates({"store_id": resolved_store_id})
-    all_dates = set(dates) | set(manager_dates)
-    years = set()
-    for date_str in all_dates:
-        if date_str and len(date_str) >= 4:
-            try:
-                years.add(int(date_str[:4]))
-            except ValueError:
-                pass
-    return {"years": sorted(list(years), reverse=True)}
+    return {"years": await manager_service.get_store_available_years(resolved_store_id)}
 
 
 # ===== KPI CONFIG =====
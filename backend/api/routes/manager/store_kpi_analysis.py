@@ -8,6 +8,7 @@ from typing import Optional
 
 from fastapi import APIRouter, Depends, Query, Request
 
+from core.ai_stream import event_stream_response, wants_event_stream
 from core.constants import (
     MONGO_GROUP,
     MONGO_IFNULL,
@@ -407,6 +408,7 @@ Format exact :
             user_prompt=prompt,
             model="gpt-4o",
             temperature=0.5,
+            cache_feature="store_kpi_analysis",
         )
         if not raw_response:
             raise Exception("No response from AI")
@@ -463,11 +465,18 @@ async def analyze_store_kpis(
     """
     Generate AI-powered analysis of store KPIs (manager only).
     Uses GPT-4o with expert retail prompts for physical stores.
+    With ?stream=true (or Accept: text/event-stream) the output is streamed as SSE.
     """
     resolved_store_id = context.get("resolved_store_id") or store_id
     if not resolved_store_id:
         raise ValidationError("Le paramètre store_id est requis pour analyser les KPIs d'un magasin")
-    return await run_store_kpi_analysis(
-        resolved_store_id, analysis_data, manager_service, kpi_service, ai_service,
-        manager_id=context.get("id"),
-    )
+
+    async def _generate() -> dict:
+        return await run_store_kpi_analysis(
+            resolved_store_id, analysis_data, manager_service, kpi_service, ai_service,
+            manager_id=context.get("id"),
+        )
+
+    if wants_event_stream(request):
+        return event_stream_response(_generate)
+    return await _generate()
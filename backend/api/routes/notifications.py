@@ -1,32 +1,27 @@
 """
 In-app notification endpoints.
-GET  /notifications          — list (20 most recent, unread first)
-PATCH /notifications/{id}/read — mark one read
-PATCH /notifications/read-all  — mark all read
+GET  /notifications              — list (20 most recent, unread first) + unread count
+GET  /notifications/unread-count — unread count only (Redis counter, no Mongo on a hit)
+PATCH /notifications/{id}/read   — mark one read
+PATCH /notifications/read-all    — mark all read
+
+Live updates are pushed on /ws/notifications (see api/routes/ws.py): clients
+only need these endpoints to load the list and to resync after a reconnection.
 """
 from fastapi import APIRouter, Depends
 from typing import Dict
 
+from api.dependencies import get_notification_service
 from core.security import get_current_user
-from core.database import get_db
-from repositories.notification_repository import NotificationRepository
 from services.notification_service import NotificationService
-from repositories.achievement_notification_repository import AchievementNotificationRepository
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
 
-def _get_service(db=Depends(get_db)) -> NotificationService:
-    return NotificationService(
-        achievement_notification_repo=AchievementNotificationRepository(db),
-        notification_repo=NotificationRepository(db),
-    )
-
-
 @router.get("")
 async def get_notifications(
     current_user: Dict = Depends(get_current_user),
-    service: NotificationService = Depends(_get_service),
+    service: NotificationService = Depends(get_notification_service),
 ):
     user_id = current_user["id"]
     notifications = await service.get_for_user(user_id, limit=20)
@@ -34,10 +29,18 @@ async def get_notifications(
     return {"notifications": notifications, "unread_count": unread}
 
 
+@router.get("/unread-count")
+async def get_unread_count(
+    current_user: Dict = Depends(get_current_user),
+    service: NotificationService = Depends(get_notification_service),
+):
+    return {"unread_count": await service.count_unread(current_user["id"])}
+
+
 @router.patch("/read-all")
 async def mark_all_read(
     current_user: Dict = Depends(get_current_user),
-    service: NotificationService = Depends(_get_service),
+    service: NotificationService = Depends(get_notification_service),
 ):
     count = await service.mark_all_read(current_user["id"])
     return {"marked_read": count}
@@ -47,7 +50,7 @@ async def mark_all_read(
 async def mark_one_read(
     notif_id: str,
     current_user: Dict = Depends(get_current_user),
-    service: NotificationService = Depends(_get_service),
+    service: NotificationService = Depends(get_notification_service),
 ):
     ok = await service.mark_read(notif_id, current_user["id"])
     return {"success": ok}
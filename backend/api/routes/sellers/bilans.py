@@ -2,7 +2,7 @@
 Seller Bilans Routes
 Routes for store info and bilan individuel IA.
 """
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from typing import Dict, Optional
 from datetime import datetime, timezone
 import uuid
@@ -11,6 +11,7 @@ import logging
 from api.dependencies_rate_limiting import rate_limit
 from services.seller_service import SellerService
 from api.dependencies import get_seller_service
+from core.ai_stream import event_stream_response, wants_event_stream
 from core.security import get_current_seller
 from core.exceptions import NotFoundError, ValidationError
 
@@ -74,12 +75,32 @@ async def get_all_bilans_individuels(
 
 @router.post("/bilan-individuel", dependencies=[rate_limit("20/minute")])
 async def generate_bilan_individuel(
+    request: Request,
     start_date: Optional[str] = Query(None, description="Start date YYYY-MM-DD", pattern=r"^\d{4}-\d{2}-\d{2}$"),
     end_date: Optional[str] = Query(None, description="End date YYYY-MM-DD", pattern=r"^\d{4}-\d{2}-\d{2}$"),
     current_user: Dict = Depends(get_current_seller),
     seller_service: SellerService = Depends(get_seller_service),
 ):
-    """Generate an individual performance report for a period."""
+    """
+    Generate an individual performance report for a period.
+    With ?stream=true (or Accept: text/event-stream) the AI text is streamed as SSE,
+    then the saved bilan is sent as the `result` event.
+    """
+    async def _generate() -> Dict:
+        return await _build_bilan_individuel(start_date, end_date, current_user, seller_service)
+
+    if wants_event_stream(request):
+        return event_stream_response(_generate)
+    return await _generate()
+
+
+async def _build_bilan_individuel(
+    start_date: Optional[str],
+    end_date: Optional[str],
+    current_user: Dict,
+    seller_service: SellerService,
+) -> Dict:
+    """Compute, generate (AI) and save the bilan of a period."""
     from uuid import uuid4
     from services.ai_service import AIService
     import json
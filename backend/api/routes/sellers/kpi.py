@@ -144,15 +144,17 @@ async def get_my_kpi_entries(
     Get seller's KPI entries.
     Returns KPI data for the seller.
     Si start_date + end_date fournis, filtre par période (pour bilan semaine précise).
+    Avec ?cursor= : pagination par curseur (next_cursor, has_more) au lieu de page/pages.
     """
     seller_id = current_user["id"]
     if start_date and end_date:
         return await seller_service.get_kpis_for_period_paginated(
-            seller_id, start_date, end_date, page=pagination.page, size=pagination.size
+            seller_id, start_date, end_date, page=pagination.page, size=pagination.size,
+            cursor=pagination.cursor,
         )
     size = days if days and days <= 365 else pagination.size
     result = await seller_service.get_kpi_entries_paginated(
-        seller_id, pagination.page, min(size, 365)
+        seller_id, pagination.page, min(size, 365), cursor=pagination.cursor
     )
     return result
 
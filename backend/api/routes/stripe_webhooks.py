@@ -1,44 +1,37 @@
 """Stripe Webhook Routes
 Secure endpoint for receiving Stripe webhook events.
 Follows Clean Architecture: Controller → Service.
-RC6: DI for PaymentService, BackgroundTasks for async processing (return 200 immediately).
+Events are persisted in the stripe_events work queue and processed by
+services/stripe_webhook_queue.py (durable, ordered per Stripe customer).
 """
+import json
 import stripe
 import os
 import logging
-from fastapi import APIRouter, Request, Depends, BackgroundTasks
+from fastapi import APIRouter, Request, Depends
 from fastapi.responses import JSONResponse
 
 from core.exceptions import ValidationError
-from services.payment_service import PaymentService
 from services.stripe_client import StripeClient
-from api.dependencies import get_payment_service, get_stripe_client
+from services.stripe_webhook_queue import StripeWebhookQueue
+from api.dependencies import get_stripe_client, get_stripe_webhook_queue
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
 
 
-async def _process_webhook_event(payment_service: PaymentService, event: dict) -> None:
-    """Process Stripe webhook event in background (RC6)."""
-    try:
-        result = await payment_service.handle_webhook_event(event)
-        logger.info(f"✅ Webhook processed: {event['type']} → {result.get('status')}")
-    except Exception:
-        logger.error("Error processing webhook in background", exc_info=True)
-
-
 @router.post("/stripe")
 async def stripe_webhook(
     request: Request,
-    background_tasks: BackgroundTasks,
-    payment_service: PaymentService = Depends(get_payment_service),
     stripe_client: StripeClient = Depends(get_stripe_client),
+    webhook_queue: StripeWebhookQueue = Depends(get_stripe_webhook_queue),
 ):
     """
     Stripe Webhook Endpoint.
 
-    RC6: Returns 200 immediately, processes event in background to avoid Stripe timeout.
+    Returns 200 as soon as the event is stored in the queue (processed by the
+    queue consumer); a storage failure returns 5xx so that Stripe redelivers.
     Security: Validates webhook signature using STRIPE_WEBHOOK_SECRET.
     Handles: invoice.payment_*, customer.subscription.*, checkout.session.completed.
     Emails: payment_succeeded → confirmation, payment_failed → alert,
@@ -66,11 +59,16 @@ async def stripe_webhook(
 
     logger.info(f"📥 Stripe webhook received: {event['type']}")
 
-    # RC6: Return 200 immediately, process in background
-    background_tasks.add_task(_process_webhook_event, payment_service, event)
+    # Cached subscription / customer reads are stale from now on (before the handler re-reads them)
+    await stripe_client.invalidate_for_event(event)
+
+    # Signature vérifiée : le corps brut est l'événement à rejouer tel quel
+    queued = await webhook_queue.enqueue(json.loads(payload))
+    if not queued:
+        logger.info(f"⏭️ Duplicate webhook delivery: {event['type']} (id={event.get('id')})")
     return JSONResponse(
         status_code=200,
-        content={"received": True, "type": event["type"]}
+        content={"received": True, "type": event["type"], "duplicate": not queued}
     )
 
 
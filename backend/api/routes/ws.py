@@ -11,6 +11,12 @@ Evenements recus par le client :
     {"type": "connected",        "store_id": "..."}
     {"type": "kpi_entry_saved",  "store_id": "...", "seller_id": "...",
      "date": "YYYY-MM-DD",       "data": {kpi fields}}
+
+Notifications in-app (tout role) :
+    ws(s)://<host>/api/ws/notifications?token=<JWT>
+    {"type": "connected",              "unread_count": n}
+    {"type": "notifications_created",  "notifications": [...], "unread_count": n|null}
+    {"type": "notifications_read",     "ids": [...] | "all", "unread_count": n|null}
 """
 import json
 import logging
@@ -18,8 +24,8 @@ import logging
 from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
 
 from core.exceptions import ForbiddenError, UnauthorizedError
-from core.ws_auth import _authenticate_ws
-from core.ws_manager import ws_manager
+from core.ws_auth import _authenticate_ws, _authenticate_ws_user
+from core.ws_manager import user_topic, ws_manager
 
 logger = logging.getLogger(__name__)
 
@@ -48,8 +54,9 @@ async def ws_store_kpi(
 
     await ws_manager.connect(store_id, websocket)
     try:
-        await websocket.send_text(
-            json.dumps({"type": "connected", "store_id": store_id})
+        # Via la file sortante du client : pas de send concurrent avec les diffusions
+        await ws_manager.send_to_client(
+            websocket, json.dumps({"type": "connected", "store_id": store_id})
         )
         # Maintien de la connexion ; on ignore les messages entrants (lecture seule)
         while True:
@@ -61,3 +68,43 @@ async def ws_store_kpi(
         logger.warning("WS error store=%s: %s", store_id, e)
     finally:
         await ws_manager.disconnect(store_id, websocket)
+
+
+@router.websocket("/notifications")
+async def ws_notifications(
+    websocket: WebSocket,
+    token: str = Query(..., description="JWT token"),
+) -> None:
+    """
+    WebSocket des notifications in-app de l'utilisateur connecte.
+    Remplace le polling de GET /notifications : chaque creation / lecture est poussee.
+    """
+    try:
+        user = await _authenticate_ws_user(token)
+    except UnauthorizedError as e:
+        await websocket.close(code=4001, reason=str(e.detail if hasattr(e, "detail") else e))
+        return
+    except Exception as e:
+        logger.error("WS notifications auth unexpected error: %s", e)
+        await websocket.close(code=4000, reason="Erreur d'authentification")
+        return
+
+    from api.dependencies import get_notification_service
+    from core.database import get_db
+
+    topic = user_topic(user["id"])
+    await ws_manager.connect(topic, websocket)
+    try:
+        unread = await get_notification_service(await get_db()).count_unread(user["id"])
+        await ws_manager.send_to_client(
+            websocket, json.dumps({"type": "connected", "unread_count": unread})
+        )
+        while True:
+            try:
+                await websocket.receive_text()
+            except WebSocketDisconnect:
+                break
+    except Exception as e:
+        logger.warning("WS notifications error user=%s: %s", user["id"], e)
+    finally:
+        await ws_manager.disconnect(topic, websocket)
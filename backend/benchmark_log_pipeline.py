@@ -0,0 +1,72 @@
+"""
+Banc d'essai du pipeline de logs (core/logging.py), en enregistrements par seconde.
+
+Mesure, sur une sortie /dev/null :
+- sync   : handler stdout classique, nettoyage + formatage dans l'appelant
+- async  : QueueHandler côté appelant (ce que paie la requête), puis débit
+           de bout en bout une fois la file vidée par le thread d'écriture
+- sanitizer : sanitize_string / sanitize_dict seuls
+
+Usage :
+    python benchmark_log_pipeline.py                 # 100 000 enregistrements
+    python benchmark_log_pipeline.py --records 500000
+"""
+import argparse
+import logging
+import os
+import time
+
+from core.logging import get_logger, setup_logging, shutdown_logging
+from middleware.log_sanitizer import sanitize_dict, sanitize_string
+
+_MESSAGE = "Webhook %s processed for %s (Authorization: Bearer %s)"
+_PAYLOAD = {"user_id": "u1", "store_id": "s1", "access_token": "abc", "items": [{"api_key": "k", "qty": 2}]}
+
+
+def _emit(records: int) -> float:
+    text, structured = logging.getLogger("bench.text"), get_logger("bench.json")
+    start = time.perf_counter()
+    for i in range(records // 2):
+        text.info(_MESSAGE, "evt_%d" % i, _PAYLOAD, "tok.en")
+        structured.info("Request completed", extra={"method": "GET", "endpoint": "/api/kpi", "status_code": 200, "duration_ms": 1.2})
+    return time.perf_counter() - start
+
+
+def run(records: int) -> None:
+    with open(os.devnull, "w") as sink:
+        setup_logging(async_logging=False, stream=sink)
+        elapsed = _emit(records)
+        print(f"sync       : {records / elapsed:>12,.0f} enregistrements/s (appelant = bout en bout)")
+
+        setup_logging(async_logging=True, stream=sink, queue_size=records + 1)
+        caller = _emit(records)
+        shutdown_logging()  # attend que le thread d'écriture ait tout vidé
+        print(f"async      : {records / caller:>12,.0f} enregistrements/s côté appelant")
+
+        setup_logging(async_logging=True, stream=sink, queue_size=records + 1)
+        start = time.perf_counter()
+        _emit(records)
+        shutdown_logging()
+        total = time.perf_counter() - start
+        print(f"async      : {records / total:>12,.0f} enregistrements/s de bout en bout")
+
+    text = _MESSAGE % ("evt_1", _PAYLOAD, "tok.en")
+    start = time.perf_counter()
+    for _ in range(records):
+        sanitize_string(text)
+    print(f"sanitize_string : {records / (time.perf_counter() - start):>12,.0f} /s")
+    start = time.perf_counter()
+    for _ in range(records):
+        sanitize_dict(_PAYLOAD)
+    print(f"sanitize_dict   : {records / (time.perf_counter() - start):>12,.0f} /s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the log pipeline (records per second)")
+    parser.add_argument("--records", type=int, default=100_000, help="Records emitted per scenario")
+    args = parser.parse_args()
+    run(args.records)
+
+
+if __name__ == "__main__":
+    main()
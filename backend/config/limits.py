@@ -4,13 +4,15 @@ Application Limits Configuration
 Centralized configuration for all application limits.
 Replace magic numbers throughout the codebase with these constants.
 """
-from typing import Final
+from typing import Dict, Final
 
 # ===== PAGINATION LIMITS =====
 DEFAULT_PAGE_SIZE: Final[int] = 20
 """Default number of items per page"""
 MAX_PAGE_SIZE: Final[int] = 400
 """Maximum number of items per page (400 couvre une année complète de saisies journalières)"""
+PAGINATION_TOTAL_CACHE_TTL: Final[int] = 60
+"""Durée de cache (s) du total en pagination par curseur (count_documents évité à chaque page)"""
 
 # ===== DATABASE LIMITS =====
 MONGODB_MAX_POOL_SIZE: Final[int] = 50  # ✅ Production-ready (configurable via MONGO_MAX_POOL_SIZE env var)
@@ -18,6 +20,28 @@ MONGODB_MAX_POOL_SIZE: Final[int] = 50  # ✅ Production-ready (configurable via
 MONGODB_MIN_POOL_SIZE: Final[int] = 1
 """Minimum MongoDB connection pool size"""
 
+# ===== QUERY PROFILER =====
+QUERY_PROFILER_FLUSH_SECONDS: Final[int] = 60
+"""Intervalle d'écriture des formes de requêtes agrégées par worker dans query_shapes"""
+QUERY_PROFILER_EXPLAIN_COOLDOWN_SECONDS: Final[int] = 600
+"""Délai minimal entre deux explain() d'une même forme de requête"""
+QUERY_PROFILER_MAX_SHAPES: Final[int] = 2000
+"""Formes distinctes suivies par worker (au-delà, les nouvelles formes sont ignorées)"""
+QUERY_PROFILER_EXAMINED_RATIO: Final[int] = 10
+"""Documents examinés par document renvoyé au-delà duquel une forme est signalée"""
+
+# ===== LOGGING =====
+LOG_QUEUE_MAX_SIZE: Final[int] = 10000
+"""Enregistrements en attente d'écriture par worker (au-delà, abandonnés et comptés, jamais bloquants)"""
+ACCESS_LOG_SAMPLE_RATES: Final[Dict[str, float]] = {
+    "/health": 0.0,
+    "/api/health": 0.0,
+    "/api/notifications/unread-count": 0.05,
+}
+"""Taux d'échantillonnage des logs d'accès réussis (< 400) par préfixe de route (le plus long l'emporte)"""
+ACCESS_LOG_SLOW_MS: Final[int] = 1000
+"""Durée au-delà de laquelle une requête est toujours journalisée, quel que soit l'échantillonnage"""
+
 # ===== RATE LIMITING =====
 RATE_LIMIT_AI: Final[str] = "10/minute"
 """Rate limit for AI endpoints (cost protection)"""
@@ -38,6 +62,56 @@ KPI_RECENT_DAYS: Final[int] = 7
 DEBRIEFS_HISTORY_CAP: Final[int] = 200
 """Hard cap for competence-history debriefs (pagination preferred client-side)"""
 
+# ===== INTEGRATIONS =====
+KPI_SYNC_MAX_ENTRIES: Final[int] = 5000
+"""Nombre maximum d'entrées KPI acceptées par appel /integrations/kpi/sync"""
+KPI_SYNC_CHUNK_SIZE: Final[int] = 500
+"""Taille d'un lot de synchronisation KPI (1 lookup vendeurs + 1 lookup existants + 1 bulk_write par lot)"""
+API_KEY_REVOCATION_TOMBSTONE_SECONDS: Final[int] = 60
+"""Durée pendant laquelle une clé API révoquée ne peut pas être remise en cache (vérification bcrypt en cours)"""
+
+# ===== SCHEDULED JOBS =====
+WEEKLY_RECAP_MAX_GERANTS: Final[int] = 20000
+"""Plafond de sécurité du nombre de gérants traités par le récap hebdomadaire (moteur bulk)"""
+
+# ===== SUPER-ADMIN DASHBOARD =====
+ADMIN_STATS_TTL_SECONDS: Final[int] = 15
+"""Durée pendant laquelle le snapshot des stats plateforme est servi sans recalcul"""
+ADMIN_STATS_MAX_AGE_SECONDS: Final[int] = 300
+"""Au-delà du TTL et jusqu'à cet âge, le snapshot est servi pendant un recalcul en arrière-plan"""
+
+# ===== CHALLENGES =====
+CHALLENGE_PROGRESS_FLUSH_SECONDS: Final[float] = 2.0
+"""Délai avant écriture groupée des progressions de challenges recalculées en lecture"""
+CHALLENGE_PROGRESS_MAX_PENDING: Final[int] = 500
+"""Nombre de mises à jour en attente au-delà duquel l'écriture est déclenchée immédiatement"""
+
+# ===== NOTIFICATIONS =====
+NOTIFICATION_UNREAD_TTL_SECONDS: Final[int] = 86400
+"""Durée de vie du compteur Redis de notifications non lues (reconstruit depuis Mongo à l'expiration)"""
+
+# ===== STRIPE =====
+STRIPE_READ_CACHE_TTL_SECONDS: Final[int] = 30
+"""Durée de cache (s) d'un abonnement / client Stripe relu (invalidé par les webhooks correspondants)"""
+
+# ===== AI =====
+AI_RESPONSE_CACHE_TTLS: Final[Dict[str, int]] = {
+    "debrief": 24 * 3600,
+    "diagnostic": 24 * 3600,
+    "seller_bilan": 6 * 3600,
+    "relationship_recommendation": 24 * 3600,
+    "store_kpi_analysis": 6 * 3600,
+}
+"""Durée de vie (secondes) d'une réponse IA en cache, par fonctionnalité (absente = pas de cache)"""
+AI_RESPONSE_CACHE_STATS_FLUSH_SECONDS: Final[int] = 10
+"""Intervalle minimal entre deux envois des compteurs du cache IA vers le hash Redis plateforme"""
+BRIEF_PREGEN_CONCURRENCY: Final[int] = 4
+"""Briefs matinaux générés en parallèle par la pré-génération nocturne"""
+BRIEF_PREGEN_TENANT: Final[str] = "brief-pregeneration"
+"""Tenant du gouverneur IA pour la pré-génération : le lot partage un seul quota, le trafic interactif garde le sien"""
+BRIEF_PREGEN_MAX_STORES: Final[int] = 20000
+"""Plafond de sécurité du nombre de magasins traités par la pré-génération"""
+
 # ===== JWT =====
 JWT_EXPIRATION_HOURS: Final[int] = 24
 """JWT token expiration time in hours"""
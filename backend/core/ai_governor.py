@@ -0,0 +1,502 @@
+"""
+Cluster-wide governor for OpenAI calls: concurrency, token budgets, circuit breaker.
+
+AIService instances are created per request, and each worker used to keep its
+own breaker state and had no notion of how many calls the other workers had in
+flight. The 9:00 burst (every manager generating a morning brief) cascaded into
+RateLimitError retries. Before each call, CoreMixin asks the governor for a permit:
+
+- Concurrency : at most AI_MAX_CONCURRENCY calls in flight on the cluster and
+  AI_TENANT_MAX_CONCURRENCY per tenant (workspace). A permit is a lease with an
+  expiry, so a crashed worker cannot leak slots.
+- Token budget: tokens per minute, global and per tenant, counted like OpenAI
+  does (prompt estimated with tiktoken + max_tokens), then corrected with the
+  actual usage when the call ends. A single oversized request is never blocked
+  on an empty window.
+- Fair queue  : waiting requests are admitted round-robin across tenants, so one
+  workspace's burst does not starve the others; a request that waits longer
+  than AI_QUEUE_TIMEOUT_SECONDS gives up (the generator falls back).
+- Breaker     : consecutive errors and the open-until deadline are shared, so
+  every worker stops calling OpenAI as soon as one detects an outage.
+
+State lives in Redis (atomic Lua admission) when the cache is connected, in the
+worker's memory otherwise (limits then apply per worker).
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Callable, Deque, Dict, Optional
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+GOVERNOR_PREFIX = "ai_gov:"
+SHARED_TENANT = "_"
+
+# Expiry of a permit (lease) if its holder never releases it (crash)
+LEASE_SECONDS = 300
+# Re-check interval of the queue: slots released by other workers are not notified
+POLL_INTERVAL_SECONDS = 0.2
+
+ADMITTED, GLOBAL_FULL, TENANT_FULL = "admitted", "global_full", "tenant_full"
+
+_current_tenant: ContextVar[Optional[str]] = ContextVar("ai_tenant", default=None)
+
+
+def bind_ai_tenant(tenant_id: Optional[str]) -> None:
+    """Attach the tenant (workspace) of the current request to the AI calls it makes."""
+    _current_tenant.set(tenant_id)
+
+
+def current_ai_tenant() -> str:
+    return _current_tenant.get() or SHARED_TENANT
+
+
+class AIQueueTimeout(Exception):
+    """No permit obtained within the queue timeout."""
+
+
+# ===== TOKEN ESTIMATION =====
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    """tiktoken encoding for the model, None if unavailable (cached: no retry per call)."""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.info("tiktoken unavailable for %s, estimating tokens from length: %s", model, e)
+        return None
+
+
+def estimate_tokens(model: str, *texts: str) -> int:
+    """Prompt tokens per tiktoken (≈ 3 characters per token if the encoding is unavailable)."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return sum(math.ceil(len(text or "") / 3) for text in texts) + 8 * len(texts)
+    return sum(len(encoding.encode(text or "")) for text in texts) + 8 * len(texts)
+
+
+# ===== BACKENDS =====
+
+def _minute(now: float) -> int:
+    return int(now // 60)
+
+
+class LocalGovernorBackend:
+    """Worker-local state (no Redis): same rules, limits apply per worker."""
+
+    backend = "local"
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._leases: Dict[str, tuple] = {}  # lease_id -> (tenant, expiry)
+        self._tokens: Dict[tuple, int] = {}  # (tenant | None, minute) -> tokens
+        self._errors = 0
+        self._open_until = 0.0
+
+    async def try_acquire(self, lease_id: str, tenant: str, tokens: int, limits: Dict) -> str:
+        now = self.clock()
+        self._leases = {k: v for k, v in self._leases.items() if v[1] > now}
+        if len(self._leases) >= limits["max_concurrency"]:
+            return GLOBAL_FULL
+        if sum(1 for t, _ in self._leases.values() if t == tenant) >= limits["tenant_max_concurrency"]:
+            return TENANT_FULL
+        minute = _minute(now)
+        used = self._tokens.get((None, minute), 0)
+        if used and used + tokens > limits["tokens_per_minute"]:
+            return GLOBAL_FULL
+        tenant_used = self._tokens.get((tenant, minute), 0)
+        if tenant_used and tenant_used + tokens > limits["tenant_tokens_per_minute"]:
+            return TENANT_FULL
+        self._leases[lease_id] = (tenant, now + LEASE_SECONDS)
+        self._tokens = {k: v for k, v in self._tokens.items() if k[1] >= minute - 1}
+        self._tokens[(None, minute)] = used + tokens
+        self._tokens[(tenant, minute)] = tenant_used + tokens
+        return ADMITTED
+
+    async def release(self, lease_id: str, tenant: str, token_delta: int) -> None:
+        self._leases.pop(lease_id, None)
+        if token_delta:
+            minute = _minute(self.clock())
+            for key in ((None, minute), (tenant, minute)):
+                self._tokens[key] = max(self._tokens.get(key, 0) + token_delta, 0)
+
+    async def open_until(self) -> float:
+        return self._open_until if self._open_until > self.clock() else 0.0
+
+    async def record_failure(self, threshold: int, cooldown: int) -> float:
+        self._errors += 1
+        if self._errors >= threshold:
+            self._open_until = self.clock() + cooldown
+            self._errors = 0
+            return self._open_until
+        return 0.0
+
+    async def record_success(self) -> None:
+        self._errors = 0
+        self._open_until = 0.0
+
+    async def in_flight(self) -> int:
+        now = self.clock()
+        return sum(1 for _, expiry in self._leases.values() if expiry > now)
+
+
+# KEYS: global leases, tenant leases, global tokens, tenant tokens
+# ARGV: now, lease id, lease expiry, max conc, tenant max conc, tokens, tpm, tenant tpm
+_REDIS_ACQUIRE_SCRIPT = """
+redis.call('zremrangebyscore', KEYS[1], '-inf', ARGV[1])
+redis.call('zremrangebyscore', KEYS[2], '-inf', ARGV[1])
+if redis.call('zcard', KEYS[1]) >= tonumber(ARGV[4]) then return 'global_full' end
+if redis.call('zcard', KEYS[2]) >= tonumber(ARGV[5]) then return 'tenant_full' end
+local tokens = tonumber(ARGV[6])
+local used = tonumber(redis.call('get', KEYS[3]) or '0')
+if used > 0 and used + tokens > tonumber(ARGV[7]) then return 'global_full' end
+local tenant_used = tonumber(redis.call('get', KEYS[4]) or '0')
+if tenant_used > 0 and tenant_used + tokens > tonumber(ARGV[8]) then return 'tenant_full' end
+redis.call('zadd', KEYS[1], ARGV[3], ARGV[2])
+redis.call('zadd', KEYS[2], ARGV[3], ARGV[2])
+redis.call('expire', KEYS[1], 900)
+redis.call('expire', KEYS[2], 900)
+redis.call('incrby', KEYS[3], tokens)
+redis.call('expire', KEYS[3], 120)
+redis.call('incrby', KEYS[4], tokens)
+redis.call('expire', KEYS[4], 120)
+return 'admitted'
+"""
+
+# KEYS: errors counter, open-until key — ARGV: threshold, cooldown seconds, now
+_REDIS_FAILURE_SCRIPT = """
+local errors = redis.call('incr', KEYS[1])
+redis.call('expire', KEYS[1], tonumber(ARGV[2]))
+if errors >= tonumber(ARGV[1]) then
+    local open_until = tonumber(ARGV[3]) + tonumber(ARGV[2])
+    redis.call('set', KEYS[2], open_until, 'EX', tonumber(ARGV[2]))
+    redis.call('del', KEYS[1])
+    return tostring(open_until)
+end
+return '0'
+"""
+
+
+class RedisGovernorBackend:
+    """Cluster-wide state in Redis (leases as sorted sets, per-minute token counters)."""
+
+    backend = "redis"
+
+    def __init__(self, redis_client, prefix: str = GOVERNOR_PREFIX, clock: Callable[[], float] = time.time):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.clock = clock
+
+    def _keys(self, tenant: str, minute: int):
+        return (
+            f"{self.prefix}leases",
+            f"{self.prefix}leases:{tenant}",
+            f"{self.prefix}tpm:{minute}",
+            f"{self.prefix}tpm:{tenant}:{minute}",
+        )
+
+    async def try_acquire(self, lease_id: str, tenant: str, tokens: int, limits: Dict) -> str:
+        now = self.clock()
+        result = await self.redis.eval(
+            _REDIS_ACQUIRE_SCRIPT, 4, *self._keys(tenant, _minute(now)),
+            now, lease_id, now + LEASE_SECONDS,
+            limits["max_concurrency"], limits["tenant_max_concurrency"],
+            tokens, limits["tokens_per_minute"], limits["tenant_tokens_per_minute"],
+        )
+        return result.decode() if isinstance(result, bytes) else result
+
+    async def release(self, lease_id: str, tenant: str, token_delta: int) -> None:
+        leases, tenant_leases, tpm, tenant_tpm = self._keys(tenant, _minute(self.clock()))
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zrem(leases, lease_id)
+        pipe.zrem(tenant_leases, lease_id)
+        if token_delta:
+            for key in (tpm, tenant_tpm):
+                pipe.incrby(key, token_delta)
+                pipe.expire(key, 120)
+        await pipe.execute()
+
+    async def open_until(self) -> float:
+        value = await self.redis.get(f"{self.prefix}breaker:open_until")
+        open_until = float(value) if value else 0.0
+        return open_until if open_until > self.clock() else 0.0
+
+    async def record_failure(self, threshold: int, cooldown: int) -> float:
+        result = await self.redis.eval(
+            _REDIS_FAILURE_SCRIPT, 2, f"{self.prefix}breaker:errors", f"{self.prefix}breaker:open_until",
+            threshold, cooldown, self.clock(),
+        )
+        return float(result or 0)
+
+    async def record_success(self) -> None:
+        await self.redis.delete(f"{self.prefix}breaker:errors", f"{self.prefix}breaker:open_until")
+
+    async def in_flight(self) -> int:
+        leases = f"{self.prefix}leases"
+        await self.redis.zremrangebyscore(leases, "-inf", self.clock())
+        return int(await self.redis.zcard(leases))
+
+
+# ===== GOVERNOR =====
+
+class AIPermit:
+    """Admission of one OpenAI call. release() must be called when it ends (finally)."""
+
+    def __init__(self, governor: "AIGovernor", backend, lease_id: str, tenant: str, estimated_tokens: int):
+        self._governor = governor
+        self._backend = backend
+        self.lease_id = lease_id
+        self.tenant = tenant
+        self.estimated_tokens = estimated_tokens
+        self._released = False
+
+    async def release(self, actual_tokens: Optional[int] = None) -> None:
+        """Free the slot; with actual_tokens, correct the budget by the estimation error."""
+        if self._released:
+            return
+        self._released = True
+        delta = (actual_tokens - self.estimated_tokens) if actual_tokens else 0
+        try:
+            await self._backend.release(self.lease_id, self.tenant, delta)
+        except Exception as e:
+            logger.warning("AI governor release failed (lease expires by itself): %s", e)
+        self._governor._on_release()
+
+
+class _Waiter:
+    __slots__ = ("tenant", "tokens", "future")
+
+    def __init__(self, tenant: str, tokens: int, future: asyncio.Future):
+        self.tenant = tenant
+        self.tokens = tokens
+        self.future = future
+
+
+class AIGovernor:
+    """Permits for OpenAI calls + shared circuit breaker (see module docstring)."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        tenant_max_concurrency: int = 4,
+        tokens_per_minute: int = 800_000,
+        tenant_tokens_per_minute: int = 150_000,
+        queue_timeout_seconds: float = 60.0,
+        breaker_threshold: int = 5,
+        breaker_cooldown_seconds: int = 300,
+        redis_resolver: Optional[Callable] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.limits = {
+            "max_concurrency": max_concurrency,
+            "tenant_max_concurrency": tenant_max_concurrency,
+            "tokens_per_minute": tokens_per_minute,
+            "tenant_tokens_per_minute": tenant_tokens_per_minute,
+        }
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown_seconds = breaker_cooldown_seconds
+        self._redis_resolver = redis_resolver or _default_redis
+        self._local = LocalGovernorBackend(clock)
+        self._clock = clock
+        # tenant -> file d'attente FIFO ; l'ordre des tenants fait le round-robin
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._counters = {"admitted": 0, "queued": 0, "queue_timeouts": 0, "breaker_opened": 0, "backend_errors": 0}
+
+    # ----- permits -----
+
+    async def acquire(self, tenant: Optional[str], estimated_tokens: int) -> AIPermit:
+        """Permit for one call; waits in the fair queue if limits are reached (AIQueueTimeout)."""
+        tenant = tenant or SHARED_TENANT
+        if not self._queues:
+            permit = await self._try_admit(tenant, estimated_tokens)
+            if permit is not None:
+                return permit
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(tenant, deque()).append(_Waiter(tenant, estimated_tokens, future))
+        self._counters["queued"] += 1
+        self._ensure_dispatcher()
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            self._counters["queue_timeouts"] += 1
+            self._drop_waiter(tenant, future)
+            if future.done() and not future.cancelled() and future.exception() is None:
+                return future.result()  # admis pendant l'expiration
+            raise AIQueueTimeout(f"No AI slot within {self.queue_timeout_seconds}s (tenant={tenant})")
+        except asyncio.CancelledError:
+            self._drop_waiter(tenant, future)
+            if future.done() and not future.cancelled() and future.exception() is None:
+                await future.result().release()
+            raise
+
+    # ----- circuit breaker -----
+
+    async def circuit_open_until(self) -> float:
+        """Epoch seconds until which calls are blocked, 0 if the circuit is closed."""
+        backend = await self._backend()
+        try:
+            return await backend.open_until()
+        except Exception as e:
+            return await self._local_fallback("open_until", e)
+
+    async def record_success(self) -> None:
+        backend = await self._backend()
+        try:
+            await backend.record_success()
+        except Exception as e:
+            await self._local_fallback("record_success", e)
+
+    async def record_failure(self) -> float:
+        """Count an error; returns the open-until deadline if this error opened the circuit."""
+        backend = await self._backend()
+        try:
+            opened = await backend.record_failure(self.breaker_threshold, self.breaker_cooldown_seconds)
+        except Exception as e:
+            opened = await self._local_fallback("record_failure", e, self.breaker_threshold, self.breaker_cooldown_seconds)
+        if opened:
+            self._counters["breaker_opened"] += 1
+        return opened
+
+    # ----- stats -----
+
+    async def stats(self) -> Dict:
+        backend = await self._backend()
+        try:
+            in_flight = await backend.in_flight()
+            open_until = await backend.open_until()
+        except Exception:
+            in_flight, open_until = None, None
+        return {
+            **self._counters,
+            "backend": backend.backend,
+            "in_flight": in_flight,
+            "waiting": sum(len(q) for q in self._queues.values()),
+            "waiting_tenants": len(self._queues),
+            "circuit_open_until": open_until or None,
+            "limits": dict(self.limits),
+        }
+
+    # ----- internals -----
+
+    async def _backend(self):
+        try:
+            redis_client = await self._redis_resolver()
+        except Exception:
+            redis_client = None
+        if redis_client is None:
+            return self._local
+        return RedisGovernorBackend(redis_client, clock=self._clock)
+
+    async def _local_fallback(self, method: str, error: Exception, *args):
+        self._counters["backend_errors"] += 1
+        logger.warning("AI governor: Redis %s failed, using worker-local state: %s", method, error)
+        return await getattr(self._local, method)(*args)
+
+    async def _try_admit(self, tenant: str, tokens: int, reasons: Optional[Dict] = None) -> Optional[AIPermit]:
+        backend = await self._backend()
+        lease_id = uuid4().hex
+        try:
+            result = await backend.try_acquire(lease_id, tenant, tokens, self.limits)
+        except Exception as e:
+            self._counters["backend_errors"] += 1
+            logger.warning("AI governor: Redis admission failed, using worker-local state: %s", e)
+            backend = self._local
+            result = await backend.try_acquire(lease_id, tenant, tokens, self.limits)
+        if reasons is not None:
+            reasons["last"] = result
+        if result != ADMITTED:
+            return None
+        self._counters["admitted"] += 1
+        return AIPermit(self, backend, lease_id, tenant, tokens)
+
+    def _ensure_dispatcher(self) -> None:
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        self._wakeup.set()
+
+    def _on_release(self) -> None:
+        self._wakeup.set()
+
+    def _drop_waiter(self, tenant: str, future: asyncio.Future) -> None:
+        queue = self._queues.get(tenant)
+        if queue is None:
+            return
+        for waiter in list(queue):
+            if waiter.future is future:
+                queue.remove(waiter)
+        if not queue:
+            self._queues.pop(tenant, None)
+
+    async def _dispatch(self) -> None:
+        """Admit waiters round-robin across tenants until the queues are empty."""
+        while self._queues:
+            self._wakeup.clear()
+            for tenant in list(self._queues):
+                queue = self._queues.get(tenant)
+                if not queue:
+                    self._queues.pop(tenant, None)
+                    continue
+                waiter = queue[0]
+                if waiter.future.done():
+                    queue.popleft()
+                    continue
+                reasons: Dict = {}
+                permit = await self._try_admit(tenant, waiter.tokens, reasons)
+                if permit is None:
+                    if reasons.get("last") == GLOBAL_FULL:
+                        break  # inutile d'essayer les autres tenants
+                    continue
+                queue.popleft()
+                if waiter.future.done():
+                    await permit.release()
+                else:
+                    waiter.future.set_result(permit)
+                # Le tenant servi passe en fin de tour
+                self._queues.move_to_end(tenant)
+                if not queue:
+                    self._queues.pop(tenant, None)
+            if not self._queues:
+                break
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def _default_redis():
+    from core.cache import get_cache_service
+    cache = await get_cache_service()
+    if cache.enabled and cache.redis_client is not None:
+        return cache.redis_client
+    return None
+
+
+_governor: Optional[AIGovernor] = None
+
+
+def get_ai_governor() -> AIGovernor:
+    """Process-wide governor configured from settings (shared by every AIService instance)."""
+    global _governor
+    if _governor is None:
+        from core.config import settings
+        _governor = AIGovernor(
+            max_concurrency=settings.AI_MAX_CONCURRENCY,
+            tenant_max_concurrency=settings.AI_TENANT_MAX_CONCURRENCY,
+            tokens_per_minute=settings.AI_TOKENS_PER_MINUTE,
+            tenant_tokens_per_minute=settings.AI_TENANT_TOKENS_PER_MINUTE,
+            queue_timeout_seconds=settings.AI_QUEUE_TIMEOUT_SECONDS,
+        )
+    return _governor
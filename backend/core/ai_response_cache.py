@@ -0,0 +1,240 @@
+"""
+AI response cache (debriefs, diagnostics, bilans, recommendations…).
+
+Creative generations (daily challenges, temperature 0.8) are not cached: each
+seller must get a fresh challenge.
+
+An OpenAI completion is a pure function of (model, temperature, system prompt,
+user prompt) for our purposes: the same prompt within a feature's TTL is answered
+from the cache instead of paying for a new call.
+
+- Key        : SHA-256 of cache version + model + temperature + system prompt
+               version (hash of the normalized system prompt) + normalized user
+               prompt (Unicode NFC, whitespace runs collapsed).
+- L1         : LRU in the worker's memory (bounded in entries).
+- L2         : Redis via CacheService (shared by the workers), per-feature TTL
+               (AI_RESPONSE_CACHE_TTLS). Without Redis, L1 only.
+- Single-flight: concurrent identical requests wait for one OpenAI call.
+- Counters   : hits / misses / coalesced / tokens saved per feature, per worker
+               (stats()) and platform-wide in a Redis hash (global_stats()).
+               Counting is in memory only; the deltas are pushed to Redis in
+               the background at most every stats_flush_seconds (and on
+               global_stats() / shutdown), so a hit never waits on Redis.
+
+Empty responses (OpenAI unavailable, circuit open) are never cached.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from config.limits import AI_RESPONSE_CACHE_STATS_FLUSH_SECONDS
+from core.cache import get_cache_service
+
+logger = logging.getLogger(__name__)
+
+AI_CACHE_PREFIX = "ai_response:"
+AI_CACHE_STATS_KEY = "ai_response_stats"
+
+# Bump to invalidate every cached response (prompt format change, model upgrade…)
+AI_CACHE_VERSION = "1"
+
+_WHITESPACE = re.compile(r"\s+")
+
+Generator = Callable[[], Awaitable[Tuple[Optional[str], int]]]
+
+
+def normalize_prompt(text: str) -> str:
+    """Prompt with insignificant differences removed (Unicode form, indentation, blank lines)."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+def system_prompt_version(system_message: str) -> str:
+    """Short hash of the normalized system prompt: editing a prompt invalidates its entries."""
+    return hashlib.sha256(normalize_prompt(system_message).encode("utf-8")).hexdigest()[:16]
+
+
+def prompt_fingerprint(model: str, temperature: float, system_message: str, user_prompt: str) -> str:
+    """Cache key of a completion request (length-prefixed parts, no ambiguity)."""
+    digest = hashlib.sha256(AI_CACHE_VERSION.encode("utf-8"))
+    for part in (model, f"{float(temperature):.3f}", system_prompt_version(system_message), normalize_prompt(user_prompt)):
+        data = part.encode("utf-8")
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class AIResponseCache:
+    """Two-level cache of AI responses with single-flight generation."""
+
+    def __init__(
+        self,
+        ttls: Dict[str, int],
+        max_local_entries: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+        stats_flush_seconds: float = AI_RESPONSE_CACHE_STATS_FLUSH_SECONDS,
+    ):
+        self.ttls = dict(ttls)
+        self.max_local_entries = max_local_entries
+        self.stats_flush_seconds = stats_flush_seconds
+        self._clock = clock
+        # key -> (texte, tokens, échéance monotone)
+        self._local: "OrderedDict[str, Tuple[str, int, float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        # "feature:counter" -> incrément pas encore envoyé au hash Redis
+        self._pending_stats: Dict[str, int] = {}
+        self._last_stats_flush = clock()
+        self._stats_flush_task: Optional[asyncio.Task] = None
+
+    async def get_or_generate(self, feature: str, key: str, generate: Generator) -> Optional[str]:
+        """
+        Cached response of `feature` under `key`, else `generate()` → (text, total_tokens).
+        Features without a TTL are not cached.
+        """
+        ttl = self.ttls.get(feature)
+        if not ttl:
+            text, _ = await generate()
+            return text
+
+        entry = self._local_get(key)
+        if entry is not None:
+            self._count(feature, "local_hits", tokens_saved=entry[1])
+            return entry[0]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count(feature, "coalesced")
+        else:
+            # Tâche indépendante du demandeur : une déconnexion n'annule pas l'appel attendu par les autres
+            task = asyncio.ensure_future(self._load_or_generate(feature, key, ttl, generate))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict:
+        """Per-feature counters of the current worker + totals."""
+        totals: Dict[str, int] = {}
+        for counters in self._counters.values():
+            for name, value in counters.items():
+                totals[name] = totals.get(name, 0) + value
+        return {
+            "features": {feature: dict(counters) for feature, counters in self._counters.items()},
+            "totals": totals,
+            "local_entries": len(self._local),
+            "inflight": len(self._inflight),
+        }
+
+    async def global_stats(self) -> Dict[str, Dict[str, int]]:
+        """Platform-wide counters from Redis: {feature: {counter: value}} (empty without Redis)."""
+        await self.flush_stats()
+        cache = await get_cache_service()
+        if not cache.enabled or not cache.redis_client:
+            return {}
+        try:
+            raw = await cache.redis_client.hgetall(AI_CACHE_STATS_KEY)
+        except Exception as e:
+            logger.warning("AI cache global stats read failed: %s", e)
+            return {}
+        out: Dict[str, Dict[str, int]] = {}
+        for field, value in (raw or {}).items():
+            feature, _, name = field.partition(":")
+            out.setdefault(feature, {})[name] = int(value)
+        return out
+
+    async def flush_stats(self) -> None:
+        """Push the counter deltas accumulated since the last flush to the Redis hash."""
+        self._last_stats_flush = self._clock()
+        if not self._pending_stats:
+            return
+        pending, self._pending_stats = self._pending_stats, {}
+        cache = await get_cache_service()
+        if not cache.enabled or not cache.redis_client:
+            return
+        try:
+            pipe = cache.redis_client.pipeline(transaction=False)
+            for field, value in pending.items():
+                pipe.hincrby(AI_CACHE_STATS_KEY, field, value)
+            await pipe.execute()
+        except Exception as e:
+            logger.debug("AI cache counters not shared in Redis: %s", e)
+            # Rendus au prochain envoi (une entrée par compteur : taille bornée)
+            for field, value in pending.items():
+                self._pending_stats[field] = self._pending_stats.get(field, 0) + value
+
+    def clear_local(self) -> None:
+        self._local.clear()
+
+    # ----- internals -----
+
+    async def _load_or_generate(self, feature: str, key: str, ttl: int, generate: Generator) -> Optional[str]:
+        cache = await get_cache_service()
+        shared = await cache.get(AI_CACHE_PREFIX + key)
+        if isinstance(shared, dict) and shared.get("text"):
+            tokens = int(shared.get("tokens") or 0)
+            self._local_put(key, shared["text"], tokens, ttl)
+            self._count(feature, "redis_hits", tokens_saved=tokens)
+            return shared["text"]
+
+        text, tokens = await generate()
+        self._count(feature, "misses", tokens_used=tokens)
+        if text:
+            self._local_put(key, text, tokens, ttl)
+            await cache.set(AI_CACHE_PREFIX + key, {"text": text, "tokens": tokens, "feature": feature}, ttl=int(ttl))
+        return text
+
+    def _local_get(self, key: str) -> Optional[Tuple[str, int, float]]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        if self._clock() >= entry[2]:
+            self._local.pop(key, None)
+            return None
+        self._local.move_to_end(key)
+        return entry
+
+    def _local_put(self, key: str, text: str, tokens: int, ttl: float) -> None:
+        if self.max_local_entries <= 0:
+            return
+        self._local[key] = (text, tokens, self._clock() + ttl)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_local_entries:
+            self._local.popitem(last=False)
+
+    def _count(self, feature: str, name: str, tokens_saved: int = 0, tokens_used: int = 0) -> None:
+        increments = {name: 1}
+        if tokens_saved:
+            increments["tokens_saved"] = tokens_saved
+        if tokens_used:
+            increments["tokens_used"] = tokens_used
+        counters = self._counters.setdefault(feature, {})
+        for counter, value in increments.items():
+            counters[counter] = counters.get(counter, 0) + value
+            field = f"{feature}:{counter}"
+            self._pending_stats[field] = self._pending_stats.get(field, 0) + value
+
+        # Envoi en arrière-plan, au plus un en cours : le demandeur n'attend jamais Redis
+        if self._clock() - self._last_stats_flush < self.stats_flush_seconds:
+            return
+        if self._stats_flush_task is None or self._stats_flush_task.done():
+            self._stats_flush_task = asyncio.ensure_future(self.flush_stats())
+
+
+_ai_response_cache: Optional[AIResponseCache] = None
+
+
+def get_ai_response_cache() -> AIResponseCache:
+    """Process-wide AI response cache configured from settings (shared by every AIService instance)."""
+    global _ai_response_cache
+    if _ai_response_cache is None:
+        from config.limits import AI_RESPONSE_CACHE_TTLS
+        from core.config import settings
+        _ai_response_cache = AIResponseCache(
+            AI_RESPONSE_CACHE_TTLS,
+            max_local_entries=settings.AI_RESPONSE_CACHE_LOCAL_ENTRIES,
+        )
+    return _ai_response_cache
@@ -0,0 +1,130 @@
+"""
+Server-Sent Events delivery of AI generations (morning brief, bilans, store analyses).
+
+The generation endpoints keep a single code path: prompt building, parsing of the
+accumulated text (_parse_brief_to_structured, JSON cleanup…) and persistence are
+unchanged. In streaming mode the handler body runs in a background task with an
+AIStreamSink in its context; CoreMixin._send_message sees the sink, calls OpenAI
+with stream=True and forwards each delta to it while accumulating the full text.
+
+Events sent to the client (text/event-stream):
+- `delta`  {"text": "..."}     tokens as they arrive
+- `reset`  {}                  an OpenAI retry restarted the text: clear the buffer
+- `result` {...}               final JSON, same body as the non-streaming response
+- `error`  {"detail", "error_code", "status_code"}
+plus `: ping` comments while nothing is produced (keeps proxies from timing out).
+
+A client disconnect does not cancel the generation: the result is still persisted.
+"""
+import asyncio
+import json
+import logging
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Set, Type
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from core.exceptions import AppException
+
+logger = logging.getLogger(__name__)
+
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+HEARTBEAT_SECONDS = 15.0
+
+_current_sink: ContextVar[Optional["AIStreamSink"]] = ContextVar("ai_stream_sink", default=None)
+
+# Générations en cours dont le client s'est peut-être déconnecté (références fortes)
+_background: Set[asyncio.Task] = set()
+
+
+class AIStreamSink:
+    """Queue of (event, payload) produced by one streamed generation."""
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._has_deltas = False
+
+    def delta(self, text: str) -> None:
+        self._has_deltas = True
+        self.queue.put_nowait(("delta", text))
+
+    def restart(self) -> None:
+        """A new attempt starts: tell the client to drop the partial text already sent."""
+        if self._has_deltas:
+            self._has_deltas = False
+            self.queue.put_nowait(("reset", None))
+
+    def finish(self, event: str, payload: Any) -> None:
+        self.queue.put_nowait((event, payload))
+
+
+def current_ai_stream_sink() -> Optional[AIStreamSink]:
+    """Sink of the streamed generation running in this context, if any."""
+    return _current_sink.get()
+
+
+def wants_event_stream(request: Request) -> bool:
+    """`?stream=true` or `Accept: text/event-stream`."""
+    if request.query_params.get("stream", "").lower() in ("1", "true", "yes"):
+        return True
+    return EVENT_STREAM_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def iter_ai_events(
+    generate: Callable[[], Awaitable[Any]],
+    response_model: Optional[Type[BaseModel]] = None,
+    heartbeat_seconds: float = HEARTBEAT_SECONDS,
+) -> AsyncIterator[str]:
+    """Run `generate()` with a sink in its context and yield its SSE events."""
+    sink = AIStreamSink()
+
+    async def run() -> None:
+        _current_sink.set(sink)  # contexte copié par la tâche : invisible pour l'appelant
+        try:
+            result = await generate()
+            if response_model is not None:
+                result = response_model.model_validate(result).model_dump(mode="json")
+            sink.finish("result", jsonable_encoder(result))
+        except AppException as e:
+            sink.finish("error", {"detail": e.detail, "error_code": e.error_code, "status_code": e.status_code})
+        except Exception:
+            logger.exception("Streamed AI generation failed")
+            sink.finish("error", {"detail": "Erreur interne du serveur", "error_code": "INTERNAL_ERROR", "status_code": 500})
+
+    task = asyncio.ensure_future(run())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+    yield ": stream-open\n\n"  # premier octet immédiat
+    while True:
+        try:
+            event, payload = await asyncio.wait_for(sink.queue.get(), heartbeat_seconds)
+        except asyncio.TimeoutError:
+            yield ": ping\n\n"
+            continue
+        if event == "delta":
+            yield format_sse("delta", {"text": payload})
+        elif event == "reset":
+            yield format_sse("reset", {})
+        else:
+            yield format_sse(event, payload)
+            return
+
+
+def event_stream_response(
+    generate: Callable[[], Awaitable[Any]],
+    response_model: Optional[Type[BaseModel]] = None,
+) -> StreamingResponse:
+    """StreamingResponse delivering `generate()` as SSE (see module docstring)."""
+    return StreamingResponse(
+        iter_ai_events(generate, response_model),
+        media_type=EVENT_STREAM_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,277 @@
+"""
+API Key Verification Cache
+Évite le bcrypt (~100-250 ms CPU) à chaque appel d'intégration.
+
+Une clé vérifiée est mise en cache sous une empreinte HMAC-SHA256 de la clé
+présentée (jamais la clé en clair, jamais le hash bcrypt) :
+- L1 : LRU en mémoire du worker (TTL court)
+- L2 : Redis via CacheService (TTL plus long, partagé entre workers)
+
+Redis fait autorité quand il est disponible : un hit L1 est confirmé par un
+EXISTS sur l'entrée L2 (pas de décodage JSON, pas de Mongo, pas de bcrypt).
+La révocation supprime l'entrée L2, elle est donc immédiate sur tous les workers.
+Sans Redis, le L1 seul est utilisé (révocation immédiate sur le worker courant,
+bornée par le TTL L1 ailleurs).
+
+Une vérification (Mongo + bcrypt) peut se terminer après une révocation et
+remettre en cache une clé révoquée : invalidate() pose d'abord une pierre
+tombale par id de clé (API_KEY_REVOCATION_TOMBSTONE_SECONDS, L1 + Redis) ;
+set() n'écrit rien tant qu'elle existe, et la relit après écriture pour retirer
+une entrée écrite pendant une révocation concurrente.
+
+Le TTL d'une entrée ne dépasse jamais la date d'expiration de la clé.
+"""
+import hashlib
+import hmac
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set, Tuple
+
+from config.limits import API_KEY_REVOCATION_TOMBSTONE_SECONDS
+from core.cache import get_cache_service
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+API_KEY_CACHE_PREFIX = "api_key:"
+API_KEY_INDEX_PREFIX = "api_key_fp:"
+API_KEY_TOMBSTONE_PREFIX = "api_key_revoked:"
+
+# Champs jamais mis en cache (secret ou inutile côté appelant)
+_EXCLUDED_FIELDS = ("key_hash", "key", "_id")
+
+
+def api_key_fingerprint(api_key: str) -> str:
+    """Empreinte HMAC-SHA256 (clé serveur) de la clé présentée. Rapide, non réversible."""
+    return hmac.new(
+        settings.JWT_SECRET.encode("utf-8"),
+        api_key.encode("utf-8"),
+        hashlib.sha256,
+    ).hexdigest()
+
+
+def _expires_at_timestamp(key_doc: Dict) -> Optional[float]:
+    """expires_at peut être un timestamp, une chaîne ISO ou un datetime selon l'origine de la clé."""
+    expires_at = key_doc.get("expires_at")
+    if not expires_at:
+        return None
+    if isinstance(expires_at, (int, float)):
+        return float(expires_at)
+    if isinstance(expires_at, datetime):
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return expires_at.timestamp()
+    try:
+        dt = datetime.fromisoformat(str(expires_at).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class APIKeyVerificationCache:
+    """Cache deux niveaux des clés API vérifiées, indexé par empreinte HMAC."""
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl_seconds: Optional[int] = None,
+        local_ttl_seconds: Optional[int] = None,
+        max_local_entries: int = 1024,
+    ):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds or settings.API_KEY_CACHE_TTL_SECONDS
+        self.local_ttl_seconds = local_ttl_seconds or settings.API_KEY_CACHE_LOCAL_TTL_SECONDS
+        self.max_local_entries = max_local_entries
+        # fingerprint -> (key_doc, monotonic deadline)
+        self._local: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()
+        # key_id -> fingerprints (invalidation par id de clé)
+        self._local_index: Dict[str, Set[str]] = {}
+        # key_id -> monotonic deadline de la pierre tombale (révocation récente)
+        self._tombstones: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    # ----- clés Redis -----
+
+    def _entry_key(self, fingerprint: str) -> str:
+        return f"{API_KEY_CACHE_PREFIX}{self.namespace}:{fingerprint}"
+
+    def _index_key(self, key_id: str) -> str:
+        return f"{API_KEY_INDEX_PREFIX}{self.namespace}:{key_id}"
+
+    def _tombstone_key(self, key_id: str) -> str:
+        return f"{API_KEY_TOMBSTONE_PREFIX}{self.namespace}:{key_id}"
+
+    # ----- L1 -----
+
+    def _local_get(self, fingerprint: str) -> Optional[Dict]:
+        entry = self._local.get(fingerprint)
+        if entry is None:
+            return None
+        key_doc, deadline = entry
+        if time.monotonic() >= deadline:
+            self._local_drop(fingerprint)
+            return None
+        self._local.move_to_end(fingerprint)
+        return key_doc
+
+    def _local_put(self, fingerprint: str, key_doc: Dict, ttl: float) -> None:
+        self._local[fingerprint] = (key_doc, time.monotonic() + min(ttl, self.local_ttl_seconds))
+        self._local.move_to_end(fingerprint)
+        key_id = key_doc.get("id")
+        if key_id:
+            self._local_index.setdefault(key_id, set()).add(fingerprint)
+        while len(self._local) > self.max_local_entries:
+            oldest, _ = next(iter(self._local.items()))
+            self._local_drop(oldest)
+
+    def _local_drop(self, fingerprint: str) -> None:
+        entry = self._local.pop(fingerprint, None)
+        if entry is None:
+            return
+        key_id = entry[0].get("id")
+        fingerprints = self._local_index.get(key_id)
+        if fingerprints is not None:
+            fingerprints.discard(fingerprint)
+            if not fingerprints:
+                self._local_index.pop(key_id, None)
+
+    # ----- Révocations -----
+
+    def _local_revoked(self, key_id: str) -> bool:
+        deadline = self._tombstones.get(key_id)
+        if deadline is None:
+            return False
+        if time.monotonic() >= deadline:
+            del self._tombstones[key_id]
+            return False
+        return True
+
+    async def _revoked(self, cache, key_id: str) -> bool:
+        """True si la clé a été révoquée récemment (ce worker ou, via Redis, un autre)."""
+        if self._local_revoked(key_id):
+            return True
+        if not cache.enabled or not cache.redis_client:
+            return False
+        try:
+            return await cache.redis_client.exists(self._tombstone_key(key_id)) > 0
+        except Exception as e:
+            logger.warning("API key cache tombstone check failed for %s: %s (not cached)", key_id, e)
+            return True
+
+    # ----- API publique -----
+
+    def _remaining_ttl(self, key_doc: Dict) -> float:
+        """TTL borné par l'expiration de la clé (0 = ne pas mettre en cache)."""
+        ttl = float(self.ttl_seconds)
+        expires_ts = _expires_at_timestamp(key_doc)
+        if expires_ts is not None:
+            ttl = min(ttl, expires_ts - datetime.now(timezone.utc).timestamp())
+        return max(ttl, 0.0)
+
+    async def get(self, api_key: str) -> Optional[Dict]:
+        """Retourne la clé vérifiée en cache, ou None (miss → vérification bcrypt)."""
+        fingerprint = api_key_fingerprint(api_key)
+        cache = await get_cache_service()
+        local_doc = self._local_get(fingerprint)
+
+        if local_doc is not None:
+            if cache.enabled and cache.redis_client:
+                try:
+                    still_valid = await cache.redis_client.exists(self._entry_key(fingerprint)) > 0
+                except Exception as e:
+                    logger.warning("API key cache exists check failed: %s (L1 kept)", e)
+                    still_valid = True
+                if not still_valid:
+                    self._local_drop(fingerprint)
+                    self.misses += 1
+                    return None
+            self.hits += 1
+            return dict(local_doc)
+
+        remote_doc = await cache.get(self._entry_key(fingerprint))
+        if remote_doc:
+            ttl = self._remaining_ttl(remote_doc)
+            if ttl > 0:
+                self._local_put(fingerprint, remote_doc, ttl)
+                self.hits += 1
+                return dict(remote_doc)
+        self.misses += 1
+        return None
+
+    async def set(self, api_key: str, key_doc: Dict[str, Any]) -> None:
+        """Met en cache une clé qui vient d'être vérifiée (bcrypt OK, active, non expirée)."""
+        cached = {k: v for k, v in key_doc.items() if k not in _EXCLUDED_FIELDS}
+        ttl = self._remaining_ttl(cached)
+        if ttl <= 0:
+            return
+        key_id = cached.get("id")
+        cache = await get_cache_service()
+        if key_id and await self._revoked(cache, key_id):
+            return
+        fingerprint = api_key_fingerprint(api_key)
+        self._local_put(fingerprint, cached, ttl)
+
+        if not cache.enabled or not cache.redis_client:
+            return
+        redis_ttl = max(int(ttl), 1)
+        entry_key = self._entry_key(fingerprint)
+        await cache.set(entry_key, cached, ttl=redis_ttl)
+        if not key_id:
+            return
+        try:
+            index_key = self._index_key(key_id)
+            await cache.redis_client.sadd(index_key, fingerprint)
+            await cache.redis_client.expire(index_key, int(self.ttl_seconds))
+        except Exception as e:
+            logger.warning("API key cache index update failed for %s: %s", key_id, e)
+        # Révocation arrivée entre le contrôle et l'écriture : elle a pu lire l'index avant le SADD
+        if await self._revoked(cache, key_id):
+            self._local_drop(fingerprint)
+            try:
+                await cache.redis_client.delete(entry_key)
+            except Exception as e:
+                logger.warning("API key cache rollback failed for %s: %s", key_id, e)
+
+    async def invalidate(self, key_id: str) -> None:
+        """Invalide toutes les entrées d'une clé (révocation, rotation, suppression)."""
+        if not key_id:
+            return
+        now = time.monotonic()
+        for expired in [k for k, deadline in self._tombstones.items() if deadline <= now]:
+            del self._tombstones[expired]
+        self._tombstones[key_id] = now + API_KEY_REVOCATION_TOMBSTONE_SECONDS
+        for fingerprint in list(self._local_index.get(key_id, ())):
+            self._local_drop(fingerprint)
+
+        cache = await get_cache_service()
+        if not cache.enabled or not cache.redis_client:
+            return
+        index_key = self._index_key(key_id)
+        try:
+            # Pierre tombale avant la suppression : un set() concurrent la verra au plus tard en relecture
+            await cache.redis_client.set(self._tombstone_key(key_id), 1, ex=API_KEY_REVOCATION_TOMBSTONE_SECONDS)
+            fingerprints = await cache.redis_client.smembers(index_key)
+            keys = [self._entry_key(fp) for fp in fingerprints or ()]
+            await cache.redis_client.delete(index_key, *keys)
+        except Exception as e:
+            logger.warning("API key cache invalidation failed for %s: %s", key_id, e)
+
+    def stats(self) -> Dict[str, int]:
+        """Compteurs hit/miss du worker courant."""
+        return {"hits": self.hits, "misses": self.misses, "local_entries": len(self._local)}
+
+
+# Caches par famille de clés (singletons de module, partagés par toutes les requêtes du worker)
+integration_api_key_cache = APIKeyVerificationCache("integration")
+enterprise_api_key_cache = APIKeyVerificationCache("enterprise")
+
+
+async def invalidate_api_key_cache(key_id: str) -> None:
+    """Invalide une clé API dans tous les caches (à appeler sur désactivation / rotation / suppression)."""
+    await integration_api_key_cache.invalidate(key_id)
+    await enterprise_api_key_cache.invalidate(key_id)
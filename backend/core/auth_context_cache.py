@@ -0,0 +1,223 @@
+"""
+Auth context cache — per-worker LRU in front of CacheService (Redis).
+
+Every authenticated request resolves the user, the workspace (space context)
+and, for gérant routes, the stores the gérant owns. With Redis alone that is
+one or two GETs + JSON decodes per request, and a Mongo find_one on a miss;
+gérant workspace and store-ownership lookups were not cached at all.
+
+AuthContextCache keeps the decoded values in process for a few seconds
+(AUTH_CONTEXT_CACHE_TTL_SECONDS), so a dashboard that fires a burst of calls
+resolves auth without any network hop after the first one.
+
+Entries :
+- user:{user_id}          user document (no password)
+- workspace:{workspace_id} minimal workspace (id, status, subscription_status, trial_end)
+- gerant_ws:{gerant_id}   workspace of a gérant (users without workspace_id)
+- store_owner:{gerant_id}:{store_id}  True — ownership check that succeeded
+  (only positive answers are kept: a refusal always re-checks Mongo)
+
+Invalidation : invalidate_user_cache / invalidate_store_cache /
+invalidate_workspace_cache (core.cache) drop the local entries immediately and
+publish on the Redis channel auth:invalidate; every worker's listener drops
+its own copies. If the listener loses Redis, the local cache is cleared (some
+invalidations may have been missed) and it reconnects with backoff. The TTL
+bounds staleness in any case.
+
+Values are returned as deep copies: callers (e.g. _attach_space_context)
+mutate the user dict per request.
+"""
+import asyncio
+import copy
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "auth:invalidate"
+
+RECONNECT_MIN_SECONDS = 1.0
+RECONNECT_MAX_SECONDS = 30.0
+
+
+class AuthContextCache:
+    """Small TTL + LRU cache of decoded auth objects, with cluster-wide invalidation."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = 5.0,
+        max_entries: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters = {
+            "hits": 0, "misses": 0, "evictions": 0, "invalidations": 0,
+            "remote_invalidations": 0, "flushes": 0,
+        }
+        self._redis_client = None
+        self._listener_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    # ----- lecture / écriture -----
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or not self.enabled:
+            self._counters["misses"] += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self._counters["misses"] += 1
+            return default
+        self._entries.move_to_end(key)
+        self._counters["hits"] += 1
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        self._entries[key] = (self._clock() + self.ttl_seconds, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._counters["flushes"] += 1
+
+    # ----- invalidation -----
+
+    def invalidate_local(self, kind: str, entity_id: str) -> None:
+        """Drop the entries affected by a change of a user, store or workspace."""
+        if kind == "user":
+            for key in (f"user:{entity_id}", f"gerant_ws:{entity_id}"):
+                self._entries.pop(key, None)
+            self._drop_matching(lambda k: k.startswith(f"store_owner:{entity_id}:"))
+        elif kind == "store":
+            self._drop_matching(lambda k: k.startswith("store_owner:") and k.endswith(f":{entity_id}"))
+        elif kind == "workspace":
+            self._entries.pop(f"workspace:{entity_id}", None)
+            self._drop_matching(
+                lambda k: k.startswith("gerant_ws:") and (self._entries[k][1] or {}).get("id") == entity_id
+            )
+
+    def _drop_matching(self, predicate: Callable[[str], bool]) -> None:
+        for key in [k for k in self._entries if predicate(k)]:
+            del self._entries[key]
+
+    async def invalidate(self, kind: str, entity_id: str) -> None:
+        """Local drop + broadcast to the other workers (best effort)."""
+        if not entity_id:
+            return
+        self.invalidate_local(kind, entity_id)
+        self._counters["invalidations"] += 1
+        if self._redis_client is None:
+            return
+        try:
+            await self._redis_client.publish(
+                INVALIDATION_CHANNEL, json.dumps({"kind": kind, "id": entity_id}, separators=(",", ":"))
+            )
+        except Exception as e:
+            logger.warning("Auth cache invalidation publish failed (%s %s): %s", kind, entity_id, e)
+
+    def _handle_message(self, message: Optional[dict]) -> None:
+        if not message or message.get("type") != "message":
+            return
+        try:
+            data = message.get("data")
+            payload = json.loads(data.decode("utf-8") if isinstance(data, bytes) else data)
+            kind, entity_id = payload["kind"], payload["id"]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return
+        self.invalidate_local(kind, entity_id)
+        self._counters["remote_invalidations"] += 1
+
+    # ----- listener Redis (démarré dans lifespan) -----
+
+    async def start(self, redis_client) -> None:
+        """Publish invalidations through redis_client and listen to the other workers."""
+        if redis_client is None or self._listener_task is not None:
+            return
+        self._redis_client = redis_client
+        self._listener_task = asyncio.create_task(self._listen())
+        logger.info("Auth context cache: invalidation listener started (ttl=%ss)", self.ttl_seconds)
+
+    async def _listen(self) -> None:
+        backoff = RECONNECT_MIN_SECONDS
+        while True:
+            pubsub = None
+            try:
+                pubsub = self._redis_client.pubsub()
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Des invalidations ont pu être perdues pendant la coupure
+                self.clear()
+                backoff = RECONNECT_MIN_SECONDS
+                while True:
+                    self._handle_message(
+                        await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    )
+            except asyncio.CancelledError:
+                if pubsub is not None:
+                    await _close_quietly(pubsub)
+                return
+            except Exception as e:
+                logger.warning("Auth cache listener error, reconnecting in %.0fs: %s", backoff, e)
+                self.clear()
+                if pubsub is not None:
+                    await _close_quietly(pubsub)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, RECONNECT_MAX_SECONDS)
+
+    async def stop(self) -> None:
+        if self._listener_task is not None and not self._listener_task.done():
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+        self._listener_task = None
+        self._redis_client = None
+
+    def stats(self) -> Dict:
+        lookups = self._counters["hits"] + self._counters["misses"]
+        return {
+            **self._counters,
+            "entries": len(self._entries),
+            "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else None,
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries,
+            "listening": self._listener_task is not None and not self._listener_task.done(),
+        }
+
+
+async def _close_quietly(pubsub) -> None:
+    try:
+        await pubsub.aclose()
+    except Exception:
+        pass
+
+
+_auth_context_cache: Optional[AuthContextCache] = None
+
+
+def get_auth_context_cache() -> AuthContextCache:
+    """Process-wide cache configured from settings."""
+    global _auth_context_cache
+    if _auth_context_cache is None:
+        from core.config import settings
+        _auth_context_cache = AuthContextCache(
+            ttl_seconds=settings.AUTH_CONTEXT_CACHE_TTL_SECONDS,
+            max_entries=settings.AUTH_CONTEXT_CACHE_MAX_ENTRIES,
+        )
+    return _auth_context_cache
@@ -308,14 +308,11 @@ async def invalidate_user_cache(user_id: str):
     Called when user data is updated.
     """
     cache = await get_cache_service()
-    if not cache.enabled:
-        return
+    if cache.enabled:
+        await cache.delete(CacheKeys.key_for_user(user_id))
     
-    # Invalidate user cache
-    await cache.delete(CacheKeys.key_for_user(user_id))
-    
-    # Invalidate workspace cache if user has workspace_id
-    # (We'll need to fetch user to get workspace_id, but that's OK for invalidation)
+    # Per-worker auth cache (after Redis, so a concurrent miss cannot refill it with the old value)
+    await _invalidate_auth_context("user", user_id)
     logger.debug(f"Invalidated cache for user {user_id}")
 
 
@@ -325,13 +322,12 @@ async def invalidate_store_cache(store_id: str):
     Called when store data is updated.
     """
     cache = await get_cache_service()
-    if not cache.enabled:
-        return
-    
-    # Invalidate store cache
-    await cache.delete(CacheKeys.key_for_store(store_id))
-    await cache.delete(CacheKeys.key_for_store_config(store_id))
+    if cache.enabled:
+        await cache.delete(CacheKeys.key_for_store(store_id))
+        await cache.delete(CacheKeys.key_for_store_config(store_id))
     
+    # Store ownership (gérant → stores) held by the per-worker auth cache
+    await _invalidate_auth_context("store", store_id)
     logger.debug(f"Invalidated cache for store {store_id}")
 
 
@@ -341,10 +337,17 @@ async def invalidate_workspace_cache(workspace_id: str):
     Called when workspace data is updated.
     """
     cache = await get_cache_service()
-    if not cache.enabled:
-        return
-    
-    # Invalidate workspace cache
-    await cache.delete(CacheKeys.key_for_workspace(workspace_id))
+    if cache.enabled:
+        await cache.delete(CacheKeys.key_for_workspace(workspace_id))
     
+    await _invalidate_auth_context("workspace", workspace_id)
     logger.debug(f"Invalidated cache for workspace {workspace_id}")
+
+
+async def _invalidate_auth_context(kind: str, entity_id: str) -> None:
+    """Drop the per-worker auth cache entries here and on every other worker (pub/sub)."""
+    try:
+        from core.auth_context_cache import get_auth_context_cache
+        await get_auth_context_cache().invalidate(kind, entity_id)
+    except Exception as e:
+        logger.warning(f"Auth context invalidation failed for {kind} {entity_id}: {e}")
@@ -26,20 +26,44 @@ class Settings(BaseSettings):
     MONGO_CONNECT_TIMEOUT_MS: int = Field(default=5000, description="MongoDB connection timeout in milliseconds")
     MONGO_SOCKET_TIMEOUT_MS: int = Field(default=30000, description="MongoDB socket timeout in milliseconds")
     MONGO_SERVER_SELECTION_TIMEOUT_MS: int = Field(default=5000, description="MongoDB server selection timeout in milliseconds")
+    QUERY_PROFILER_ENABLED: bool = Field(default=False, description="Record query shapes (latency, sampled explain) from BaseRepository into query_shapes; report: query_shape_report.py")
+    QUERY_PROFILER_EXPLAIN_SAMPLE_RATE: float = Field(default=0.01, ge=0, le=1, description="Fraction of calls of an already explained query shape that trigger a new explain() (after the cooldown)")
     
     # Cache (Redis)
     REDIS_URL: Optional[str] = Field(default=None, description="Redis connection URL (e.g., redis://localhost:6379/0). If not provided, cache is disabled (graceful fallback)")
     REDIS_ENABLED: bool = Field(default=True, description="Enable Redis cache (set to False to disable even if REDIS_URL is set)")
+    API_KEY_CACHE_TTL_SECONDS: int = Field(default=300, description="TTL (Redis) of a verified API key in the verification cache")
+    API_KEY_CACHE_LOCAL_TTL_SECONDS: int = Field(default=30, description="TTL of a verified API key in the per-worker in-memory cache")
+    AUTH_CONTEXT_CACHE_TTL_SECONDS: float = Field(default=5.0, ge=0, description="TTL of resolved users/workspaces/store ownership in the per-worker auth cache (0 = disabled)")
+    AUTH_CONTEXT_CACHE_MAX_ENTRIES: int = Field(default=10000, ge=0, description="Entries kept in the per-worker auth cache (LRU)")
+    WS_PUBSUB_ENCODING: str = Field(default="json", description="Encoding of WebSocket KPI events on Redis pub/sub: json or zlib (compact binary)")
     
     # Security
     JWT_SECRET: str = Field(..., description="JWT secret key for token signing")
+    PASSWORD_HASH_ROUNDS: int = Field(default=12, ge=4, le=31, description="bcrypt cost for new password hashes (older costs are upgraded on login)")
+    PASSWORD_HASH_WORKERS: int = Field(default=2, ge=0, description="Processes of the password hashing pool (0 = thread pool)")
+    PASSWORD_HASH_MAX_PENDING: int = Field(default=64, ge=1, description="Hashing jobs allowed to wait before new requests get a 503")
     CORS_ORIGINS: str = Field(default="https://retailperformerai.com,https://www.retailperformerai.com", description="Allowed CORS origins (comma-separated). Set CORS_ORIGINS env var to override.")
     API_RATE_LIMIT: int = Field(default=60, description="API rate limit per minute")
     
     # External Services
     OPENAI_API_KEY: str = Field(..., description="OpenAI API key")
+    AI_RESPONSE_CACHE_ENABLED: bool = Field(default=True, description="Serve identical AI prompts from the response cache (Redis + per-worker LRU)")
+    AI_RESPONSE_CACHE_LOCAL_ENTRIES: int = Field(default=256, description="AI responses kept in the per-worker in-memory LRU")
+    AI_MAX_CONCURRENCY: int = Field(default=16, description="OpenAI calls in flight across all workers")
+    AI_TENANT_MAX_CONCURRENCY: int = Field(default=4, description="OpenAI calls in flight per workspace")
+    AI_TOKENS_PER_MINUTE: int = Field(default=800000, description="Cluster-wide OpenAI token budget per minute (prompt + max_tokens)")
+    AI_TENANT_TOKENS_PER_MINUTE: int = Field(default=150000, description="OpenAI token budget per minute per workspace")
+    AI_QUEUE_TIMEOUT_SECONDS: float = Field(default=60.0, description="Max wait for an AI slot before the generation falls back")
     STRIPE_API_KEY: str = Field(..., description="Stripe API key")
     STRIPE_WEBHOOK_SECRET: str = Field(..., description="Stripe webhook secret")
+    STRIPE_HTTP_TIMEOUT_SECONDS: float = Field(default=20.0, description="Timeout of one Stripe API request (async gateway)")
+    STRIPE_MAX_CONCURRENCY: int = Field(default=20, ge=1, description="Stripe API calls in flight per worker (also the HTTP pool size)")
+    STRIPE_QUEUE_TIMEOUT_SECONDS: float = Field(default=10.0, description="Max wait for a Stripe slot before the request gets a 503")
+    STRIPE_MAX_NETWORK_RETRIES: int = Field(default=2, ge=0, description="Automatic retries of idempotent-safe Stripe requests on network errors")
+    STRIPE_WEBHOOK_CONCURRENCY: int = Field(default=8, ge=1, description="Stripe customers whose webhook events are processed in parallel per worker")
+    STRIPE_WEBHOOK_LEASE_SECONDS: int = Field(default=120, ge=10, description="Lease on a customer's webhook events; taken over by another worker after expiry")
+    STRIPE_WEBHOOK_MAX_ATTEMPTS: int = Field(default=8, ge=1, description="Processing attempts of a webhook event before it is parked as failed")
     BREVO_API_KEY: str = Field(..., description="Brevo (Sendinblue) API key")
     
     # Stripe Price IDs (single product with tiered pricing)
@@ -54,6 +78,18 @@ class Settings(BaseSettings):
     # Email Configuration
     SENDER_EMAIL: str = Field(default="hello@retailperformerai.com")
     SENDER_NAME: str = Field(default="Retail Performer AI")
+    EMAIL_RATE_PER_SECOND: float = Field(default=10.0, description="Brevo API calls per second allowed by the e-mail dispatcher (provider quota)")
+    EMAIL_RATE_BURST: int = Field(default=20, description="Burst size of the e-mail dispatcher token bucket")
+    EMAIL_DISPATCH_CONCURRENCY: int = Field(default=8, description="E-mail sends in flight at once per dispatch")
+    EMAIL_MAX_ATTEMPTS: int = Field(default=4, description="Attempts per e-mail before dead-lettering (retryable errors only)")
+
+    # PDF rendering
+    PDF_RENDER_WORKERS: int = Field(default=2, description="Processes in the PDF rendering pool (per web worker, spawned on first render)")
+    PDF_CACHE_DIR: str = Field(default="/tmp/retail_performer_pdf_cache", description="On-disk cache of rendered PDFs (empty to disable)")
+    PDF_CACHE_MEMORY_MB: int = Field(default=32, description="In-memory cache of rendered PDFs per worker, in MB")
+
+    # KPI rollup
+    KPI_ROLLUP_READS_ENABLED: bool = Field(default=False, description="Serve KPI history / calendar / years from store_daily_kpis (False: read raw kpi_entries + manager_kpis). Enable only after the backfill (rebuild_store_daily_kpis.py)")
     
     # URLs
     FRONTEND_URL: str = Field(..., description="Frontend application URL")
@@ -71,6 +107,10 @@ class Settings(BaseSettings):
     # Monitoring
     SENTRY_DSN: Optional[str] = Field(default=None, description="Sentry DSN for error tracking (optional)")
 
+    # Logging
+    LOG_ASYNC: bool = Field(default=True, description="Write logs from a background thread (QueueHandler/QueueListener); False = synchronous stdout handler")
+    ACCESS_LOG_SAMPLE_RATE: float = Field(default=1.0, ge=0, le=1, description="Fraction of successful requests logged by LoggingMiddleware on routes without a rate in ACCESS_LOG_SAMPLE_RATES")
+
     # Application
     ENVIRONMENT: str = Field(default="development", description="Environment: development, staging, production")
     DEBUG: bool = Field(default=False, description="Debug mode")
@@ -6,6 +6,7 @@ CHUNK 2 SonarQube : éviter la duplication de littéraux dans backend/api/routes
 # ----- Descriptions des paramètres Query (OpenAPI) -----
 QUERY_PAGE_NUM_DESC = "Numéro de page"
 QUERY_PAGE_SIZE_DESC = "Nombre d'éléments par page"
+QUERY_CURSOR_DESC = "Pagination par curseur : next_cursor de la page précédente (vide pour la première page)"
 QUERY_STORE_ID_REQUIS_GERANT = "Store ID (requis pour gérant)"
 QUERY_STORE_ID_POUR_GERANT_VISUALISANT = "Store ID (pour gérant visualisant un magasin)"
 QUERY_STORE_ID_POUR_GERANT = "Store ID (pour gérant)"
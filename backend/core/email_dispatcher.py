@@ -0,0 +1,337 @@
+"""
+Bulk e-mail dispatcher (scheduled jobs fan-out).
+
+Replaces the "one to_thread(send_*) per recipient, in sequence" loops:
+
+- Worker pool   : `concurrency` sends in flight at once (asyncio tasks; the
+  synchronous Brevo SDK call runs in the default thread pool).
+- Rate limit    : token bucket shared by the worker process, one token per API
+  call, sized on the provider quota (EMAIL_RATE_PER_SECOND / EMAIL_RATE_BURST).
+- Retry         : exponential backoff with jitter on retryable errors
+  (429, 5xx, network); permanent errors (4xx) are not retried.
+- Dead letters  : messages still undelivered are stored in email_dead_letters.
+
+One API call per message: the job e-mails render their HTML per recipient, so
+Brevo `messageVersions` batching would never group anything.
+
+The transport is pluggable: BrevoTransport in production, InMemoryEmailTransport
+in tests / local runs without a Brevo key.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE_PER_SECOND = 10.0
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_BACKOFF_BASE_SECONDS = 1.0
+DEFAULT_BACKOFF_MAX_SECONDS = 30.0
+
+
+class EmailMessage:
+    """One e-mail to one recipient (sender defaults to SENDER_NAME / SENDER_EMAIL)."""
+
+    def __init__(
+        self,
+        to_email: str,
+        subject: str,
+        html_content: str,
+        to_name: str = "",
+        params: Optional[Dict] = None,
+        category: str = "transactional",
+        tags: Optional[List[str]] = None,
+        sender: Optional[Dict[str, str]] = None,
+    ):
+        self.to_email = to_email
+        self.to_name = to_name
+        self.subject = subject
+        self.html_content = html_content
+        self.params = params
+        self.category = category
+        self.tags = list(tags or [])
+        self.sender = sender
+
+    def to_dict(self) -> Dict:
+        return {
+            "to_email": self.to_email,
+            "to_name": self.to_name,
+            "subject": self.subject,
+            "html_content": self.html_content,
+            "params": self.params,
+            "category": self.category,
+            "tags": self.tags,
+            "sender": self.sender,
+        }
+
+
+class EmailTransportError(Exception):
+    """Provider error; `retryable` tells the dispatcher whether another attempt makes sense."""
+
+    def __init__(self, message: str, retryable: bool = True, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.status_code = status_code
+
+
+# ===== TRANSPORTS =====
+
+class BrevoTransport:
+    """Brevo transactional API (sib_api_v3_sdk). SDK calls run in a thread (blocking HTTP)."""
+
+    def __init__(self, api_instance=None):
+        self._api = api_instance
+
+    def _api_instance(self):
+        if self._api is None:
+            from email_service import get_brevo_api_instance
+            self._api = get_brevo_api_instance()
+        return self._api
+
+    @staticmethod
+    def _sender(message: EmailMessage) -> Dict[str, str]:
+        if message.sender:
+            return message.sender
+        from email_service import SENDER_EMAIL, SENDER_NAME
+        return {"name": SENDER_NAME, "email": SENDER_EMAIL}
+
+    @staticmethod
+    def _recipient(message: EmailMessage) -> Dict[str, str]:
+        recipient = {"email": message.to_email}
+        if message.to_name:
+            recipient["name"] = message.to_name
+        return recipient
+
+    async def _call(self, payload) -> None:
+        from sib_api_v3_sdk.rest import ApiException
+        try:
+            await asyncio.to_thread(self._api_instance().send_transac_email, payload)
+        except ApiException as e:
+            status = getattr(e, "status", None)
+            retryable = status is None or status == 429 or status >= 500
+            raise EmailTransportError(f"Brevo {status}: {e.reason}", retryable, status) from e
+        except Exception as e:
+            # Network / timeout: retry
+            raise EmailTransportError(f"Brevo transport error: {e}", retryable=True) from e
+
+    async def send(self, message: EmailMessage) -> None:
+        import sib_api_v3_sdk
+        await self._call(sib_api_v3_sdk.SendSmtpEmail(
+            to=[self._recipient(message)],
+            sender=self._sender(message),
+            subject=message.subject,
+            html_content=message.html_content,
+            params=message.params or None,
+            tags=message.tags or None,
+        ))
+
+
+class InMemoryEmailTransport:
+    """
+    Local fake: records what would have been sent.
+
+    `failures` maps a recipient to the errors raised on its successive attempts
+    (ex: {"a@x": [EmailTransportError("429")]} → first attempt fails, second succeeds).
+    """
+
+    def __init__(self, latency_seconds: float = 0.0,
+                 failures: Optional[Dict[str, List[Exception]]] = None):
+        self.latency_seconds = latency_seconds
+        self.failures = {k: list(v) for k, v in (failures or {}).items()}
+        self.sent: List[EmailMessage] = []
+        self.calls = 0
+
+    async def send(self, message: EmailMessage) -> None:
+        self.calls += 1
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        pending = self.failures.get(message.to_email)
+        if pending:
+            raise pending.pop(0)
+        self.sent.append(message)
+
+
+# ===== RATE LIMIT =====
+
+# Absorbs float drift of the refill (0.1 s × 10/s must give one full token)
+_TOKEN_EPSILON = 1e-9
+
+
+class TokenBucket:
+    """Token bucket: `rate` tokens per second, up to `capacity` accumulated."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Awaitable] = asyncio.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(rate, 1))
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until `tokens` are available, then take them (FIFO through the lock)."""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens + _TOKEN_EPSILON >= tokens:
+                    self._tokens -= tokens
+                    return
+                await self._sleep((tokens - self._tokens) / self.rate)
+
+
+# ===== DISPATCHER =====
+
+class DispatchReport:
+    """Outcome of one dispatch() call."""
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.api_calls = 0
+        self.dead_lettered = 0
+        self.duration_ms = 0.0
+
+    def to_dict(self) -> Dict:
+        return dict(vars(self))
+
+
+ResultCallback = Callable[[EmailMessage, bool], Awaitable[None]]
+
+
+class EmailDispatcher:
+    """Bounded, rate-limited, retrying sender with dead-lettering (see module docstring)."""
+
+    def __init__(
+        self,
+        transport,
+        dead_letters=None,
+        rate_limiter: Optional[TokenBucket] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        backoff_base_seconds: float = DEFAULT_BACKOFF_BASE_SECONDS,
+        backoff_max_seconds: float = DEFAULT_BACKOFF_MAX_SECONDS,
+        sleep: Callable[[float], Awaitable] = asyncio.sleep,
+    ):
+        self.transport = transport
+        self.dead_letters = dead_letters
+        self.rate_limiter = rate_limiter or TokenBucket(DEFAULT_RATE_PER_SECOND)
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._sleep = sleep
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** (attempt - 1)))
+        return delay * (0.5 + random.random() / 2)
+
+    async def _dead_letter(self, message: EmailMessage, error: Exception, attempts: int,
+                           report: DispatchReport) -> None:
+        report.dead_lettered += 1
+        logger.error("Email to %s (%s) dead-lettered after %d attempt(s): %s",
+                     message.to_email, message.category, attempts, error)
+        if self.dead_letters is None:
+            return
+        try:
+            await self.dead_letters.record(
+                message.to_dict(), str(error), attempts, getattr(error, "status_code", None)
+            )
+        except Exception as e:
+            logger.error("Email dead letter write failed for %s: %s", message.to_email, e)
+
+    async def _send_one(self, message: EmailMessage, report: DispatchReport,
+                        on_result: Optional[ResultCallback]) -> None:
+        attempt = 0
+        while True:
+            attempt += 1
+            await self.rate_limiter.acquire()
+            report.api_calls += 1
+            try:
+                await self.transport.send(message)
+            except Exception as error:
+                retryable = getattr(error, "retryable", True)
+                if retryable and attempt < self.max_attempts:
+                    report.retries += 1
+                    await self._sleep(self._backoff(attempt))
+                    continue
+                report.failed += 1
+                await self._dead_letter(message, error, attempt, report)
+                if on_result:
+                    await on_result(message, False)
+                return
+            report.sent += 1
+            if on_result:
+                await on_result(message, True)
+            return
+
+    async def dispatch(self, messages: List[EmailMessage],
+                       on_result: Optional[ResultCallback] = None) -> DispatchReport:
+        """
+        Send all messages through the worker pool. on_result(message, ok) is awaited
+        once per message (delivered or dead-lettered), e.g. to checkpoint a job.
+        """
+        report = DispatchReport()
+        started = time.perf_counter()
+        queue: asyncio.Queue = asyncio.Queue()
+        for message in messages:
+            queue.put_nowait(message)
+
+        async def _worker():
+            while True:
+                try:
+                    message = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    await self._send_one(message, report, on_result)
+                except Exception:
+                    logger.exception("Email dispatcher worker error")
+
+        workers = min(self.concurrency, queue.qsize())
+        if workers:
+            await asyncio.gather(*(_worker() for _ in range(workers)))
+        report.duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(
+            "Email dispatch: %d sent, %d failed, %d API calls, %d retries in %.0f ms",
+            report.sent, report.failed, report.api_calls, report.retries,
+            report.duration_ms,
+        )
+        return report
+
+
+# Process-wide bucket: concurrent dispatches in one worker share the provider quota
+_shared_rate_limiter: Optional[TokenBucket] = None
+
+
+def _get_shared_rate_limiter() -> TokenBucket:
+    global _shared_rate_limiter
+    if _shared_rate_limiter is None:
+        from core.config import settings
+        _shared_rate_limiter = TokenBucket(settings.EMAIL_RATE_PER_SECOND, settings.EMAIL_RATE_BURST)
+    return _shared_rate_limiter
+
+
+def build_email_dispatcher(db=None, transport=None) -> EmailDispatcher:
+    """Dispatcher configured from settings (Brevo transport, dead letters in db when given)."""
+    from core.config import settings
+    from repositories.email_dead_letter_repository import EmailDeadLetterRepository
+
+    return EmailDispatcher(
+        transport or BrevoTransport(),
+        dead_letters=EmailDeadLetterRepository(db) if db is not None else None,
+        rate_limiter=_get_shared_rate_limiter(),
+        concurrency=settings.EMAIL_DISPATCH_CONCURRENCY,
+        max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+    )
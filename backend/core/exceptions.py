@@ -11,6 +11,7 @@ dans main.py les convertissent en réponses JSON avec status_code, detail et err
 - ValidationError     → 400 (données / logique métier invalides)
 - ConflictError       → 409 (doublons, conflit d'état)
 - BusinessLogicError  → 422 (règles métier non respectées)
+- ServiceUnavailableError → 503 (surcharge temporaire, réessayer)
 """
 from typing import Optional
 
@@ -103,6 +104,17 @@ class BusinessLogicError(AppException):
         )
 
 
+class ServiceUnavailableError(AppException):
+    """Surcharge temporaire (file d'attente pleine) : le client peut réessayer."""
+
+    def __init__(self, detail: str = "Service temporairement indisponible"):
+        super().__init__(
+            detail=detail,
+            status_code=503,
+            error_code="SERVICE_UNAVAILABLE",
+        )
+
+
 __all__ = [
     "AppException",
     "NotFoundError",
@@ -111,4 +123,6 @@ __all__ = [
     "ForbiddenError",
     "ConflictError",
     "BusinessLogicError",
+    "ServiceUnavailableError",
 ]
+
@@ -9,13 +9,15 @@ Index coverage :
 - stores                   : id (UNIQUE), gerant_id
 - subscriptions            : stripe_customer_id, stripe_subscription_id (UNIQUE), (user_id, status)
 - kpi_entries              : id (UNIQUE), (seller_id, date), (store_id, date),
-                             (seller_id, store_id, date), (store_id, locked, date)
+                             (seller_id, store_id, date), (store_id, locked, date),
+                             (seller_id, date, id) keyset
 - manager_kpis             : id (UNIQUE), (store_id, date), (manager_id, date)
+- store_daily_kpis         : (store_id, date) UNIQUE, (store_id, year)
 - objectives               : (store_id, status), (manager_id, period_start), (store_id, period)
 - challenges               : (store_id, status)
 - daily_challenges         : (seller_id, date) + TTL 90j
 - sales                    : (seller_id, date)
-- debriefs                 : (seller_id, created_at)
+- debriefs                 : (seller_id, created_at), (seller_id, created_at, id) keyset
 - diagnostics              : (seller_id, created_at)
 - api_keys                 : (key, is_active)
 - kpi_configs              : store_id, manager_id
@@ -24,7 +26,7 @@ Index coverage :
 - evaluations              : (seller_id, created_at), (store_id, created_at)
 - seller_bilans            : (seller_id, created_at)
 - interview_notes          : (seller_id, created_at)
-- morning_briefs           : (store_id, created_at), (manager_id, created_at)
+- morning_briefs           : (store_id, created_at), (manager_id, created_at), (store_id, generated_at)
 - gerant_invitations       : (gerant_id, status) + TTL 30j
 - invitations              : (store_id, status) + TTL 30j
 - password_resets          : (email) + TTL via expires_at
@@ -38,10 +40,14 @@ Index coverage :
 - conflict_consultations   : (seller_id, created_at)
 - payment_transactions     : (user_id, created_at)
 - onboarding_progress      : user_id UNIQUE
-- system_logs              : created_at TTL 30j
+- system_logs              : created_at TTL 30j, (timestamp, _id) keyset
 - sync_logs                : created_at TTL 30j
-- admin_logs               : created_at TTL 365j
-- stripe_events            : event_id (UNIQUE)
+- admin_logs               : created_at TTL 365j, (timestamp, _id) keyset
+- stripe_events            : event_id (UNIQUE), file : (status, available_at), (ordering_key, status, stripe_created), (status, processed_at)
+- stripe_event_locks       : TTL sur expires_at (baux par client Stripe)
+- scheduler_runs           : (status, lease_expires_at), (job_id, started_at) + TTL 90j
+- query_shapes             : TTL 30j sur last_seen (profiler, core/query_profiler.py)
+- email_dead_letters       : (status, created_at), (category, created_at) + TTL 90j
 
 Création au démarrage via lifespan (_create_indexes_background) ou script :
   python -m backend.scripts.ensure_indexes
@@ -115,6 +121,18 @@ INDEXES: Dict[str, List[IndexSpec]] = {
     ],
     "stripe_events": [
         _spec("event_id", unique=True, background=True, name="event_id_unique"),
+        # File de traitement (services/stripe_webhook_queue.py)
+        _spec([("status", 1), ("available_at", 1)], background=True, name="queue_ready_idx"),
+        _spec([("ordering_key", 1), ("status", 1), ("stripe_created", 1), ("received_at", 1)],
+              background=True, name="queue_key_order_idx"),
+        _spec([("status", 1), ("processed_at", -1)], background=True, name="status_processed_idx"),
+    ],
+    "stripe_event_locks": [
+        _spec("expires_at", expireAfterSeconds=3600, background=True, name="ttl_expired_leases"),
+    ],
+    # Formes de requêtes agrégées (QUERY_PROFILER_ENABLED) : une forme non revue depuis 30j disparaît
+    "query_shapes": [
+        _spec("last_seen", expireAfterSeconds=_TTL_30D, background=True, name="ttl_30d"),
     ],
 
     # ── KPI (Time Series collection) ─────────────────────────────────────────
@@ -132,12 +150,20 @@ INDEXES: Dict[str, List[IndexSpec]] = {
               background=True, name="seller_store_date_idx"),
         _spec([("store_id", 1), ("locked", 1), ("date", -1)],
               background=True, name="store_locked_date_idx"),
+        # Pagination par curseur (utils.pagination.paginate_keyset) : tri date desc + id
+        _spec([("seller_id", 1), ("date", -1), ("id", -1)],
+              background=True, name="seller_date_id_keyset_idx"),
     ],
     "manager_kpis": [
         _spec("id", unique=True, background=True, name="id_unique"),
         _spec([("store_id",   1), ("date", -1)], background=True, name="store_date_idx"),
         _spec([("manager_id", 1), ("date", -1)], background=True, name="manager_date_idx"),
     ],
+    # Rollup magasin × jour (repositories/store_daily_kpi_repository.py) — collection classique
+    "store_daily_kpis": [
+        _spec([("store_id", 1), ("date", 1)], unique=True, background=True, name="store_date_unique"),
+        _spec([("store_id", 1), ("year", -1)], background=True, name="store_year_idx"),
+    ],
 
     # ── Objectives / Challenges ──────────────────────────────────────────────
     "objectives": [
@@ -162,6 +188,8 @@ INDEXES: Dict[str, List[IndexSpec]] = {
     ],
     "debriefs": [
         _spec([("seller_id", 1), ("created_at", -1)], background=True, name="seller_created_at_idx"),
+        _spec([("seller_id", 1), ("created_at", -1), ("id", -1)],
+              background=True, name="seller_created_at_id_keyset_idx"),
     ],
     "diagnostics": [
         _spec([("seller_id", 1), ("created_at", -1)], background=True, name="seller_created_at_idx"),
@@ -205,6 +233,8 @@ INDEXES: Dict[str, List[IndexSpec]] = {
     "morning_briefs": [
         _spec([("store_id",   1), ("created_at", -1)], background=True, name="store_created_idx"),
         _spec([("manager_id", 1), ("created_at", -1)], background=True, name="manager_created_idx"),
+        # Brief du jour (cache + pré-génération nocturne) : store_id + generated_at >= aujourd'hui
+        _spec([("store_id",   1), ("generated_at", -1)], background=True, name="store_generated_idx"),
     ],
 
     # ── Invitations ──────────────────────────────────────────────────────────
@@ -288,12 +318,29 @@ INDEXES: Dict[str, List[IndexSpec]] = {
     # ── Logs (TTL automatique) ───────────────────────────────────────────────
     "system_logs": [
         _spec("created_at", expireAfterSeconds=_TTL_30D, background=True, name="ttl_30d"),
+        _spec([("timestamp", -1), ("_id", -1)], background=True, name="timestamp_keyset_idx"),
     ],
     "sync_logs": [
         _spec("created_at", expireAfterSeconds=_TTL_30D, background=True, name="ttl_30d"),
     ],
     "admin_logs": [
         _spec("created_at", expireAfterSeconds=_TTL_365D, background=True, name="ttl_365d"),
+        _spec([("timestamp", -1), ("_id", -1)], background=True, name="timestamp_keyset_idx"),
+    ],
+
+    # ── Scheduler (runs uniques par cluster, reprise sur checkpoint) ─────────
+    "scheduler_runs": [
+        _spec([("status", 1), ("lease_expires_at", 1)], background=True, name="status_lease_idx"),
+        _spec([("status", 1), ("retry_at", 1)], background=True, name="status_retry_idx"),
+        _spec([("job_id", 1), ("started_at", -1)], background=True, name="job_started_idx"),
+        _spec("started_at", expireAfterSeconds=_TTL_90D, background=True, name="ttl_90d"),
+    ],
+
+    # ── E-mails non délivrés (core.email_dispatcher) ─────────────────────────
+    "email_dead_letters": [
+        _spec([("status", 1), ("created_at", 1)], background=True, name="status_created_idx"),
+        _spec([("category", 1), ("created_at", -1)], background=True, name="category_created_idx"),
+        _spec("created_at", expireAfterSeconds=_TTL_90D, background=True, name="ttl_90d"),
     ],
 
     # ── Audit logs métier (KPI, objectifs, évaluations — toutes mutations) ───
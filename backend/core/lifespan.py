@@ -1,7 +1,9 @@
 """
 Application lifespan: startup and shutdown.
 Handles MongoDB connection (with retry), Redis cache, background index creation,
-and APScheduler for periodic jobs (weekly gérant recap, silent seller alerts).
+and APScheduler for periodic jobs (weekly gérant recap, silent seller alerts,
+morning brief pre-generation),
+coordinated across workers by core.scheduler (one run per job per cluster).
 Index creation runs after a delay so it does not block the healthcheck.
 Uses core.indexes as single source of truth (Audit 2.6). init_database runs in
 thread pool to avoid blocking the event loop (Audit 1.7).
@@ -86,109 +88,146 @@ async def _create_indexes_background() -> None:
         logger.warning("Background index init warning: %s", e)
 
 
-def _start_scheduler(database) -> None:
+# Checkpoint persisted every N items so a successor can resume a long job
+_JOB_CHECKPOINT_EVERY = 25
+
+
+async def _send_with_checkpoint(ctx, db, items, builder, label: str) -> None:
+    """
+    Send one e-mail per item through the bulk dispatcher (worker pool, rate limit,
+    retry, dead letters), skipping items already handled by a previous attempt
+    (ctx.checkpoint["done"]) and checkpointing progress periodically.
+    """
+    from core.email_dispatcher import build_email_dispatcher
+    from services.email_jobs import build_job_messages
+
+    done = set(ctx.checkpoint.get("done", []))
+    pending = [item for item in items if item.get("email") not in done]
+    skipped = len(items) - len(pending)
+
+    async def _on_result(message, ok):
+        done.add(message.to_email)
+        ctx.add_items(1)
+        if len(done) % _JOB_CHECKPOINT_EVERY == 0:
+            await ctx.save_checkpoint({"done": sorted(done)})
+
+    report = await build_email_dispatcher(db).dispatch(
+        build_job_messages(pending, builder), on_result=_on_result
+    )
+    await ctx.save_checkpoint({"done": sorted(done)})
+    logger.info(
+        "%s: sent=%d failed=%d skipped(resumed)=%d total=%d api_calls=%d in %.0f ms",
+        label, report.sent, report.failed, skipped, len(items), report.api_calls, report.duration_ms,
+    )
+
+
+async def _start_scheduler(database) -> None:
     """
-    Start APScheduler with two periodic jobs:
+    Start APScheduler with four periodic jobs:
     - Weekly gérant recap : every Monday at 08:00 (Europe/Paris)
     - Silent seller alerts : Mon-Fri at 08:00 (Europe/Paris)
+    - Objective expiring alerts : Mon-Fri at 08:00 (Europe/Paris)
+    - Morning brief pre-generation : every day at 04:30 (Europe/Paris)
+    Every worker runs the triggers, but core.scheduler.ClusterScheduler elects a
+    single leader per job and day (Redis lease, Mongo fallback): each job runs
+    once per cluster, with a run record in scheduler_runs and checkpoint resume.
     No-op if APScheduler is not installed or INTERNAL_JOB_KEY is not set.
     """
     global _scheduler
     try:
         from apscheduler.schedulers.asyncio import AsyncIOScheduler
         from apscheduler.triggers.cron import CronTrigger
+        from apscheduler.triggers.interval import IntervalTrigger
         from core.config import settings
+        from core.scheduler import ClusterScheduler, build_lease_lock
 
         if not getattr(settings, "INTERNAL_JOB_KEY", ""):
             logger.info("APScheduler: INTERNAL_JOB_KEY not set — scheduled jobs disabled")
             return
+        if getattr(database, "db", None) is None:
+            logger.warning("APScheduler: database not connected — scheduled jobs disabled")
+            return
+
+        async def _weekly_gerant_recap(ctx):
+            from services.jobs_service import JobsService
+            from services.email_jobs import build_weekly_gerant_recap
+
+            recaps = await JobsService(database.db).compute_weekly_gerant_recaps()
+            await _send_with_checkpoint(
+                ctx, database.db, recaps, build_weekly_gerant_recap, "weekly-gerant-recap"
+            )
+
+        async def _silent_seller_alerts(ctx):
+            from services.jobs_service import JobsService
+            from services.email_jobs import build_silent_seller_alert
+
+            alerts = await JobsService(database.db).compute_silent_seller_alerts()
+            await _send_with_checkpoint(
+                ctx, database.db, alerts, build_silent_seller_alert, "silent-seller-alerts"
+            )
+
+        async def _objective_expiring_alerts(ctx):
+            from services.jobs_service import JobsService
+
+            count = await JobsService(database.db).compute_objective_expiring_alerts()
+            ctx.add_items(count)
+            logger.info("objective-expiring-alerts: %d notifications créées", count)
 
-        async def _run_weekly_gerant_recap():
-            try:
-                from core.database import database as db_inst
-                from services.jobs_service import JobsService
-                from services.email_jobs import send_weekly_gerant_recap
-                import asyncio as _asyncio
-
-                service = JobsService(db_inst.db)
-                recaps = await service.compute_weekly_gerant_recaps()
-                sent, failed = 0, 0
-                for recap in recaps:
-                    try:
-                        ok = await _asyncio.to_thread(
-                            send_weekly_gerant_recap,
-                            recap["email"], recap["name"], recap,
-                        )
-                        if ok:
-                            sent += 1
-                        else:
-                            failed += 1
-                    except Exception:
-                        logger.exception("weekly recap: failed to send to %s", recap.get("email"))
-                        failed += 1
-                logger.info("weekly-gerant-recap: sent=%d failed=%d total=%d", sent, failed, len(recaps))
-            except Exception:
-                logger.exception("weekly-gerant-recap job error")
-
-        async def _run_silent_seller_alerts():
-            try:
-                from core.database import database as db_inst
-                from services.jobs_service import JobsService
-                from services.email_jobs import send_silent_seller_alert
-                import asyncio as _asyncio
-
-                service = JobsService(db_inst.db)
-                alerts = await service.compute_silent_seller_alerts()
-                sent, failed = 0, 0
-                for alert in alerts:
-                    try:
-                        ok = await _asyncio.to_thread(
-                            send_silent_seller_alert,
-                            alert["email"], alert["name"], alert,
-                        )
-                        if ok:
-                            sent += 1
-                        else:
-                            failed += 1
-                    except Exception:
-                        logger.exception("silent-seller-alerts: failed to send to %s", alert.get("email"))
-                        failed += 1
-                logger.info("silent-seller-alerts: sent=%d failed=%d total=%d", sent, failed, len(alerts))
-            except Exception:
-                logger.exception("silent-seller-alerts job error")
-
-        async def _run_objective_expiring_alerts():
-            try:
-                from core.database import database as db_inst
-                from services.jobs_service import JobsService
-
-                service = JobsService(db_inst.db)
-                count = await service.compute_objective_expiring_alerts()
-                logger.info("objective-expiring-alerts: %d notifications créées", count)
-            except Exception:
-                logger.exception("objective-expiring-alerts job error")
+        async def _brief_pregeneration(ctx):
+            from services.brief_pregeneration_service import BriefPregenerationService
+
+            report = await BriefPregenerationService(database.db).run()
+            ctx.add_items(report["generated"])
+            await ctx.save_checkpoint({"report": report})
+
+        lock = await build_lease_lock(database.db)
+        cluster = ClusterScheduler(database.db, lock)
+        cluster.register("weekly-gerant-recap", _weekly_gerant_recap)
+        cluster.register("silent-seller-alerts", _silent_seller_alerts)
+        cluster.register("objective-expiring-alerts", _objective_expiring_alerts)
+        cluster.register("brief-pregeneration", _brief_pregeneration)
 
         _scheduler = AsyncIOScheduler(timezone="Europe/Paris")
         _scheduler.add_job(
-            _run_weekly_gerant_recap,
+            cluster.run_job,
             CronTrigger(day_of_week="mon", hour=8, minute=0, timezone="Europe/Paris"),
+            args=["weekly-gerant-recap"],
             id="weekly-gerant-recap",
             replace_existing=True,
         )
         _scheduler.add_job(
-            _run_silent_seller_alerts,
+            cluster.run_job,
             CronTrigger(day_of_week="mon-fri", hour=8, minute=0, timezone="Europe/Paris"),
+            args=["silent-seller-alerts"],
             id="silent-seller-alerts",
             replace_existing=True,
         )
         _scheduler.add_job(
-            _run_objective_expiring_alerts,
+            cluster.run_job,
             CronTrigger(day_of_week="mon-fri", hour=8, minute=0, timezone="Europe/Paris"),
+            args=["objective-expiring-alerts"],
             id="objective-expiring-alerts",
             replace_existing=True,
         )
+        _scheduler.add_job(
+            cluster.run_job,
+            CronTrigger(hour=4, minute=30, timezone="Europe/Paris"),
+            args=["brief-pregeneration"],
+            id="brief-pregeneration",
+            replace_existing=True,
+        )
+        _scheduler.add_job(
+            cluster.resume_orphaned_runs,
+            IntervalTrigger(minutes=5),
+            id="scheduler-resume-orphans",
+            replace_existing=True,
+        )
         _scheduler.start()
-        logger.info("APScheduler started (weekly recap Mon 08:00, silent alerts + objective expiring Mon-Fri 08:00 Paris)")
+        logger.info(
+            "APScheduler started (weekly recap Mon 08:00, silent alerts + objective expiring Mon-Fri 08:00, "
+            "brief pre-generation daily 04:30 Paris, "
+            "leader lease: %s, owner: %s)", lock.backend, cluster.owner,
+        )
 
     except ImportError:
         logger.warning("APScheduler not installed — scheduled jobs disabled (pip install apscheduler)")
@@ -257,20 +296,51 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         from core.config import settings
         redis_url = getattr(settings, "CACHE_REDIS_URL", None) or getattr(settings, "REDIS_URL", None)
         if redis_url and str(redis_url).strip():
-            await ws_manager.start_redis_listener(str(redis_url).strip())
+            await ws_manager.start_redis_listener(
+                str(redis_url).strip(), encoding=settings.WS_PUBSUB_ENCODING
+            )
         else:
             logger.info("No Redis URL — WebSocket using local broadcast only")
     except Exception as e:
         logger.warning("WsManager init warning (non-critical): %s", e)
 
+    # Per-worker auth cache: invalidations from the other workers (Redis pub/sub)
+    try:
+        from core.auth_context_cache import get_auth_context_cache
+        from core.cache import get_cache_service
+        auth_cache = get_auth_context_cache()
+        cache = await get_cache_service()
+        if auth_cache.enabled and cache.enabled:
+            await auth_cache.start(cache.redis_client)
+        elif auth_cache.enabled:
+            logger.info("No Redis — auth context cache invalidated locally only")
+    except Exception as e:
+        logger.warning("Auth context cache listener warning (non-critical): %s", e)
+
+    # Query-shape profiler (opt-in): periodic flush into query_shapes
+    try:
+        if database.db is not None:
+            from core.query_profiler import get_query_profiler
+            await get_query_profiler().start(database.db)
+    except Exception as e:
+        logger.warning("Query profiler warning (non-critical): %s", e)
+
+    # Stripe webhooks: every worker drains the durable stripe_events queue
+    try:
+        if database.db is not None:
+            from services.stripe_webhook_queue import get_stripe_webhook_queue
+            await get_stripe_webhook_queue(database.db).start()
+    except Exception as e:
+        logger.warning("Stripe webhook queue consumer warning (non-critical): %s", e)
+
     # Schedule index creation in background (does not block healthcheck).
     # Keep task in module-level set to prevent premature garbage collection.
     index_task = asyncio.create_task(_create_indexes_background())
     _background_tasks.add(index_task)
     index_task.add_done_callback(lambda t: _background_tasks.discard(t))
 
-    # APScheduler — periodic jobs (weekly recap + silent seller alerts)
-    _start_scheduler(database)
+    # APScheduler — periodic jobs (weekly recap + alerts), one leader per job and day
+    await _start_scheduler(database)
 
     logger.info("Application startup complete (worker %s)", worker_id)
     yield
@@ -288,6 +358,46 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         await ws_manager.stop()
     except Exception as e:
         logger.warning("WsManager stop warning: %s", e)
+    try:
+        from core.auth_context_cache import get_auth_context_cache
+        await get_auth_context_cache().stop()
+    except Exception as e:
+        logger.warning("Auth context cache stop warning: %s", e)
+    try:
+        from services.stripe_webhook_queue import shutdown_stripe_webhook_queue
+        await shutdown_stripe_webhook_queue()
+    except Exception as e:
+        logger.warning("Stripe webhook queue stop warning: %s", e)
+    try:
+        from core.query_profiler import get_query_profiler
+        await get_query_profiler().stop(database.db)
+    except Exception as e:
+        logger.warning("Query profiler flush warning: %s", e)
+    try:
+        from services.stripe_client import shutdown_stripe_gateway
+        await shutdown_stripe_gateway()
+    except Exception as e:
+        logger.warning("Stripe gateway shutdown warning: %s", e)
+    try:
+        from core.pdf_renderer import shutdown_pdf_renderer
+        shutdown_pdf_renderer()
+    except Exception as e:
+        logger.warning("PDF renderer shutdown warning: %s", e)
+    try:
+        from services.seller_service._challenges_mixin import challenge_progress_writer
+        await challenge_progress_writer.flush()
+    except Exception as e:
+        logger.warning("Challenge progress flush warning: %s", e)
+    try:
+        from core.ai_response_cache import get_ai_response_cache
+        await get_ai_response_cache().flush_stats()
+    except Exception as e:
+        logger.warning("AI cache counters flush warning: %s", e)
+    try:
+        from core.password_hasher import shutdown_password_hasher
+        shutdown_password_hasher()
+    except Exception as e:
+        logger.warning("Password hasher shutdown warning: %s", e)
     try:
         await database.disconnect()
         logger.info("MongoDB connection closed")
@@ -300,3 +410,6 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         logger.info("Redis cache disconnected")
     except Exception as e:
         logger.warning("Error disconnecting Redis cache: %s", e)
+    # En dernier : vide la file de logs (les logs d'arrêt ci-dessus compris)
+    from core.logging import shutdown_logging
+    shutdown_logging()
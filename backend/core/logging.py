@@ -1,59 +1,176 @@
 """
-Logging structuré JSON avec request_id
+Logging structuré JSON avec request_id + pipeline non bloquant.
+
+setup_logging() (main.py) remplace les handlers du root logger par un
+QueueHandler : logger.info() capture le request_id (le thread d'écriture n'a pas
+le contexte de la requête), fusionne le message avec ses arguments (l'enregistrement
+ne référence plus les objets de l'appelant, qui peuvent muter entre-temps) et
+l'empile. Un QueueListener (thread dédié) le nettoie par regex
+(middleware/log_sanitizer.py), le formate et l'écrit sur stdout : ni regex ni I/O
+sur la boucle d'événements.
+File pleine (LOG_QUEUE_MAX_SIZE) : l'enregistrement est abandonné et compté
+plutôt que de bloquer une requête.
+
+Les loggers obtenus par get_logger() sont écrits en JSON, les autres en texte.
+Sans setup_logging() (scripts, tests), get_logger() garde un handler JSON direct.
 """
+import atexit
 import json
 import logging
+import queue
 import sys
 from contextvars import ContextVar
-from typing import Optional
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from config.limits import LOG_QUEUE_MAX_SIZE
+from middleware.log_sanitizer import SanitizingFormatter, merge_record_args, sanitize_record
 
 # Context variable pour request_id
 request_id_var: ContextVar[Optional[str]] = ContextVar('request_id', default=None)
 
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+_EXTRA_FIELDS = ("user_id", "store_id", "duration_ms", "endpoint", "method", "status_code", "sample_rate")
+
+
 class JSONFormatter(logging.Formatter):
     """Formatter JSON pour logs structurés"""
-    
+
     def format(self, record):
+        sanitize_record(record)
+        request_id = getattr(record, 'request_id', None)
         log_data = {
             'timestamp': self.formatTime(record, self.datefmt),
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
-            'request_id': request_id_var.get(),
+            'request_id': request_id if request_id is not None else request_id_var.get(),
         }
-        
+
         # Ajouter extra fields si présents
-        if hasattr(record, 'user_id'):
-            log_data['user_id'] = record.user_id
-        if hasattr(record, 'store_id'):
-            log_data['store_id'] = record.store_id
-        if hasattr(record, 'duration_ms'):
-            log_data['duration_ms'] = record.duration_ms
-        if hasattr(record, 'endpoint'):
-            log_data['endpoint'] = record.endpoint
-        if hasattr(record, 'method'):
-            log_data['method'] = record.method
-        if hasattr(record, 'status_code'):
-            log_data['status_code'] = record.status_code
-        
+        for field in _EXTRA_FIELDS:
+            if hasattr(record, field):
+                log_data[field] = getattr(record, field)
+
         # Ajouter exception si présente
         if record.exc_info:
             log_data['exception'] = self.formatException(record.exc_info)
-        
+
         return json.dumps(log_data)
 
-# Configurer logger par défaut
+
+class _PipelineFormatter(logging.Formatter):
+    """JSON for get_logger() loggers (record.structured), sanitized text otherwise."""
+
+    def __init__(self):
+        super().__init__()
+        self._json = JSONFormatter()
+        self._text = SanitizingFormatter(TEXT_FORMAT)
+
+    def format(self, record):
+        formatter = self._json if getattr(record, 'structured', False) else self._text
+        return formatter.format(record)
+
+
+class _StructuredFilter(logging.Filter):
+    """Marks records of get_logger() loggers to be written as JSON."""
+
+    def filter(self, record):
+        record.structured = True
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Caller side of the pipeline: capture the request_id, merge msg % args and enqueue.
+    Unlike QueueHandler.prepare, nothing is formatted here: regex sanitization and
+    formatting run on the listener thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        if getattr(record, 'request_id', None) is None:
+            record.request_id = request_id_var.get()
+        merge_record_args(record)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# Configurer logger par défaut (hors pipeline)
 _handler = logging.StreamHandler(sys.stdout)
 _handler.setFormatter(JSONFormatter())
+_structured = _StructuredFilter()
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+_output: Optional[logging.Handler] = None
+
+
+def setup_logging(async_logging: bool = True, level: int = logging.INFO, stream=None,
+                  queue_size: int = LOG_QUEUE_MAX_SIZE) -> None:
+    """Install the root pipeline (replaces logging.basicConfig). Idempotent."""
+    global _listener, _queue_handler, _output
+    shutdown_logging()
+    _output = logging.StreamHandler(stream or sys.stdout)
+    _output.setFormatter(_PipelineFormatter())
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    # Loggers créés avant le pipeline : leurs enregistrements passent désormais par le root
+    for existing in list(logging.Logger.manager.loggerDict.values()):
+        if isinstance(existing, logging.Logger) and _handler in existing.handlers:
+            existing.removeHandler(_handler)
+
+    if not async_logging:
+        root.addHandler(_output)
+        return
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    _listener = QueueListener(log_queue, _output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Drain the queue, stop the writer thread; later records are written synchronously."""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    root.addHandler(_output)
+    _listener = _queue_handler = None
+
+
+atexit.register(shutdown_logging)
+
+
+def pipeline_stats() -> Dict:
+    """Queue depth and records dropped on a full queue (this worker)."""
+    if _queue_handler is None:
+        return {"async": False, "queued": 0, "dropped": 0}
+    return {"async": True, "queued": _queue_handler.queue.qsize(), "dropped": _queue_handler.dropped}
+
 
 def get_logger(name: str = __name__):
     """Retourne un logger configuré avec JSON formatter"""
     logger = logging.getLogger(name)
-    if not logger.handlers:
+    if _structured not in logger.filters:
+        logger.addFilter(_structured)
+    if _output is None and not logger.handlers:
         logger.addHandler(_handler)
-        logger.setLevel(logging.INFO)
+    logger.setLevel(logging.INFO)
     return logger
 
 # Logger par défaut
 logger = get_logger(__name__)
-
@@ -0,0 +1,208 @@
+"""
+Password hashing off the event loop (bcrypt on a process pool).
+
+bcrypt costs ~250 ms of CPU at cost 12. Run inline it froze the worker: logins
+added latency to every concurrent request and a 500-user enterprise import
+blocked it for about a minute. PasswordHasher runs hashing and verification on
+a small process pool:
+
+- Bounded queue : beyond PASSWORD_HASH_MAX_PENDING jobs waiting, new requests
+  are rejected with a 503 instead of piling up behind the pool.
+- Cost          : PASSWORD_HASH_ROUNDS for new hashes; needs_rehash() tells the
+  login path to upgrade a hash made with another cost (opportunistic, only
+  when the pool is not busy).
+- Batch API     : hash_many() for imports, in chunks, using at most half of the
+  pool so logins always find a free worker.
+- Metrics       : queue wait and hash time per password (p50 / p95).
+
+PASSWORD_HASH_WORKERS = 0 uses a thread pool instead (bcrypt releases the GIL):
+no extra processes, useful for tests and tiny deployments.
+"""
+import asyncio
+import logging
+import math
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import bcrypt
+
+from core.exceptions import ServiceUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# Mots de passe hachés par tâche du lot (un aller-retour processus par chunk)
+BATCH_CHUNK_SIZE = 8
+# Échantillons conservés pour les percentiles
+METRIC_SAMPLES = 1000
+
+
+# ===== JOBS (module level: picklable for the process pool) =====
+
+def _hash_job(passwords: List[str], rounds: int, submitted_at: float) -> Tuple[List[str], float, float]:
+    started = time.time()
+    hashes = [
+        bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+        for password in passwords
+    ]
+    return hashes, started - submitted_at, time.time() - started
+
+
+def _verify_job(password: str, hashed: str, submitted_at: float) -> Tuple[bool, float, float]:
+    started = time.time()
+    try:
+        ok = bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+    except ValueError:  # hash mal formé
+        ok = False
+    return ok, started - submitted_at, time.time() - started
+
+
+def bcrypt_cost(hashed: str) -> Optional[int]:
+    """Cost factor of a bcrypt hash ($2b$12$...), None if unreadable."""
+    try:
+        return int(hashed.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def _percentile(samples, q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+
+class PasswordHasher:
+    """Async bcrypt hashing / verification on a process pool (see module docstring)."""
+
+    def __init__(
+        self,
+        rounds: int = 12,
+        workers: int = 2,
+        max_pending: int = 64,
+        executor: Optional[Executor] = None,
+    ):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = executor
+        self._pending = 0
+        self._counters = {"hashed": 0, "verified": 0, "rehashed": 0, "rejected": 0}
+        self._queue_wait_ms: deque = deque(maxlen=METRIC_SAMPLES)
+        self._hash_ms: deque = deque(maxlen=METRIC_SAMPLES)
+
+    # ----- API -----
+
+    async def hash(self, password: str) -> str:
+        hashes = await self._submit(_hash_job, [password], self.rounds)
+        self._counters["hashed"] += 1
+        return hashes[0]
+
+    async def verify(self, password: str, hashed: Optional[str]) -> bool:
+        if not password or not hashed:
+            return False
+        ok = await self._submit(_verify_job, password, hashed)
+        self._counters["verified"] += 1
+        return ok
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """Hash a batch (imports) in chunks, leaving half of the pool to interactive requests."""
+        if not passwords:
+            return []
+        chunks = [passwords[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(passwords), BATCH_CHUNK_SIZE)]
+        semaphore = asyncio.Semaphore(max(1, math.ceil(self.workers / 2)))
+
+        async def run(chunk: List[str]) -> List[str]:
+            async with semaphore:
+                return await self._submit(_hash_job, chunk, self.rounds, bypass_limit=True, items=len(chunk))
+
+        results = await asyncio.gather(*(run(chunk) for chunk in chunks))
+        self._counters["hashed"] += len(passwords)
+        return [hashed for chunk in results for hashed in chunk]
+
+    def needs_rehash(self, hashed: Optional[str]) -> bool:
+        """True if the hash was made with another cost than PASSWORD_HASH_ROUNDS."""
+        cost = bcrypt_cost(hashed or "")
+        return cost is not None and cost != self.rounds
+
+    async def rehash_if_needed(self, password: str, hashed: Optional[str]) -> Optional[str]:
+        """
+        New hash at the current cost after a successful verification, or None
+        (cost unchanged, or pool busy: the upgrade waits for a later login).
+        """
+        if not self.needs_rehash(hashed) or self._pending >= self.max_pending // 2:
+            return None
+        try:
+            new_hash = await self.hash(password)
+        except ServiceUnavailableError:
+            return None
+        self._counters["rehashed"] += 1
+        return new_hash
+
+    def stats(self) -> Dict:
+        return {
+            **self._counters,
+            "rounds": self.rounds,
+            "workers": self.workers,
+            "pool": "process" if self.workers > 0 else "thread",
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "queue_wait_ms": {"p50": _percentile(self._queue_wait_ms, 0.5), "p95": _percentile(self._queue_wait_ms, 0.95)},
+            "hash_ms": {"p50": _percentile(self._hash_ms, 0.5), "p95": _percentile(self._hash_ms, 0.95)},
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # ----- internals -----
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.workers > 0:
+                # spawn : pas de fork d'un processus qui a déjà une boucle asyncio et des threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _submit(self, job, *args, bypass_limit: bool = False, items: int = 1):
+        if not bypass_limit and self._pending >= self.max_pending:
+            self._counters["rejected"] += 1
+            logger.warning("Password hasher saturated (%d jobs pending), request rejected", self._pending)
+            raise ServiceUnavailableError("Serveur momentanément surchargé, veuillez réessayer")
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, wait_s, duration_s = await loop.run_in_executor(self._get_executor(), job, *args, time.time())
+        finally:
+            self._pending -= 1
+        self._queue_wait_ms.append(max(wait_s, 0.0) * 1000)
+        self._hash_ms.append(duration_s * 1000 / items)
+        return result
+
+
+_password_hasher: Optional[PasswordHasher] = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Process-wide hasher configured from settings (pool created on first use)."""
+    global _password_hasher
+    if _password_hasher is None:
+        from core.config import settings
+        _password_hasher = PasswordHasher(
+            rounds=settings.PASSWORD_HASH_ROUNDS,
+            workers=settings.PASSWORD_HASH_WORKERS,
+            max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+        )
+    return _password_hasher
+
+
+def shutdown_password_hasher() -> None:
+    if _password_hasher is not None:
+        _password_hasher.shutdown()
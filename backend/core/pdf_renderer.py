@@ -0,0 +1,325 @@
+"""
+PDF rendering service (documentation, seller bilans, team analyses exports).
+
+xhtml2pdf is synchronous and CPU-bound (hundreds of ms per document): calling it
+from an async handler freezes every request served by the worker. Here:
+
+- Process pool : markdown → HTML → PDF runs in a ProcessPoolExecutor
+  (PDF_RENDER_WORKERS processes, spawned lazily on first render).
+- Cache        : output keyed by a SHA-256 of renderer version + template +
+  inputs. L1 in memory (LRU bounded in bytes), L2 on disk (PDF_CACHE_DIR,
+  shared by the workers of the host, survives restarts).
+- Single-flight: concurrent requests for the same document wait for one render.
+- ETag         : the cache key is known before rendering, so a matching
+  If-None-Match is answered 304 without touching the pool or the cache.
+
+Render functions executed in the pool must be module-level (picklable):
+render_markdown_document / render_html_document, or any function with the same
+contract (returns the PDF bytes) — e.g. an fpdf2 builder for tabular exports.
+"""
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump to invalidate every cached PDF (CSS change in code, engine upgrade…)
+RENDERER_VERSION = "1"
+
+DEFAULT_TEMPLATE = "document.html"
+DEFAULT_MEMORY_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_DISK_MAX_FILES = 500
+MARKDOWN_EXTENSIONS = ("extra", "codehilite", "tables", "toc")
+
+_TEMPLATES_DIR = Path(__file__).parent.parent / "templates" / "pdf"
+
+
+class PdfRenderError(Exception):
+    """Rendering failed (engine missing, invalid document, pool crashed)."""
+
+
+def pdf_engine_available() -> bool:
+    """xhtml2pdf installed? (checked without importing it in the web worker)."""
+    return find_spec("xhtml2pdf") is not None
+
+
+@lru_cache(maxsize=None)
+def load_pdf_template(name: str) -> str:
+    """Read a PDF template once per process (templates ship with the code)."""
+    return (_TEMPLATES_DIR / name).read_text(encoding="utf-8")
+
+
+# ===== Render functions (executed in the process pool) =====
+
+def render_html_document(html: str) -> bytes:
+    """HTML → PDF bytes with xhtml2pdf."""
+    try:
+        from xhtml2pdf import pisa
+    except ImportError as e:
+        raise PdfRenderError("xhtml2pdf library not available") from e
+
+    buffer = io.BytesIO()
+    status = pisa.CreatePDF(html, dest=buffer, encoding="utf-8")
+    if status.err:
+        raise PdfRenderError(f"xhtml2pdf reported {status.err} error(s)")
+    return buffer.getvalue()
+
+
+def render_markdown_document(source: str, title: str = "", template: str = DEFAULT_TEMPLATE) -> bytes:
+    """Markdown → styled HTML (templates/pdf/<template>) → PDF bytes."""
+    import markdown
+
+    body = markdown.markdown(source, extensions=list(MARKDOWN_EXTENSIONS))
+    html = load_pdf_template(template).format(title=title, body=body)
+    return render_html_document(html)
+
+
+# ===== Cache keys =====
+
+def content_hash(*parts: str) -> str:
+    """SHA-256 of the renderer version and the given parts (length-prefixed, no ambiguity)."""
+    digest = hashlib.sha256(RENDERER_VERSION.encode("utf-8"))
+    for part in parts:
+        data = part.encode("utf-8")
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def format_etag(key: str) -> str:
+    return f'"{key[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match match (list of tags, weak validators, `*`)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class RenderedPdf:
+    """A rendered document: bytes + validator. `source` is memory, disk or render."""
+
+    def __init__(self, key: str, content: bytes, source: str):
+        self.key = key
+        self.content = content
+        self.source = source
+
+    @property
+    def etag(self) -> str:
+        return format_etag(self.key)
+
+
+class PdfRenderer:
+    """Process-pool PDF renderer with memory + disk cache keyed by content hash."""
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_workers: int = 2,
+        memory_max_bytes: int = DEFAULT_MEMORY_MAX_BYTES,
+        disk_max_files: int = DEFAULT_DISK_MAX_FILES,
+        executor: Optional[Executor] = None,
+    ):
+        self._cache_dir = Path(cache_dir) if cache_dir else None
+        self._max_workers = max(1, max_workers)
+        self._memory_max_bytes = memory_max_bytes
+        self._disk_max_files = disk_max_files
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "renders": 0, "render_errors": 0, "render_ms": 0.0}
+
+    # ----- keys -----
+
+    @staticmethod
+    def markdown_key(source: str, title: str = "", template: str = DEFAULT_TEMPLATE) -> str:
+        return content_hash("markdown", template, load_pdf_template(template), title, source)
+
+    @staticmethod
+    def html_key(html: str) -> str:
+        return content_hash("html", html)
+
+    # ----- public API -----
+
+    async def render_markdown(self, source: str, title: str = "", template: str = DEFAULT_TEMPLATE) -> RenderedPdf:
+        key = self.markdown_key(source, title, template)
+        return await self.render(key, render_markdown_document, source, title, template)
+
+    async def render_html(self, html: str) -> RenderedPdf:
+        return await self.render(self.html_key(html), render_html_document, html)
+
+    async def render(self, key: str, render_fn: Callable[..., bytes], *args) -> RenderedPdf:
+        """Cached render: memory → disk → pool (one render per key at a time)."""
+        content = self._memory_get(key)
+        if content is not None:
+            self._counters["memory_hits"] += 1
+            return RenderedPdf(key, content, "memory")
+
+        task = self._inflight.get(key)
+        if task is None:
+            # Tâche indépendante du demandeur : un client qui se déconnecte
+            # n'annule pas le rendu attendu par les autres
+            task = asyncio.ensure_future(self._load_or_render(key, render_fn, args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict:
+        return {
+            **self._counters,
+            "render_ms": round(self._counters["render_ms"], 1),
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "inflight": len(self._inflight),
+        }
+
+    def shutdown(self) -> None:
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # ----- internals -----
+
+    async def _load_or_render(self, key: str, render_fn: Callable[..., bytes], args) -> RenderedPdf:
+        if self._cache_dir is not None:
+            content = await asyncio.to_thread(self._disk_get, key)
+            if content is not None:
+                self._counters["disk_hits"] += 1
+                self._memory_put(key, content)
+                return RenderedPdf(key, content, "disk")
+
+        started = time.perf_counter()
+        try:
+            content = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), render_fn, *args
+            )
+        except BrokenProcessPool as e:
+            # Un process mort (OOM…) casse le pool : il sera recréé au prochain rendu
+            self._counters["render_errors"] += 1
+            self._reset_executor()
+            raise PdfRenderError("PDF rendering process crashed") from e
+        except PdfRenderError:
+            self._counters["render_errors"] += 1
+            raise
+        except Exception as e:
+            self._counters["render_errors"] += 1
+            raise PdfRenderError(str(e)) from e
+        finally:
+            self._counters["render_ms"] += (time.perf_counter() - started) * 1000
+
+        self._counters["renders"] += 1
+        self._memory_put(key, content)
+        if self._cache_dir is not None:
+            try:
+                await asyncio.to_thread(self._disk_put, key, content)
+            except OSError as e:
+                logger.warning("PDF disk cache write failed (%s): %s", key[:12], e)
+        return RenderedPdf(key, content, "render")
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            import multiprocessing
+            # spawn : pas de fork d'un worker qui tient des threads (Motor, Redis, to_thread)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _reset_executor(self) -> None:
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _memory_get(self, key: str) -> Optional[bytes]:
+        content = self._memory.get(key)
+        if content is not None:
+            self._memory.move_to_end(key)
+        return content
+
+    def _memory_put(self, key: str, content: bytes) -> None:
+        if len(content) > self._memory_max_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = content
+        self._memory_bytes += len(content)
+        while self._memory_bytes > self._memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _disk_path(self, key: str) -> Path:
+        return self._cache_dir / f"{key}.pdf"
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        try:
+            return self._disk_path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("PDF disk cache read failed (%s): %s", key[:12], e)
+            return None
+
+    def _disk_put(self, key: str, content: bytes) -> None:
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._disk_path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(content)
+        os.replace(tmp, path)  # atomique : un autre worker ne lit jamais un fichier partiel
+        self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        files = list(self._cache_dir.glob("*.pdf"))
+        if len(files) <= self._disk_max_files:
+            return
+        files.sort(key=lambda p: p.stat().st_mtime)
+        for path in files[: len(files) - self._disk_max_files]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+_renderer: Optional[PdfRenderer] = None
+
+
+def get_pdf_renderer() -> PdfRenderer:
+    """Process-wide renderer configured from settings."""
+    global _renderer
+    if _renderer is None:
+        from core.config import settings
+        _renderer = PdfRenderer(
+            cache_dir=settings.PDF_CACHE_DIR or None,
+            max_workers=settings.PDF_RENDER_WORKERS,
+            memory_max_bytes=settings.PDF_CACHE_MEMORY_MB * 1024 * 1024,
+        )
+    return _renderer
+
+
+def shutdown_pdf_renderer() -> None:
+    global _renderer
+    if _renderer is not None:
+        _renderer.shutdown()
+        _renderer = None
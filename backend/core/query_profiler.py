@@ -0,0 +1,441 @@
+"""
+Query-shape profiler and index advisor (opt-in: QUERY_PROFILER_ENABLED).
+
+BaseRepository reports every find / count / update / delete here. Queries are
+reduced to their shape: collection, operation, filter fields grouped as
+equality / range / other, sort and projection. Values are never kept (no PII
+in query_shapes). Per shape, the worker aggregates calls, latency and returned
+docs and flushes them every QUERY_PROFILER_FLUSH_SECONDS into query_shapes
+($inc, so all workers add up).
+
+The plan comes from explain() (executionStats: docs/keys examined vs
+returned, COLLSCAN, blocking SORT, index used). It runs in the background,
+one at a time: the first time a shape is seen, then for a fraction
+QUERY_PROFILER_EXPLAIN_SAMPLE_RATE of calls, at most once per
+QUERY_PROFILER_EXPLAIN_COOLDOWN_SECONDS per shape.
+
+build_report() (query_shape_report.py) ranks the hottest shapes, flags
+collection scans, in-memory sorts and high examined/returned ratios, and
+suggests an index (equality → sort → range) when no index declared in
+core/indexes.INDEXES covers the shape. It also lists declared indexes that
+$indexStats (or, failing that, the sampled plans) show as never used.
+
+utils/db_counter.py (PERF_DEBUG) stays the per-request operation counter.
+"""
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from config.limits import (
+    QUERY_PROFILER_EXAMINED_RATIO,
+    QUERY_PROFILER_EXPLAIN_COOLDOWN_SECONDS,
+    QUERY_PROFILER_FLUSH_SECONDS,
+    QUERY_PROFILER_MAX_SHAPES,
+)
+
+logger = logging.getLogger(__name__)
+
+SHAPES_COLLECTION = "query_shapes"
+_IGNORED_COLLECTIONS = {SHAPES_COLLECTION}
+_EQUALITY_OPS = {"$eq", "$in"}
+_RANGE_OPS = {"$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$exists", "$regex"}
+
+
+# ---------------------------------------------------------------------------
+# Shapes
+# ---------------------------------------------------------------------------
+
+def query_shape(filters: Optional[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Field names of a filter grouped by how an index can use them (values dropped)."""
+    eq, rng, other = set(), set(), set()
+
+    def visit(node: Dict[str, Any]) -> None:
+        for key, cond in node.items():
+            if key == "$and":
+                for sub in cond:
+                    visit(sub)
+            elif key in ("$or", "$nor"):
+                branches = sorted(",".join(_indexable_fields(sub)) for sub in cond)
+                other.add(f"{key}({'|'.join(branches)})")
+            elif key.startswith("$"):
+                other.add(key)
+            elif isinstance(cond, dict) and cond and all(op.startswith("$") for op in cond):
+                ops = set(cond) - {"$options"}
+                if ops <= _EQUALITY_OPS:
+                    eq.add(key)
+                elif ops & _RANGE_OPS and not ops - _RANGE_OPS - _EQUALITY_OPS:
+                    rng.add(key)
+                else:
+                    other.add(f"{key}:{','.join(sorted(ops))}")
+            else:
+                eq.add(key)
+
+    visit(filters or {})
+    return {"eq": sorted(eq), "range": sorted(rng - eq), "other": sorted(other)}
+
+
+def _indexable_fields(filters: Dict[str, Any]) -> List[str]:
+    shape = query_shape(filters)
+    return shape["eq"] + shape["range"]
+
+
+def _sort_spec(sort) -> List[List]:
+    if not sort:
+        return []
+    if isinstance(sort, dict):
+        sort = list(sort.items())
+    return [[field, direction] for field, direction in sort]
+
+
+def _projection_fields(projection: Optional[Dict[str, Any]]) -> List[str]:
+    return sorted(k for k, v in (projection or {}).items() if v and k != "_id")
+
+
+def shape_id(collection: str, op: str, shape: Dict, sort: List, projection: List[str]) -> str:
+    raw = repr((collection, op, shape["eq"], shape["range"], shape["other"], sort, projection))
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def describe(doc: Dict) -> str:
+    """One-line description of a shape: `challenges.find {store_id=, start_date~} sort(created_at:-1)`."""
+    shape = doc["shape"]
+    fields = [f"{f}=" for f in shape["eq"]] + [f"{f}~" for f in shape["range"]] + shape["other"]
+    text = f"{doc['collection']}.{doc['op']} {{{', '.join(fields)}}}"
+    if doc.get("sort"):
+        text += " sort(" + ", ".join(f"{f}:{d}" for f, d in doc["sort"]) + ")"
+    return text
+
+
+def parse_explain(explain: Dict) -> Dict:
+    """Winning plan summary: stages, indexes used, COLLSCAN / blocking SORT, examined vs returned."""
+    planner = explain.get("queryPlanner") or {}
+    plan = planner.get("winningPlan") or {}
+    plan = plan.get("queryPlan", plan)  # moteur SBE (5.0+)
+    stages, indexes = [], []
+
+    def walk(node: Dict) -> None:
+        stage = node.get("stage")
+        if stage:
+            stages.append(stage)
+        if node.get("indexName"):
+            indexes.append(node["indexName"])
+        for child in [node.get("inputStage")] + list(node.get("inputStages") or []):
+            if child:
+                walk(child)
+
+    walk(plan)
+    stats = explain.get("executionStats") or {}
+    return {
+        "stages": stages,
+        "indexes": indexes,
+        "collscan": "COLLSCAN" in stages,
+        "in_memory_sort": "SORT" in stages,
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "n_returned": stats.get("nReturned"),
+        "execution_ms": stats.get("executionTimeMillis"),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Recorder
+# ---------------------------------------------------------------------------
+
+class QueryProfiler:
+    """Per-worker aggregation of query shapes + sampled explain(); flushed into query_shapes."""
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = False,
+        explain_sample_rate: float = 0.01,
+        explain_cooldown_seconds: float = QUERY_PROFILER_EXPLAIN_COOLDOWN_SECONDS,
+        max_shapes: int = QUERY_PROFILER_MAX_SHAPES,
+        flush_seconds: float = QUERY_PROFILER_FLUSH_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.enabled = enabled
+        self.explain_sample_rate = explain_sample_rate
+        self.explain_cooldown_seconds = explain_cooldown_seconds
+        self.max_shapes = max_shapes
+        self.flush_seconds = flush_seconds
+        self._clock = clock
+        self._shapes: Dict[str, Dict] = {}
+        self._explains: set = set()  # références des explain() en cours (sinon collectables)
+        self._explain_slot = asyncio.Semaphore(1)
+        self._task: Optional[asyncio.Task] = None
+        self._counters = {"recorded": 0, "dropped": 0, "explains": 0, "explain_errors": 0, "flushes": 0}
+
+    def record(
+        self,
+        collection,
+        op: str,
+        filters: Optional[Dict[str, Any]],
+        duration_ms: float,
+        returned: int,
+        *,
+        sort=None,
+        projection: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+    ) -> None:
+        """Account one query (no I/O; explain() is scheduled in the background when sampled)."""
+        if not self.enabled or collection.name in _IGNORED_COLLECTIONS:
+            return
+        name = collection.name
+        shape, sort_spec, fields = query_shape(filters), _sort_spec(sort), _projection_fields(projection)
+        key = shape_id(name, op, shape, sort_spec, fields)
+        entry = self._shapes.get(key)
+        if entry is None:
+            if len(self._shapes) >= self.max_shapes:
+                self._counters["dropped"] += 1
+                return
+            entry = self._shapes[key] = {
+                "collection": name, "op": op, "shape": shape, "sort": sort_spec, "projection": fields,
+                "count": 0, "total_ms": 0.0, "max_ms": 0.0, "returned": 0,
+                "explain": None, "explained_at": None, "explain_pending": False,
+            }
+        entry["count"] += 1
+        entry["total_ms"] += duration_ms
+        entry["max_ms"] = max(entry["max_ms"], duration_ms)
+        entry["returned"] += returned
+        self._counters["recorded"] += 1
+        if self._should_explain(entry):
+            entry["explained_at"] = self._clock()
+            task = asyncio.create_task(self._explain(collection, entry, dict(filters or {}), sort, projection, limit))
+            self._explains.add(task)
+            task.add_done_callback(self._explains.discard)
+
+    def _should_explain(self, entry: Dict) -> bool:
+        if entry["explained_at"] is None:
+            return True
+        if self._clock() - entry["explained_at"] < self.explain_cooldown_seconds:
+            return False
+        return random.random() < self.explain_sample_rate
+
+    async def _explain(self, collection, entry: Dict, filters, sort, projection, limit) -> None:
+        async with self._explain_slot:
+            try:
+                cursor = collection.find(filters or {}, projection)
+                if sort:
+                    cursor = cursor.sort(sort)
+                if limit:
+                    cursor = cursor.limit(limit)
+                entry["explain"] = parse_explain(await cursor.explain())
+                entry["explain_pending"] = True
+                self._counters["explains"] += 1
+            except Exception as e:
+                self._counters["explain_errors"] += 1
+                logger.debug("Query profiler: explain failed on %s: %s", entry["collection"], e)
+
+    async def flush(self, db) -> int:
+        """Add the deltas accumulated since the last flush into query_shapes. Returns shapes written."""
+        operations = []
+        now = datetime.now(timezone.utc)
+        for key, entry in self._shapes.items():
+            if not entry["count"] and not entry["explain_pending"]:
+                continue
+            update: Dict[str, Any] = {
+                "$setOnInsert": {
+                    "collection": entry["collection"], "op": entry["op"], "shape": entry["shape"],
+                    "sort": entry["sort"], "projection": entry["projection"], "first_seen": now,
+                },
+                "$inc": {"count": entry["count"], "total_ms": round(entry["total_ms"], 3), "returned": entry["returned"]},
+                "$max": {"max_ms": round(entry["max_ms"], 3)},
+                "$set": {"last_seen": now},
+            }
+            if entry["explain_pending"]:
+                update["$set"]["explain"] = entry["explain"]
+            operations.append(UpdateOne({"_id": key}, update, upsert=True))
+            entry.update(count=0, total_ms=0.0, max_ms=0.0, returned=0, explain_pending=False)
+        if operations:
+            await db[SHAPES_COLLECTION].bulk_write(operations, ordered=False)
+            self._counters["flushes"] += 1
+        return len(operations)
+
+    async def _loop(self, db) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush(db)
+            except Exception as e:
+                logger.warning("Query profiler flush failed: %s", e)
+
+    async def start(self, db) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._loop(db))
+            logger.info("Query profiler enabled (explain sample rate %.3f)", self.explain_sample_rate)
+
+    async def stop(self, db) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            await self.flush(db)
+
+    def stats(self) -> Dict:
+        return {**self._counters, "shapes": len(self._shapes), "enabled": self.enabled}
+
+
+_profiler: Optional[QueryProfiler] = None
+
+
+def get_query_profiler() -> QueryProfiler:
+    """Process-wide profiler configured from settings (disabled unless QUERY_PROFILER_ENABLED)."""
+    global _profiler
+    if _profiler is None:
+        from core.config import settings
+        _profiler = QueryProfiler(
+            enabled=settings.QUERY_PROFILER_ENABLED,
+            explain_sample_rate=settings.QUERY_PROFILER_EXPLAIN_SAMPLE_RATE,
+        )
+    return _profiler
+
+
+# ---------------------------------------------------------------------------
+# Advisor
+# ---------------------------------------------------------------------------
+
+def _index_keys(spec_keys) -> List[Tuple[str, int]]:
+    if isinstance(spec_keys, str):
+        return [(spec_keys, 1)]
+    return [(field, direction) for field, direction in spec_keys]
+
+
+def _index_name(spec: Dict) -> str:
+    # Nom par défaut MongoDB : champ_direction concaténés
+    return spec["kwargs"].get("name") or "_".join(f"{f}_{d}" for f, d in _index_keys(spec["keys"]))
+
+
+def _is_read_index(spec: Dict) -> bool:
+    """Unique and TTL indexes exist for constraints / expiry, not for reads: never 'unused'."""
+    kwargs = spec["kwargs"]
+    return not kwargs.get("unique") and "expireAfterSeconds" not in kwargs
+
+
+def candidate_index(doc: Dict) -> List[Tuple[str, int]]:
+    """Index for a shape following the equality → sort → range rule."""
+    shape = doc["shape"]
+    keys = [(field, 1) for field in shape["eq"]]
+    seen = set(shape["eq"])
+    for field, direction in doc.get("sort") or []:
+        if field not in seen:
+            keys.append((field, direction))
+            seen.add(field)
+    keys += [(field, 1) for field in shape["range"] if field not in seen]
+    return keys
+
+
+def is_covered(candidate: List[Tuple[str, int]], n_eq: int, declared: Iterable[Dict]) -> bool:
+    """A declared index covers the candidate if it starts with its equality fields (any order)
+    followed by its first sort/range field."""
+    eq_fields = {field for field, _ in candidate[:n_eq]}
+    rest = candidate[n_eq:]
+    for spec in declared:
+        fields = [field for field, _ in _index_keys(spec["keys"])]
+        if set(fields[:n_eq]) != eq_fields:
+            continue
+        if not rest or (len(fields) > n_eq and fields[n_eq] == rest[0][0]):
+            return True
+    return False
+
+
+def _flags(doc: Dict, examined_ratio: float) -> List[str]:
+    plan = doc.get("explain") or {}
+    flags = []
+    if plan.get("collscan"):
+        flags.append("COLLSCAN")
+    if plan.get("in_memory_sort"):
+        flags.append("IN_MEMORY_SORT")
+    examined = plan.get("docs_examined") or 0
+    if examined and examined / max(plan.get("n_returned") or 0, 1) > examined_ratio:
+        flags.append("EXAMINED_RATIO")
+    return flags
+
+
+def build_report(
+    shapes: List[Dict],
+    declared: Dict[str, List[Dict]],
+    index_stats: Optional[Dict[str, List[Dict]]] = None,
+    *,
+    top: int = 20,
+    examined_ratio: float = QUERY_PROFILER_EXAMINED_RATIO,
+) -> Dict:
+    """
+    shapes: query_shapes documents; declared: core.indexes.INDEXES;
+    index_stats: {collection: $indexStats output} when available.
+    """
+    ranked = sorted(shapes, key=lambda d: d.get("total_ms") or 0, reverse=True)
+    hot, suggestions = [], {}
+    for doc in ranked:
+        flags = _flags(doc, examined_ratio)
+        row = {
+            "id": doc.get("_id"),
+            "query": describe(doc),
+            "count": doc.get("count", 0),
+            "total_ms": round(doc.get("total_ms") or 0, 1),
+            "avg_ms": round((doc.get("total_ms") or 0) / max(doc.get("count") or 0, 1), 2),
+            "max_ms": doc.get("max_ms"),
+            "avg_returned": round((doc.get("returned") or 0) / max(doc.get("count") or 0, 1), 1),
+            "plan": doc.get("explain"),
+            "flags": flags,
+        }
+        if flags:
+            candidate = candidate_index(doc)
+            n_eq = len(doc["shape"]["eq"])
+            specs = declared.get(doc["collection"], []) + [{"keys": "_id", "kwargs": {}}]
+            if candidate and is_covered(candidate, n_eq, specs):
+                # index déclaré mais absent de la base ou écarté par le planner
+                row["flags"].append("DECLARED_INDEX_NOT_USED")
+            elif candidate:
+                key = (doc["collection"], tuple(candidate))
+                suggestion = suggestions.setdefault(key, {
+                    "collection": doc["collection"], "keys": [list(k) for k in candidate],
+                    "reasons": set(), "queries": [], "total_ms": 0.0,
+                })
+                suggestion["reasons"].update(flags)
+                suggestion["queries"].append(row["query"])
+                suggestion["total_ms"] += row["total_ms"]
+                row["suggested_index"] = suggestion["keys"]
+        hot.append(row)
+
+    return {
+        "hot": hot[:top],
+        "suggestions": [
+            {**s, "reasons": sorted(s["reasons"]), "total_ms": round(s["total_ms"], 1)}
+            for s in sorted(suggestions.values(), key=lambda s: s["total_ms"], reverse=True)
+        ],
+        "unused_indexes": _unused_indexes(shapes, declared, index_stats),
+    }
+
+
+def _unused_indexes(shapes: List[Dict], declared: Dict[str, List[Dict]], index_stats) -> List[Dict]:
+    unused = []
+    if index_stats:
+        for collection, stats in index_stats.items():
+            ops = {s["name"]: (s.get("accesses") or {}).get("ops", 0) for s in stats}
+            for spec in filter(_is_read_index, declared.get(collection, [])):
+                name = _index_name(spec)
+                if ops.get(name) == 0:
+                    unused.append({"collection": collection, "name": name, "source": "indexStats"})
+        return unused
+    # Repli sans $indexStats : index jamais choisi par les plans échantillonnés d'une collection profilée
+    used, profiled = set(), set()
+    for doc in shapes:
+        if doc.get("explain"):
+            profiled.add(doc["collection"])
+            used.update((doc["collection"], name) for name in doc["explain"]["indexes"])
+    for collection in sorted(profiled):
+        for spec in filter(_is_read_index, declared.get(collection, [])):
+            name = _index_name(spec)
+            if (collection, name) not in used:
+                unused.append({"collection": collection, "name": name, "source": "sampled_plans"})
+    return unused
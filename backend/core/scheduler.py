@@ -0,0 +1,346 @@
+"""
+Cluster-safe scheduling layer on top of APScheduler.
+
+Every uvicorn/gunicorn worker starts its own AsyncIOScheduler; without
+coordination each cron job would run once per worker. ClusterScheduler makes
+each (job, period) run exactly once per cluster:
+
+- Leader lease per run : Redis (SET NX PX + owner token, Lua renew/release),
+  Mongo fallback (scheduler_locks, upsert on _id) when Redis is unavailable.
+- Run record per run    : scheduler_runs (_id = "<job_id>:<run_key>") with
+  start / end / duration / items processed / status / checkpoint.
+  A "completed" record makes later triggers for the same period a no-op.
+- Heartbeat             : the leader renews its lease while the job runs. If a
+  renewal fails the lease may already belong to another worker: the job task
+  is cancelled and the run marked "interrupted".
+- Resume                : if the leader dies, its lease expires; the periodic
+  resume sweep picks the orphaned run up and passes the last saved
+  checkpoint to the job (JobContext.checkpoint).
+- Retry                 : a "failed" / "interrupted" run is retried by the sweep
+  from its checkpoint, up to max_attempts with exponential backoff (retry_at).
+
+The clock is injectable (SystemClock by default) so lease expiry and
+resumption can be tested with a fake clock and in-memory stand-ins.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+from uuid import uuid4
+from zoneinfo import ZoneInfo
+
+from repositories.scheduler_run_repository import SchedulerLockRepository, SchedulerRunRepository
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_HEARTBEAT_SECONDS = 30
+DEFAULT_RESUME_MAX_AGE_HOURS = 6
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_BACKOFF_SECONDS = 300
+RETRYABLE_STATUSES = ("failed", "interrupted")
+SCHEDULER_TIMEZONE = "Europe/Paris"
+
+
+class SystemClock:
+    """Wall clock (UTC). Replace with a fake clock in tests."""
+
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+
+# ===== LEADER LEASES =====
+
+# KEYS[1] = lock key, ARGV[1] = owner token, ARGV[2] = ttl ms
+_REDIS_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# KEYS[1] = lock key, ARGV[1] = owner token
+_REDIS_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLeaseLock:
+    """Lease in Redis: SET NX PX to acquire, owner-checked Lua scripts to renew / release."""
+
+    backend = "redis"
+
+    def __init__(self, redis_client, prefix: str = "scheduler:lock:"):
+        self.redis = redis_client
+        self.prefix = prefix
+
+    async def acquire(self, name: str, owner: str, ttl_seconds: int) -> bool:
+        return bool(await self.redis.set(
+            f"{self.prefix}{name}", owner, nx=True, px=int(ttl_seconds * 1000)
+        ))
+
+    async def renew(self, name: str, owner: str, ttl_seconds: int) -> bool:
+        renewed = await self.redis.eval(
+            _REDIS_RENEW_SCRIPT, 1, f"{self.prefix}{name}", owner, int(ttl_seconds * 1000)
+        )
+        return bool(renewed)
+
+    async def release(self, name: str, owner: str) -> None:
+        await self.redis.eval(_REDIS_RELEASE_SCRIPT, 1, f"{self.prefix}{name}", owner)
+
+
+class MongoLeaseLock:
+    """Lease in Mongo (scheduler_locks): fallback when Redis is not configured."""
+
+    backend = "mongo"
+
+    def __init__(self, db, clock=None):
+        self.repo = SchedulerLockRepository(db)
+        self.clock = clock or SystemClock()
+
+    async def acquire(self, name: str, owner: str, ttl_seconds: int) -> bool:
+        now = self.clock.now()
+        return await self.repo.try_acquire(name, owner, now, now + timedelta(seconds=ttl_seconds))
+
+    async def renew(self, name: str, owner: str, ttl_seconds: int) -> bool:
+        return await self.repo.renew(name, owner, self.clock.now() + timedelta(seconds=ttl_seconds))
+
+    async def release(self, name: str, owner: str) -> None:
+        await self.repo.release(name, owner)
+
+
+async def build_lease_lock(db, clock=None):
+    """Redis lease when the cache is connected, Mongo lease otherwise."""
+    try:
+        from core.cache import get_cache_service
+        cache = await get_cache_service()
+        if cache.enabled and cache.redis_client is not None:
+            return RedisLeaseLock(cache.redis_client)
+    except Exception as e:
+        logger.warning("Scheduler: Redis lease unavailable, falling back to Mongo: %s", e)
+    return MongoLeaseLock(db, clock=clock)
+
+
+# ===== JOB CONTEXT =====
+
+class JobContext:
+    """Handed to each job run: checkpoint of a previous attempt + progress reporting."""
+
+    def __init__(self, scheduler: "ClusterScheduler", run_id: str, job_id: str, run_key: str,
+                 checkpoint: Optional[Dict], items_processed: int, resumed: bool):
+        self._scheduler = scheduler
+        self.run_id = run_id
+        self.job_id = job_id
+        self.run_key = run_key
+        self.checkpoint: Dict = dict(checkpoint or {})
+        self.items_processed = items_processed
+        self.resumed = resumed
+
+    def add_items(self, count: int = 1) -> None:
+        """Count processed items (persisted with the next checkpoint and at the end of the run)."""
+        self.items_processed += count
+
+    async def save_checkpoint(self, checkpoint: Dict) -> None:
+        """Persist progress so a successor can resume if this worker dies."""
+        self.checkpoint = dict(checkpoint)
+        await self._scheduler.runs.update_run(
+            self.run_id,
+            {"checkpoint": self.checkpoint, "items_processed": self.items_processed},
+            owner=self._scheduler.owner,
+        )
+
+
+JobFunc = Callable[[JobContext], Awaitable[None]]
+
+
+# ===== CLUSTER SCHEDULER =====
+
+class ClusterScheduler:
+    """Runs registered jobs at most once per (job_id, run_key) across all workers."""
+
+    def __init__(
+        self,
+        db,
+        lock,
+        clock=None,
+        owner: Optional[str] = None,
+        lease_seconds: int = DEFAULT_LEASE_SECONDS,
+        heartbeat_seconds: int = DEFAULT_HEARTBEAT_SECONDS,
+        resume_max_age_hours: int = DEFAULT_RESUME_MAX_AGE_HOURS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        retry_backoff_seconds: int = DEFAULT_RETRY_BACKOFF_SECONDS,
+    ):
+        self.runs = SchedulerRunRepository(db)
+        self.lock = lock
+        self.clock = clock or SystemClock()
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.resume_max_age_hours = resume_max_age_hours
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self._jobs: Dict[str, Dict] = {}
+
+    def register(self, job_id: str, func: JobFunc, run_key_format: str = "%Y-%m-%d") -> None:
+        """
+        Register a job. run_key_format (strftime, Europe/Paris) defines the period
+        deduplicated across the cluster: daily by default.
+        """
+        self._jobs[job_id] = {"func": func, "run_key_format": run_key_format}
+
+    def current_run_key(self, job_id: str) -> str:
+        fmt = self._jobs[job_id]["run_key_format"]
+        return self.clock.now().astimezone(ZoneInfo(SCHEDULER_TIMEZONE)).strftime(fmt)
+
+    def _retry_at(self, attempt: int) -> Optional[datetime]:
+        """When a failed attempt may be retried (None: attempts exhausted)."""
+        if attempt >= self.max_attempts:
+            return None
+        return self.clock.now() + timedelta(seconds=self.retry_backoff_seconds * 2 ** (attempt - 1))
+
+    async def _heartbeat(self, lock_name: str, run_id: str, job_task: asyncio.Task, lease_lost: asyncio.Event) -> None:
+        """Renew the lease (and mirror it on the run record) until cancelled; stop the job if it is lost."""
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                renewed = await self.lock.renew(lock_name, self.owner, self.lease_seconds)
+                if not renewed:
+                    logger.warning("Scheduler: lost lease %s (owner %s), interrupting the job", lock_name, self.owner)
+                    lease_lost.set()
+                    job_task.cancel()
+                    return
+                await self.runs.update_run(
+                    run_id,
+                    {"lease_expires_at": self.clock.now() + timedelta(seconds=self.lease_seconds)},
+                    owner=self.owner,
+                )
+            except Exception as e:
+                logger.warning("Scheduler: heartbeat failed for %s: %s", lock_name, e)
+
+    async def run_job(self, job_id: str, run_key: Optional[str] = None) -> Optional[Dict]:
+        """
+        Run job_id for run_key (current period by default) if this worker wins the lease
+        and the period has not completed yet.
+
+        Returns the final run summary, or None when skipped (other leader / already done).
+        """
+        job = self._jobs[job_id]
+        run_key = run_key or self.current_run_key(job_id)
+        run_id = self.runs.run_id(job_id, run_key)
+        lock_name = run_id
+
+        if not await self.lock.acquire(lock_name, self.owner, self.lease_seconds):
+            logger.info("Scheduler: %s already led by another worker, skipping", run_id)
+            return None
+
+        heartbeat = None
+        try:
+            existing = await self.runs.find_run(job_id, run_key)
+            previous = existing.get("status") if existing else None
+            now = self.clock.now()
+            if previous == "completed":
+                logger.info("Scheduler: %s already completed, skipping", run_id)
+                return None
+            if previous in RETRYABLE_STATUSES:
+                retry_at = existing.get("retry_at")
+                if retry_at is not None and retry_at.tzinfo is None:
+                    retry_at = retry_at.replace(tzinfo=timezone.utc)  # Mongo returns naive datetimes
+                if retry_at is None or retry_at > now:
+                    logger.info("Scheduler: %s %s, retry %s", run_id, previous,
+                                f"at {retry_at.isoformat()}" if retry_at else "attempts exhausted")
+                    return None
+
+            resumed = previous in ("running", *RETRYABLE_STATUSES)
+            attempt = (existing.get("attempts", 1) + 1) if resumed else 1
+            await self.runs.start_run({
+                "_id": run_id,
+                "job_id": job_id,
+                "run_key": run_key,
+                "status": "running",
+                "owner": self.owner,
+                "lock_backend": getattr(self.lock, "backend", "unknown"),
+                "started_at": existing.get("started_at", now) if resumed else now,
+                "attempt_started_at": now,
+                "attempts": attempt,
+                "retry_at": None,
+                "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                "checkpoint": existing.get("checkpoint", {}) if resumed else {},
+                "items_processed": existing.get("items_processed", 0) if resumed else 0,
+                "ended_at": None,
+                "duration_ms": None,
+                "error": None,
+            })
+            if resumed:
+                logger.warning("Scheduler: resuming %s run %s from checkpoint (attempt %d)", previous, run_id, attempt)
+
+            ctx = JobContext(
+                self, run_id, job_id, run_key,
+                checkpoint=existing.get("checkpoint") if resumed else None,
+                items_processed=existing.get("items_processed", 0) if resumed else 0,
+                resumed=resumed,
+            )
+            started = time.perf_counter()
+            job_task = asyncio.create_task(job["func"](ctx))
+            lease_lost = asyncio.Event()
+            heartbeat = asyncio.create_task(self._heartbeat(lock_name, run_id, job_task, lease_lost))
+
+            status, error = "completed", None
+            try:
+                await job_task
+            except asyncio.CancelledError:
+                if not lease_lost.is_set():
+                    raise  # worker shutdown: the run stays "running" and resumes once the lease expires
+                status, error = "interrupted", "lease lost"
+            except Exception as e:
+                logger.exception("Scheduler: job %s failed", run_id)
+                status, error = "failed", str(e)
+            duration_ms = round((time.perf_counter() - started) * 1000, 2)
+
+            summary = {
+                "status": status,
+                "retry_at": self._retry_at(attempt) if status in RETRYABLE_STATUSES else None,
+                "ended_at": self.clock.now(),
+                "duration_ms": duration_ms,
+                "items_processed": ctx.items_processed,
+                "checkpoint": ctx.checkpoint,
+                "error": error,
+            }
+            # Owner-filtered: a no-op if another worker took the run over after the lease was lost
+            await self.runs.update_run(run_id, summary, owner=self.owner)
+            logger.info(
+                "Scheduler: %s %s in %.0f ms (%d items, owner %s)",
+                run_id, status, duration_ms, ctx.items_processed, self.owner,
+            )
+            return {"run_id": run_id, "resumed": resumed, **summary}
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            try:
+                await self.lock.release(lock_name, self.owner)
+            except Exception as e:
+                logger.warning("Scheduler: lease release failed for %s: %s", lock_name, e)
+
+    async def resume_orphaned_runs(self) -> int:
+        """
+        Resume runs whose leader died (status running + lease expired) and retry
+        failed / interrupted runs whose backoff elapsed. Returns runs resumed.
+        """
+        now = self.clock.now()
+        orphans = await self.runs.find_resumable_runs(
+            now, now - timedelta(hours=self.resume_max_age_hours)
+        )
+        resumed = 0
+        for run in orphans:
+            job_id = run.get("job_id")
+            if job_id not in self._jobs:
+                continue
+            result = await self.run_job(job_id, run.get("run_key"))
+            if result is not None:
+                resumed += 1
+        return resumed
@@ -34,7 +34,8 @@ JWT_EXPIRATION = 24  # hours
 
 def get_password_hash(password: str) -> str:
     """
-    Hash a password using bcrypt
+    Hash a password using bcrypt (blocking: request handlers use
+    core.password_hasher.get_password_hasher() instead)
     
     Args:
         password: Plain text password
@@ -42,12 +43,12 @@ def get_password_hash(password: str) -> str:
     Returns:
         Hashed password string
     """
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=settings.PASSWORD_HASH_ROUNDS)).decode('utf-8')
 
 
 def verify_password(password: str, hashed: str) -> bool:
     """
-    Verify a password against its hash
+    Verify a password against its hash (blocking, see get_password_hash)
     
     Args:
         password: Plain text password to verify
@@ -146,10 +147,12 @@ def _get_token_from_request(
 async def _get_current_user_from_token(token: str) -> dict:
     """
     Single point of JWT decoding and user resolution (Token -> User).
-    Used by all role-specific dependencies. Uses cache for user lookups (5 min).
+    Used by all role-specific dependencies. Uses cache for user lookups
+    (per-worker auth cache, then Redis for 5 min).
     """
     from core.database import get_db
     from core.cache import get_cache_service, CacheKeys
+    from core.auth_context_cache import get_auth_context_cache
     from repositories.user_repository import UserRepository
     from repositories.store_repository import WorkspaceRepository
 
@@ -159,20 +162,25 @@ async def _get_current_user_from_token(token: str) -> dict:
         logger.warning("Auth rejected: missing user_id in token payload")
         raise UnauthorizedError("Invalid token payload")
 
-    cache = await get_cache_service()
-    cache_key = CacheKeys.key_for_user(user_id)
-    user = await cache.get(cache_key)
+    local_cache = get_auth_context_cache()
+    user = local_cache.get(f"user:{user_id}")
 
     if user is None:
-        db = await get_db()
-        user_repo = UserRepository(db)
-        user = await user_repo.find_one({"id": user_id}, {"_id": 0, "password": 0})
-        if not user:
-            logger.warning("Auth rejected: user not found for id %s", user_id)
-            raise UnauthorizedError("User not found")
-        await cache.set(cache_key, user, ttl=300)
-    else:
-        logger.debug("Cache hit for user %s", user_id)
+        cache = await get_cache_service()
+        cache_key = CacheKeys.key_for_user(user_id)
+        user = await cache.get(cache_key)
+
+        if user is None:
+            db = await get_db()
+            user_repo = UserRepository(db)
+            user = await user_repo.find_one({"id": user_id}, {"_id": 0, "password": 0})
+            if not user:
+                logger.warning("Auth rejected: user not found for id %s", user_id)
+                raise UnauthorizedError("User not found")
+            await cache.set(cache_key, user, ttl=300)
+        else:
+            logger.debug("Cache hit for user %s", user_id)
+        local_cache.set(f"user:{user_id}", user)
 
     db = await get_db()
     workspace_repo = WorkspaceRepository(db)
@@ -181,6 +189,10 @@ async def _get_current_user_from_token(token: str) -> dict:
     normalized_role = _normalize_role(user.get("role"))
     if normalized_role and normalized_role != user.get("role"):
         user["role"] = normalized_role
+
+    # AI calls made by this request are governed per workspace (core.ai_governor)
+    from core.ai_governor import bind_ai_tenant
+    bind_ai_tenant(user["space"].get("id") or user_id)
     return user
 
 
@@ -189,9 +201,11 @@ async def _resolve_workspace(workspace_repo, user: dict) -> Optional[dict]:
     Resolve workspace for a user without enforcing access rules.
     Returns minimal workspace info or None.
     Uses WorkspaceRepository (no direct DB access).
-    ✅ CACHED: Workspace lookups are cached for 2 minutes.
+    ✅ CACHED: Workspace lookups are cached for 2 minutes (Redis) and a few
+    seconds per worker (auth context cache, gérant lookups included).
     """
     from core.cache import get_cache_service, CacheKeys
+    from core.auth_context_cache import get_auth_context_cache
 
     if _normalize_role(user.get('role')) == 'super_admin':
         return None
@@ -201,8 +215,19 @@ async def _resolve_workspace(workspace_repo, user: dict) -> Optional[dict]:
     user_id = user.get('id')
     user_role = _normalize_role(user.get('role'))
 
+    if workspace_id:
+        local_key = f"workspace:{workspace_id}"
+    elif gerant_id or user_role == 'gerant':
+        local_key = f"gerant_ws:{gerant_id or user_id}"
+    else:
+        return None
+
+    local_cache = get_auth_context_cache()
+    workspace = local_cache.get(local_key)
+    if workspace is not None:
+        return workspace
+
     cache = await get_cache_service()
-    workspace = None
 
     if workspace_id:
         cache_key = CacheKeys.key_for_workspace(workspace_id)
@@ -225,6 +250,8 @@ async def _resolve_workspace(workspace_repo, user: dict) -> Optional[dict]:
             cache_key = CacheKeys.key_for_workspace(workspace.get('id'))
             await cache.set(cache_key, workspace, ttl=120)
 
+    if workspace:
+        local_cache.set(local_key, workspace)
     return workspace
 
 
@@ -416,6 +443,8 @@ async def _resolve_subscription_read_only(current_user: dict) -> tuple:
                     workspace_id,
                     {"subscription_status": "trial_expired", "updated_at": datetime.now(timezone.utc).isoformat()}
                 )
+                from core.cache import invalidate_workspace_cache
+                await invalidate_workspace_cache(workspace_id)
         return ("TRIAL_EXPIRED", "Période d'essai terminée. Vous pouvez consulter vos données mais les modifications sont désactivées.")
 
     if subscription_status == 'trial_expired':
@@ -533,12 +562,18 @@ async def verify_store_ownership(
         return
 
     if role == 'gerant':
+        from core.auth_context_cache import get_auth_context_cache
+        local_cache = get_auth_context_cache()
+        owner_key = f"store_owner:{user_id}:{target_store_id}"
+        if local_cache.get(owner_key):
+            return
         store = await store_repo.find_one(
             {"id": target_store_id, "gerant_id": user_id, "active": True},
             {"_id": 0, "id": 1}
         )
         if not store:
             raise ForbiddenError("Accès refusé : ce magasin ne vous appartient pas ou n'existe pas")
+        local_cache.set(owner_key, True)
         return
 
     if role == 'seller':
@@ -634,11 +669,17 @@ async def verify_seller_store_access(
         seller_store_id = seller.get("store_id")
         if not seller_store_id:
             raise ForbiddenError("Vendeur sans magasin assigné")
+        from core.auth_context_cache import get_auth_context_cache
+        local_cache = get_auth_context_cache()
+        owner_key = f"store_owner:{user_id}:{seller_store_id}"
+        if local_cache.get(owner_key):
+            return seller
         store = await manager_service.get_store_by_id(
             seller_store_id, gerant_id=user_id, projection={"_id": 0, "id": 1, "active": 1}
         )
         if not store or not store.get("active"):
             raise ForbiddenError("Ce vendeur n'appartient pas à l'un de vos magasins")
+        local_cache.set(owner_key, True)
         return seller
 
     raise ForbiddenError(MSG_ROLE_UNAUTHORIZED)
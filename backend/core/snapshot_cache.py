@@ -0,0 +1,132 @@
+"""
+Snapshot cache with stale-while-revalidate (dashboards, platform-wide counters).
+
+For expensive read-only aggregates that many clients poll:
+
+- fresh (age < ttl)          : served from the worker's memory, no I/O;
+- stale (ttl <= age < max_age): served immediately, one background refresh;
+- expired / absent           : the caller waits for the refresh.
+
+Snapshots are also stored in Redis (CacheService) with their computation time,
+so a worker whose memory is stale adopts a fresher snapshot computed by another
+worker instead of recomputing it. Refreshes are single-flight per worker.
+Without Redis, each worker keeps its own snapshot.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from core.cache import get_cache_service
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_CACHE_PREFIX = "snapshot:"
+
+
+class SnapshotCache:
+    """One cached snapshot (value + computation time) under a fixed key."""
+
+    def __init__(
+        self,
+        key: str,
+        ttl_seconds: float,
+        max_age_seconds: float,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.key = key
+        self.ttl_seconds = ttl_seconds
+        self.max_age_seconds = max(max_age_seconds, ttl_seconds)
+        self._clock = clock
+        self._value: Any = None
+        self._computed_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._counters = {"fresh_hits": 0, "stale_hits": 0, "shared_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0}
+
+    async def get(self, loader: Callable[[], Awaitable[Any]]) -> Tuple[Any, Dict]:
+        """Return (value, meta) — meta: computed_at, age_seconds, stale."""
+        if self._age() < self.ttl_seconds:
+            self._counters["fresh_hits"] += 1
+            return self._value, self._meta()
+
+        if await self._adopt_shared():
+            self._counters["shared_hits"] += 1
+            return self._value, self._meta()
+
+        if self._age() < self.max_age_seconds:
+            self._counters["stale_hits"] += 1
+            self._refresh(loader)
+            return self._value, self._meta()
+
+        self._counters["misses"] += 1
+        await asyncio.shield(self._refresh(loader))
+        return self._value, self._meta()
+
+    def invalidate(self) -> None:
+        """Drop the local snapshot (the next get() recomputes or adopts Redis)."""
+        self._value = None
+        self._computed_at = None
+
+    def stats(self) -> Dict:
+        return {**self._counters, **self._meta()}
+
+    # ----- internals -----
+
+    def _age(self) -> float:
+        if self._computed_at is None:
+            return float("inf")
+        return self._clock() - self._computed_at
+
+    def _meta(self) -> Dict:
+        age = self._age()
+        return {
+            "computed_at": self._computed_at,
+            "age_seconds": round(age, 3) if self._computed_at is not None else None,
+            "stale": age >= self.ttl_seconds,
+        }
+
+    def _refresh(self, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._run_refresh(loader))
+        return self._refresh_task
+
+    async def _run_refresh(self, loader: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            value = await loader()
+        except Exception as e:
+            self._counters["refresh_errors"] += 1
+            if self._computed_at is None:
+                raise
+            # Un snapshot périmé vaut mieux qu'une erreur : il reste servi
+            logger.warning("Snapshot %s refresh failed, serving stale value: %s", self.key, e)
+            return
+        self._counters["refreshes"] += 1
+        self._value = value
+        self._computed_at = self._clock()
+        try:
+            cache = await get_cache_service()
+            await cache.set(
+                SNAPSHOT_CACHE_PREFIX + self.key,
+                {"value": value, "computed_at": self._computed_at},
+                ttl=int(self.max_age_seconds) + 1,
+            )
+        except Exception as e:
+            logger.debug("Snapshot %s not shared in Redis: %s", self.key, e)
+
+    async def _adopt_shared(self) -> bool:
+        """Take a fresher snapshot computed by another worker, if any."""
+        try:
+            cache = await get_cache_service()
+            shared = await cache.get(SNAPSHOT_CACHE_PREFIX + self.key)
+        except Exception:
+            return False
+        if not isinstance(shared, dict) or "computed_at" not in shared:
+            return False
+        computed_at = float(shared["computed_at"])
+        if self._computed_at is not None and computed_at <= self._computed_at:
+            return False
+        if self._clock() - computed_at >= self.ttl_seconds:
+            return False
+        self._value = shared.get("value")
+        self._computed_at = computed_at
+        return True
@@ -0,0 +1,106 @@
+"""
+Debounced write-behind for derived fields computed on read (challenge progress, …).
+
+GET handlers that recompute a derived value (progress_*, status) must not write
+during the request. They submit the new $set fields here; updates are merged per
+(collection, filter) — latest value wins — and flushed as one bulk_write per
+collection `delay_seconds` after the first buffered update (a steady stream of
+reads cannot postpone it), or immediately once `max_pending` updates are buffered.
+Services build a new repository per request: pending updates are keyed on
+repository.collection_name, not on the repository object, so they merge across
+requests; the latest submitting repository performs the bulk_write.
+
+The buffered values are always recomputable from source data: a flush failure is
+logged and dropped, the next read resubmits them. flush() on shutdown (lifespan)
+writes whatever is pending.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+
+def _freeze(filters: Dict[str, Any]) -> Tuple:
+    return tuple(sorted(filters.items()))
+
+
+class DebouncedUpdateWriter:
+    """Buffer of pending $set updates flushed with bulk_write."""
+
+    def __init__(self, name: str, delay_seconds: float = 2.0, max_pending: int = 500):
+        self.name = name
+        self.delay_seconds = delay_seconds
+        self.max_pending = max_pending
+        # (collection, filtre figé) -> (repo, filtre, champs $set fusionnés)
+        self._pending: Dict[Tuple, Tuple[Any, Dict, Dict]] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._immediate: set = set()  # références des flush immédiats (sinon collectables)
+        self._counters = {"submitted": 0, "merged": 0, "flushes": 0, "written": 0, "errors": 0}
+
+    def submit(self, repository, filters: Dict[str, Any], set_fields: Dict[str, Any]) -> None:
+        """Queue `$set: set_fields` on the document matching `filters` (no I/O)."""
+        if not set_fields:
+            return
+        key = (repository.collection_name, _freeze(filters))
+        self._counters["submitted"] += 1
+        if key in self._pending:
+            self._counters["merged"] += 1
+            _, pending_filters, pending_fields = self._pending[key]
+            pending_fields.update(set_fields)
+            self._pending[key] = (repository, pending_filters, pending_fields)
+        else:
+            self._pending[key] = (repository, dict(filters), dict(set_fields))
+
+        if len(self._pending) >= self.max_pending:
+            self._schedule(0)
+        elif self._timer is None or self._timer.done():
+            self._schedule(self.delay_seconds)
+
+    async def flush(self) -> int:
+        """Write every pending update now. Returns the number of updates written."""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        by_collection: Dict[str, Tuple[Any, list]] = {}
+        for repo, filters, set_fields in pending.values():
+            group = by_collection.setdefault(repo.collection_name, (repo, []))
+            group[1].append(UpdateOne(filters, {"$set": set_fields}))
+        self._counters["flushes"] += 1
+        written = 0
+        for repo, operations in by_collection.values():
+            try:
+                await repo.bulk_write(operations)
+                written += len(operations)
+            except Exception as e:
+                self._counters["errors"] += 1
+                logger.warning("%s: write-behind flush of %d update(s) failed: %s", self.name, len(operations), e)
+        self._counters["written"] += written
+        return written
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> Dict:
+        return {**self._counters, "pending": len(self._pending)}
+
+    # ----- internals -----
+
+    def _schedule(self, delay: float) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:  # pas de boucle (scripts) : écrit au prochain flush()
+            return
+        if delay == 0:
+            # Le timer en cours n'est pas annulé : il peut être au milieu d'un flush
+            task = loop.create_task(self.flush())
+            self._immediate.add(task)
+            task.add_done_callback(self._immediate.discard)
+        else:
+            self._timer = loop.create_task(self._flush_after(delay))
+
+    async def _flush_after(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self.flush()
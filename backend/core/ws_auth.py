@@ -13,10 +13,10 @@ from repositories.user_repository import UserRepository
 logger = logging.getLogger(__name__)
 
 
-async def _authenticate_ws(token: str, store_id: str) -> dict:
+async def _authenticate_ws_user(token: str) -> dict:
     """
-    Decode le JWT, charge l'utilisateur et verifie qu'il a acces au store.
-    Leve UnauthorizedError ou ForbiddenError en cas de refus.
+    Decode le JWT et charge l'utilisateur (canal de notifications : tout role).
+    Leve UnauthorizedError en cas de refus.
     """
     payload = decode_token(token)
     user_id = payload.get("user_id") or payload.get("sub")
@@ -29,6 +29,17 @@ async def _authenticate_ws(token: str, store_id: str) -> dict:
     )
     if not user:
         raise UnauthorizedError("Utilisateur non trouve")
+    return user
+
+
+async def _authenticate_ws(token: str, store_id: str) -> dict:
+    """
+    Decode le JWT, charge l'utilisateur et verifie qu'il a acces au store.
+    Leve UnauthorizedError ou ForbiddenError en cas de refus.
+    """
+    user = await _authenticate_ws_user(token)
+    user_id = user["id"]
+    db = await get_db()
 
     role = _normalize_role(user.get("role"))
 
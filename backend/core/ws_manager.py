@@ -6,18 +6,177 @@ Architecture :
 - Publication via Redis Pub/Sub (scalable multi-workers)
 - Fallback broadcast direct en memoire si Redis indisponible
 
+Abonnements par store : un worker s'abonne a kpi:store:{id} au premier client
+local du store et se desabonne au depart du dernier (pas de psubscribe global :
+un worker ne recoit que les stores qu'il sert). Apres une panne Redis, la boucle
+d'ecoute se reconnecte avec backoff et reabonne les stores locaux.
+Encodage optionnel "zlib" (JSON compact compresse, prefixe binaire) ; le
+decodage detecte le format, les deux encodages cohabitent pendant un deploiement.
+
+Diffusion non bloquante : chaque client a sa file sortante bornee et sa tache
+d'ecriture (send avec timeout). broadcast_to_store ne fait qu'empiler, donc une
+tablette lente ne retarde ni les autres ecrans du store ni la boucle Redis.
+- Coalescing : un kpi_entry_saved encore en file pour le meme (vendeur, date)
+  est remplace par le plus recent au lieu d'etre empile.
+- Back-pressure : file pleine ou send trop long -> client deconnecte (1013),
+  le front se reconnecte et recharge l'etat.
+- Compteurs par store (connexions, file, lag, envois, coalesces, drops) : stats().
+
 Canal Redis : kpi:store:{store_id}
+
+Topics utilisateur : la meme mecanique sert les notifications in-app. Une
+connexion /ws/notifications est enregistree sous le topic "user:{user_id}"
+(user_topic) et son canal Redis est notif:user:{user_id} ; publish_to_user
+y pousse les evenements notifications_* (plus de polling de GET /notifications).
 """
 import asyncio
 import json
 import logging
-from typing import Dict, Optional, Set
+import time
+import zlib
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set
 
 from fastapi import WebSocket
 
 logger = logging.getLogger(__name__)
 
 KPI_CHANNEL_PREFIX = "kpi:store:"
+NOTIFICATION_CHANNEL_PREFIX = "notif:user:"
+USER_TOPIC_PREFIX = "user:"
+
+# File sortante max par client (messages en attente) avant deconnexion
+WS_CLIENT_QUEUE_SIZE = 64
+# Delai max d'un send_text avant de considerer le client comme bloque
+WS_SEND_TIMEOUT_SECONDS = 5.0
+# Code de fermeture "Try Again Later" envoye aux clients trop lents
+WS_SLOW_CLIENT_CLOSE_CODE = 1013
+
+_COALESCED_EVENT_TYPES = ("kpi_entry_saved",)
+
+# Encodage des messages pub/sub
+PUBSUB_ENCODING_JSON = "json"
+PUBSUB_ENCODING_ZLIB = "zlib"
+_ZLIB_MAGIC = b"\x00z"
+
+WS_PUBSUB_RECONNECT_MIN_SECONDS = 1.0
+WS_PUBSUB_RECONNECT_MAX_SECONDS = 30.0
+
+
+def encode_pubsub_message(message: str, encoding: str = PUBSUB_ENCODING_JSON):
+    """JSON texte tel quel, ou prefixe binaire + zlib (encoding="zlib")."""
+    if encoding == PUBSUB_ENCODING_ZLIB:
+        return _ZLIB_MAGIC + zlib.compress(message.encode("utf-8"))
+    return message
+
+
+def decode_pubsub_message(data) -> str:
+    """Inverse de encode_pubsub_message ; detecte le format (JSON commence par '{')."""
+    if isinstance(data, str):
+        return data
+    if data.startswith(_ZLIB_MAGIC):
+        return zlib.decompress(data[len(_ZLIB_MAGIC):]).decode("utf-8")
+    return data.decode("utf-8")
+
+
+def user_topic(user_id: str) -> str:
+    """Topic des connexions de notifications d'un utilisateur (les store_id sont des uuid : pas de collision)."""
+    return f"{USER_TOPIC_PREFIX}{user_id}"
+
+
+def _channel_for(topic: str) -> str:
+    """Canal Redis d'un topic : kpi:store:{store_id} ou notif:user:{user_id}."""
+    if topic.startswith(USER_TOPIC_PREFIX):
+        return f"{NOTIFICATION_CHANNEL_PREFIX}{topic[len(USER_TOPIC_PREFIX):]}"
+    return f"{KPI_CHANNEL_PREFIX}{topic}"
+
+
+def _topic_from_channel(channel: str) -> Optional[str]:
+    if channel.startswith(KPI_CHANNEL_PREFIX):
+        return channel[len(KPI_CHANNEL_PREFIX):]
+    if channel.startswith(NOTIFICATION_CHANNEL_PREFIX):
+        return user_topic(channel[len(NOTIFICATION_CHANNEL_PREFIX):])
+    return None
+
+
+def _coalesce_key(message: str) -> Optional[str]:
+    """Cle de coalescing d'un evenement (None = jamais fusionne)."""
+    try:
+        event = json.loads(message)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(event, dict) or event.get("type") not in _COALESCED_EVENT_TYPES:
+        return None
+    return f"{event['type']}:{event.get('seller_id')}:{event.get('date')}"
+
+
+class _ClientChannel:
+    """File sortante bornee + tache d'ecriture d'une connexion WebSocket."""
+
+    def __init__(self, manager: "WsManager", store_id: str, websocket: WebSocket) -> None:
+        self.manager = manager
+        self.store_id = store_id
+        self.websocket = websocket
+        # [coalesce_key, message, enqueued_at]
+        self.queue: Deque[List] = deque()
+        self.sent = 0
+        self.coalesced = 0
+        self.closed = False
+        self._wakeup = asyncio.Event()
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._run())
+
+    def offer(self, message: str, key: Optional[str]) -> bool:
+        """Empile un message (ou remplace celui de meme cle). False si la file est pleine."""
+        if key is not None:
+            for item in self.queue:
+                if item[0] == key:
+                    item[1] = message
+                    self.coalesced += 1
+                    return True
+        if len(self.queue) >= self.manager.max_queue_size:
+            return False
+        self.queue.append([key, message, time.monotonic()])
+        self.idle.clear()
+        self._wakeup.set()
+        return True
+
+    def lag_ms(self) -> float:
+        """Age du plus ancien message en attente."""
+        if not self.queue:
+            return 0.0
+        return round((time.monotonic() - self.queue[0][2]) * 1000, 1)
+
+    async def _run(self) -> None:
+        while not self.closed:
+            if not self.queue:
+                self.idle.set()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            _, message, _ = self.queue.popleft()
+            try:
+                # asyncio.timeout : pas de tache intermediaire par envoi (vs wait_for)
+                async with asyncio.timeout(self.manager.send_timeout):
+                    await self.websocket.send_text(message)
+                self.sent += 1
+            except asyncio.TimeoutError:
+                await self.manager._drop(self.store_id, self.websocket, "slow")
+                return
+            except Exception:
+                await self.manager._drop(self.store_id, self.websocket, "error")
+                return
+
+    def close(self) -> None:
+        self.closed = True
+        self.queue.clear()
+        self.idle.set()
+        if self.task is not None and self.task is not asyncio.current_task() and not self.task.done():
+            self.task.cancel()
 
 
 class WsManager:
@@ -30,10 +189,34 @@ class WsManager:
         await ws_manager.disconnect(store_id, websocket)
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        max_queue_size: int = WS_CLIENT_QUEUE_SIZE,
+        send_timeout: float = WS_SEND_TIMEOUT_SECONDS,
+    ) -> None:
         self._connections: Dict[str, Set[WebSocket]] = {}
+        self._channels: Dict[WebSocket, _ClientChannel] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self.max_queue_size = max_queue_size
+        self.send_timeout = send_timeout
         self._redis_client = None
+        self._redis_url: Optional[str] = None
+        self._sub_client = None
+        self._pubsub = None
+        self._subscribed: Set[str] = set()
+        self._subscription_event = asyncio.Event()
+        self._encoding = PUBSUB_ENCODING_JSON
+        self._pubsub_counters: Dict[str, int] = {
+            "received": 0, "delivered": 0, "discarded": 0, "bytes_received": 0, "reconnects": 0,
+        }
         self._listener_task: Optional[asyncio.Task] = None
+        # Fermetures en arriere-plan : references gardees pour eviter le GC
+        self._close_tasks: Set[asyncio.Task] = set()
+
+    def _store_counters(self, store_id: str) -> Dict[str, int]:
+        return self._counters.setdefault(
+            store_id, {"broadcasts": 0, "dropped_slow": 0, "dropped_error": 0}
+        )
 
     # ------------------------------------------------------------------
     # Cycle de vie des connexions
@@ -42,9 +225,15 @@ class WsManager:
     async def connect(self, store_id: str, websocket: WebSocket) -> None:
         """Accepte et enregistre une connexion WebSocket."""
         await websocket.accept()
-        if store_id not in self._connections:
+        first_client = store_id not in self._connections
+        if first_client:
             self._connections[store_id] = set()
         self._connections[store_id].add(websocket)
+        channel = _ClientChannel(self, store_id, websocket)
+        self._channels[websocket] = channel
+        channel.start()
+        if first_client:
+            await self._subscribe(store_id)
         logger.info(
             "WS connected store=%s total_clients=%s",
             store_id,
@@ -53,30 +242,100 @@ class WsManager:
 
     async def disconnect(self, store_id: str, websocket: WebSocket) -> None:
         """Retire une connexion WebSocket."""
+        self._unregister(store_id, websocket)
+        if store_id not in self._connections:
+            await self._unsubscribe(store_id)
+        logger.info("WS disconnected store=%s", store_id)
+
+    def _unregister(self, store_id: str, websocket: WebSocket) -> None:
         if store_id in self._connections:
             self._connections[store_id].discard(websocket)
             if not self._connections[store_id]:
                 del self._connections[store_id]
-        logger.info("WS disconnected store=%s", store_id)
+        channel = self._channels.pop(websocket, None)
+        if channel is not None:
+            channel.close()
+
+    async def _drop(self, store_id: str, websocket: WebSocket, reason: str) -> None:
+        """Deconnecte un client trop lent ("slow") ou en erreur ("error")."""
+        if websocket not in self._channels:
+            return
+        self._unregister(store_id, websocket)
+        if store_id not in self._connections:
+            await self._unsubscribe(store_id)
+        self._store_counters(store_id)[f"dropped_{reason}"] += 1
+        logger.warning("WS client dropped store=%s reason=%s", store_id, reason)
+        if reason == "slow":
+            task = asyncio.create_task(self._close_quietly(websocket))
+            self._close_tasks.add(task)
+            task.add_done_callback(self._close_tasks.discard)
+
+    async def _close_quietly(self, websocket: WebSocket) -> None:
+        try:
+            await asyncio.wait_for(
+                websocket.close(code=WS_SLOW_CLIENT_CLOSE_CODE), timeout=self.send_timeout
+            )
+        except Exception:
+            pass
 
     # ------------------------------------------------------------------
     # Diffusion locale
     # ------------------------------------------------------------------
 
     async def broadcast_to_store(self, store_id: str, message: str) -> None:
-        """Envoie un message texte a tous les WebSockets du store."""
-        clients = self._connections.get(store_id, set()).copy()
+        """
+        Empile un message texte pour tous les WebSockets du store (non bloquant).
+        Les envois se font en parallele dans les taches d'ecriture des clients.
+        """
+        clients = self._connections.get(store_id)
         if not clients:
             return
-        dead: Set[WebSocket] = set()
-        for ws in clients:
-            try:
-                await ws.send_text(message)
-            except Exception:
-                dead.add(ws)
-        # Nettoyage des connexions mortes
-        if dead and store_id in self._connections:
-            self._connections[store_id] -= dead
+        self._store_counters(store_id)["broadcasts"] += 1
+        key = _coalesce_key(message)
+        for ws in list(clients):
+            channel = self._channels.get(ws)
+            if channel is None:
+                continue
+            if not channel.offer(message, key):
+                await self._drop(store_id, ws, "slow")
+
+    async def send_to_client(self, websocket: WebSocket, message: str) -> None:
+        """Empile un message pour un seul client (ex: evenement "connected")."""
+        channel = self._channels.get(websocket)
+        if channel is not None and not channel.offer(message, None):
+            await self._drop(channel.store_id, websocket, "slow")
+
+    async def flush(self, store_id: Optional[str] = None, timeout: float = 5.0) -> None:
+        """Attend que les files sortantes soient vides (tests, arret propre)."""
+        channels = [
+            c for c in self._channels.values() if store_id is None or c.store_id == store_id
+        ]
+        if channels:
+            await asyncio.wait_for(
+                asyncio.gather(*(c.idle.wait() for c in channels)), timeout=timeout
+            )
+        # Laisse les taches d'ecriture finir leur nettoyage (drop, compteurs)
+        await asyncio.sleep(0)
+
+    def stats(self) -> Dict:
+        """Compteurs par store du worker courant (connexions, file, lag, envois, drops)."""
+        stores: Dict[str, Dict] = {}
+        for store_id in set(self._connections) | set(self._counters):
+            channels = [self._channels[ws] for ws in self._connections.get(store_id, ()) if ws in self._channels]
+            stores[store_id] = {
+                "connections": len(channels),
+                "queued": sum(len(c.queue) for c in channels),
+                "max_queue_depth": max((len(c.queue) for c in channels), default=0),
+                "max_lag_ms": max((c.lag_ms() for c in channels), default=0.0),
+                "sent": sum(c.sent for c in channels),
+                "coalesced": sum(c.coalesced for c in channels),
+                **self._store_counters(store_id),
+            }
+        return {
+            "connections": sum(s["connections"] for s in stores.values()),
+            "stores": stores,
+            "pubsub": self.pubsub_stats(),
+        }
 
     # ------------------------------------------------------------------
     # Publication (Redis Pub/Sub ou fallback local)
@@ -87,14 +346,14 @@ class WsManager:
         Publie un evenement KPI.
 
         - Redis disponible : publie sur kpi:store:{store_id}
-          -> tous les workers recoivent via subscriber et diffusent localement
+          -> les workers abonnes a ce store (au moins un client local) le diffusent
         - Redis indisponible : diffuse directement aux WebSockets de ce worker
         """
-        message = json.dumps(event, default=str)
+        message = json.dumps(event, default=str, separators=(",", ":"))
         if self._redis_client is not None:
             try:
                 await self._redis_client.publish(
-                    f"{KPI_CHANNEL_PREFIX}{store_id}", message
+                    _channel_for(store_id), encode_pubsub_message(message, self._encoding)
                 )
                 return
             except Exception as e:
@@ -103,62 +362,162 @@ class WsManager:
                 )
         await self.broadcast_to_store(store_id, message)
 
+    async def publish_to_user(self, user_id: str, event: dict) -> None:
+        """Publie un evenement sur les connexions de notifications d'un utilisateur (tous workers)."""
+        await self.publish(user_topic(user_id), event)
+
     # ------------------------------------------------------------------
     # Subscriber Redis (demarre dans lifespan)
     # ------------------------------------------------------------------
 
-    async def start_redis_listener(self, redis_url: str) -> None:
+    async def start_redis_listener(self, redis_url: str, encoding: str = PUBSUB_ENCODING_JSON) -> None:
         """
-        Cree une connexion Redis dediee au pub/sub et demarre la boucle d'ecoute.
+        Cree les connexions Redis (publication + abonnement) et demarre la boucle d'ecoute.
         Une connexion separee est obligatoire (protocole Redis : pub/sub exclusif).
+        Les abonnements sont par store, pris au premier client local et rendus au dernier.
         """
         try:
             import redis.asyncio as aioredis
 
+            self._redis_url = redis_url
+            self._encoding = encoding
             # Client dedie a la publication
             self._redis_client = aioredis.from_url(
                 redis_url, decode_responses=True
             )
-            # Client dedie a l'abonnement
-            sub_client = aioredis.from_url(redis_url, decode_responses=True)
-            pubsub = sub_client.pubsub()
-            await pubsub.psubscribe(f"{KPI_CHANNEL_PREFIX}*")
-            self._listener_task = asyncio.create_task(self._listen(pubsub))
+            await self._open_pubsub()
+            self._listener_task = asyncio.create_task(self._listen())
             logger.info(
-                "WsManager: Redis pub/sub listener started (pattern=%s*)",
-                KPI_CHANNEL_PREFIX,
+                "WsManager: Redis pub/sub listener started (per-store channels, encoding=%s)",
+                encoding,
             )
         except Exception as e:
             logger.warning(
                 "WsManager: Redis pub/sub unavailable, local broadcast only: %s", e
             )
             self._redis_client = None
+            self._pubsub = None
+
+    async def _open_pubsub(self) -> None:
+        """Connexion d'abonnement (bytes : messages compacts possibles) + reabonnement des stores locaux."""
+        import redis.asyncio as aioredis
+
+        sub_client = aioredis.from_url(self._redis_url, decode_responses=False)
+        pubsub = sub_client.pubsub()
+        stores = list(self._connections)
+        if stores:
+            await pubsub.subscribe(*(_channel_for(s) for s in stores))
+            self._subscription_event.set()
+        self._sub_client = sub_client
+        self._pubsub = pubsub
+        self._subscribed = set(stores)
+
+    async def _close_pubsub(self) -> None:
+        pubsub, self._pubsub = self._pubsub, None
+        sub_client, self._sub_client = self._sub_client, None
+        self._subscribed = set()
+        for resource in (pubsub, sub_client):
+            if resource is None:
+                continue
+            try:
+                await resource.aclose()
+            except Exception:
+                pass
 
-    async def _listen(self, pubsub) -> None:
-        """Boucle d'ecoute Redis : recoit les messages et diffuse localement."""
+    async def _subscribe(self, store_id: str) -> None:
+        """Premier client local du store : abonnement a son canal."""
+        if self._pubsub is None or store_id in self._subscribed:
+            return
         try:
-            async for message in pubsub.listen():
-                if message.get("type") != "pmessage":
-                    continue
-                channel: str = message.get("channel", "")
-                data: str = message.get("data", "")
-                if not channel.startswith(KPI_CHANNEL_PREFIX):
-                    continue
-                store_id = channel[len(KPI_CHANNEL_PREFIX):]
-                await self.broadcast_to_store(store_id, data)
-        except asyncio.CancelledError:
-            logger.info("WsManager: Redis listener cancelled")
+            await self._pubsub.subscribe(_channel_for(store_id))
+            self._subscribed.add(store_id)
+            self._subscription_event.set()
+        except Exception as e:
+            # La boucle d'ecoute se reconnecte et reabonne les stores locaux
+            logger.warning("WsManager: subscribe failed store=%s: %s", store_id, e)
+
+    async def _unsubscribe(self, store_id: str) -> None:
+        """Dernier client local parti : desabonnement (plus de decodage inutile)."""
+        if self._pubsub is None or store_id not in self._subscribed:
+            return
+        self._subscribed.discard(store_id)
+        try:
+            await self._pubsub.unsubscribe(_channel_for(store_id))
         except Exception as e:
-            logger.error("WsManager: Redis listener error: %s", e)
+            logger.warning("WsManager: unsubscribe failed store=%s: %s", store_id, e)
+
+    async def _handle_pubsub_message(self, message: dict) -> None:
+        if message.get("type") != "message":
+            return
+        channel = message.get("channel", b"")
+        if isinstance(channel, bytes):
+            channel = channel.decode("utf-8", "replace")
+        store_id = _topic_from_channel(channel)
+        if store_id is None:
+            return
+        data = message.get("data", b"")
+        self._pubsub_counters["received"] += 1
+        self._pubsub_counters["bytes_received"] += len(data)
+        if store_id not in self._connections:
+            # Message en vol pendant un desabonnement
+            self._pubsub_counters["discarded"] += 1
+            return
+        await self.broadcast_to_store(store_id, decode_pubsub_message(data))
+        self._pubsub_counters["delivered"] += 1
+
+    async def _listen(self) -> None:
+        """
+        Boucle d'ecoute Redis : recoit les messages des stores abonnes et diffuse localement.
+        En cas d'erreur Redis : reconnexion avec backoff et reabonnement des stores locaux.
+        """
+        backoff = WS_PUBSUB_RECONNECT_MIN_SECONDS
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._open_pubsub()
+                    self._pubsub_counters["reconnects"] += 1
+                    logger.info("WsManager: Redis pub/sub reconnected (%d stores)", len(self._subscribed))
+                if not self._pubsub.subscribed:
+                    # Aucun client local : rien a ecouter jusqu'au prochain abonnement
+                    self._subscription_event.clear()
+                    await self._subscription_event.wait()
+                    continue
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+                backoff = WS_PUBSUB_RECONNECT_MIN_SECONDS
+                if message is not None:
+                    await self._handle_pubsub_message(message)
+            except asyncio.CancelledError:
+                logger.info("WsManager: Redis listener cancelled")
+                return
+            except Exception as e:
+                logger.error("WsManager: Redis listener error, reconnecting in %.0fs: %s", backoff, e)
+                await self._close_pubsub()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, WS_PUBSUB_RECONNECT_MAX_SECONDS)
+
+    def pubsub_stats(self) -> Dict:
+        """Compteurs pub/sub du worker (recus vs diffuses localement, abonnements)."""
+        return {
+            "enabled": self._redis_client is not None,
+            "encoding": self._encoding,
+            "subscriptions": len(self._subscribed),
+            **self._pubsub_counters,
+        }
 
     async def stop(self) -> None:
-        """Arrete proprement le subscriber (appele dans lifespan shutdown)."""
+        """Arrete proprement le subscriber et les taches d'ecriture (appele dans lifespan shutdown)."""
+        for channel in list(self._channels.values()):
+            channel.close()
+        self._channels.clear()
         if self._listener_task and not self._listener_task.done():
             self._listener_task.cancel()
             try:
                 await self._listener_task
             except asyncio.CancelledError:
                 pass
+        await self._close_pubsub()
         if self._redis_client is not None:
             try:
                 await self._redis_client.aclose()
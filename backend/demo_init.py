@@ -27,6 +27,8 @@ load_dotenv(Path(__file__).parent.parent / ".env", override=False)
 
 from motor.motor_asyncio import AsyncIOMotorClient
 
+from repositories.store_daily_kpi_repository import StoreDailyKpiRepository
+
 # ── IDs fixes (déterministes) ─────────────────────────────────────────────────
 DEMO_WORKSPACE_ID  = "demo-workspace-001"
 DEMO_GERANT_ID     = "demo-gerant-001"
@@ -1164,6 +1166,11 @@ async def seed(db):
         {"$set": {"store_ids": [DEMO_STORE_ID, DEMO_STORE_ID_2, DEMO_STORE_ID_3]}},
     )
 
+    # KPI écrits directement dans kpi_entries : reconstruire le rollup store_daily_kpis
+    rollup = StoreDailyKpiRepository(db)
+    for store_id in (DEMO_STORE_ID, DEMO_STORE_ID_2, DEMO_STORE_ID_3):
+        await rollup.rebuild_store(store_id)
+
     print(f"✅ Demo seeding complete — 3 boutiques, {len(SELLERS) + len(SELLERS_2) + len(SELLERS_3)} vendeurs, 183j de KPIs (6 mois) par boutique")
 
 
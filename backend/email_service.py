@@ -3,6 +3,7 @@ from sib_api_v3_sdk.rest import ApiException
 import os
 import logging
 from datetime import datetime
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +14,9 @@ RECIPIENT_EMAIL = os.environ.get('RECIPIENT_EMAIL', 'hello@retailperformerai.com
 _TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), 'templates', 'email')
 
 
+@lru_cache(maxsize=None)
 def _load_template(name: str) -> str:
+    """Read an email template once per process (templates ship with the code)."""
     with open(os.path.join(_TEMPLATES_DIR, name), encoding='utf-8') as f:
         return f.read()
 
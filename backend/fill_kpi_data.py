@@ -7,6 +7,8 @@ from dotenv import load_dotenv
 import uuid
 import random
 
+from repositories.store_daily_kpi_repository import StoreDailyKpiRepository
+
 load_dotenv()
 
 MONGO_URL = os.environ.get('MONGO_URL')
@@ -78,6 +80,7 @@ async def fill_kpi_data():
             entry = {
                 "id": str(uuid.uuid4()),
                 "seller_id": seller['id'],
+                "store_id": seller.get('store_id'),
                 "date": date,
                 "ca_journalier": round(ca_journalier, 2),
                 "nb_ventes": nb_ventes,
@@ -100,6 +103,12 @@ async def fill_kpi_data():
         await db.kpi_entries.insert_many(entries_to_insert)
         print(f"\n✅ Successfully inserted {len(entries_to_insert)} KPI entries")
         print(f"   Total: {len(entries_to_insert)} entries for {len(sellers)} sellers over 365 days")
+
+    # Écriture directe dans kpi_entries : reconstruire le rollup store_daily_kpis des magasins touchés
+    rollup = StoreDailyKpiRepository(db)
+    for store_id in sorted({s['store_id'] for s in sellers if s.get('store_id')}):
+        rows = await rollup.rebuild_store(store_id)
+        print(f"   Rollup store_daily_kpis rebuilt for {store_id}: {rows} day(s)")
     
     # Verify data
     print("\n📊 Verification:")
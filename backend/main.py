@@ -4,10 +4,12 @@ import logging
 import traceback
 
 sys.stdout.reconfigure(line_buffering=True) if hasattr(sys.stdout, "reconfigure") else None
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", stream=sys.stdout)
-logger = logging.getLogger(__name__)
-
 from core.config import settings
+from core.logging import setup_logging
+
+# Logs écrits par un thread dédié (core/logging.py), nettoyés hors de la boucle d'événements
+setup_logging(async_logging=settings.LOG_ASYNC)
+logger = logging.getLogger(__name__)
 
 # --- Sentry (optionnel : activé si SENTRY_DSN est défini) ---
 if getattr(settings, "SENTRY_DSN", None):
@@ -4,8 +4,8 @@ Masque automatiquement les champs sensibles (password, token, api_key, etc.)
 """
 import logging
 import re
-from typing import Any, Dict, List
-from copy import deepcopy
+from functools import lru_cache
+from typing import Any
 
 
 # Liste des champs sensibles à masquer
@@ -36,6 +36,24 @@ SENSITIVE_FIELDS = [
 
 REDACTED_VALUE = "[REDACTED]"
 
+# Précompilés une fois : une seule passe regex par chaîne, une seule recherche par clé
+_CONTROL_CHARS_RE = re.compile(r"[\x00-\x1f\x7f]+")
+_SENSITIVE_KEY_RE = re.compile("|".join(re.escape(f) for f in sorted({f.lower() for f in SENSITIVE_FIELDS})))
+# Le lookahead sur la première lettre évite d'essayer chaque alternative à chaque position
+_SECRET_RE = re.compile(
+    r"(?=[bpsta])(?:(?P<bearer>Bearer\s+[\w\-\.]+)"
+    r"|(?P<key>password|token|api[_-]?key|secret)[\"']?\s*[:=]\s*[\"']?[^\"']+)",
+    re.IGNORECASE,
+)
+_SECRET_KEYWORDS = ("bearer", "password", "token", "api", "secret")
+
+
+def _redact_match(match: "re.Match") -> str:
+    if match.group("bearer"):
+        return "Bearer [REDACTED]"
+    key = match.group("key").lower()
+    return f"{'api_key' if key.startswith('api') else key}: [REDACTED]"
+
 
 def neutralize_for_log(text: Any) -> str:
     """
@@ -45,7 +63,13 @@ def neutralize_for_log(text: Any) -> str:
     if text is None:
         return ""
     s = str(text)
-    return re.sub(r"[\x00-\x1f\x7f]+", " ", s).strip() or "[empty]"
+    return _CONTROL_CHARS_RE.sub(" ", s).strip() or "[empty]"
+
+
+@lru_cache(maxsize=4096)
+def is_sensitive_key(key: str) -> bool:
+    """True if the key contains a sensitive field name (case-insensitive). Cached per key."""
+    return _SENSITIVE_KEY_RE.search(key.lower()) is not None
 
 
 def sanitize_dict(data: Any, depth: int = 0, max_depth: int = 10) -> Any:
@@ -66,14 +90,7 @@ def sanitize_dict(data: Any, depth: int = 0, max_depth: int = 10) -> Any:
     if isinstance(data, dict):
         sanitized = {}
         for key, value in data.items():
-            # Check if key contains sensitive field name (case-insensitive)
-            key_lower = str(key).lower()
-            is_sensitive = any(
-                sensitive_field.lower() in key_lower 
-                for sensitive_field in SENSITIVE_FIELDS
-            )
-            
-            if is_sensitive:
+            if is_sensitive_key(str(key)):
                 sanitized[key] = REDACTED_VALUE
             elif isinstance(value, (dict, list)):
                 sanitized[key] = sanitize_dict(value, depth + 1, max_depth)
@@ -90,7 +107,8 @@ def sanitize_dict(data: Any, depth: int = 0, max_depth: int = 10) -> Any:
 
 def sanitize_string(text: str) -> str:
     """
-    Sanitize a string by masking sensitive patterns.
+    Sanitize a string by masking sensitive patterns (Bearer tokens, password/token/api_key/secret
+    assignments) in a single pass of one precompiled regex.
     
     Args:
         text: String to sanitize
@@ -100,21 +118,41 @@ def sanitize_string(text: str) -> str:
     """
     if not isinstance(text, str):
         return text
-    
-    # Patterns pour détecter les tokens/secrets dans les strings
-    patterns = [
-        (r'Bearer\s+[\w\-\.]+', 'Bearer [REDACTED]'),
-        (r'password["\']?\s*[:=]\s*["\']?[^"\']+', 'password: [REDACTED]'),
-        (r'token["\']?\s*[:=]\s*["\']?[^"\']+', 'token: [REDACTED]'),
-        (r'api[_-]?key["\']?\s*[:=]\s*["\']?[^"\']+', 'api_key: [REDACTED]'),
-        (r'secret["\']?\s*[:=]\s*["\']?[^"\']+', 'secret: [REDACTED]'),
-    ]
-    
-    sanitized = text
-    for pattern, replacement in patterns:
-        sanitized = re.sub(pattern, replacement, sanitized, flags=re.IGNORECASE)
-    
-    return sanitized
+    lowered = text.lower()
+    if not any(keyword in lowered for keyword in _SECRET_KEYWORDS):
+        return text  # cas courant : aucun motif possible, pas de regex
+    return _SECRET_RE.sub(_redact_match, text)
+
+
+def merge_record_args(record: logging.LogRecord) -> None:
+    """
+    Structured args and `extra` through sanitize_dict (key based), then merge the args into
+    record.msg (args = None) so the record no longer references the caller's objects.
+    Runs on the caller side of the core.logging pipeline (NonBlockingQueueHandler.prepare).
+    """
+    if hasattr(record, 'extra') and isinstance(record.extra, dict):
+        record.extra = sanitize_dict(record.extra)
+    if record.args:
+        args = record.args
+        if isinstance(args, dict):
+            record.args = sanitize_dict(args)
+        else:
+            record.args = tuple(sanitize_dict(a) if isinstance(a, (dict, list)) else a for a in args)
+        record.msg = record.getMessage()
+        record.args = None
+
+
+def sanitize_record(record: logging.LogRecord) -> None:
+    """
+    Sanitize a log record in place: merge_record_args (no-op if already merged), then the
+    merged message through sanitize_string (one pass instead of msg + each arg).
+    Runs on the log writer thread (core.logging pipeline), not in the request.
+    """
+    if getattr(record, "_sanitized", False):
+        return
+    merge_record_args(record)
+    record.msg = sanitize_string(record.getMessage())
+    record._sanitized = True
 
 
 class SanitizingFormatter(logging.Formatter):
@@ -126,26 +164,7 @@ class SanitizingFormatter(logging.Formatter):
         """
         Format log record with sanitization.
         """
-        # Sanitize extra fields if present
-        if hasattr(record, 'extra') and isinstance(record.extra, dict):
-            record.extra = sanitize_dict(record.extra)
-        
-        # Sanitize message
-        if hasattr(record, 'msg') and isinstance(record.msg, str):
-            record.msg = sanitize_string(record.msg)
-        
-        # Sanitize args if present
-        if hasattr(record, 'args') and record.args:
-            sanitized_args = []
-            for arg in record.args:
-                if isinstance(arg, (dict, list)):
-                    sanitized_args.append(sanitize_dict(arg))
-                elif isinstance(arg, str):
-                    sanitized_args.append(sanitize_string(arg))
-                else:
-                    sanitized_args.append(arg)
-            record.args = tuple(sanitized_args)
-        
+        sanitize_record(record)
         return super().format(record)
 
 
@@ -1,59 +1,100 @@
 """
 Middleware pour logging avec request_id et durée
+Logs d'accès réussis échantillonnés par route (ACCESS_LOG_SAMPLE_RATES) ; erreurs et requêtes lentes toujours journalisées.
+La sanitization a lieu à l'écriture, sur le thread du pipeline (core/logging.py).
 """
+import random
 import time
 import uuid
+from typing import Dict, Optional
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
+from config.limits import ACCESS_LOG_SAMPLE_RATES, ACCESS_LOG_SLOW_MS
 from core.logging import request_id_var, get_logger
-from middleware.log_sanitizer import sanitize_dict
 
 logger = get_logger(__name__)
 
+_RATE_CACHE_MAX_PATHS = 4096
+
+
+class AccessLogSampler:
+    """Per-route sampling rate of successful access logs (longest matching path prefix wins)."""
+
+    def __init__(self, rates: Dict[str, float], default_rate: float = 1.0, slow_ms: float = ACCESS_LOG_SLOW_MS):
+        self._prefixes = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self.default_rate = default_rate
+        self.slow_ms = slow_ms
+        self._rates: Dict[str, float] = {}
+
+    def rate_for(self, path: str) -> float:
+        rate = self._rates.get(path)
+        if rate is None:
+            rate = next((r for prefix, r in self._prefixes if path.startswith(prefix)), self.default_rate)
+            if len(self._rates) >= _RATE_CACHE_MAX_PATHS:
+                self._rates.clear()  # chemins avec identifiants : le cache reste borné
+            self._rates[path] = rate
+        return rate
+
+    def sample(self, path: str, status_code: int, duration_ms: float) -> Optional[float]:
+        """Rate to record with the log, or None to skip it."""
+        if status_code >= 400 or duration_ms >= self.slow_ms:
+            return 1.0
+        rate = self.rate_for(path)
+        if rate >= 1.0 or (rate > 0 and random.random() < rate):
+            return rate
+        return None
+
+
+_sampler: Optional[AccessLogSampler] = None
+
+
+def get_access_log_sampler() -> AccessLogSampler:
+    global _sampler
+    if _sampler is None:
+        from core.config import settings
+        _sampler = AccessLogSampler(ACCESS_LOG_SAMPLE_RATES, default_rate=settings.ACCESS_LOG_SAMPLE_RATE)
+    return _sampler
+
+
 class LoggingMiddleware(BaseHTTPMiddleware):
     """Middleware pour logging structuré avec request_id et durée"""
-    
+
     async def dispatch(self, request: Request, call_next):
         # Générer request_id
         request_id = str(uuid.uuid4())[:8]
         request_id_var.set(request_id)
-        
+
         # Ajouter request_id au request state
         request.state.request_id = request_id
-        
+
         # Mesurer durée
-        start_time = time.time()
-        
+        start_time = time.perf_counter()
+
         try:
             response = await call_next(request)
-            duration_ms = (time.time() - start_time) * 1000
-            
-            # Log structuré (avec sanitization automatique)
-            log_data = {
-                'request_id': request_id,
-                'method': request.method,
-                'endpoint': request.url.path,
-                'status_code': response.status_code,
-                'duration_ms': round(duration_ms, 2),
-            }
-            # ⚠️ SECURITY: Sanitize log data to mask sensitive fields
-            sanitized_log_data = sanitize_dict(log_data)
-            logger.info('Request completed', extra=sanitized_log_data)
-            
+            duration_ms = (time.perf_counter() - start_time) * 1000
+
+            sample_rate = get_access_log_sampler().sample(request.url.path, response.status_code, duration_ms)
+            if sample_rate is not None:
+                logger.info('Request completed', extra={
+                    'request_id': request_id,
+                    'method': request.method,
+                    'endpoint': request.url.path,
+                    'status_code': response.status_code,
+                    'duration_ms': round(duration_ms, 2),
+                    'sample_rate': sample_rate,
+                })
+
             # Ajouter request_id au header de réponse
             response.headers['X-Request-ID'] = request_id
             return response
-            
-        except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
-            # ⚠️ SECURITY: Sanitize log data to mask sensitive fields
-            log_data = {
+
+        except Exception:
+            duration_ms = (time.perf_counter() - start_time) * 1000
+            logger.exception('Request failed', extra={
                 'request_id': request_id,
                 'method': request.method,
                 'endpoint': request.url.path,
                 'duration_ms': round(duration_ms, 2),
-            }
-            sanitized_log_data = sanitize_dict(log_data)
-            logger.exception('Request failed', extra=sanitized_log_data)
+            })
             raise
-
@@ -36,6 +36,34 @@ class PaginatedResponse(BaseModel, Generic[T]):
         }
 
 
+class CursorPaginatedResponse(BaseModel, Generic[T]):
+    """
+    Keyset (cursor) paginated response, see utils.pagination.paginate_keyset.
+
+    No page number: pass next_cursor back as ?cursor= to get the following page.
+    total is only filled when the caller asks for it; it may come from a short-lived
+    cache (total_is_estimate=True) since counting every page is what made deep pages slow.
+    """
+    items: List[T] = Field(..., description="List of items for current page")
+    size: int = Field(..., ge=1, description="Number of items per page")
+    next_cursor: Optional[str] = Field(None, description="Opaque cursor of the next page (None on the last page)")
+    has_more: bool = Field(..., description="True if another page follows")
+    total: Optional[int] = Field(None, ge=0, description="Total number of items (optional, possibly estimated)")
+    total_is_estimate: bool = Field(False, description="True if total comes from the count cache")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [],
+                "size": 20,
+                "next_cursor": "eyJ2IjpbIjIwMjUtMDEtMzEiLCJrcGktOTkiXX0.3f9c0a1b2c3d4e5f",
+                "has_more": True,
+                "total": None,
+                "total_is_estimate": False
+            }
+        }
+
+
 class PaginationParams(BaseModel):
     """
     Pagination query parameters for list endpoints.
@@ -44,11 +72,20 @@ class PaginationParams(BaseModel):
     """
     page: int = Field(default=1, ge=1, description="Page number (1-indexed)")
     size: int = Field(default=20, ge=1, le=400, description="Number of items per page (max 400)")
+    cursor: Optional[str] = Field(
+        default=None,
+        description="Keyset pagination on endpoints that support it: next_cursor of the previous page, empty for the first page",
+    )
     
     @property
     def skip(self) -> int:
         """Calculate skip value for MongoDB queries"""
         return (self.page - 1) * self.size
+
+    @property
+    def keyset(self) -> bool:
+        """True if the client asked for cursor pagination (?cursor=, even empty)"""
+        return self.cursor is not None
     
     @property
     def limit(self) -> int:
@@ -0,0 +1,99 @@
+"""
+Rapport du profiler de requêtes (query_shapes, alimenté quand QUERY_PROFILER_ENABLED=true).
+
+Classe les formes de requêtes par temps cumulé, signale les COLLSCAN, tris en
+mémoire et ratios examinés/renvoyés élevés, propose les index absents de
+core/indexes.INDEXES et liste les index déclarés jamais utilisés ($indexStats).
+
+Usage :
+    python query_shape_report.py                          # top 20 + suggestions + index inutilisés
+    python query_shape_report.py --top 50 --collection challenges
+    python query_shape_report.py --json > report.json
+    python query_shape_report.py --no-index-stats         # sans droit $indexStats : repli sur les plans échantillonnés
+    python query_shape_report.py --reset                  # vide query_shapes (nouvelle campagne de mesure)
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from core.indexes import INDEXES
+from core.query_profiler import SHAPES_COLLECTION, build_report
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def _index_stats(db, collections):
+    stats = {}
+    for name in collections:
+        try:
+            stats[name] = await db[name].aggregate([{"$indexStats": {}}]).to_list(None)
+        except Exception as e:
+            logger.warning("⚠️ $indexStats indisponible sur %s : %s", name, e)
+    return stats or None
+
+
+def _print(report):
+    print("\n=== Formes de requêtes les plus coûteuses ===")
+    for row in report["hot"]:
+        plan = row["plan"] or {}
+        print(f"{row['total_ms']:>10.0f} ms  {row['count']:>8} appels  {row['avg_ms']:>7.2f} ms moy.  {row['query']}")
+        if plan:
+            print(f"{'':>14}plan {'>'.join(plan['stages'])}  examinés {plan['docs_examined']} / renvoyés {plan['n_returned']}")
+        if row["flags"]:
+            print(f"{'':>14}⚠️ {', '.join(row['flags'])}")
+
+    print("\n=== Index suggérés (absents de core/indexes.INDEXES) ===")
+    for suggestion in report["suggestions"]:
+        keys = ", ".join(f'("{f}", {d})' for f, d in suggestion["keys"])
+        print(f'"{suggestion["collection"]}": _spec([{keys}])  # {", ".join(suggestion["reasons"])}, {suggestion["total_ms"]:.0f} ms')
+        for query in suggestion["queries"]:
+            print(f"    {query}")
+
+    print("\n=== Index déclarés jamais utilisés ===")
+    for index in report["unused_indexes"]:
+        print(f"{index['collection']}.{index['name']}  ({index['source']})")
+
+
+async def run(top=20, collection=None, as_json=False, index_stats=True, reset=False):
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    db = client[os.environ.get("DB_NAME", "retail_coach")]
+    try:
+        if reset:
+            result = await db[SHAPES_COLLECTION].delete_many({})
+            logger.info("🧹 %d forme(s) supprimée(s)", result.deleted_count)
+            return
+        filters = {"collection": collection} if collection else {}
+        shapes = await db[SHAPES_COLLECTION].find(filters).to_list(None)
+        declared = {collection: INDEXES.get(collection, [])} if collection else INDEXES
+        stats = await _index_stats(db, declared) if index_stats else None
+        report = build_report(shapes, declared, stats, top=top)
+        if as_json:
+            print(json.dumps(report, indent=2, default=str))
+        else:
+            _print(report)
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank profiled query shapes and suggest indexes")
+    parser.add_argument("--top", type=int, default=20, help="Number of query shapes listed")
+    parser.add_argument("--collection", help="Limit to one collection")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--no-index-stats", action="store_true", help="Do not run $indexStats (unused indexes from sampled plans)")
+    parser.add_argument("--reset", action="store_true", help="Delete every recorded query shape")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.top, args.collection, args.json, not args.no_index_stats, args.reset))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Reconstruction / contrôle du rollup store_daily_kpis (une ligne par magasin et par jour).
+
+Le rollup est maintenu à chaque écriture KPI (KPIRepository / ManagerKPIRepository) ;
+ce script sert au backfill initial et à la réparation après un incident.
+Les lectures ne passent par le rollup qu'avec KPI_ROLLUP_READS_ENABLED=true :
+lancer le backfill (puis --check) avant de l'activer.
+
+Usage :
+    python rebuild_store_daily_kpis.py                         # tous les magasins
+    python rebuild_store_daily_kpis.py --store-id <id>         # un magasin
+    python rebuild_store_daily_kpis.py --from 2025-01-01 --to 2025-12-31
+    python rebuild_store_daily_kpis.py --check                 # contrôle seul, code 1 si écart
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from core.indexes import INDEXES
+from repositories.store_daily_kpi_repository import StoreDailyKpiRepository
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def _store_ids(db, store_id):
+    if store_id:
+        return [store_id]
+    ids = set(await db["kpi_entries"].distinct("store_id"))
+    ids |= set(await db["manager_kpis"].distinct("store_id"))
+    ids |= set(await db["store_daily_kpis"].distinct("store_id"))  # lignes orphelines
+    return sorted(i for i in ids if i)
+
+
+async def run(store_id=None, start=None, end=None, check=False) -> int:
+    """Returns the number of problems found (check) or 0."""
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    db = client[os.environ.get("DB_NAME", "retail_coach")]
+    repo = StoreDailyKpiRepository(db)
+    try:
+        if not check:
+            for spec in INDEXES["store_daily_kpis"]:
+                await db["store_daily_kpis"].create_index(spec["keys"], **spec["kwargs"])
+
+        problems = 0
+        for sid in await _store_ids(db, store_id):
+            if check:
+                found = await repo.check_store(sid, start, end)
+                for problem in found:
+                    logger.warning("❌ %s %s : %s %s", sid, problem["date"], problem["problem"], ", ".join(problem["fields"]))
+                problems += len(found)
+                logger.info("🔍 %s : %d écart(s)", sid, len(found))
+            else:
+                rows = await repo.rebuild_store(sid, start, end)
+                logger.info("✅ %s : %d ligne(s) reconstruite(s)", sid, rows)
+        return problems
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or check the store_daily_kpis rollup")
+    parser.add_argument("--store-id", help="Limit to one store (default: every store with KPI data)")
+    parser.add_argument("--from", dest="start", help="First date (YYYY-MM-DD, inclusive)")
+    parser.add_argument("--to", dest="end", help="Last date (YYYY-MM-DD, inclusive)")
+    parser.add_argument("--check", action="store_true", help="Only compare with raw data, do not write")
+    args = parser.parse_args()
+
+    problems = asyncio.run(run(args.store_id, args.start, args.end, args.check))
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Rejeu d'événements Stripe stockés dans la file stripe_events.
+
+Les événements sont remis à l'état pending ; les consommateurs des workers
+(services/stripe_webhook_queue.py) les retraitent dans l'ordre de chaque client.
+Les handlers sont idempotents et protégés contre les événements obsolètes.
+
+Usage :
+    python replay_stripe_events.py --status failed                  # événements en échec
+    python replay_stripe_events.py --event-id evt_1 --event-id evt_2
+    python replay_stripe_events.py --status processed --since 2025-06-01 --type invoice.payment_failed
+    python replay_stripe_events.py --status failed --dry-run        # compte seulement
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from repositories.stripe_event_repository import StripeEventRepository
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _filters(event_ids=None, status=None, since=None, event_type=None) -> dict:
+    filters = {}
+    if event_ids:
+        filters["event_id"] = {"$in": event_ids}
+    if status:
+        filters["status"] = status
+    if since:
+        filters["received_at"] = {"$gte": datetime.fromisoformat(since).replace(tzinfo=timezone.utc)}
+    if event_type:
+        filters["event_type"] = event_type
+    return filters
+
+
+async def run(event_ids=None, status=None, since=None, event_type=None, dry_run=False) -> int:
+    """Returns the number of events requeued (or matching, in dry-run)."""
+    filters = _filters(event_ids, status, since, event_type)
+    if not filters:
+        raise SystemExit("Préciser --event-id, --status, --since ou --type")
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    db = client[os.environ.get("DB_NAME", "retail_coach")]
+    repo = StripeEventRepository(db)
+    try:
+        if dry_run:
+            count = await repo.count({**filters, "payload": {"$exists": True}})
+            logger.info("🔍 %d événement(s) à rejouer (%s)", count, filters)
+            return count
+        count = await repo.requeue(filters, datetime.now(timezone.utc))
+        logger.info("✅ %d événement(s) remis en file", count)
+        return count
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay stored Stripe webhook events")
+    parser.add_argument("--event-id", dest="event_ids", action="append", help="Stripe event id (repeatable)")
+    parser.add_argument("--status", help="Queue status to replay (failed, processed, ...)")
+    parser.add_argument("--since", help="Only events received from this date (YYYY-MM-DD)")
+    parser.add_argument("--type", dest="event_type", help="Only this event type (e.g. invoice.paid)")
+    parser.add_argument("--dry-run", action="store_true", help="Count matching events, do not requeue")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.event_ids, args.status, args.since, args.event_type, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,12 @@
 Achievement Notification Repository - Data access for achievement_notifications collection
 Security: All methods require user_id to prevent IDOR
 """
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Set
 from repositories.base_repository import BaseRepository
 
+ERR_USER_ID_REQUIRED = "user_id is required for security"
+ERR_USER_ITEM_TYPE_ITEM_ID_REQUIRED = "user_id, item_type and item_id are required for security"
+
 
 class AchievementNotificationRepository(BaseRepository):
     """Repository for achievement_notifications collection with security filters"""
@@ -51,6 +54,20 @@ class AchievementNotificationRepository(BaseRepository):
             projection
         )
     
+    async def find_seen_item_ids(self, user_id: str, item_type: str, item_ids: List[str]) -> Set[str]:
+        """Item IDs (among item_ids) the user has a notification for — one $in query."""
+        if not user_id or not item_type:
+            raise ValueError(ERR_USER_ITEM_TYPE_ITEM_ID_REQUIRED)
+        if not item_ids:
+            return set()
+        docs = await self.find_many(
+            {"user_id": user_id, "item_type": item_type, "item_id": {"$in": list(item_ids)}},
+            {"_id": 0, "item_id": 1},
+            limit=len(item_ids),
+            allow_over_limit=True,
+        )
+        return {doc["item_id"] for doc in docs}
+
     async def create_notification(self, notification_data: Dict[str, Any], user_id: str) -> str:
         """Create a new notification (SECURITY: validates user_id)"""
         if not user_id:
@@ -8,12 +8,14 @@ stores, workspaces. Uses skip/limit for all list operations (pagination-ready).
 Collections without a dedicated repo (admin_logs, system_logs, logs, diagnostics,
 relationship_consultations) still use self.db.
 """
+import asyncio
 import logging
 from typing import List, Dict, Optional
 from datetime import datetime, timezone, timedelta
 
-from utils.pagination import paginate
-from models.pagination import PaginatedResponse
+from core.exceptions import ValidationError
+from utils.pagination import paginate, paginate_keyset
+from models.pagination import CursorPaginatedResponse, PaginatedResponse
 from repositories.user_repository import UserRepository
 from repositories.store_repository import StoreRepository, WorkspaceRepository
 
@@ -22,6 +24,7 @@ logger = logging.getLogger(__name__)
 # Opérateurs MongoDB réutilisés (Sonar: éviter duplication de littéraux)
 MONGO_OP_EXISTS = "$exists"
 MONGO_OP_GROUP = "$group"
+MONGO_OP_COUNT = "$count"
 
 # Default limits for backward compatibility (pagination-ready: callers can pass skip/limit)
 DEFAULT_WORKSPACES_LIST_LIMIT = 1000
@@ -221,6 +224,71 @@ class AdminRepository:
         """Count workspaces matching criteria"""
         return await self.workspace_repo.count(criteria)
     
+    async def get_platform_counts(self, since: datetime) -> Dict:
+        """
+        All super-admin dashboard counters in one round trip per collection.
+
+        users and workspaces: one $facet aggregation each (one scan instead of one
+        count_documents per criterion); diagnostics and relationship_consultations:
+        estimated_document_count (collection metadata, no scan). The four run
+        concurrently.
+        """
+        users_pipeline = [
+            {"$project": {"_id": 0, "role": 1, "status": 1, "created_at": 1}},
+            {"$facet": {
+                "total_active": [{"$match": {"status": "active"}}, {MONGO_OP_COUNT: "n"}],
+                "active_managers": [{"$match": {"role": "manager", "status": "active"}}, {MONGO_OP_COUNT: "n"}],
+                "active_sellers": [{"$match": {"role": "seller", "status": "active"}}, {MONGO_OP_COUNT: "n"}],
+                "inactive": [{"$match": {"status": "suspended"}}, {MONGO_OP_COUNT: "n"}],
+                # created_at est un datetime ou une chaîne ISO selon l'origine du compte
+                "recent_signups": [{"$match": {"created_at": {"$gte": since}}}, {MONGO_OP_COUNT: "n"}],
+                "recent_analyses": [{"$match": {"created_at": {"$gte": since.isoformat()}}}, {MONGO_OP_COUNT: "n"}],
+            }},
+        ]
+        workspaces_pipeline = [
+            {"$project": {"_id": 0, "subscription_status": 1}},
+            {"$facet": {
+                "total": [{MONGO_OP_COUNT: "n"}],
+                "by_status": [{MONGO_OP_GROUP: {"_id": "$subscription_status", "n": {"$sum": 1}}}],
+            }},
+        ]
+
+        async def _facet(repo, pipeline) -> Dict:
+            rows = await repo.aggregate(pipeline, max_results=1)
+            return rows[0] if rows else {}
+
+        async def _estimated(collection) -> int:
+            try:
+                return await collection.estimated_document_count()
+            except Exception:
+                return 0
+
+        users, workspaces, diagnostics, consultations = await asyncio.gather(
+            _facet(self.user_repo, users_pipeline),
+            _facet(self.workspace_repo, workspaces_pipeline),
+            _estimated(self.db.diagnostics),
+            _estimated(self.db.relationship_consultations),
+        )
+
+        def _n(facet: Dict, name: str) -> int:
+            bucket = facet.get(name) or []
+            return bucket[0]["n"] if bucket else 0
+
+        by_status = {row["_id"]: row["n"] for row in workspaces.get("by_status") or []}
+        return {
+            "workspaces_total": _n(workspaces, "total"),
+            "workspaces_active": by_status.get("active", 0),
+            "workspaces_trialing": by_status.get("trialing", 0),
+            "users_active": _n(users, "total_active"),
+            "managers_active": _n(users, "active_managers"),
+            "sellers_active": _n(users, "active_sellers"),
+            "users_suspended": _n(users, "inactive"),
+            "recent_signups": _n(users, "recent_signups"),
+            "recent_analyses": _n(users, "recent_analyses"),
+            "diagnostics": diagnostics,
+            "relationship_consultations": consultations,
+        }
+
     async def count_diagnostics(self) -> int:
         """Count total diagnostics"""
         return await self.db.diagnostics.count_documents({})
@@ -285,6 +353,45 @@ class AdminRepository:
         ).sort("timestamp", -1).skip(skip).limit(size).to_list(size)
         return (items, total)
 
+    async def get_system_logs_page(
+        self,
+        time_threshold: datetime,
+        size: int = 50,
+        cursor: Optional[str] = None,
+    ) -> CursorPaginatedResponse:
+        """Keyset page of system logs (timestamp desc, _id as tie-breaker: logs have no id)."""
+        query = {"timestamp": {"$gte": time_threshold.isoformat()}}
+        for coll in (self.db.system_logs, self.db.logs):
+            try:
+                return await paginate_keyset(
+                    coll, query, sort=[("timestamp", -1)], size=size, cursor=cursor,
+                    projection={"_id": 0}, tie_breaker="_id", with_total=True,
+                )
+            except ValidationError:
+                raise
+            except Exception:
+                continue
+        return CursorPaginatedResponse(items=[], size=size, has_more=False, total=0)
+
+    async def get_admin_logs_page(
+        self,
+        time_threshold: datetime,
+        size: int = 50,
+        cursor: Optional[str] = None,
+        action: Optional[str] = None,
+        admin_emails: Optional[List[str]] = None
+    ) -> CursorPaginatedResponse:
+        """Keyset page of admin audit logs (timestamp desc, _id as tie-breaker)."""
+        query: Dict = {"timestamp": {"$gte": time_threshold.isoformat()}}
+        if action:
+            query["action"] = action
+        if admin_emails:
+            query["admin_email"] = {"$in": admin_emails}
+        return await paginate_keyset(
+            self.db.admin_logs, query, sort=[("timestamp", -1)], size=size, cursor=cursor,
+            projection={"_id": 0}, tie_breaker="_id", with_total=True,
+        )
+
     async def get_admin_actions(self, time_threshold: datetime) -> List[str]:
         """Get distinct admin actions within time window"""
         return await self.db.admin_logs.distinct(
@@ -3,10 +3,16 @@ Base Repository Pattern
 Provides common CRUD operations for all repositories.
 Phase 4: Cache-agnostic — no cache invalidation; Services call invalidate_* after write ops.
 """
+import time
 from typing import Optional, List, Dict, Any, AsyncIterator
 from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorCollection
 from datetime import datetime, timezone
 
+from config.limits import DEFAULT_PAGE_SIZE
+from core.query_profiler import get_query_profiler
+from models.pagination import CursorPaginatedResponse
+from utils.pagination import paginate_keyset
+
 
 class BaseRepository:
     """
@@ -26,6 +32,12 @@ class BaseRepository:
         self.collection_name = collection_name
         self.collection: AsyncIOMotorCollection = db[collection_name]
     
+    def _profile(self, op: str, filters: Optional[Dict[str, Any]], started: float, returned: int, **kwargs) -> None:
+        """Report a query to the query-shape profiler (no-op unless QUERY_PROFILER_ENABLED)."""
+        profiler = get_query_profiler()
+        if profiler.enabled:
+            profiler.record(self.collection, op, filters, (time.perf_counter() - started) * 1000, returned, **kwargs)
+    
     # ===== READ OPERATIONS =====
     
     async def find_one(
@@ -35,7 +47,10 @@ class BaseRepository:
     ) -> Optional[Dict]:
         """Find a single document"""
         projection = projection or {"_id": 0}
-        return await self.collection.find_one(filters, projection)
+        started = time.perf_counter()
+        doc = await self.collection.find_one(filters, projection)
+        self._profile("find_one", filters, started, 1 if doc else 0, projection=projection, limit=1)
+        return doc
     
     async def find_many(
         self,
@@ -63,7 +78,36 @@ class BaseRepository:
             cursor = cursor.sort(sort)
         
         cursor = cursor.skip(skip).limit(limit)
-        return await cursor.to_list(limit)
+        started = time.perf_counter()
+        docs = await cursor.to_list(limit)
+        self._profile("find", filters, started, len(docs), sort=sort, projection=projection, limit=limit)
+        return docs
+    
+    async def find_page(
+        self,
+        filters: Dict[str, Any],
+        sort: List[tuple],
+        size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        projection: Optional[Dict[str, int]] = None,
+        *,
+        tie_breaker: str = "id",
+        with_total: bool = False
+    ) -> CursorPaginatedResponse:
+        """
+        Keyset page (utils.pagination.paginate_keyset): constant cost at any depth,
+        unlike skip. Pass the returned next_cursor to get the following page.
+        """
+        return await paginate_keyset(
+            self.collection,
+            filters,
+            sort=sort,
+            size=size,
+            cursor=cursor,
+            projection=projection,
+            tie_breaker=tie_breaker,
+            with_total=with_total,
+        )
     
     async def find_iter(
         self,
@@ -78,16 +122,26 @@ class BaseRepository:
         cursor = self.collection.find(filters, projection)
         if sort:
             cursor = cursor.sort(sort)
-        async for doc in cursor:
-            yield doc
+        started, returned = time.perf_counter(), 0
+        try:
+            async for doc in cursor:
+                returned += 1
+                yield doc
+        finally:
+            self._profile("find", filters, started, returned, sort=sort, projection=projection)
     
     async def count(self, filters: Dict[str, Any]) -> int:
         """Count documents matching filters"""
-        return await self.collection.count_documents(filters)
+        started = time.perf_counter()
+        count = await self.collection.count_documents(filters)
+        self._profile("count", filters, started, count)
+        return count
     
     async def exists(self, filters: Dict[str, Any]) -> bool:
         """Check if document exists"""
+        started = time.perf_counter()
         count = await self.collection.count_documents(filters, limit=1)
+        self._profile("count", filters, started, count, limit=1)
         return count > 0
     
     async def distinct(self, field: str, filters: Optional[Dict[str, Any]] = None) -> List:
@@ -101,7 +155,10 @@ class BaseRepository:
         Returns:
             List of distinct values
         """
-        return await self.collection.distinct(field, filters or {})
+        started = time.perf_counter()
+        values = await self.collection.distinct(field, filters or {})
+        self._profile("distinct", filters, started, len(values), projection={field: 1})
+        return values
     
     # ===== WRITE OPERATIONS =====
     
@@ -138,7 +195,9 @@ class BaseRepository:
         else:
             update["$set"] = {"updated_at": datetime.now(timezone.utc)}
         
+        started = time.perf_counter()
         result = await self.collection.update_one(filters, update, upsert=upsert)
+        self._profile("update_one", filters, started, result.modified_count, limit=1)
         return result.modified_count > 0 or (upsert and result.upserted_id is not None)
     
     async def update_many(
@@ -151,7 +210,9 @@ class BaseRepository:
         Returns number of documents modified.
         Cache invalidation is the responsibility of the calling Service.
         """
+        started = time.perf_counter()
         result = await self.collection.update_many(filters, update)
+        self._profile("update_many", filters, started, result.modified_count)
         return result.modified_count
     
     async def delete_one(self, filters: Dict[str, Any]) -> bool:
@@ -160,7 +221,9 @@ class BaseRepository:
         Returns True if document was deleted.
         Cache invalidation is the responsibility of the calling Service.
         """
+        started = time.perf_counter()
         result = await self.collection.delete_one(filters)
+        self._profile("delete_one", filters, started, result.deleted_count, limit=1)
         return result.deleted_count > 0
     
     async def delete_many(self, filters: Dict[str, Any]) -> int:
@@ -168,7 +231,9 @@ class BaseRepository:
         Delete multiple documents
         Returns number of documents deleted
         """
+        started = time.perf_counter()
         result = await self.collection.delete_many(filters)
+        self._profile("delete_many", filters, started, result.deleted_count)
         return result.deleted_count
     
     # ===== AGGREGATION =====
@@ -205,13 +270,14 @@ class BaseRepository:
             Dict with operation counts
         """
         if not operations:
-            return {"inserted": 0, "updated": 0, "deleted": 0}
+            return {"inserted": 0, "updated": 0, "matched": 0, "deleted": 0, "upserted": 0}
         
         result = await self.collection.bulk_write(operations, ordered=False)
         
         return {
             "inserted": result.inserted_count,
             "updated": result.modified_count,
+            "matched": result.matched_count,
             "deleted": result.deleted_count,
             "upserted": result.upserted_count
         }
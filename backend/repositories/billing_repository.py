@@ -12,6 +12,23 @@ class BillingProfileRepository(BaseRepository):
     async def find_by_gerant(self, gerant_id: str) -> Optional[Dict]:
         """Find billing profile for a gérant"""
         return await self.find_one({"gerant_id": gerant_id})
+
+    async def find_by_gerant_ids(
+        self, gerant_ids: List[str], projection: Optional[Dict] = None
+    ) -> Dict[str, Dict]:
+        """
+        Batch fetch billing profiles ($in) keyed by gerant_id (first profile wins,
+        like find_by_gerant). Used by bulk jobs to avoid one lookup per gérant.
+        """
+        if not gerant_ids:
+            return {}
+        profiles: Dict[str, Dict] = {}
+        async for doc in self.find_iter(
+            {"gerant_id": {"$in": list(gerant_ids)}},
+            projection=projection or {"_id": 0},
+        ):
+            profiles.setdefault(doc.get("gerant_id"), doc)
+        return profiles
     
     async def find_by_id(self, profile_id: str) -> Optional[Dict]:
         """Find billing profile by ID"""
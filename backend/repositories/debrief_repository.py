@@ -39,6 +39,30 @@ class DebriefRepository(BaseRepository):
         sort = sort or [("created_at", -1)]
         return await self.find_many(filters, projection, limit, skip, sort)
     
+    async def find_recent_by_sellers(
+        self,
+        seller_ids: List[str],
+        per_seller: int = 5,
+    ) -> Dict[str, List[Dict]]:
+        """
+        Most recent debriefs of several sellers in one aggregation ($topN per seller_id).
+        Returns {seller_id: [debrief, ...]} newest first; sellers without debriefs are absent.
+        """
+        if not seller_ids:
+            return {}
+        pipeline = [
+            {"$match": {"seller_id": {"$in": list(seller_ids)}}},
+            {"$group": {
+                "_id": "$seller_id",
+                "debriefs": {"$topN": {"n": per_seller, "sortBy": {"created_at": -1}, "output": "$$ROOT"}},
+            }},
+        ]
+        rows = await self.aggregate(pipeline, max_results=len(seller_ids))
+        return {
+            row["_id"]: [{k: v for k, v in d.items() if k != "_id"} for d in row["debriefs"]]
+            for row in rows
+        }
+
     async def find_by_store(
         self,
         store_id: str,
@@ -18,6 +18,20 @@ class DiagnosticRepository(BaseRepository):
         )
         return results[0] if results else None
     
+    async def find_latest_by_sellers(self, seller_ids: List[str]) -> Dict[str, Dict]:
+        """Latest diagnostic per seller in one aggregation: {seller_id: diagnostic}."""
+        if not seller_ids:
+            return {}
+        pipeline = [
+            {"$match": {"seller_id": {"$in": list(seller_ids)}}},
+            {"$sort": {"seller_id": 1, "created_at": -1}},
+            {"$group": {"_id": "$seller_id", "doc": {"$first": "$$ROOT"}}},
+            {"$replaceRoot": {"newRoot": "$doc"}},
+            {"$project": {"_id": 0}},
+        ]
+        rows = await self.aggregate(pipeline, max_results=len(seller_ids))
+        return {row["seller_id"]: row for row in rows}
+
     async def find_all_by_seller(self, seller_id: str) -> List[Dict]:
         """Find all diagnostics for a seller"""
         return await self.find_many(
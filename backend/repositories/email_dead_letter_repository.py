@@ -0,0 +1,50 @@
+"""
+Email Dead Letter Repository
+Data access for email_dead_letters: messages the e-mail dispatcher could not
+deliver after all retries (or rejected permanently by the provider).
+"""
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from repositories.base_repository import BaseRepository
+
+
+class EmailDeadLetterRepository(BaseRepository):
+    """Repository for email_dead_letters collection (one document per undelivered message)."""
+
+    def __init__(self, db):
+        super().__init__(db, "email_dead_letters")
+
+    async def record(
+        self,
+        message: Dict,
+        error: str,
+        attempts: int,
+        status_code: Optional[int] = None,
+    ) -> str:
+        """Store an undelivered message with the last error (status pending = not replayed)."""
+        doc = {
+            "id": str(uuid.uuid4()),
+            **message,
+            "error": error,
+            "status_code": status_code,
+            "attempts": attempts,
+            "status": "pending",
+            "created_at": datetime.now(timezone.utc),
+        }
+        return await self.insert_one(doc)
+
+    async def find_pending(self, category: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """Oldest undelivered messages first (replay / monitoring)."""
+        filters = {"status": "pending"}
+        if category:
+            filters["category"] = category
+        return await self.find_many(filters, sort=[("created_at", 1)], limit=limit)
+
+    async def mark_replayed(self, dead_letter_id: str) -> bool:
+        """Flag a dead letter as re-sent."""
+        return await self.update_one(
+            {"id": dead_letter_id},
+            {"$set": {"status": "replayed", "replayed_at": datetime.now(timezone.utc)}},
+        )
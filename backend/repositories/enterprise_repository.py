@@ -129,10 +129,7 @@ class APIKeyRepository(BaseRepository):
         """Revoke (deactivate) an API key"""
         return await self.update_one(
             {"id": key_id, "enterprise_account_id": enterprise_id},
-            {
-                "is_active": False,
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }
+            {"$set": {"is_active": False}}
         )
 
 
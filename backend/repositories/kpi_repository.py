@@ -1,14 +1,157 @@
-"""KPI Repository - Data access for KPI entries (kpi_entries) and manager KPIs (manager_kpis)."""
-from typing import Optional, List, Dict
+"""
+KPI Repository - Data access for KPI entries (kpi_entries) and manager KPIs (manager_kpis).
+
+Every write also refreshes the store_daily_kpis rollup rows of the touched
+(store_id, date) keys (see StoreDailyKpiRepository): manual entry, integrations
+sync and bulk writes all go through these methods.
+"""
+import logging
+from typing import Any, Optional, List, Dict, Set, Tuple
+
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+
 from repositories.base_repository import BaseRepository
+from repositories.store_daily_kpi_repository import StoreDailyKpiRepository
+from utils.kpi_pipeline import build_daily_totals_facet_pipeline, build_daily_totals_pipeline
 from utils.kpi_ts import date_str_to_ts
 
+logger = logging.getLogger(__name__)
+
+_KEY_PROJECTION = {"_id": 0, "store_id": 1, "date": 1}
+
+
+class _StoreRollupMaintenance:
+    """
+    Write overrides that keep store_daily_kpis in sync with the collection.
+
+    Keys are taken from the written documents / filters when they carry both
+    store_id and date, otherwise read before the write (one query, batched
+    with $or for bulk writes). A rollup failure never fails the KPI write:
+    it is logged and repaired by rebuild_store_daily_kpis.py.
+    """
+
+    _rollup: Optional[StoreDailyKpiRepository] = None
+
+    @staticmethod
+    def _doc_key(doc: Dict) -> Optional[Tuple[str, str]]:
+        store_id, date = doc.get("store_id"), doc.get("date")
+        if isinstance(store_id, str) and isinstance(date, str):
+            return store_id, date
+        return None
+
+    async def _lookup_keys(self, filters: List[Dict]) -> Set[Tuple[str, str]]:
+        if not filters:
+            return set()
+        query = filters[0] if len(filters) == 1 else {"$or": filters}
+        keys = set()
+        async for doc in self.find_iter(query, _KEY_PROJECTION):
+            key = self._doc_key(doc)
+            if key:
+                keys.add(key)
+        return keys
+
+    async def _filter_keys(self, filters: Dict) -> Set[Tuple[str, str]]:
+        key = self._doc_key(filters)
+        return {key} if key else await self._lookup_keys([filters])
+
+    @staticmethod
+    def _moved_keys(keys: Set[Tuple[str, str]], update: Dict) -> Set[Tuple[str, str]]:
+        """Keys after an update that may $set store_id / date."""
+        set_fields = update.get("$set") or {}
+        if "store_id" not in set_fields and "date" not in set_fields:
+            return set()
+        return {(set_fields.get("store_id", s), set_fields.get("date", d)) for s, d in keys}
+
+    async def _refresh_rollup(self, keys: Set[Tuple[str, str]]) -> None:
+        if self._rollup is None or not keys:
+            return
+        try:
+            await self._rollup.refresh(keys)
+        except Exception as e:
+            logger.warning("store_daily_kpis refresh failed for %d key(s): %s", len(keys), e)
+
+    async def insert_one(self, document: Dict[str, Any]) -> str:
+        result = await super().insert_one(document)
+        key = self._doc_key(document)
+        await self._refresh_rollup({key} if key else set())
+        return result
+
+    async def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True) -> List[str]:
+        result = await super().insert_many(documents, ordered=ordered)
+        await self._refresh_rollup({k for k in map(self._doc_key, documents) if k})
+        return result
 
-class KPIRepository(BaseRepository):
+    async def update_one(self, filters: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> bool:
+        keys = await self._filter_keys(filters)
+        result = await super().update_one(filters, update, upsert=upsert)
+        if upsert and not keys:
+            key = self._doc_key({**filters, **(update.get("$set") or {})})
+            keys = {key} if key else set()
+        await self._refresh_rollup(keys | self._moved_keys(keys, update))
+        return result
+
+    async def update_many(self, filters: Dict[str, Any], update: Dict[str, Any]) -> int:
+        keys = await self._filter_keys(filters)
+        result = await super().update_many(filters, update)
+        await self._refresh_rollup(keys | self._moved_keys(keys, update))
+        return result
+
+    async def delete_one(self, filters: Dict[str, Any]) -> bool:
+        keys = await self._filter_keys(filters)
+        result = await super().delete_one(filters)
+        await self._refresh_rollup(keys)
+        return result
+
+    async def delete_many(self, filters: Dict[str, Any]) -> int:
+        keys = await self._filter_keys(filters)
+        result = await super().delete_many(filters)
+        await self._refresh_rollup(keys)
+        return result
+
+    async def bulk_write(self, operations: list) -> dict:
+        keys: Set[Tuple[str, str]] = set()
+        updates = []
+        lookups = []
+        for op in operations:
+            if isinstance(op, InsertOne):
+                key = self._doc_key(op._doc)
+                if key:
+                    keys.add(key)
+            elif isinstance(op, (UpdateOne, UpdateMany, ReplaceOne, DeleteOne, DeleteMany)):
+                key = self._doc_key(op._filter)
+                if key:
+                    keys.add(key)
+                else:
+                    lookups.append(op._filter)
+                if isinstance(op, ReplaceOne):
+                    key = self._doc_key(op._doc)
+                    if key:
+                        keys.add(key)
+                elif isinstance(op, (UpdateOne, UpdateMany)) and isinstance(op._doc, dict):
+                    updates.append(op)
+        if lookups:
+            try:
+                keys |= await self._lookup_keys(lookups)
+            except Exception as e:
+                logger.warning("store_daily_kpis key lookup failed: %s", e)
+
+        result = await super().bulk_write(operations)
+
+        for op in updates:
+            set_fields = op._doc.get("$set") or {}
+            key = self._doc_key({**op._filter, **set_fields})
+            if key:
+                keys.add(key)
+        await self._refresh_rollup(keys)
+        return result
+
+
+class KPIRepository(_StoreRollupMaintenance, BaseRepository):
     """Repository for kpi_entries collection (seller KPIs — MongoDB Time Series)."""
 
     def __init__(self, db):
         super().__init__(db, "kpi_entries")
+        self._rollup = StoreDailyKpiRepository(db)
 
     # ------------------------------------------------------------------
     # Time Series : injection automatique du champ `ts` (timeField)
@@ -25,7 +168,6 @@ class KPIRepository(BaseRepository):
         Execute bulk KPI write. Injects `ts` into InsertOne documents that have a
         `date` field but no `ts` field.
         """
-        from pymongo import InsertOne
         for op in operations:
             if isinstance(op, InsertOne):
                 doc = op._doc
@@ -37,6 +179,129 @@ class KPIRepository(BaseRepository):
         """Find KPI entry for a seller on a specific date"""
         return await self.find_one({"seller_id": seller_id, "date": date}, projection={"_id": 0})
     
+    async def find_existing_seller_dates(
+        self, seller_ids: List[str], dates: List[str]
+    ) -> Set[Tuple[str, str]]:
+        """
+        Set-based existence check for (seller_id, date) pairs (integrations sync).
+
+        One query with two $in filters instead of one find_one per entry. The
+        result may contain pairs that were not asked for (cartesian product of
+        the two lists): callers intersect with their own keys.
+        """
+        if not seller_ids or not dates:
+            return set()
+        existing: Set[Tuple[str, str]] = set()
+        async for doc in self.find_iter(
+            {"seller_id": {"$in": list(seller_ids)}, "date": {"$in": list(dates)}},
+            projection={"_id": 0, "seller_id": 1, "date": 1},
+        ):
+            existing.add((doc.get("seller_id"), doc.get("date")))
+        return existing
+
+    async def aggregate_weekly_store_recap(
+        self,
+        store_ids: List[str],
+        prev_week_start: str,
+        week_start: str,
+        week_end: str,
+    ) -> Dict[str, Dict]:
+        """
+        Weekly recap for many stores in one aggregation ($facet).
+
+        Scans [prev_week_start, week_end] once and splits on week_start:
+        - stores      : CA / ventes of the week and CA of the previous week per store
+        - top_sellers : best seller (by CA) of the week per store
+
+        Returns {store_id: {"ca", "ventes", "ca_prev", "top_seller_id", "top_seller_ca"}};
+        stores without any entry in the window are absent.
+        """
+        if not store_ids:
+            return {}
+        ca_expr = {"$ifNull": ["$seller_ca", {"$ifNull": ["$ca_journalier", 0]}]}
+        in_week = {"$gte": ["$date", week_start]}
+        pipeline = [
+            {"$match": {
+                "store_id": {"$in": list(store_ids)},
+                "date": {"$gte": prev_week_start, "$lte": week_end},
+            }},
+            {"$facet": {
+                "stores": [
+                    {"$group": {
+                        "_id": "$store_id",
+                        "ca": {"$sum": {"$cond": [in_week, ca_expr, 0]}},
+                        "ventes": {"$sum": {"$cond": [in_week, {"$ifNull": ["$nb_ventes", 0]}, 0]}},
+                        "ca_prev": {"$sum": {"$cond": [in_week, 0, ca_expr]}},
+                    }},
+                ],
+                "top_sellers": [
+                    {"$match": {"date": {"$gte": week_start}}},
+                    {"$group": {
+                        "_id": {"store_id": "$store_id", "seller_id": "$seller_id"},
+                        "ca": {"$sum": ca_expr},
+                    }},
+                    {"$sort": {"ca": -1, "_id.seller_id": 1}},
+                    {"$group": {
+                        "_id": "$_id.store_id",
+                        "seller_id": {"$first": "$_id.seller_id"},
+                        "ca": {"$first": "$ca"},
+                    }},
+                ],
+            }},
+        ]
+        result = await self.aggregate(pipeline, max_results=1)
+        facets = result[0] if result else {}
+
+        recap: Dict[str, Dict] = {}
+        for row in facets.get("stores", []):
+            recap[row["_id"]] = {
+                "ca": row.get("ca", 0),
+                "ventes": row.get("ventes", 0),
+                "ca_prev": row.get("ca_prev", 0),
+                "top_seller_id": None,
+                "top_seller_ca": 0,
+            }
+        for row in facets.get("top_sellers", []):
+            entry = recap.get(row["_id"])
+            if entry is not None:
+                entry["top_seller_id"] = row.get("seller_id")
+                entry["top_seller_ca"] = row.get("ca", 0)
+        return recap
+
+    async def aggregate_store_days(
+        self,
+        store_ids: List[str],
+        start_date: str,
+        end_date: str,
+    ) -> Dict[str, Dict[str, Dict]]:
+        """
+        Daily totals of many stores in one aggregation (morning brief pre-generation).
+
+        Returns {store_id: {date: {"ca", "ventes", "articles", "prospects", "sellers"}}}
+        where sellers is the list of {"seller_id", "ca"} entries of that day.
+        """
+        if not store_ids:
+            return {}
+        pipeline = [
+            {"$match": {
+                "store_id": {"$in": list(store_ids)},
+                "date": {"$gte": start_date, "$lte": end_date},
+            }},
+            {"$group": {
+                "_id": {"store_id": "$store_id", "date": "$date"},
+                "ca": {"$sum": {"$ifNull": ["$ca_journalier", 0]}},
+                "ventes": {"$sum": {"$ifNull": ["$nb_ventes", 0]}},
+                "articles": {"$sum": {"$ifNull": ["$nb_articles", 0]}},
+                "prospects": {"$sum": {"$ifNull": ["$nb_prospects", 0]}},
+                "sellers": {"$push": {"seller_id": "$seller_id", "ca": {"$ifNull": ["$ca_journalier", 0]}}},
+            }},
+        ]
+        days: Dict[str, Dict[str, Dict]] = {}
+        for row in await self.aggregate(pipeline, max_results=None):
+            key = row.pop("_id")
+            days.setdefault(key["store_id"], {})[key["date"]] = row
+        return days
+
     async def find_by_seller(self, seller_id: str, limit: int = 1000) -> List[Dict]:
         """Find all KPI entries for a seller"""
         return await self.find_many(
@@ -142,12 +407,32 @@ class KPIRepository(BaseRepository):
             "total_prospects": 0
         }
 
+    async def aggregate_daily_totals(self, query: Dict, date_range: Dict) -> List[Dict]:
+        """
+        Per-day totals (ca_journalier, nb_ventes, nb_articles) over date_range, sorted by date.
+        One document per day with data — raw entries never leave MongoDB.
+        """
+        pipeline = build_daily_totals_pipeline({**query, "date": date_range})
+        return await self.aggregate(pipeline, max_results=None)
+
+    async def aggregate_daily_totals_facets(self, queries: Dict[str, Dict], date_range: Dict) -> Dict[str, List[Dict]]:
+        """aggregate_daily_totals for several named queries in one aggregation: {name: daily rows}."""
+        if not queries:
+            return {}
+        pipeline = build_daily_totals_facet_pipeline(
+            {name: {**query, "date": date_range} for name, query in queries.items()}
+        )
+        result = await self.aggregate(pipeline, max_results=1)
+        facets = result[0] if result else {}
+        return {name: facets.get(name, []) for name in queries}
+
 
-class ManagerKPIRepository(BaseRepository):
+class ManagerKPIRepository(_StoreRollupMaintenance, BaseRepository):
     """Repository for manager_kpis collection"""
     
     def __init__(self, db):
         super().__init__(db, "manager_kpis")
+        self._rollup = StoreDailyKpiRepository(db)
     
     async def find_by_manager_and_date(self, manager_id: str, date: str) -> Optional[Dict]:
         """Find KPI entry for a manager on a specific date"""
@@ -259,3 +544,22 @@ class ManagerKPIRepository(BaseRepository):
             "total_articles": 0,
             "total_prospects": 0
         }
+
+    async def aggregate_daily_totals(self, query: Dict, date_range: Dict) -> List[Dict]:
+        """
+        Per-day totals (ca_journalier, nb_ventes, nb_articles) over date_range, sorted by date.
+        One document per day with data — raw entries never leave MongoDB.
+        """
+        pipeline = build_daily_totals_pipeline({**query, "date": date_range})
+        return await self.aggregate(pipeline, max_results=None)
+
+    async def aggregate_daily_totals_facets(self, queries: Dict[str, Dict], date_range: Dict) -> Dict[str, List[Dict]]:
+        """aggregate_daily_totals for several named queries in one aggregation: {name: daily rows}."""
+        if not queries:
+            return {}
+        pipeline = build_daily_totals_facet_pipeline(
+            {name: {**query, "date": date_range} for name, query in queries.items()}
+        )
+        result = await self.aggregate(pipeline, max_results=1)
+        facets = result[0] if result else {}
+        return {name: facets.get(name, []) for name in queries}
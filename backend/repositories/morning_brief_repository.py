@@ -2,7 +2,7 @@
 Morning Brief Repository - Data access for morning briefs
 Security: All methods require store_id or manager_id to prevent IDOR
 """
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Set
 from repositories.base_repository import BaseRepository
 
 
@@ -189,3 +189,17 @@ class MorningBriefRepository(BaseRepository):
             sort=[("generated_at", -1)],
         )
         return results[0] if results else None
+
+    async def find_briefed_store_ids(self, store_ids: List[str], today_date_str: str) -> Set[str]:
+        """Stores (among store_ids) that already have an uncustomized brief generated today."""
+        if not store_ids:
+            return set()
+        found = await self.distinct(
+            "store_id",
+            {
+                "store_id": {"$in": list(store_ids)},
+                "generated_at": {"$gte": f"{today_date_str}T00:00:00"},
+                "$or": [{"context": None}, {"context": ""}],
+            },
+        )
+        return set(found)
@@ -5,24 +5,44 @@ TTL: 30 days (index on created_at)
 """
 from typing import List, Dict, Optional
 from datetime import datetime, timezone
+from uuid import uuid4
 from repositories.base_repository import BaseRepository
 
 
+def build_notification(
+    user_id: str, notif_type: str, title: str, message: str, data: Optional[Dict] = None
+) -> Dict:
+    """Notification document (id used by PATCH /notifications/{id}/read)."""
+    return {
+        "id": str(uuid4()),
+        "user_id": user_id,
+        "type": notif_type,
+        "title": title,
+        "message": message,
+        "read": False,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "data": data or {},
+    }
+
+
 class NotificationRepository(BaseRepository):
     def __init__(self, db):
         super().__init__(db, "notifications")
 
     async def create(self, user_id: str, notif_type: str, title: str, message: str, data: Optional[Dict] = None) -> Dict:
-        doc = {
-            "user_id": user_id,
-            "type": notif_type,
-            "title": title,
-            "message": message,
-            "read": False,
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "data": data or {},
-        }
-        return await self.insert_one(doc)
+        doc = build_notification(user_id, notif_type, title, message, data)
+        await self.insert_one(doc)
+        doc.pop("_id", None)
+        return doc
+
+    async def create_many(self, docs: List[Dict]) -> int:
+        """Bulk insert (job fan-out): one round-trip instead of one per notification."""
+        if not docs:
+            return 0
+        await self.insert_many(docs, ordered=False)
+        for doc in docs:
+            doc.pop("_id", None)
+        return len(docs)
 
     async def find_for_user(self, user_id: str, limit: int = 20) -> List[Dict]:
         """Last `limit` notifications, unread first then by date desc."""
@@ -37,15 +57,14 @@ class NotificationRepository(BaseRepository):
         return await self.count({"user_id": user_id, "read": False})
 
     async def mark_read(self, notif_id: str, user_id: str) -> bool:
-        result = await self.update_one(
-            {"id": notif_id, "user_id": user_id},
+        """True only if the notification was unread (drives the unread counter)."""
+        return await self.update_one(
+            {"id": notif_id, "user_id": user_id, "read": False},
             {"$set": {"read": True}},
         )
-        return result.modified_count > 0
 
     async def mark_all_read(self, user_id: str) -> int:
-        result = await self.update_many(
+        return await self.update_many(
             {"user_id": user_id, "read": False},
             {"$set": {"read": True}},
         )
-        return result.modified_count
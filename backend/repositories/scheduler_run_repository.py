@@ -0,0 +1,99 @@
+"""
+Scheduler Run Repository
+Data access for scheduler_runs (one document per scheduled job run) and
+scheduler_locks (Mongo fallback of the cluster leader lease).
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from repositories.base_repository import BaseRepository
+
+
+class SchedulerRunRepository(BaseRepository):
+    """
+    Repository for scheduler_runs collection.
+
+    _id = "<job_id>:<run_key>" (ex: "weekly-gerant-recap:2026-10-19") so a run
+    is unique per job and period across the whole cluster.
+    """
+
+    def __init__(self, db):
+        super().__init__(db, "scheduler_runs")
+
+    @staticmethod
+    def run_id(job_id: str, run_key: str) -> str:
+        return f"{job_id}:{run_key}"
+
+    async def find_run(self, job_id: str, run_key: str) -> Optional[Dict]:
+        """Find the run record for a job period (None if never started)."""
+        return await self.find_one({"_id": self.run_id(job_id, run_key)})
+
+    async def start_run(self, doc: Dict) -> None:
+        """Create or take over the run record (upsert on _id)."""
+        fields = {k: v for k, v in doc.items() if k != "_id"}
+        await self.collection.update_one({"_id": doc["_id"]}, {"$set": fields}, upsert=True)
+
+    async def update_run(self, run_id: str, fields: Dict, owner: Optional[str] = None) -> bool:
+        """Update a run record (restricted to the current owner when provided)."""
+        filters = {"_id": run_id}
+        if owner:
+            filters["owner"] = owner
+        result = await self.collection.update_one(filters, {"$set": fields})
+        return result.matched_count > 0
+
+    async def find_resumable_runs(self, now: datetime, started_after: datetime, limit: int = 20) -> List[Dict]:
+        """
+        Runs recent enough to be resumed: still 'running' with an expired lease (leader died),
+        or 'failed' / 'interrupted' with a retry due (retry_at None = attempts exhausted).
+        """
+        return await self.find_many(
+            {
+                "$or": [
+                    {"status": "running", "lease_expires_at": {"$lte": now}},
+                    {"status": {"$in": ["failed", "interrupted"]}, "retry_at": {"$lte": now}},
+                ],
+                "started_at": {"$gte": started_after},
+            },
+            sort=[("started_at", 1)],
+            limit=limit,
+        )
+
+    async def find_recent_runs(self, job_id: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Latest run records (monitoring)."""
+        filters = {"job_id": job_id} if job_id else {}
+        return await self.find_many(filters, sort=[("started_at", -1)], limit=limit)
+
+
+class SchedulerLockRepository(BaseRepository):
+    """Repository for scheduler_locks collection (lease = owner + expires_at)."""
+
+    def __init__(self, db):
+        super().__init__(db, "scheduler_locks")
+
+    async def try_acquire(self, name: str, owner: str, now: datetime, expires_at: datetime) -> bool:
+        """
+        Atomically take the lease if free, expired, or already ours.
+        A concurrent holder makes the upsert collide on _id → DuplicateKeyError → False.
+        """
+        try:
+            await self.collection.update_one(
+                {"_id": name, "$or": [{"expires_at": {"$lte": now}}, {"owner": owner}]},
+                {"$set": {"owner": owner, "expires_at": expires_at}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def renew(self, name: str, owner: str, expires_at: datetime) -> bool:
+        """Extend the lease if still held by owner."""
+        result = await self.collection.update_one(
+            {"_id": name, "owner": owner}, {"$set": {"expires_at": expires_at}}
+        )
+        return result.matched_count > 0
+
+    async def release(self, name: str, owner: str) -> None:
+        """Release the lease if still held by owner."""
+        await self.collection.delete_one({"_id": name, "owner": owner})
@@ -0,0 +1,168 @@
+"""
+Store Daily KPI Repository - materialized rollup of kpi_entries + manager_kpis
+(collection store_daily_kpis, one row per store and day).
+
+Maintained on every write through KPIRepository / ManagerKPIRepository
+(refresh of the touched (store_id, date) keys), rebuilt by
+rebuild_store_daily_kpis.py. Resolution rules live in utils/kpi_rollup.py.
+
+Reads (history, calendar, available years) are O(days) instead of
+O(sellers × days) raw entries.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from pymongo import DeleteOne, ReplaceOne
+
+from repositories.base_repository import BaseRepository
+from utils.kpi_rollup import build_store_daily_rows, rows_differ
+
+logger = logging.getLogger(__name__)
+
+RollupKey = Tuple[str, str]
+
+_RAW_SELLER_PROJECTION = {
+    "_id": 0, "store_id": 1, "seller_id": 1, "date": 1, "created_by": 1, "locked": 1,
+    "seller_ca": 1, "ca_journalier": 1, "nb_ventes": 1, "nb_clients": 1, "nb_articles": 1, "nb_prospects": 1,
+}
+_RAW_MANAGER_PROJECTION = {"_id": 0, "store_id": 1, "date": 1, "locked": 1, "nb_prospects": 1}
+
+# Taille max d'un $or / bulk_write de refresh
+REFRESH_BATCH_SIZE = 500
+
+
+def _date_filter(start: Optional[str], end: Optional[str]) -> Optional[Dict]:
+    date_filter = {}
+    if start:
+        date_filter["$gte"] = start
+    if end:
+        date_filter["$lte"] = end
+    return date_filter or None
+
+
+class StoreDailyKpiRepository(BaseRepository):
+    """Repository for store_daily_kpis (rollup rows keyed by store_id + date)."""
+
+    def __init__(self, db):
+        super().__init__(db, "store_daily_kpis")
+
+    # ===== MAINTENANCE =====
+
+    async def refresh(self, keys: Iterable[RollupKey]) -> int:
+        """
+        Recompute the rollup rows of the given (store_id, date) keys from raw data.
+        Constant number of queries per batch of keys: 2 finds + 1 bulk_write.
+        Rows whose raw data disappeared are deleted. Returns the number of keys refreshed.
+        """
+        keys = sorted({(s, d) for s, d in keys if s and d})
+        for start in range(0, len(keys), REFRESH_BATCH_SIZE):
+            await self._refresh_batch(keys[start:start + REFRESH_BATCH_SIZE])
+        return len(keys)
+
+    async def rebuild_store(self, store_id: str, start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """Recompute every row of a store (optionally a date range). Returns rows written."""
+        expected = await self._compute_from_raw(store_id, start, end)
+        query: Dict = {"store_id": store_id}
+        date_filter = _date_filter(start, end)
+        if date_filter:
+            query["date"] = date_filter
+        stale = [
+            doc["date"] async for doc in self.find_iter(query, {"_id": 0, "date": 1})
+            if doc["date"] not in expected
+        ]
+        now = datetime.now(timezone.utc)
+        operations = [
+            ReplaceOne({"store_id": store_id, "date": date}, {**row, "updated_at": now}, upsert=True)
+            for date, row in expected.items()
+        ] + [DeleteOne({"store_id": store_id, "date": date}) for date in stale]
+        for offset in range(0, len(operations), REFRESH_BATCH_SIZE):
+            await self.bulk_write(operations[offset:offset + REFRESH_BATCH_SIZE])
+        return len(expected)
+
+    async def check_store(self, store_id: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        """
+        Compare stored rows with a recomputation from raw data.
+        Returns the mismatches: [{"store_id", "date", "problem": missing|orphan|mismatch, "fields"}].
+        """
+        expected = await self._compute_from_raw(store_id, start, end)
+        stored = {row["date"]: row for row in await self.find_range(store_id, start, end)}
+        problems = []
+        for date in sorted(set(expected) | set(stored)):
+            if date not in stored:
+                problems.append({"store_id": store_id, "date": date, "problem": "missing", "fields": []})
+            elif date not in expected:
+                problems.append({"store_id": store_id, "date": date, "problem": "orphan", "fields": []})
+            else:
+                fields = rows_differ(expected[date], stored[date])
+                if fields:
+                    problems.append({"store_id": store_id, "date": date, "problem": "mismatch", "fields": fields})
+        return problems
+
+    # ===== READS =====
+
+    async def find_range(self, store_id: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        """Rows of a store sorted by date (inclusive bounds)."""
+        query: Dict = {"store_id": store_id}
+        date_filter = _date_filter(start, end)
+        if date_filter:
+            query["date"] = date_filter
+        return [row async for row in self.find_iter(query, {"_id": 0}, sort=[("date", 1)])]
+
+    async def find_calendar(self, store_id: str, date_filter: Optional[Dict] = None) -> List[Dict]:
+        """Calendar projection (date, seller_locked, locked_seller_ids) — date_filter is a raw Mongo condition."""
+        query: Dict = {"store_id": store_id}
+        if date_filter:
+            query["date"] = date_filter
+        projection = {"_id": 0, "date": 1, "seller_locked": 1, "locked_seller_ids": 1}
+        return [row async for row in self.find_iter(query, projection, sort=[("date", 1)])]
+
+    async def find_years(self, store_id: str) -> List[int]:
+        """Years with data, most recent first."""
+        years = await self.distinct("year", {"store_id": store_id})
+        return sorted((y for y in years if isinstance(y, int)), reverse=True)
+
+    # ===== INTERNALS =====
+
+    async def _refresh_batch(self, keys: List[RollupKey]) -> None:
+        dates_by_store: Dict[str, Set[str]] = defaultdict(set)
+        for store_id, date in keys:
+            dates_by_store[store_id].add(date)
+        raw_filter = {"$or": [
+            {"store_id": store_id, "date": {"$in": sorted(dates)}}
+            for store_id, dates in dates_by_store.items()
+        ]}
+
+        seller_by_store: Dict[str, List[Dict]] = defaultdict(list)
+        async for entry in self._iter_raw(self.db["kpi_entries"], raw_filter, _RAW_SELLER_PROJECTION):
+            seller_by_store[entry.get("store_id")].append(entry)
+        manager_by_store: Dict[str, List[Dict]] = defaultdict(list)
+        async for kpi in self._iter_raw(self.db["manager_kpis"], raw_filter, _RAW_MANAGER_PROJECTION):
+            manager_by_store[kpi.get("store_id")].append(kpi)
+
+        now = datetime.now(timezone.utc)
+        operations = []
+        for store_id, dates in dates_by_store.items():
+            rows = build_store_daily_rows(store_id, seller_by_store.get(store_id, []), manager_by_store.get(store_id, []))
+            for date in dates:
+                row = rows.get(date)
+                if row is None:
+                    operations.append(DeleteOne({"store_id": store_id, "date": date}))
+                else:
+                    operations.append(ReplaceOne({"store_id": store_id, "date": date}, {**row, "updated_at": now}, upsert=True))
+        await self.bulk_write(operations)
+
+    async def _compute_from_raw(self, store_id: str, start: Optional[str], end: Optional[str]) -> Dict[str, Dict]:
+        query: Dict = {"store_id": store_id}
+        date_filter = _date_filter(start, end)
+        if date_filter:
+            query["date"] = date_filter
+        seller_entries = [e async for e in self._iter_raw(self.db["kpi_entries"], query, _RAW_SELLER_PROJECTION)]
+        manager_kpis = [k async for k in self._iter_raw(self.db["manager_kpis"], query, _RAW_MANAGER_PROJECTION)]
+        return build_store_daily_rows(store_id, seller_entries, manager_kpis)
+
+    @staticmethod
+    async def _iter_raw(collection, query: Dict, projection: Dict):
+        async for doc in collection.find(query, projection):
+            yield doc
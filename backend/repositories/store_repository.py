@@ -93,6 +93,24 @@ class StoreRepository(BaseRepository):
             skip
         )
     
+    async def find_active_by_gerant_ids(
+        self,
+        gerant_ids: List[str],
+        projection: Optional[Dict] = None,
+    ) -> List[Dict]:
+        """
+        Batch fetch active stores for several gérants ($in). Used by bulk jobs
+        (weekly recap) to avoid one lookup per gérant; callers group by gerant_id.
+        """
+        if not gerant_ids:
+            return []
+        return [
+            doc async for doc in self.find_iter(
+                {"gerant_id": {"$in": list(gerant_ids)}, "active": True},
+                projection=projection or {"_id": 0},
+            )
+        ]
+
     # ===== COUNT OPERATIONS =====
     
     async def count_by_gerant(self, gerant_id: str, active_only: bool = False) -> int:
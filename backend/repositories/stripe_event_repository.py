@@ -1,9 +1,26 @@
 """
 Stripe Event Repository
-Data access for stripe_events collection (webhook idempotency / audit).
+Data access for stripe_events collection (webhook idempotency / audit + work queue).
+
+Queue fields (services/stripe_webhook_queue.py) :
+- status         : pending → processing → processed | failed (retries exhausted)
+- ordering_key   : events sharing a key (one Stripe customer) are processed in order
+- available_at   : not before (retry backoff)
+- lease_owner / lease_expires_at : worker processing the event
+- payload        : the verified Stripe event, replayed as-is
+
+Documents written before the queue have no status: they count as processed.
 """
 from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
 from repositories.base_repository import BaseRepository
+from repositories.scheduler_run_repository import SchedulerLockRepository
+
+PROCESSED_STATUSES = ["processed", None]
+OPEN_STATUSES = ["pending", "processing"]
 
 
 class StripeEventRepository(BaseRepository):
@@ -14,14 +31,146 @@ class StripeEventRepository(BaseRepository):
 
     async def exists(self, event_id: str) -> bool:
         """Return True if this Stripe event was already processed (idempotency check)."""
-        doc = await self.find_one({"event_id": event_id}, {"_id": 1})
+        doc = await self.find_one({"event_id": event_id, "status": {"$in": PROCESSED_STATUSES}}, {"_id": 1})
         return doc is not None
 
     async def mark_processed(self, event_id: str, event_type: str, stripe_created: int) -> None:
         """Persist a processed Stripe event to prevent double-processing after restart."""
-        await self.insert_one({
-            "event_id": event_id,
-            "event_type": event_type,
-            "stripe_created": stripe_created,
-            "processed_at": datetime.now(timezone.utc).isoformat(),
-        })
+        await self.collection.update_one(
+            {"event_id": event_id},
+            {
+                "$set": {"status": "processed", "processed_at": datetime.now(timezone.utc).isoformat()},
+                "$setOnInsert": {"event_type": event_type, "stripe_created": stripe_created},
+            },
+            upsert=True,
+        )
+
+    # ===== QUEUE =====
+
+    async def enqueue(self, event: Dict, ordering_key: str, now: datetime) -> bool:
+        """Store a verified event as pending. False if Stripe already delivered it."""
+        try:
+            await self.collection.insert_one({
+                "event_id": event["id"],
+                "event_type": event.get("type"),
+                "stripe_created": event.get("created") or 0,
+                "ordering_key": ordering_key,
+                "payload": event,
+                "status": "pending",
+                "attempts": 0,
+                "received_at": now,
+                "available_at": now,
+            })
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def ready_keys(self, now: datetime, limit: int) -> List[str]:
+        """
+        Ordering keys whose head event is ready (or abandoned by a dead worker), oldest first.
+        Grouped per key before the limit: a customer with many events behind a head in
+        backoff takes no slot from the other keys.
+        """
+        pipeline = [
+            {"$match": {"status": {"$in": OPEN_STATUSES}}},
+            {"$sort": {"ordering_key": 1, "stripe_created": 1, "received_at": 1}},
+            {"$group": {
+                "_id": "$ordering_key",
+                "status": {"$first": "$status"},
+                "available_at": {"$first": "$available_at"},
+                "lease_expires_at": {"$first": "$lease_expires_at"},
+            }},
+            {"$match": {"$or": [
+                {"status": "pending", "available_at": {"$lte": now}},
+                {"status": "processing", "lease_expires_at": {"$lte": now}},
+            ]}},
+            {"$sort": {"available_at": 1}},
+            {"$limit": limit},
+        ]
+        return [doc["_id"] for doc in await self.aggregate(pipeline, max_results=limit)]
+
+    async def head_of(self, ordering_key: str) -> Optional[Dict]:
+        """Oldest unfinished event of a key (Stripe creation order, then arrival)."""
+        docs = await self.find_many(
+            {"ordering_key": ordering_key, "status": {"$in": OPEN_STATUSES}},
+            projection={"_id": 0},
+            sort=[("stripe_created", 1), ("received_at", 1)],
+            limit=1,
+        )
+        return docs[0] if docs else None
+
+    async def claim(self, event_id: str, owner: str, lease_expires_at: datetime) -> bool:
+        result = await self.collection.update_one(
+            {"event_id": event_id, "status": {"$in": OPEN_STATUSES}},
+            {"$set": {"status": "processing", "lease_owner": owner, "lease_expires_at": lease_expires_at}},
+        )
+        return result.modified_count > 0
+
+    async def complete(self, event_id: str, result_status: Optional[str], lag_ms: int) -> None:
+        await self.collection.update_one(
+            {"event_id": event_id},
+            {
+                "$set": {
+                    "status": "processed",
+                    "result_status": result_status,
+                    "lag_ms": lag_ms,
+                    "processed_at": datetime.now(timezone.utc).isoformat(),
+                },
+                "$unset": {"lease_owner": "", "lease_expires_at": ""},
+            },
+        )
+
+    async def fail(self, event_id: str, attempts: int, error: str, retry_at: Optional[datetime]) -> None:
+        """Schedule a retry at retry_at, or park the event as failed when None."""
+        fields = {"attempts": attempts, "last_error": error[:500]}
+        if retry_at is None:
+            fields.update(status="failed", failed_at=datetime.now(timezone.utc).isoformat())
+        else:
+            fields.update(status="pending", available_at=retry_at)
+        await self.collection.update_one(
+            {"event_id": event_id},
+            {"$set": fields, "$unset": {"lease_owner": "", "lease_expires_at": ""}},
+        )
+
+    async def requeue(self, filters: Dict, now: datetime) -> int:
+        """Put matching events (with a stored payload) back in the queue (replay)."""
+        result = await self.collection.update_many(
+            {**filters, "payload": {"$exists": True}},
+            {
+                "$set": {"status": "pending", "attempts": 0, "available_at": now},
+                "$unset": {"lease_owner": "", "lease_expires_at": "", "last_error": ""},
+            },
+        )
+        return result.modified_count
+
+    async def queue_metrics(self, now: datetime, sample: int = 200) -> Dict:
+        counts = {
+            status: await self.count({"status": status})
+            for status in ("pending", "processing", "failed")
+        }
+        oldest = await self.find_many(
+            {"status": {"$in": OPEN_STATUSES}}, projection={"_id": 0, "received_at": 1},
+            sort=[("received_at", 1)], limit=1,
+        )
+        recent = await self.find_many(
+            {"status": "processed", "lag_ms": {"$exists": True}}, projection={"_id": 0, "lag_ms": 1},
+            sort=[("processed_at", -1)], limit=sample,
+        )
+        lags = sorted(doc["lag_ms"] for doc in recent)
+        oldest_at = oldest[0]["received_at"] if oldest else None
+        if oldest_at is not None and oldest_at.tzinfo is None:
+            oldest_at = oldest_at.replace(tzinfo=timezone.utc)
+        return {
+            **counts,
+            "oldest_open_age_seconds": round((now - oldest_at).total_seconds(), 1) if oldest_at else 0,
+            "lag_ms_p50": lags[len(lags) // 2] if lags else None,
+            "lag_ms_p95": lags[min(len(lags) - 1, int(len(lags) * 0.95))] if lags else None,
+            "lag_sample": len(lags),
+        }
+
+
+class StripeEventLockRepository(SchedulerLockRepository):
+    """Per-ordering-key leases (stripe_event_locks): one worker drains a customer's events at a time."""
+
+    def __init__(self, db):
+        BaseRepository.__init__(self, db, "stripe_event_locks")
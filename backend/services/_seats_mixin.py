@@ -115,7 +115,7 @@ class SeatsMixin:
         if not is_trial and subscription_item_id:
             try:
                 # CRITICAL: Call Stripe BEFORE updating local DB (atomicity)
-                self.stripe.modify_subscription_item(
+                await self.stripe.modify_subscription_item(
                     subscription_item_id,
                     quantity=new_seats,
                     proration_behavior='create_prorations',
@@ -126,7 +126,7 @@ class SeatsMixin:
                 try:
                     stripe_sub_id = subscription.get('stripe_subscription_id')
                     if stripe_sub_id:
-                        upcoming = self.stripe.upcoming_invoice(stripe_sub_id)
+                        upcoming = await self.stripe.upcoming_invoice(stripe_sub_id)
                         proration_amount = upcoming.get('amount_due', 0) / 100
                 except Exception as e:
                     logger.warning(f"Could not fetch proration: {e}")
@@ -145,7 +145,7 @@ class SubscriptionWebhookMixin:
                 old_stripe_id = duplicate_check.get('stripe_subscription_id')
                 if old_stripe_id:
                     try:
-                        self.stripe.modify_subscription(old_stripe_id, cancel_at_period_end=True)
+                        await self.stripe.modify_subscription(old_stripe_id, cancel_at_period_end=True)
                         await self.subscription_repo.update_by_stripe_subscription(
                             old_stripe_id,
                             {
@@ -437,9 +437,9 @@ class SubscriptionWebhookMixin:
         billing_interval = 'month'  # Default
         if subscription_id:
             try:
-                stripe_sub = self.stripe.retrieve_subscription(subscription_id)
-                if stripe_sub.items.data:
-                    price = stripe_sub.items.data[0].price
+                stripe_sub = await self.stripe.retrieve_subscription(subscription_id)
+                if stripe_sub["items"].data:
+                    price = stripe_sub["items"].data[0].price
                     if price.recurring:
                         billing_interval = price.recurring.interval
             except Exception as e:
@@ -1,11 +1,12 @@
 """Admin user management methods for AdminService."""
 import uuid
-import bcrypt
 import secrets
 import logging
 from typing import Dict, Optional
 from datetime import datetime, timezone
 
+from core.password_hasher import get_password_hasher
+
 logger = logging.getLogger(__name__)
 
 
@@ -70,13 +71,13 @@ class AdminsMixin:
 
         # Generate temporary password
         temp_password = secrets.token_urlsafe(16)
-        hashed_password = bcrypt.hashpw(temp_password.encode('utf-8'), bcrypt.gensalt())
+        hashed_password = await get_password_hasher().hash(temp_password)
 
         # Create new super admin
         new_admin = {
             "id": str(uuid.uuid4()),
             "email": email,
-            "password": hashed_password.decode('utf-8'),
+            "password": hashed_password,
             "name": name,
             "role": "super_admin",
             "status": "active",
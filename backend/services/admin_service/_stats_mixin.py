@@ -3,12 +3,46 @@ import logging
 from typing import Dict, List, Optional
 from datetime import datetime, timezone, timedelta
 
-from config.limits import MAX_PAGE_SIZE
+from config.limits import ADMIN_STATS_MAX_AGE_SECONDS, ADMIN_STATS_TTL_SECONDS, MAX_PAGE_SIZE
 from core.constants import PRICE_PER_SEAT_STARTER
+from core.snapshot_cache import SnapshotCache
 from models.pagination import PaginatedResponse
 
 logger = logging.getLogger(__name__)
 
+# Partagé par toutes les instances d'AdminService du worker (une par requête)
+_platform_stats_cache = SnapshotCache(
+    "admin:platform_stats",
+    ttl_seconds=ADMIN_STATS_TTL_SECONDS,
+    max_age_seconds=ADMIN_STATS_MAX_AGE_SECONDS,
+)
+
+
+def _window_start(now: datetime, hours: int) -> datetime:
+    """
+    Start of a logs time window, floored to the minute: the query (and so the
+    cached total of utils.pagination._cached_total) stays the same for a minute.
+    """
+    return (now - timedelta(hours=hours)).replace(second=0, microsecond=0)
+
+
+def _pagination_fields(keyset_page, total: int, page: int, size: int) -> Dict:
+    """Pagination part of a logs response: page/pages (offset) or next_cursor/has_more (keyset)."""
+    if keyset_page is not None:
+        return {
+            "total": total,
+            "total_is_estimate": keyset_page.total_is_estimate,
+            "size": size,
+            "next_cursor": keyset_page.next_cursor,
+            "has_more": keyset_page.has_more,
+        }
+    return {
+        "total": total,
+        "page": page,
+        "size": size,
+        "pages": (total + size - 1) // size if total > 0 else 0,
+    }
+
 
 class StatsMixin:
 
@@ -65,56 +99,38 @@ class StatsMixin:
         """
         Get platform-wide statistics
         Returns structured data for frontend dashboard
+
+        Served from a short-TTL snapshot (stale-while-revalidate): polling admins
+        share one computation instead of re-counting users and workspaces.
         """
-        # Workspaces stats
-        total_workspaces = await self.admin_repo.count_workspaces_by_criteria({})
-        active_workspaces = await self.admin_repo.count_workspaces_by_criteria({"subscription_status": "active"})
-        trial_workspaces = await self.admin_repo.count_workspaces_by_criteria({"subscription_status": "trialing"})
-
-        # Users stats
-        total_active_users = await self.admin_repo.count_users_by_criteria({"status": "active"})
-        active_managers = await self.admin_repo.count_users_by_criteria({"role": "manager", "status": "active"})
-        active_sellers = await self.admin_repo.count_users_by_criteria({"role": "seller", "status": "active"})
-        inactive_users = await self.admin_repo.count_users_by_criteria({"status": "suspended"})
-
-        # Usage stats
-        total_diagnostics = await self.admin_repo.count_diagnostics()
-        total_ai_operations = await self.admin_repo.count_relationship_consultations()
-
-        # Revenue stats
-        active_subscriptions = await self.admin_repo.count_workspaces_by_criteria({
-            "subscription_status": "active"
-        })
-        trial_subscriptions = await self.admin_repo.count_workspaces_by_criteria({
-            "subscription_status": "trialing"
-        })
-        mrr = active_subscriptions * PRICE_PER_SEAT_STARTER  # Indicatif : basé sur le tarif Starter
+        stats, meta = await _platform_stats_cache.get(self._compute_platform_stats)
+        return {**stats, "cache": {"age_seconds": meta["age_seconds"], "stale": meta["stale"]}}
 
-        # Activity stats (recent signups and analyses)
+    async def _compute_platform_stats(self) -> Dict:
+        """All counters in two $facet aggregations + two metadata counts, run concurrently."""
         seven_days_ago = datetime.now(timezone.utc) - timedelta(days=7)
-        recent_signups = await self.admin_repo.count_users_by_criteria({
-            "created_at": {"$gte": seven_days_ago}
-        })
-        recent_analyses = await self.admin_repo.count_users_by_criteria({
-            "created_at": {"$gte": seven_days_ago.isoformat()}
-        })
+        counts = await self.admin_repo.get_platform_counts(since=seven_days_ago)
+
+        active_subscriptions = counts["workspaces_active"]
+        trial_subscriptions = counts["workspaces_trialing"]
+        mrr = active_subscriptions * PRICE_PER_SEAT_STARTER  # Indicatif : basé sur le tarif Starter
 
         return {
             "workspaces": {
-                "total": total_workspaces,
-                "active": active_workspaces,
-                "trial": trial_workspaces
+                "total": counts["workspaces_total"],
+                "active": active_subscriptions,
+                "trial": trial_subscriptions
             },
             "users": {
-                "total_active": total_active_users,
-                "active_managers": active_managers,
-                "active_sellers": active_sellers,
-                "inactive": inactive_users
+                "total_active": counts["users_active"],
+                "active_managers": counts["managers_active"],
+                "active_sellers": counts["sellers_active"],
+                "inactive": counts["users_suspended"]
             },
             "usage": {
-                "total_ai_operations": total_ai_operations,
+                "total_ai_operations": counts["relationship_consultations"],
                 "analyses_ventes": 0,
-                "diagnostics": total_diagnostics
+                "diagnostics": counts["diagnostics"]
             },
             "revenue": {
                 "mrr": mrr,
@@ -122,8 +138,8 @@ class StatsMixin:
                 "trial_subscriptions": trial_subscriptions
             },
             "activity": {
-                "recent_signups_7d": recent_signups,
-                "recent_analyses_7d": recent_analyses
+                "recent_signups_7d": counts["recent_signups"],
+                "recent_analyses_7d": counts["recent_analyses"]
             },
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
@@ -152,7 +168,8 @@ class StatsMixin:
         page: int = 1,
         size: int = 50,
         level: Optional[str] = None,
-        type_filter: Optional[str] = None
+        type_filter: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> Dict:
         """
         Get system logs filtered by time window (paginated).
@@ -161,17 +178,25 @@ class StatsMixin:
             hours: Number of hours to look back
             page: Page number (1-indexed)
             size: Number of items per page
+            cursor: Keyset pagination (None = page/size, "" = first page)
 
         Returns:
             Dict with items, total, page, size, pages and optional available_actions/admins
         """
         size = min(size, MAX_PAGE_SIZE)
         now = datetime.now(timezone.utc)
-        time_threshold = now - timedelta(hours=hours)
-
-        logs, total = await self.admin_repo.get_system_logs(
-            time_threshold, page=page, size=size
-        )
+        time_threshold = _window_start(now, hours)
+
+        if cursor is not None:
+            keyset_page = await self.admin_repo.get_system_logs_page(
+                time_threshold, size=size, cursor=cursor
+            )
+            logs, total = keyset_page.items, keyset_page.total
+        else:
+            keyset_page = None
+            logs, total = await self.admin_repo.get_system_logs(
+                time_threshold, page=page, size=size
+            )
 
         # Normalize logs to ensure required fields exist
         normalized_logs = []
@@ -224,13 +249,9 @@ class StatsMixin:
                 filtered_logs.append(log)
             normalized_logs = filtered_logs
 
-        pages = (total + size - 1) // size if total > 0 else 0
         return {
             "items": normalized_logs,
-            "total": total,
-            "page": page,
-            "size": size,
-            "pages": pages,
+            **_pagination_fields(keyset_page, total, page, size),
             "period_hours": hours,
             "timestamp": now.isoformat(),
             "available_actions": sorted(list(all_actions)),
@@ -243,23 +264,36 @@ class StatsMixin:
         page: int = 1,
         size: int = 50,
         action: Optional[str] = None,
-        admin_emails: Optional[List[str]] = None
+        admin_emails: Optional[List[str]] = None,
+        cursor: Optional[str] = None
     ) -> Dict:
         """
         Get admin audit logs filtered by time window (paginated).
-        Returns dict with items, total, page, size, pages.
+        Returns dict with items, total, page, size, pages
+        (cursor given: items, size, next_cursor, has_more, total).
         """
         size = min(size, MAX_PAGE_SIZE)
         now = datetime.now(timezone.utc)
-        time_threshold = now - timedelta(hours=hours)
-
-        logs, total = await self.admin_repo.get_admin_logs(
-            time_threshold=time_threshold,
-            page=page,
-            size=size,
-            action=action,
-            admin_emails=admin_emails
-        )
+        time_threshold = _window_start(now, hours)
+
+        if cursor is not None:
+            keyset_page = await self.admin_repo.get_admin_logs_page(
+                time_threshold=time_threshold,
+                size=size,
+                cursor=cursor,
+                action=action,
+                admin_emails=admin_emails
+            )
+            logs, total = keyset_page.items, keyset_page.total
+        else:
+            keyset_page = None
+            logs, total = await self.admin_repo.get_admin_logs(
+                time_threshold=time_threshold,
+                page=page,
+                size=size,
+                action=action,
+                admin_emails=admin_emails
+            )
 
         normalized_logs = []
         for log in logs:
@@ -295,13 +329,9 @@ class StatsMixin:
                 "name": admin.get('name') or email
             })
 
-        pages = (total + size - 1) // size if total > 0 else 0
         return {
             "items": normalized_logs,
-            "total": total,
-            "page": page,
-            "size": size,
-            "pages": pages,
+            **_pagination_fields(keyset_page, total, page, size),
             "period_hours": hours,
             "timestamp": now.isoformat(),
             "available_actions": sorted([a for a in actions if a]),
@@ -1,10 +1,10 @@
 """Subscriptions mixin for AdminService."""
 import logging
-import stripe
 from typing import Dict, List, Optional
 from datetime import datetime, timezone, timedelta
 
 from core.config import settings
+from services.stripe_client import get_stripe_gateway
 
 logger = logging.getLogger(__name__)
 
@@ -128,7 +128,7 @@ class SubscriptionsMixin:
         if not settings.STRIPE_API_KEY:
             raise ValueError("Configuration Stripe manquante")
 
-        stripe.api_key = settings.STRIPE_API_KEY
+        stripe_client = get_stripe_gateway()
 
         canceled_results = []
         errors = []
@@ -144,7 +144,7 @@ class SubscriptionsMixin:
 
             try:
                 # Cancel at period end (not immediately)
-                stripe.Subscription.modify(stripe_sub_id, cancel_at_period_end=True)
+                await stripe_client.modify_subscription(stripe_sub_id, cancel_at_period_end=True)
 
                 # Update database
                 await self.subscription_repo.update_by_stripe_subscription(
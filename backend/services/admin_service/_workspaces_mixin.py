@@ -5,6 +5,7 @@ from typing import Dict, List, Optional
 from datetime import datetime, timezone
 
 from models.pagination import PaginatedResponse
+from services.stripe_client import get_stripe_gateway
 
 logger = logging.getLogger(__name__)
 
@@ -169,7 +170,7 @@ class WorkspacesMixin:
             stripe_sub_id = subscription.get('stripe_subscription_id') if subscription else None
             if stripe_sub_id:
                 try:
-                    stripe.Subscription.delete(stripe_sub_id)
+                    await get_stripe_gateway().delete_subscription(stripe_sub_id)
                     stripe_canceled = True
                     await self.subscription_repo.update_by_workspace(
                         workspace_id,
@@ -309,7 +310,7 @@ class WorkspacesMixin:
                 stripe_sub_id = subscription.get('stripe_subscription_id') if subscription else None
                 if stripe_sub_id:
                     try:
-                        stripe.Subscription.delete(stripe_sub_id)
+                        await get_stripe_gateway().delete_subscription(stripe_sub_id)
                         await self.subscription_repo.update_by_workspace(
                             workspace_id,
                             {
@@ -465,6 +465,7 @@ FORMAT JSON UNIQUEMENT :
             user_prompt=prompt,
             model="gpt-4o",
             temperature=0.4,
+            cache_feature="debrief",
         )
 
         if response:
@@ -547,6 +548,7 @@ RAPPELS CRITIQUES :
             user_prompt=prompt,
             model="gpt-4o",
             temperature=0.3,
+            cache_feature="diagnostic",
         )
 
         if response:
@@ -5,8 +5,8 @@ CoreMixin - Core AIService functionality: init, circuit breaker, send_message, a
 import asyncio
 import logging
 import os
-from typing import Optional
-from datetime import datetime, timezone, timedelta
+from typing import Optional, Tuple
+from datetime import datetime, timezone
 
 from services.ai_service._prompts import (
     AsyncOpenAI,
@@ -20,6 +20,9 @@ from services.ai_service._prompts import (
     RetryError,
     settings,
 )
+from core.ai_response_cache import get_ai_response_cache, prompt_fingerprint
+from core.ai_stream import AIStreamSink, current_ai_stream_sink
+from core.ai_governor import AIQueueTimeout, current_ai_tenant, estimate_tokens, get_ai_governor
 
 logger = logging.getLogger(__name__)
 
@@ -44,58 +47,43 @@ class CoreMixin:
             elif AsyncOpenAI is None:
                 logger.warning("⚠️ OpenAI unavailable (OpenAI SDK import failed: AsyncOpenAI missing)")
 
-        # Circuit Breaker State
-        self._error_count = 0
-        self._circuit_open = False
-        self._circuit_open_until = None
+        # Circuit breaker, concurrency and token budgets are shared by every
+        # worker (core.ai_governor): instances are created per request
+        self._governor = get_ai_governor()
         self._last_success_time = None
 
         # Constants
-        self.MAX_CONSECUTIVE_ERRORS = 5
-        self.CIRCUIT_BREAKER_DURATION = 300  # 5 minutes en secondes
         self.DEFAULT_TIMEOUT = 30.0  # 30 secondes
 
-    def _check_circuit_breaker(self) -> bool:
+    async def _check_circuit_breaker(self) -> bool:
         """
-        Check if circuit breaker is open (blocking requests)
+        Check if the shared circuit breaker is open (blocking requests)
 
         Returns:
             True if circuit is open (should block), False if closed (allow requests)
         """
-        if not self._circuit_open:
-            return False
-
-        # Check if we should reset the circuit breaker
-        if self._circuit_open_until:
-            if datetime.now(timezone.utc) >= self._circuit_open_until:
-                logger.info("🔄 Circuit breaker: Resetting after cooldown period")
-                self._circuit_open = False
-                self._circuit_open_until = None
-                self._error_count = 0
-                return False
-
-        return True
-
-    def _record_success(self):
-        """Record a successful API call (reset error count)"""
-        self._error_count = 0
+        open_until = await self._governor.circuit_open_until()
+        if open_until:
+            logger.warning(
+                "🔴 Circuit breaker: OpenAI calls blocked until "
+                f"{datetime.fromtimestamp(open_until, timezone.utc).isoformat()}"
+            )
+            return True
+        return False
+
+    async def _record_success(self):
+        """Record a successful API call (reset the shared error count)"""
         self._last_success_time = datetime.now(timezone.utc)
-        if self._circuit_open:
-            logger.info("✅ Circuit breaker: Success after errors, resetting")
-            self._circuit_open = False
-            self._circuit_open_until = None
-
-    def _record_error(self):
-        """Record an error and check if circuit breaker should open"""
-        self._error_count += 1
-        logger.warning(f"⚠️ OpenAI error count: {self._error_count}/{self.MAX_CONSECUTIVE_ERRORS}")
-
-        if self._error_count >= self.MAX_CONSECUTIVE_ERRORS:
-            self._circuit_open = True
-            self._circuit_open_until = datetime.now(timezone.utc) + timedelta(seconds=self.CIRCUIT_BREAKER_DURATION)
+        await self._governor.record_success()
+
+    async def _record_error(self):
+        """Record an error; the governor opens the shared circuit after consecutive errors"""
+        open_until = await self._governor.record_failure()
+        if open_until:
             logger.error(
-                f"🔴 Circuit breaker OPENED: {self._error_count} consecutive errors. "
-                f"Blocking OpenAI calls for {self.CIRCUIT_BREAKER_DURATION}s until {self._circuit_open_until.isoformat()}"
+                f"🔴 Circuit breaker OPENED: {self._governor.breaker_threshold} consecutive errors. "
+                f"Blocking OpenAI calls for {self._governor.breaker_cooldown_seconds}s until "
+                f"{datetime.fromtimestamp(open_until, timezone.utc).isoformat()}"
             )
 
     def _get_max_tokens(self, model: str) -> int:
@@ -127,13 +115,45 @@ class CoreMixin:
         user_prompt: str,
         model: str,
         temperature: float,
-        max_tokens: int
-    ) -> Optional[str]:
+        max_tokens: int,
+        estimated_tokens: int
+    ) -> Tuple[Optional[str], int]:
         """
         Internal method that performs the actual API call with retry logic
 
-        This method is wrapped by @retry decorator for automatic retries
+        This method is wrapped by @retry decorator for automatic retries.
+        The governor permit is acquired and released per attempt, so the
+        backoff sleeps between attempts never hold a concurrency slot.
+
+        Returns:
+            (response text or None, total tokens billed)
+
+        Raises:
+            AIQueueTimeout: no permit within the governor queue timeout (not retried)
         """
+        permit = await self._governor.acquire(current_ai_tenant(), estimated_tokens)
+        total_tokens = None
+        try:
+            response, total_tokens = await self._request_completion(
+                system_message, user_prompt, model, temperature, max_tokens
+            )
+            return response, total_tokens
+        finally:
+            await permit.release(total_tokens)
+
+    async def _request_completion(
+        self,
+        system_message: str,
+        user_prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Tuple[Optional[str], int]:
+        """Single OpenAI request (streamed when an AI stream sink is bound)."""
+        sink = current_ai_stream_sink()
+        if sink is not None:
+            return await self._stream_completion(sink, system_message, user_prompt, model, temperature, max_tokens)
+
         response = await self.client.chat.completions.create(
             model=model,
             messages=[
@@ -146,6 +166,7 @@ class CoreMixin:
         )
 
         # Log token usage for cost tracking
+        total_tokens = 0
         if hasattr(response, 'usage') and response.usage:
             usage = response.usage
             total_tokens = usage.total_tokens if hasattr(usage, 'total_tokens') else 0
@@ -158,15 +179,64 @@ class CoreMixin:
             )
 
         if response.choices and len(response.choices) > 0:
-            return response.choices[0].message.content
-        return None
+            return response.choices[0].message.content, total_tokens
+        return None, total_tokens
+
+    async def _stream_completion(
+        self,
+        sink: AIStreamSink,
+        system_message: str,
+        user_prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Tuple[Optional[str], int]:
+        """
+        Streaming variant (SSE endpoints, see core.ai_stream): each delta is forwarded
+        to the sink, the accumulated text is returned like a regular completion.
+        DEFAULT_TIMEOUT applies between two chunks instead of to the whole answer.
+        """
+        sink.restart()
+        stream = await self.client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=temperature,
+            timeout=self.DEFAULT_TIMEOUT,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+
+        parts = []
+        total_tokens = 0
+        chunks = stream.__aiter__()
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.DEFAULT_TIMEOUT)
+            except StopAsyncIteration:
+                break
+            usage = getattr(chunk, 'usage', None)
+            if usage:
+                total_tokens = getattr(usage, 'total_tokens', 0) or 0
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    sink.delta(delta)
+
+        logger.info(f"💰 OpenAI tokens used (model={model}, streamed): Total={total_tokens}")
+        return ("".join(parts) or None), total_tokens
 
     async def _send_message(
         self,
         system_message: str,
         user_prompt: str,
         model: str = "gpt-4o-mini",
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        cache_feature: Optional[str] = None
     ) -> Optional[str]:
         """
         Send a message to OpenAI and get response
@@ -175,14 +245,21 @@ class CoreMixin:
         - Timeout protection (30s)
         - Token limits (cost control)
         - Retry logic with exponential backoff (max 3 attempts)
-        - Circuit breaker (blocks after 5 consecutive errors)
+        - Shared circuit breaker (blocks every worker after 5 consecutive errors)
+        - Governor permit: cluster-wide and per-tenant concurrency and tokens-per-minute
+          limits, fair queue across tenants (core.ai_governor)
         - Token usage logging
+        - Streaming: inside core.ai_stream.event_stream_response, deltas are
+          forwarded to the client as they arrive (same return value)
+        - Response cache (cache_feature): identical prompts within the feature TTL
+          are served from core.ai_response_cache, concurrent ones share one call
 
         Args:
             system_message: System prompt for the AI
             user_prompt: User prompt
             model: Model to use (gpt-4o or gpt-4o-mini)
             temperature: Temperature for generation (0.0-2.0)
+            cache_feature: Feature name in AI_RESPONSE_CACHE_TTLS (None = no cache)
 
         Returns:
             AI response text or None
@@ -190,46 +267,68 @@ class CoreMixin:
         if not self.available or not self.client:
             return None
 
-        # Check circuit breaker
-        if self._check_circuit_breaker():
-            logger.warning(
-                f"🔴 Circuit breaker: OpenAI calls blocked until {self._circuit_open_until.isoformat()}"
+        if cache_feature and settings.AI_RESPONSE_CACHE_ENABLED:
+            key = prompt_fingerprint(model, temperature, system_message, user_prompt)
+            return await get_ai_response_cache().get_or_generate(
+                cache_feature,
+                key,
+                lambda: self._complete(system_message, user_prompt, model, temperature),
             )
-            return None
+        response, _ = await self._complete(system_message, user_prompt, model, temperature)
+        return response
+
+    async def _complete(
+        self,
+        system_message: str,
+        user_prompt: str,
+        model: str,
+        temperature: float
+    ) -> Tuple[Optional[str], int]:
+        """OpenAI call behind the circuit breaker. Returns (response text or None, total tokens)."""
+        # Check circuit breaker
+        if await self._check_circuit_breaker():
+            return None, 0
 
         # Get max_tokens based on model
         max_tokens = self._get_max_tokens(model)
 
+        # Permit (per attempt): global / per-tenant concurrency and tokens-per-minute budgets
+        estimated_tokens = estimate_tokens(model, system_message, user_prompt) + max_tokens
         try:
-            response = await self._send_message_with_retry(
+            response, total_tokens = await self._send_message_with_retry(
                 system_message=system_message,
                 user_prompt=user_prompt,
                 model=model,
                 temperature=temperature,
-                max_tokens=max_tokens
+                max_tokens=max_tokens,
+                estimated_tokens=estimated_tokens
             )
 
             # Success: reset error count
             if response:
-                self._record_success()
+                await self._record_success()
 
-            return response
+            return response, total_tokens
+
+        except AIQueueTimeout as e:
+            logger.warning(f"🚦 OpenAI call dropped: {e}")
+            return None, 0
 
         except asyncio.TimeoutError:
             logger.error(f"⏱️ OpenAI timeout after {self.DEFAULT_TIMEOUT}s (model={model})")
-            self._record_error()
-            return None
+            await self._record_error()
+            return None, 0
 
         except RateLimitError as e:
             logger.warning(f"🚦 OpenAI rate limit hit (model={model}): {str(e)}")
             # RateLimitError is retried by tenacity, but we still record it
-            self._record_error()
+            await self._record_error()
             raise  # Re-raise for tenacity to handle retry
 
         except (APIConnectionError, APITimeoutError) as e:
             logger.warning(f"🔌 OpenAI connection error (model={model}): {str(e)}")
             # Connection errors are retried by tenacity
-            self._record_error()
+            await self._record_error()
             raise  # Re-raise for tenacity to handle retry
 
         except Exception as e:
@@ -238,8 +337,8 @@ class CoreMixin:
                 logger.error("OpenAI API error (details hidden)")
             else:
                 logger.error(f"OpenAI API error (model={model}): {e}")
-            self._record_error()
-            return None
+            await self._record_error()
+            return None, 0
 
     async def generate_admin_response(
         self,
@@ -243,6 +243,7 @@ MÉTRIQUES ACTUELLES :
             user_prompt=user_prompt,
             model="gpt-4o",
             temperature=0.4,
+            cache_feature="seller_bilan",
         )
 
         if not response:
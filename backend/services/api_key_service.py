@@ -2,10 +2,12 @@
 APIKeyService — gestionnaire des clés API (manager + gérant).
 """
 from __future__ import annotations
+import asyncio
 from datetime import datetime, timezone
 from typing import Dict, List, Optional
 
 from repositories.enterprise_repository import APIKeyRepository
+from core.api_key_cache import invalidate_api_key_cache
 
 
 class APIKeyService:
@@ -48,7 +50,7 @@ class APIKeyService:
         api_key = f"sk_live_{random_part}"
 
         # Hash the key for storage (same system as IntegrationService)
-        hashed_key = get_password_hash(api_key)
+        hashed_key = await asyncio.to_thread(get_password_hash, api_key)
 
         # Calculate expiration
         expires_at = None
@@ -143,6 +145,7 @@ class APIKeyService:
             {"active": False, "deleted_at": datetime.now(timezone.utc).isoformat()},
             user_id=user_id
         )
+        await invalidate_api_key_cache(key_id)
 
         return {"message": "API key deactivated successfully"}
 
@@ -200,6 +203,7 @@ class APIKeyService:
             {"active": False, "regenerated_at": datetime.now(timezone.utc).isoformat()},
             user_id=user_id
         )
+        await invalidate_api_key_cache(key_id)
 
         # Generate new key
         from core.security import get_password_hash
@@ -208,7 +212,7 @@ class APIKeyService:
         new_api_key = f"sk_live_{random_part}"
 
         # Hash the key for storage (same system as IntegrationService)
-        hashed_key = get_password_hash(new_api_key)
+        hashed_key = await asyncio.to_thread(get_password_hash, new_api_key)
 
         new_key_id = str(uuid4())
 
@@ -294,5 +298,6 @@ class APIKeyService:
 
         # Permanently delete
         await self.api_key_repo.delete_key(key_id, user_id=user_id if role == 'manager' else None)
+        await invalidate_api_key_cache(key_id)
 
         return {"success": True, "message": "API key permanently deleted"}
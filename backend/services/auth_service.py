@@ -10,11 +10,8 @@ import secrets
 import logging
 import re
 
-from core.security import (
-    get_password_hash,
-    verify_password,
-    create_token
-)
+from core.password_hasher import get_password_hasher
+from core.security import create_token
 from repositories.user_repository import UserRepository
 from repositories.store_repository import WorkspaceRepository
 from repositories.gerant_invitation_repository import GerantInvitationRepository
@@ -78,9 +75,18 @@ class AuthService:
         if not user:
             raise UnauthorizedError("Identifiants invalides")
         
-        # Verify password
-        if not verify_password(password, user['password']):
+        # Verify password (bcrypt on the hashing pool, off the event loop)
+        hasher = get_password_hasher()
+        if not await hasher.verify(password, user.get('password')):
             raise UnauthorizedError("Identifiants invalides")
+
+        # Opportunistic upgrade when PASSWORD_HASH_ROUNDS changed
+        new_hash = await hasher.rehash_if_needed(password, user['password'])
+        if new_hash:
+            try:
+                await self.user_repo.update_one({"id": user['id']}, {"$set": {"password": new_hash}})
+            except Exception as e:
+                logger.warning("Password rehash not saved for user %s: %s", user['id'], e)
         
         # Generate token
         token = create_token(user['id'], self._normalize_email(user['email']), user['role'])
@@ -203,7 +209,7 @@ class AuthService:
             "id": gerant_id,
             "name": name,
             "email": email,
-            "password": get_password_hash(password),
+            "password": await get_password_hasher().hash(password),
             "role": "gerant",  # Important: no accent!
             "phone": phone,
             "workspace_id": workspace_id,  # Link workspace to user
@@ -297,7 +303,7 @@ class AuthService:
             "id": user_id,
             "name": name,
             "email": email,
-            "password": get_password_hash(password),
+            "password": await get_password_hasher().hash(password),
             "role": invitation['role'],
             "gerant_id": invitation.get('gerant_id'),
             "store_id": invitation.get('store_id'),
@@ -464,7 +470,7 @@ class AuthService:
             raise Exception("Token expiré")
         
         # Update password
-        hashed_password = get_password_hash(new_password)
+        hashed_password = await get_password_hasher().hash(new_password)
         await self.user_repo.update_one(
             {"email": reset['email']},
             {"$set": {"password": hashed_password}}
@@ -566,8 +572,8 @@ class AuthService:
                 if subscription:
                     stripe_sub_id = subscription.get("stripe_subscription_id")
                     if stripe_sub_id:
-                        import stripe
-                        stripe.Subscription.modify(stripe_sub_id, cancel_at_period_end=True)
+                        from services.stripe_client import get_stripe_gateway
+                        await get_stripe_gateway().modify_subscription(stripe_sub_id, cancel_at_period_end=True)
                     await self.subscription_repo.update_by_user(
                         user_id,
                         {"subscription_status": "canceled", "updated_at": now.isoformat()}
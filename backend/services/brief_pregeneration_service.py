@@ -0,0 +1,313 @@
+"""
+Overnight pre-generation of morning briefs.
+
+Managers open the app around opening time; without pre-generation each first
+open waits for a gpt-4o call. The nightly job generates the uncustomized brief
+of every billable store ahead of time and stores it in morning_briefs, where
+ManagerService.get_cached_morning_brief (POST /briefs/morning) finds it.
+
+Bulk engine: the number of queries is constant whatever the number of stores
+(gérants, billing $in, stores $in, managers/sellers $in, briefs already done
+today, one KPI aggregation, latest diagnostics); only the OpenAI calls are per
+store, with bounded concurrency and under their own AI governor tenant so the
+batch never takes the quota of interactive users.
+"""
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from config.limits import BRIEF_PREGEN_CONCURRENCY, BRIEF_PREGEN_MAX_STORES, BRIEF_PREGEN_TENANT
+from core.ai_governor import bind_ai_tenant
+
+logger = logging.getLogger(__name__)
+
+# Recherche du dernier jour travaillé (comme get_yesterday_stats_for_brief) + semaine de ce jour
+LOOKBACK_DAYS = 30
+BILLABLE_STATUSES = ("active", "trialing", "trial", "past_due")
+
+
+def _first_name(name: Optional[str]) -> str:
+    parts = (name or "").split()
+    return parts[0] if parts else ""
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return round(ordered[index], 1)
+
+
+def build_brief_stats(store: Dict, days: Dict[str, Dict], seller_names: Dict[str, str], today: date) -> Dict:
+    """
+    Brief stats of one store from its daily totals (KPIRepository.aggregate_store_days).
+    Same shape and rules as ManagerService.get_yesterday_stats_for_brief.
+    """
+    stats: Dict = {
+        "ca_yesterday": 0,
+        "objectif_yesterday": store.get("objective_daily", 0) or 0,
+        "ventes_yesterday": 0,
+        "panier_moyen_yesterday": 0,
+        "taux_transfo_yesterday": 0,
+        "indice_vente_yesterday": 0,
+        "top_seller_yesterday": None,
+        "ca_week": 0,
+        "objectif_week": store.get("objective_weekly", 0) or 0,
+        "team_active_last_day": "Non renseigné",
+        "data_date": None,
+    }
+
+    last_data_date = None
+    for days_back in range(1, LOOKBACK_DAYS + 1):
+        check_date = (today - timedelta(days=days_back)).isoformat()
+        if (days.get(check_date) or {}).get("ca", 0) > 0:
+            last_data_date = check_date
+            break
+    if not last_data_date:
+        last_data_date = (today - timedelta(days=1)).isoformat()
+    stats["data_date"] = last_data_date
+
+    day = days.get(last_data_date)
+    if day:
+        stats["ca_yesterday"] = day.get("ca", 0)
+        stats["ventes_yesterday"] = day.get("ventes", 0)
+        if day.get("ventes", 0) > 0:
+            stats["panier_moyen_yesterday"] = round(day["ca"] / day["ventes"], 2)
+            stats["indice_vente_yesterday"] = round(day.get("articles", 0) / day["ventes"], 2)
+        if day.get("prospects", 0) > 0:
+            stats["taux_transfo_yesterday"] = round((day.get("ventes", 0) / day["prospects"]) * 100, 1)
+
+        sellers = day.get("sellers") or []
+        top = max(sellers, key=lambda s: s.get("ca", 0) or 0, default=None)
+        if top and (top.get("ca", 0) or 0) > 0 and top.get("seller_id") in seller_names:
+            stats["top_seller_yesterday"] = f"{_first_name(seller_names[top['seller_id']])} ({top['ca']:,.0f}€)"
+
+        active_ids = list(dict.fromkeys(s["seller_id"] for s in sellers if s.get("seller_id")))
+        names = [_first_name(seller_names[sid]) for sid in active_ids if sid in seller_names]
+        if names:
+            stats["team_active_last_day"] = ", ".join(names[:6])
+            if len(names) > 6:
+                stats["team_active_last_day"] += f" et {len(names) - 6} autres"
+
+    last_data_day = date.fromisoformat(last_data_date)
+    week_start = (last_data_day - timedelta(days=last_data_day.weekday())).isoformat()
+    stats["ca_week"] = sum(
+        row.get("ca", 0) or 0 for day_str, row in days.items() if week_start <= day_str <= last_data_date
+    )
+    return stats
+
+
+class BriefPregenerationService:
+    """Generates today's uncustomized morning brief for every billable store (nightly job)."""
+
+    def __init__(self, db, ai_service=None, concurrency: int = BRIEF_PREGEN_CONCURRENCY):
+        from repositories.user_repository import UserRepository
+        from repositories.store_repository import StoreRepository
+        from repositories.kpi_repository import KPIRepository
+        from repositories.billing_repository import BillingProfileRepository
+        from repositories.diagnostic_repository import DiagnosticRepository
+        from repositories.morning_brief_repository import MorningBriefRepository
+
+        if ai_service is None:
+            from services.ai_service import AIService
+            ai_service = AIService()
+        self.ai_service = ai_service
+        self.concurrency = concurrency
+        self.user_repo = UserRepository(db)
+        self.store_repo = StoreRepository(db)
+        self.kpi_repo = KPIRepository(db)
+        self.billing_repo = BillingProfileRepository(db)
+        self.diagnostic_repo = DiagnosticRepository(db)
+        self.brief_repo = MorningBriefRepository(db)
+
+    async def run(self, today: Optional[date] = None) -> Dict:
+        """
+        Generate the missing briefs of the day. Idempotent: stores that already
+        have today's uncustomized brief (earlier run, or a manager was faster) are skipped.
+
+        Returns the run report: coverage (stores with a brief ready / eligible stores),
+        generated / already cached / fallback / failed counts, OpenAI latency percentiles.
+        """
+        started = time.perf_counter()
+        today = today or datetime.now(timezone.utc).date()
+        report: Dict = {
+            "eligible_stores": 0, "already_cached": 0, "generated": 0, "fallback": 0, "failed": 0,
+            "coverage": None, "latency_ms": {}, "prepare_ms": None, "duration_ms": None,
+        }
+        if not self.ai_service.available:
+            logger.warning("brief-pregeneration: OpenAI unavailable, nothing generated")
+            report["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return report
+
+        targets = await self._load_targets()
+        report["eligible_stores"] = len(targets)
+        store_ids = [t["store"]["id"] for t in targets]
+        done = await self.brief_repo.find_briefed_store_ids(store_ids, today.isoformat())
+        report["already_cached"] = len(done)
+        pending = [t for t in targets if t["store"]["id"] not in done]
+
+        stats_by_store, profiles_by_store = await self._prepare(pending, today)
+        report["prepare_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        latencies: List[float] = []
+        await asyncio.gather(*(
+            self._generate_one(target, stats_by_store[target["store"]["id"]],
+                               profiles_by_store.get(target["store"]["id"], []), semaphore, report, latencies)
+            for target in pending
+        ))
+
+        ready = report["already_cached"] + report["generated"]
+        report["coverage"] = round(ready / len(targets), 4) if targets else None
+        report["latency_ms"] = {
+            "p50": _percentile(latencies, 0.5),
+            "p95": _percentile(latencies, 0.95),
+            "max": round(max(latencies), 1) if latencies else None,
+        }
+        report["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(
+            "brief-pregeneration: coverage=%s eligible=%d cached=%d generated=%d fallback=%d failed=%d "
+            "p50=%sms p95=%sms in %.0f ms",
+            report["coverage"], report["eligible_stores"], report["already_cached"], report["generated"],
+            report["fallback"], report["failed"], report["latency_ms"]["p50"], report["latency_ms"]["p95"],
+            report["duration_ms"],
+        )
+        return report
+
+    async def _load_targets(self) -> List[Dict]:
+        """[{store, manager}] for every active store of a billable gérant (manager: first active one, else the gérant)."""
+        gerants = await self.user_repo.find_many(
+            {"role": "gerant", "status": "active"},
+            projection={"_id": 0, "id": 1, "name": 1},
+            limit=BRIEF_PREGEN_MAX_STORES,
+            allow_over_limit=True,
+        )
+        gerants_by_id = {g["id"]: g for g in gerants if g.get("id")}
+        billing = await self.billing_repo.find_by_gerant_ids(
+            list(gerants_by_id), projection={"_id": 0, "gerant_id": 1, "subscription_status": 1}
+        )
+        billable = [
+            gid for gid in gerants_by_id
+            if (billing.get(gid) or {}).get("subscription_status", "") in BILLABLE_STATUSES
+        ]
+        stores = await self.store_repo.find_active_by_gerant_ids(
+            billable,
+            projection={"_id": 0, "id": 1, "name": 1, "gerant_id": 1,
+                        "objective_daily": 1, "objective_weekly": 1, "business_context": 1},
+        )
+        stores = [s for s in stores if s.get("id")][:BRIEF_PREGEN_MAX_STORES]
+        managers = await self.user_repo.find_by_store_ids(
+            [s["id"] for s in stores], "manager",
+            projection={"_id": 0, "id": 1, "name": 1, "store_id": 1, "status": 1},
+        )
+        manager_by_store: Dict[str, Dict] = {}
+        for manager in managers:
+            if manager.get("status") == "active":
+                manager_by_store.setdefault(manager.get("store_id"), manager)
+        return [
+            {"store": store, "manager": manager_by_store.get(store["id"]) or gerants_by_id[store["gerant_id"]]}
+            for store in stores
+            if store.get("gerant_id") in gerants_by_id
+        ]
+
+    async def _prepare(self, targets: List[Dict], today: date):
+        """Stats and team DISC profiles of every pending store (constant number of queries)."""
+        if not targets:
+            return {}, {}
+        store_ids = [t["store"]["id"] for t in targets]
+        start = (today - timedelta(days=LOOKBACK_DAYS + 6)).isoformat()
+        end = (today - timedelta(days=1)).isoformat()
+        days_by_store = await self.kpi_repo.aggregate_store_days(store_ids, start, end)
+
+        sellers = await self.user_repo.find_by_store_ids(
+            store_ids, "seller", projection={"_id": 0, "id": 1, "name": 1, "store_id": 1, "status": 1},
+        )
+        names = {s["id"]: s.get("name", "") for s in sellers if s.get("id")}
+        unknown = {
+            entry.get("seller_id")
+            for days in days_by_store.values() for day in days.values() for entry in day.get("sellers", [])
+            if entry.get("seller_id") and entry.get("seller_id") not in names
+        }
+        if unknown:
+            for user in await self.user_repo.find_by_ids(list(unknown), projection={"_id": 0, "id": 1, "name": 1}):
+                names[user["id"]] = user.get("name", "")
+
+        stats_by_store = {
+            t["store"]["id"]: build_brief_stats(t["store"], days_by_store.get(t["store"]["id"], {}), names, today)
+            for t in targets
+        }
+
+        active_by_store: Dict[str, List[Dict]] = {}
+        for seller in sellers:
+            if seller.get("status") == "active" and seller.get("id"):
+                store_sellers = active_by_store.setdefault(seller.get("store_id"), [])
+                if len(store_sellers) < 50:
+                    store_sellers.append(seller)
+        diagnostics = await self.diagnostic_repo.find_latest_by_sellers(
+            [s["id"] for store_sellers in active_by_store.values() for s in store_sellers]
+        )
+        profiles_by_store = {
+            store_id: [
+                {
+                    "first_name": _first_name(seller.get("name")),
+                    "disc_style": ((diagnostics.get(seller["id"]) or {}).get("profile") or {}).get("style", "") or "?",
+                }
+                for seller in store_sellers
+            ]
+            for store_id, store_sellers in active_by_store.items()
+        }
+        return stats_by_store, profiles_by_store
+
+    async def _generate_one(self, target: Dict, stats: Dict, profiles: List[Dict],
+                            semaphore: asyncio.Semaphore, report: Dict, latencies: List[float]) -> None:
+        store, manager = target["store"], target["manager"]
+        store_name = store.get("name", "Mon Magasin")
+        manager_name = manager.get("name", "Manager")
+        async with semaphore:
+            bind_ai_tenant(BRIEF_PREGEN_TENANT)
+            started = time.perf_counter()
+            try:
+                result = await self.ai_service.generate_morning_brief(
+                    stats=stats,
+                    manager_name=manager_name,
+                    store_name=store_name,
+                    data_date=stats.get("data_date"),
+                    team_disc_profiles=profiles,
+                    business_context=store.get("business_context"),
+                )
+            except Exception:
+                logger.exception("brief-pregeneration: generation failed for store %s", store["id"])
+                report["failed"] += 1
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        # Le brief de secours n'est pas mis en cache : l'ouverture du matin retentera l'IA
+        if not result.get("success") or result.get("fallback"):
+            report["fallback"] += 1
+            return
+        record = {
+            "brief_id": str(uuid4()),
+            "store_id": store["id"],
+            "manager_id": manager["id"],
+            "manager_name": manager_name,
+            "store_name": store_name,
+            "brief": result.get("brief"),
+            "structured": result.get("structured"),
+            "date": result.get("date"),
+            "data_date": result.get("data_date"),
+            "has_context": False,
+            "context": None,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "fallback": False,
+            "pregenerated": True,
+        }
+        try:
+            await self.brief_repo.create_brief(record, store["id"], manager["id"])
+            report["generated"] += 1
+        except Exception:
+            logger.exception("brief-pregeneration: cannot save brief for store %s", store["id"])
+            report["failed"] += 1
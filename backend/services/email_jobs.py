@@ -1,45 +1,48 @@
 """
-Email functions for scheduled jobs (weekly recap, silent seller alerts).
+Email messages for scheduled jobs (weekly recap, silent seller alerts).
 Kept separate from email_service.py to avoid making that file even larger.
+
+The builders only render the message (templates/email/*.html); delivery goes
+through core.email_dispatcher (worker pool, rate limit, retry, dead letters).
 """
 import logging
-import sib_api_v3_sdk
-from sib_api_v3_sdk.rest import ApiException
-from email_service import get_brevo_api_instance, get_frontend_url, SENDER_NAME, SENDER_EMAIL
+from typing import Dict, List
+
+from core.email_dispatcher import EmailMessage
+from email_service import _load_template, get_frontend_url
 
 logger = logging.getLogger(__name__)
 
 
-def send_weekly_gerant_recap(recipient_email: str, recipient_name: str, data: dict) -> bool:
+def _evolution_html(evolution, bold: bool) -> str:
+    weight = "font-weight:bold;" if bold else ""
+    if evolution is None:
+        return '<span style="color:#9ca3af;">—</span>'
+    if evolution >= 0:
+        arrow = "&#9650; " if bold else ""
+        return f'<span style="color:#16a34a;{weight}">{arrow}+{evolution}%</span>'
+    arrow = "&#9660; " if bold else ""
+    return f'<span style="color:#dc2626;{weight}">{arrow}{evolution}%</span>'
+
+
+def build_weekly_gerant_recap(recipient_email: str, recipient_name: str, data: dict) -> EmailMessage:
     """Email récap hebdo envoyé au gérant chaque lundi matin."""
-    frontend_url = get_frontend_url().rstrip('/')
-    dashboard_link = f"{frontend_url}/gerant-dashboard"
+    dashboard_link = f"{get_frontend_url().rstrip('/')}/gerant-dashboard"
 
-    evo_total = data.get("total_evolution")
-    if evo_total is None:
+    if data.get("total_evolution") is None:
         evo_str = '<span style="color:#9ca3af;">Pas de données semaine précédente</span>'
-    elif evo_total >= 0:
-        evo_str = f'<span style="color:#16a34a;font-weight:bold;">&#9650; +{evo_total}%</span>'
     else:
-        evo_str = f'<span style="color:#dc2626;font-weight:bold;">&#9660; {evo_total}%</span>'
-
-    stores_rows = ""
-    for s in data.get("stores", []):
-        s_evo = s.get("evolution")
-        if s_evo is None:
-            s_evo_str = '<span style="color:#9ca3af;">—</span>'
-        elif s_evo >= 0:
-            s_evo_str = f'<span style="color:#16a34a;">+{s_evo}%</span>'
-        else:
-            s_evo_str = f'<span style="color:#dc2626;">{s_evo}%</span>'
-        stores_rows += (
-            f'<tr style="border-bottom:1px solid #f3f4f6;">'
-            f'<td style="padding:10px 8px;font-weight:500;">{s["name"]}</td>'
-            f'<td style="padding:10px 8px;text-align:right;font-weight:bold;">{s["ca"]:,.0f} €</td>'
-            f'<td style="padding:10px 8px;text-align:right;">{s["ventes"]}</td>'
-            f'<td style="padding:10px 8px;text-align:center;">{s_evo_str}</td>'
-            f'</tr>'
-        )
+        evo_str = _evolution_html(data["total_evolution"], bold=True)
+
+    stores_rows = "".join(
+        f'<tr style="border-bottom:1px solid #f3f4f6;">'
+        f'<td style="padding:10px 8px;font-weight:500;">{s["name"]}</td>'
+        f'<td style="padding:10px 8px;text-align:right;font-weight:bold;">{s["ca"]:,.0f} €</td>'
+        f'<td style="padding:10px 8px;text-align:right;">{s["ventes"]}</td>'
+        f'<td style="padding:10px 8px;text-align:center;">{_evolution_html(s.get("evolution"), bold=False)}</td>'
+        f'</tr>'
+        for s in data.get("stores", [])
+    )
 
     top_seller_block = ""
     ts = data.get("top_seller")
@@ -52,57 +55,28 @@ def send_weekly_gerant_recap(recipient_email: str, recipient_name: str, data: di
             '</div>'
         )
 
-    html_content = (
-        '<!DOCTYPE html><html><head><meta charset="UTF-8">'
-        '<meta name="viewport" content="width=device-width,initial-scale=1.0"></head>'
-        '<body style="font-family:Arial,sans-serif;line-height:1.6;color:#333;max-width:600px;margin:0 auto;padding:20px;">'
-        '<div style="background:linear-gradient(135deg,#1E40AF 0%,#1E3A8A 100%);padding:28px;text-align:center;border-radius:10px 10px 0 0;">'
-        '<h1 style="color:white;margin:0;font-size:22px;">📊 Récap de la semaine</h1>'
-        f'<p style="color:rgba(255,255,255,0.85);margin-top:8px;">{data["week_start"]} — {data["week_end"]}</p>'
-        '</div>'
-        '<div style="background:#f9f9f9;padding:28px;border-radius:0 0 10px 10px;">'
-        f'<p style="font-size:16px;">Bonjour <strong>{recipient_name}</strong>,</p>'
-        '<div style="background:white;padding:20px;border-radius:8px;margin:16px 0;text-align:center;border-left:4px solid #1E40AF;">'
-        '<p style="margin:0;font-size:14px;color:#6b7280;">CA total tous magasins</p>'
-        f'<p style="margin:4px 0;font-size:32px;font-weight:bold;color:#1E40AF;">{data["total_ca"]:,.0f} €</p>'
-        f'<p style="margin:0;">{evo_str}</p>'
-        '</div>'
-        '<table style="width:100%;border-collapse:collapse;background:white;border-radius:8px;overflow:hidden;margin:16px 0;">'
-        '<thead><tr style="background:#f3f4f6;">'
-        '<th style="padding:10px 8px;text-align:left;font-size:12px;color:#6b7280;text-transform:uppercase;">Magasin</th>'
-        '<th style="padding:10px 8px;text-align:right;font-size:12px;color:#6b7280;text-transform:uppercase;">CA</th>'
-        '<th style="padding:10px 8px;text-align:right;font-size:12px;color:#6b7280;text-transform:uppercase;">Ventes</th>'
-        '<th style="padding:10px 8px;text-align:center;font-size:12px;color:#6b7280;text-transform:uppercase;">Évolution</th>'
-        '</tr></thead>'
-        f'<tbody>{stores_rows}</tbody>'
-        '</table>'
-        f'{top_seller_block}'
-        f'<div style="text-align:center;margin-top:24px;">'
-        f'<a href="{dashboard_link}" style="background:#F97316;color:white;padding:12px 28px;border-radius:8px;text-decoration:none;font-weight:bold;font-size:15px;">Voir le tableau de bord</a>'
-        '</div>'
-        '<p style="font-size:12px;color:#9ca3af;margin-top:24px;text-align:center;">Retail Performer AI — récap automatique chaque lundi</p>'
-        '</div></body></html>'
+    html_content = _load_template("weekly_gerant_recap.html").format(
+        week_start=data["week_start"],
+        week_end=data["week_end"],
+        recipient_name=recipient_name,
+        total_ca=f"{data['total_ca']:,.0f}",
+        evolution=evo_str,
+        stores_rows=stores_rows,
+        top_seller_block=top_seller_block,
+        dashboard_link=dashboard_link,
+    )
+    return EmailMessage(
+        to_email=recipient_email,
+        to_name=recipient_name,
+        subject=f"📊 Récap semaine du {data['week_start']} — {data['total_ca']:,.0f} €",
+        html_content=html_content,
+        category="weekly-gerant-recap",
     )
-
-    try:
-        send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-            to=[{"email": recipient_email, "name": recipient_name}],
-            sender={"name": SENDER_NAME, "email": SENDER_EMAIL},
-            subject=f"📊 Récap semaine du {data['week_start']} — {data['total_ca']:,.0f} €",
-            html_content=html_content,
-        )
-        get_brevo_api_instance().send_transac_email(send_smtp_email)
-        logger.info("Weekly recap sent to %s", recipient_email)
-        return True
-    except ApiException as e:
-        logger.error("Error sending weekly recap to %s: %s", recipient_email, e)
-        return False
 
 
-def send_silent_seller_alert(recipient_email: str, recipient_name: str, data: dict) -> bool:
+def build_silent_seller_alert(recipient_email: str, recipient_name: str, data: dict) -> EmailMessage:
     """Email d'alerte vendeurs silencieux envoyé au manager."""
-    frontend_url = get_frontend_url().rstrip('/')
-    dashboard_link = f"{frontend_url}/dashboard"
+    dashboard_link = f"{get_frontend_url().rstrip('/')}/dashboard"
 
     sellers_list = ""
     for s in data.get("sellers", []):
@@ -117,36 +91,27 @@ def send_silent_seller_alert(recipient_email: str, recipient_name: str, data: di
     count = len(data.get("sellers", []))
     subject_label = f"{count} vendeur{'s' if count > 1 else ''} sans saisie KPI"
 
-    html_content = (
-        '<!DOCTYPE html><html><head><meta charset="UTF-8">'
-        '<meta name="viewport" content="width=device-width,initial-scale=1.0"></head>'
-        '<body style="font-family:Arial,sans-serif;line-height:1.6;color:#333;max-width:600px;margin:0 auto;padding:20px;">'
-        '<div style="background:linear-gradient(135deg,#1E40AF 0%,#1E3A8A 100%);padding:28px;text-align:center;border-radius:10px 10px 0 0;">'
-        '<h1 style="color:white;margin:0;font-size:22px;">⚠️ Saisie KPI en retard</h1>'
-        f'<p style="color:rgba(255,255,255,0.85);margin-top:8px;">{subject_label} dans votre équipe</p>'
-        '</div>'
-        '<div style="background:#f9f9f9;padding:28px;border-radius:0 0 10px 10px;">'
-        f'<p style="font-size:16px;">Bonjour <strong>{recipient_name}</strong>,</p>'
-        '<p>Les vendeurs suivants n\'ont pas saisi leurs KPI depuis 2 jours ou plus :</p>'
-        f'<ul style="list-style:none;padding:8px 16px;background:white;border-radius:8px;margin:16px 0;">{sellers_list}</ul>'
-        '<p style="font-size:14px;color:#6b7280;">Pensez à les relancer depuis leur fiche vendeur.</p>'
-        f'<div style="text-align:center;margin-top:24px;">'
-        f'<a href="{dashboard_link}" style="background:#F97316;color:white;padding:12px 28px;border-radius:8px;text-decoration:none;font-weight:bold;font-size:15px;">Voir mon tableau de bord</a>'
-        '</div>'
-        '<p style="font-size:12px;color:#9ca3af;margin-top:24px;text-align:center;">Retail Performer AI — alerte automatique quotidienne</p>'
-        '</div></body></html>'
+    html_content = _load_template("silent_seller_alert.html").format(
+        subject_label=subject_label,
+        recipient_name=recipient_name,
+        sellers_list=sellers_list,
+        dashboard_link=dashboard_link,
+    )
+    return EmailMessage(
+        to_email=recipient_email,
+        to_name=recipient_name,
+        subject=f"⚠️ {subject_label}",
+        html_content=html_content,
+        category="silent-seller-alerts",
     )
 
-    try:
-        send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-            to=[{"email": recipient_email, "name": recipient_name}],
-            sender={"name": SENDER_NAME, "email": SENDER_EMAIL},
-            subject=f"⚠️ {subject_label}",
-            html_content=html_content,
-        )
-        get_brevo_api_instance().send_transac_email(send_smtp_email)
-        logger.info("Silent seller alert sent to %s", recipient_email)
-        return True
-    except ApiException as e:
-        logger.error("Error sending silent seller alert to %s: %s", recipient_email, e)
-        return False
+
+def build_job_messages(items: List[Dict], builder) -> List[EmailMessage]:
+    """One message per job item ({email, name, ...}); items that fail to render are logged and skipped."""
+    messages = []
+    for item in items:
+        try:
+            messages.append(builder(item["email"], item["name"], item))
+        except Exception:
+            logger.exception("Cannot render %s for %s", builder.__name__, item.get("email"))
+    return messages
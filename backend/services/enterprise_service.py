@@ -5,7 +5,6 @@ Business logic for enterprise accounts, API keys, bulk imports, and synchronizat
 from typing import Dict, List, Optional
 from datetime import datetime, timezone, timedelta
 import secrets
-import bcrypt
 import logging
 from uuid import uuid4
 
@@ -17,6 +16,8 @@ from repositories.enterprise_repository import (
 from repositories.user_repository import UserRepository
 from repositories.store_repository import StoreRepository
 from models.enterprise import SyncLog
+from core.api_key_cache import enterprise_api_key_cache, invalidate_api_key_cache
+from core.password_hasher import get_password_hasher
 
 logger = logging.getLogger(__name__)
 
@@ -80,13 +81,13 @@ class EnterpriseService:
         await self.enterprise_repo.insert_one(enterprise_account)
         
         # Create IT Admin user
-        hashed_password = bcrypt.hashpw(it_admin_password.encode('utf-8'), bcrypt.gensalt())
+        hashed_password = await get_password_hasher().hash(it_admin_password)
         
         it_admin = {
             "id": str(uuid4()),
             "name": it_admin_name,
             "email": it_admin_email,
-            "password": hashed_password.decode('utf-8'),
+            "password": hashed_password,
             "role": "it_admin",
             "status": "active",
             "enterprise_account_id": enterprise_id,
@@ -191,16 +192,21 @@ class EnterpriseService:
         success = await self.api_key_repo.revoke_key(key_id, enterprise_id)
         
         if success:
+            await invalidate_api_key_cache(key_id)
             logger.info(f"✅ API key revoked: {key_id}")
         
         return success
     
     async def verify_api_key(self, api_key: str) -> Optional[Dict]:
-        """Verify API key and check expiration"""
-        key_doc = await self.api_key_repo.find_by_key(api_key)
-        
-        if not key_doc:
-            return None
+        """Verify API key and check expiration (verified keys cached by HMAC fingerprint)."""
+        key_doc = await enterprise_api_key_cache.get(api_key)
+        if key_doc is None:
+            key_doc = await self.api_key_repo.find_by_key(api_key)
+            if not key_doc:
+                return None
+            cache_after_checks = True
+        else:
+            cache_after_checks = False
         
         # Check expiration
         if key_doc.get('expires_at'):
@@ -213,6 +219,9 @@ class EnterpriseService:
             if datetime.now(timezone.utc) > expires_at:
                 return None
         
+        if cache_after_checks:
+            await enterprise_api_key_cache.set(api_key, key_doc)
+        
         # Update usage stats
         await self.api_key_repo.update_usage(key_doc['id'])
         
@@ -345,6 +354,8 @@ class EnterpriseService:
         # PHASE 2: Build bulk operations list in memory
         bulk_operations = []
         sync_logs_batch = []
+        # New users waiting for their temp password hash (hashed in one batch, off the event loop)
+        new_users_pending_hash = []
         
         for user_data in users:
             results["total_processed"] += 1
@@ -412,15 +423,12 @@ class EnterpriseService:
                 else:
                     # Create mode
                     if mode in ["create_only", "create_or_update"]:
-                        temp_password = secrets.token_urlsafe(16)
-                        hashed_password = bcrypt.hashpw(temp_password.encode('utf-8'), bcrypt.gensalt())
-                        
                         user_id = str(uuid4())
                         new_user = {
                             "id": user_id,
                             "email": email,
                             "name": user_data['name'],
-                            "password": hashed_password.decode('utf-8'),
+                            "password": None,  # set after the batch hash below
                             "role": user_data.get('role', 'seller'),
                             "status": "active",
                             "enterprise_account_id": enterprise_id,
@@ -433,6 +441,7 @@ class EnterpriseService:
                         
                         # Add to bulk operations
                         bulk_operations.append(InsertOne(new_user))
+                        new_users_pending_hash.append(new_user)
                         results["created"] += 1
                         
                         # Prepare log for batch insert
@@ -463,6 +472,13 @@ class EnterpriseService:
                 })
                 logger.error(f"Error preparing user {user_data.get('email')}: {str(e)}")
         
+        # PHASE 2b: Temp passwords hashed in one batch on the hashing pool
+        if new_users_pending_hash:
+            temp_passwords = [secrets.token_urlsafe(16) for _ in new_users_pending_hash]
+            hashes = await get_password_hasher().hash_many(temp_passwords)
+            for new_user, hashed_password in zip(new_users_pending_hash, hashes):
+                new_user["password"] = hashed_password
+
         # PHASE 3: Execute bulk write via repository (no .collection)
         if bulk_operations:
             try:
@@ -8,6 +8,7 @@ from repositories.store_repository import StoreRepository, WorkspaceRepository
 from repositories.gerant_invitation_repository import GerantInvitationRepository
 from repositories.subscription_repository import SubscriptionRepository
 from repositories.kpi_repository import KPIRepository, ManagerKPIRepository
+from repositories.store_daily_kpi_repository import StoreDailyKpiRepository
 from repositories.billing_repository import BillingProfileRepository
 from repositories.system_log_repository import SystemLogRepository
 
@@ -34,6 +35,7 @@ class GerantService(ProfileMixin, SubscriptionMixin, StoresMixin, StaffMixin, St
         manager_kpi_repo: ManagerKPIRepository,
         billing_profile_repo: Optional[BillingProfileRepository] = None,
         system_log_repo: Optional[SystemLogRepository] = None,
+        store_daily_kpi_repo: Optional[StoreDailyKpiRepository] = None,
     ):
         self.user_repo = user_repo
         self.store_repo = store_repo
@@ -44,3 +46,4 @@ class GerantService(ProfileMixin, SubscriptionMixin, StoresMixin, StaffMixin, St
         self.manager_kpi_repo = manager_kpi_repo
         self.billing_profile_repo = billing_profile_repo
         self.system_log_repo = system_log_repo
+        self.store_daily_kpi_repo = store_daily_kpi_repo
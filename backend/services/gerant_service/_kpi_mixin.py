@@ -4,13 +4,21 @@ import logging
 from typing import Dict, Optional, List
 from datetime import datetime, timezone, timedelta
 
+from core.config import settings
 from core.constants import MONGO_IFNULL, MONGO_MATCH, MONGO_GROUP, MONGO_SUM
+from utils.kpi_rollup import history_row, is_history_row
 
 logger = logging.getLogger(__name__)
 
 
 class KpiMixin:
 
+    def _store_daily_rollup(self):
+        """StoreDailyKpiRepository when rollup reads are enabled, else None (raw data path)."""
+        if not settings.KPI_ROLLUP_READS_ENABLED:
+            return None
+        return getattr(self, "store_daily_kpi_repo", None)
+
     async def get_store_stats(
         self,
         store_id: str,
@@ -443,6 +451,12 @@ class KpiMixin:
             start_date_query = start_date.strftime('%Y-%m-%d')
             end_date_query = end_date.strftime('%Y-%m-%d')
 
+        # Rollup store_daily_kpis : une ligne par jour, priorité manager et verrouillage déjà résolus
+        rollup = self._store_daily_rollup()
+        if rollup is not None:
+            rows = await rollup.find_range(store_id, start_date_query, end_date_query)
+            return [history_row(row) for row in rows if is_history_row(row)]
+
         # ✅ PHASE 6: Use aggregation for date aggregation instead of .to_list(10000)
         # We still need individual entries for priority logic, but we'll use cursor iteration
         # instead of loading everything in memory at once. Phase 0: use injected repos.
@@ -589,6 +603,10 @@ class KpiMixin:
         if not store:
             raise ValueError("Magasin non trouvé ou accès non autorisé")
 
+        rollup = self._store_daily_rollup()
+        if rollup is not None:
+            return {"years": await rollup.find_years(store_id)}
+
         # Get distinct years from kpi_entries (guard against None/non-iterable)
         kpi_years = await self.kpi_repo.distinct("date", {"store_id": store_id})
         if kpi_years is None:
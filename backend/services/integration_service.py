@@ -2,14 +2,21 @@
 from typing import Dict, List, Optional
 from datetime import datetime, timezone
 from uuid import uuid4
+import asyncio
 import secrets
 import logging
+import time
 
 from repositories.integration_repository import IntegrationRepository
 from core.security import get_password_hash, verify_password
+from core.api_key_cache import integration_api_key_cache, invalidate_api_key_cache
 
 logger = logging.getLogger(__name__)
 
+# last_used_at : au plus une écriture par clé et par fenêtre (évite 1 update par appel API)
+LAST_USED_WRITE_INTERVAL_SECONDS = 60
+_last_used_written: Dict[str, float] = {}
+
 
 class IntegrationService:
     """Service for integration-related business logic. Phase 0: repositories only, no self.db."""
@@ -42,8 +49,8 @@ class IntegrationService:
         # Generate API key
         api_key = f"sk_live_{secrets.token_urlsafe(32)}"
         
-        # Hash the key for storage
-        hashed_key = get_password_hash(api_key)
+        # Hash the key for storage (bcrypt hors event loop)
+        hashed_key = await asyncio.to_thread(get_password_hash, api_key)
         
         # Calculate expiration
         expires_at = None
@@ -139,6 +146,12 @@ class IntegrationService:
             logger.warning(f"Invalid API key format. Expected prefix 'sk_live_', got: {api_key[:12]}...")
             raise ValueError("Invalid API Key format. API keys must start with 'sk_live_'")
         
+        # Fast path: clé déjà vérifiée (empreinte HMAC, pas de bcrypt ni de Mongo)
+        cached_doc = await integration_api_key_cache.get(api_key)
+        if cached_doc is not None:
+            await self._touch_last_used(cached_doc['id'])
+            return cached_doc
+
         # Find key by prefix (first page, enough for verification)
         key_prefix = api_key[:12]
         possible_keys, _ = await self.integration_repo.find_api_keys_by_prefix(
@@ -149,9 +162,9 @@ class IntegrationService:
             logger.warning(f"No API keys found with prefix: {key_prefix}...")
             raise ValueError("Invalid or inactive API Key - No matching key found")
         
-        # Try to match the key with hash verification
+        # Try to match the key with hash verification (bcrypt hors event loop)
         for key_doc in possible_keys:
-            if verify_password(api_key, key_doc['key_hash']):
+            if await asyncio.to_thread(verify_password, api_key, key_doc['key_hash']):
                 # Check if key is active
                 if not key_doc.get('active', True):
                     logger.warning(f"API key {key_doc.get('id')} is inactive")
@@ -188,16 +201,26 @@ class IntegrationService:
                         raise ValueError("API Key configuration invalid: missing tenant_id")
                 
                 # Update last_used_at
-                await self.integration_repo.api_keys.update_one(
-                    {"id": key_doc['id']},
-                    {"$set": {"last_used_at": datetime.now(timezone.utc)}}
-                )
+                await self._touch_last_used(key_doc['id'])
+                await integration_api_key_cache.set(api_key, key_doc)
                 
                 return key_doc
         
         # If we get here, the key prefix matched but hash verification failed
         logger.warning(f"API key hash verification failed for prefix: {key_prefix}...")
         raise ValueError("Invalid or inactive API Key - Hash verification failed")
+
+    async def _touch_last_used(self, key_id: str) -> None:
+        """Met à jour last_used_at au plus une fois par LAST_USED_WRITE_INTERVAL_SECONDS et par worker."""
+        now = time.monotonic()
+        last = _last_used_written.get(key_id)
+        if last is not None and now - last < LAST_USED_WRITE_INTERVAL_SECONDS:
+            return
+        _last_used_written[key_id] = now
+        await self.integration_repo.api_keys.update_one(
+            {"id": key_id},
+            {"$set": {"last_used_at": datetime.now(timezone.utc)}}
+        )
     
     async def get_tenant_id_from_api_key(self, api_key_data: Dict) -> Optional[str]:
         """
@@ -208,4 +231,7 @@ class IntegrationService:
     
     async def deactivate_api_key(self, key_id: str, user_id: str) -> bool:
         """Deactivate an API key"""
-        return await self.integration_repo.deactivate_api_key(key_id, user_id)
+        deactivated = await self.integration_repo.deactivate_api_key(key_id, user_id)
+        if deactivated:
+            await invalidate_api_key_cache(key_id)
+        return deactivated
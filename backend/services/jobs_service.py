@@ -7,6 +7,8 @@ import logging
 from datetime import date, timedelta
 from typing import List, Dict
 
+from config.limits import WEEKLY_RECAP_MAX_GERANTS
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,14 +29,17 @@ class JobsService:
         from repositories.store_repository import StoreRepository
         from repositories.kpi_repository import KPIRepository
         from repositories.billing_repository import BillingProfileRepository
+        from repositories.achievement_notification_repository import AchievementNotificationRepository
         from repositories.notification_repository import NotificationRepository
         from repositories.objective_repository import ObjectiveRepository
+        from services.notification_service import NotificationService
 
         self.user_repo = UserRepository(db)
         self.store_repo = StoreRepository(db)
         self.kpi_repo = KPIRepository(db)
         self.billing_repo = BillingProfileRepository(db)
         self.notification_repo = NotificationRepository(db)
+        self.notification_service = NotificationService(AchievementNotificationRepository(db), self.notification_repo)
         self.objective_repo = ObjectiveRepository(db)
 
     # ── Weekly gérant recap ────────────────────────────────────────────────
@@ -43,6 +48,10 @@ class JobsService:
         """
         Returns one recap dict per active gérant with subscription active/trial.
         Used to send the Monday morning email.
+
+        Bulk engine: the number of queries is constant whatever the number of
+        gérants / stores (gérants, billing $in, stores $in, one KPI $facet
+        aggregation, seller names $in); recaps are assembled in memory.
         """
         today = date.today()
         weekday = today.weekday()
@@ -51,30 +60,28 @@ class JobsService:
         last_monday = today - timedelta(days=days_since_monday + 7)
         last_sunday = last_monday + timedelta(days=6)
         prev_monday = last_monday - timedelta(days=7)
-        prev_sunday = last_monday - timedelta(days=1)
 
         last_week_start = last_monday.isoformat()
         last_week_end = last_sunday.isoformat()
         prev_week_start = prev_monday.isoformat()
-        prev_week_end = prev_sunday.isoformat()
 
-        recaps = []
         new_gerant_cutoff = (today - timedelta(days=7)).isoformat()
 
         try:
             gerants = await self.user_repo.find_many(
                 {"role": {"$in": ["gerant"]}, "status": "active"},
-                projection={"_id": 0, "id": 1, "name": 1, "email": 1, "created_at": 1}
+                projection={"_id": 0, "id": 1, "name": 1, "email": 1, "created_at": 1},
+                limit=WEEKLY_RECAP_MAX_GERANTS,
+                allow_over_limit=True,
             )
         except Exception:
             logger.exception("weekly_gerant_recap: cannot fetch gérants")
             return []
 
+        eligible = []
         for gerant in gerants:
-            gerant_id = gerant.get("id")
-            if not gerant_id:
+            if not gerant.get("id"):
                 continue
-
             # Skip gérants whose account was created less than 7 days ago
             created = (gerant.get("created_at") or "")
             if isinstance(created, str):
@@ -83,26 +90,64 @@ class JobsService:
                 created_str = created.date().isoformat() if hasattr(created, "date") else ""
             if created_str and created_str >= new_gerant_cutoff:
                 continue
+            eligible.append(gerant)
+        if not eligible:
+            return []
 
-            # Check workspace is billable (active or trial)
-            try:
-                billing = await self.billing_repo.find_by_gerant(gerant_id)
-                status = (billing or {}).get("subscription_status", "")
-                if status not in ("active", "trialing", "trial", "past_due"):
-                    continue
-            except Exception:
-                continue
+        # Billable workspaces (active or trial), one $in lookup
+        try:
+            billing_by_gerant = await self.billing_repo.find_by_gerant_ids(
+                [g["id"] for g in eligible],
+                projection={"_id": 0, "gerant_id": 1, "subscription_status": 1},
+            )
+        except Exception:
+            logger.exception("weekly_gerant_recap: cannot fetch billing profiles")
+            return []
+        eligible = [
+            g for g in eligible
+            if (billing_by_gerant.get(g["id"]) or {}).get("subscription_status", "")
+            in ("active", "trialing", "trial", "past_due")
+        ]
+        if not eligible:
+            return []
 
-            # Stores for this gérant
-            try:
-                stores = await self.store_repo.find_many(
-                    {"gerant_id": gerant_id, "active": True},
-                    projection={"_id": 0, "id": 1, "name": 1}
-                )
-            except Exception:
-                continue
+        # Active stores of all billable gérants, one $in lookup
+        try:
+            stores = await self.store_repo.find_active_by_gerant_ids(
+                [g["id"] for g in eligible],
+                projection={"_id": 0, "id": 1, "name": 1, "gerant_id": 1},
+            )
+        except Exception:
+            logger.exception("weekly_gerant_recap: cannot fetch stores")
+            return []
+        stores_by_gerant: Dict[str, List[Dict]] = {}
+        for store in stores:
+            stores_by_gerant.setdefault(store.get("gerant_id"), []).append(store)
+
+        # Last week / previous week / top seller for every store, one aggregation
+        store_ids = [s.get("id") for s in stores if s.get("id")]
+        try:
+            kpis_by_store = await self.kpi_repo.aggregate_weekly_store_recap(
+                store_ids, prev_week_start, last_week_start, last_week_end
+            )
+        except Exception:
+            logger.exception("weekly_gerant_recap: KPI aggregation failed")
+            return []
 
-            if not stores:
+        # Top seller names, one $in lookup
+        seller_ids = {k["top_seller_id"] for k in kpis_by_store.values() if k.get("top_seller_id")}
+        try:
+            sellers = await self.user_repo.find_by_ids(
+                list(seller_ids), projection={"_id": 0, "id": 1, "name": 1}
+            )
+            seller_names = {s.get("id"): s.get("name", "—") for s in sellers}
+        except Exception:
+            seller_names = {}
+
+        recaps = []
+        for gerant in eligible:
+            gerant_stores = stores_by_gerant.get(gerant["id"])
+            if not gerant_stores:
                 continue
 
             store_stats = []
@@ -111,60 +156,22 @@ class JobsService:
             top_seller = None
             top_seller_ca = 0
 
-            for store in stores:
-                store_id = store.get("id")
+            for store in gerant_stores:
                 store_name = store.get("name", "Magasin")
-
-                # KPI last week
-                try:
-                    result = await self.kpi_repo.aggregate([
-                        {"$match": {"store_id": store_id, "date": {"$gte": last_week_start, "$lte": last_week_end}}},
-                        {"$group": {
-                            "_id": None,
-                            "ca": {"$sum": {"$ifNull": ["$seller_ca", {"$ifNull": ["$ca_journalier", 0]}]}},
-                            "ventes": {"$sum": {"$ifNull": ["$nb_ventes", 0]}},
-                        }}
-                    ], max_results=1)
-                    ca = result[0].get("ca", 0) if result else 0
-                    ventes = result[0].get("ventes", 0) if result else 0
-                except Exception:
-                    ca, ventes = 0, 0
-
-                # KPI prev week (for evolution)
-                try:
-                    prev_result = await self.kpi_repo.aggregate([
-                        {"$match": {"store_id": store_id, "date": {"$gte": prev_week_start, "$lte": prev_week_end}}},
-                        {"$group": {"_id": None, "ca": {"$sum": {"$ifNull": ["$seller_ca", {"$ifNull": ["$ca_journalier", 0]}]}}}}
-                    ], max_results=1)
-                    ca_prev = prev_result[0].get("ca", 0) if prev_result else 0
-                except Exception:
-                    ca_prev = 0
-
+                kpis = kpis_by_store.get(store.get("id")) or {}
+                ca = kpis.get("ca", 0)
+                ventes = kpis.get("ventes", 0)
+                ca_prev = kpis.get("ca_prev", 0)
                 evolution = round(((ca - ca_prev) / ca_prev * 100), 1) if ca_prev > 0 else None
 
-                # Top seller this store
-                try:
-                    sellers_agg = await self.kpi_repo.aggregate([
-                        {"$match": {"store_id": store_id, "date": {"$gte": last_week_start, "$lte": last_week_end}}},
-                        {"$group": {
-                            "_id": "$seller_id",
-                            "ca": {"$sum": {"$ifNull": ["$seller_ca", {"$ifNull": ["$ca_journalier", 0]}]}}
-                        }},
-                        {"$sort": {"ca": -1}},
-                    ], max_results=1)
-                    if sellers_agg:
-                        s_id = sellers_agg[0].get("_id")
-                        s_ca = sellers_agg[0].get("ca", 0)
-                        if s_ca > top_seller_ca:
-                            seller_doc = await self.user_repo.find_by_id(s_id, projection={"_id": 0, "name": 1})
-                            top_seller_ca = s_ca
-                            top_seller = {
-                                "name": (seller_doc or {}).get("name", "—"),
-                                "store": store_name,
-                                "ca": s_ca,
-                            }
-                except Exception:
-                    pass
+                s_ca = kpis.get("top_seller_ca", 0)
+                if kpis.get("top_seller_id") is not None and s_ca > top_seller_ca:
+                    top_seller_ca = s_ca
+                    top_seller = {
+                        "name": seller_names.get(kpis["top_seller_id"], "—"),
+                        "store": store_name,
+                        "ca": s_ca,
+                    }
 
                 total_ca += ca
                 total_ca_prev += ca_prev
@@ -209,6 +216,7 @@ class JobsService:
         new_manager_cutoff = (today - timedelta(days=3)).isoformat()
 
         alerts = []
+        notifications = []
         try:
             managers = await self.user_repo.find_many(
                 {"role": "manager", "status": "active"},
@@ -272,17 +280,14 @@ class JobsService:
                     last_date = date.fromisoformat(last[0]["date"])
                     days_ago = (today - last_date).days
                     silent.append({"name": seller.get("name", "—"), "days_ago": days_ago})
-                    # Notif in-app pour le manager
-                    try:
-                        await self.notification_repo.create(
-                            user_id=manager_id,
-                            notif_type="silent_seller",
-                            title="Vendeur silencieux ⚠️",
-                            message=f"{seller.get('name', '—')} n'a pas saisi ses KPI depuis {days_ago} jour{'s' if days_ago > 1 else ''}",
-                            data={"seller_id": seller_id, "days_ago": days_ago},
-                        )
-                    except Exception:
-                        pass
+                    # Notif in-app pour le manager (insérées en un lot en fin de job)
+                    notifications.append({
+                        "user_id": manager_id,
+                        "type": "silent_seller",
+                        "title": "Vendeur silencieux ⚠️",
+                        "message": f"{seller.get('name', '—')} n'a pas saisi ses KPI depuis {days_ago} jour{'s' if days_ago > 1 else ''}",
+                        "data": {"seller_id": seller_id, "days_ago": days_ago},
+                    })
                 except Exception:
                     continue
 
@@ -293,6 +298,7 @@ class JobsService:
                     "sellers": silent,
                 })
 
+        await self.notification_service.create_many(notifications)
         return alerts
 
     # ── Objective expiring alerts ───────────────────────────────────────────
@@ -303,64 +309,65 @@ class JobsService:
         qui expirent aujourd'hui ou demain.
         Évite les doublons via vérification en base (un seul envoi par objectif par jour).
         Retourne le nombre de notifications créées.
+
+        Nombre de requêtes constant : objectifs concernés, managers ($in),
+        notifications déjà envoyées aujourd'hui ($in), puis un insert_many.
         """
         today = date.today()
         today_str = today.isoformat()
         tomorrow_str = (today + timedelta(days=1)).isoformat()
         since_str = today_str + "T00:00:00"  # depuis minuit aujourd'hui
 
-        count = 0
         try:
+            objectives = [
+                obj async for obj in self.objective_repo.find_iter(
+                    {"status": "active", "period_end": {"$in": [today_str, tomorrow_str]}},
+                    projection={"_id": 0, "id": 1, "title": 1, "period_end": 1, "manager_id": 1},
+                )
+                if obj.get("manager_id")
+            ]
+            if not objectives:
+                return 0
+            manager_ids = list({obj["manager_id"] for obj in objectives})
             managers = await self.user_repo.find_many(
-                {"role": "manager"},
+                {"id": {"$in": manager_ids}, "role": "manager"},
                 projection={"_id": 0, "id": 1},
+                limit=len(manager_ids),
+                allow_over_limit=True,
             )
+            active_managers = {m["id"] for m in managers if m.get("id")}
+
+            # Éviter les doublons : déjà notifié aujourd'hui ?
+            already_sent = {
+                (notif.get("user_id"), (notif.get("data") or {}).get("objective_id"))
+                async for notif in self.notification_repo.find_iter(
+                    {
+                        "type": "objective_expiring",
+                        "data.objective_id": {"$in": [obj.get("id", "") for obj in objectives]},
+                        "created_at": {"$gte": since_str},
+                    },
+                    projection={"_id": 0, "user_id": 1, "data.objective_id": 1},
+                )
+            }
         except Exception:
+            logger.exception("objective_expiring_alerts: cannot load objectives")
             return 0
 
-        for manager in managers:
-            manager_id = manager.get("id")
-            if not manager_id:
-                continue
-            try:
-                objectives = await self.objective_repo.find_by_manager(
-                    manager_id,
-                    projection={"_id": 0, "id": 1, "title": 1, "period_end": 1, "status": 1},
-                    limit=20,
-                )
-                for obj in objectives:
-                    if obj.get("status") != "active":
-                        continue
-                    period_end = obj.get("period_end", "")
-                    if period_end not in (today_str, tomorrow_str):
-                        continue
-
-                    obj_id = obj.get("id", "")
-
-                    # Éviter les doublons : déjà notifié aujourd'hui ?
-                    existing = await self.notification_repo.find_one(
-                        {
-                            "user_id": manager_id,
-                            "type": "objective_expiring",
-                            "data.objective_id": obj_id,
-                            "created_at": {"$gte": since_str},
-                        },
-                        {"_id": 1},
-                    )
-                    if existing:
-                        continue
-
-                    days_left = (date.fromisoformat(period_end) - today).days
-                    label = "aujourd'hui" if days_left == 0 else "demain"
-                    await self.notification_repo.create(
-                        user_id=manager_id,
-                        notif_type="objective_expiring",
-                        title=f"Objectif se termine {label} ⏰",
-                        message=f"« {obj.get('title', '')} » expire {label}",
-                        data={"objective_id": obj_id},
-                    )
-                    count += 1
-            except Exception:
+        notifications = []
+        for obj in objectives:
+            manager_id = obj["manager_id"]
+            obj_id = obj.get("id", "")
+            if manager_id not in active_managers or (manager_id, obj_id) in already_sent:
                 continue
+            days_left = (date.fromisoformat(obj["period_end"]) - today).days
+            label = "aujourd'hui" if days_left == 0 else "demain"
+            notifications.append({
+                "user_id": manager_id,
+                "type": "objective_expiring",
+                "title": f"Objectif se termine {label} ⏰",
+                "message": f"« {obj.get('title', '')} » expire {label}",
+                "data": {"objective_id": obj_id},
+            })
+            already_sent.add((manager_id, obj_id))
 
-        return count
+        return await self.notification_service.create_many(notifications)
@@ -0,0 +1,248 @@
+"""
+KPI Sync Service - Moteur de synchronisation KPI par lots (POST /integrations/kpi/sync).
+
+Au lieu de 2 lectures par entrée (vendeur + KPI existant) avant le bulk_write,
+chaque lot coûte un nombre FIXE de requêtes, quel que soit le nombre d'entrées :
+  1. users.find({"id": {"$in": [...]}})               → contrôle des vendeurs
+  2. kpi_entries.find({"seller_id": {"$in"}, "date": {"$in"}}) → clés existantes
+  3. kpi_entries.bulk_write([...])                    → écriture idempotente
+
+Chaque entrée est clé sur (seller_id, date) : une clé existante devient un
+UpdateOne, une clé absente un InsertOne. kpi_entries étant une collection
+Time Series (pas d'index unique possible), l'upsert serveur n'est pas utilisé :
+la résolution des clés existantes se fait en une requête ensembliste par lot.
+Les compteurs créés / mis à jour sont lus dans le résultat du bulk_write.
+
+Les lots sont indépendants : un lot en échec est journalisé et compté dans
+entries_failed, les suivants sont quand même écrits. store_ids couvre tous les
+magasins du payload (un bulk_write en échec a pu écrire une partie du lot),
+pour que l'appelant invalide leurs caches même après un échec partiel.
+"""
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+from pymongo import InsertOne, UpdateOne
+
+from config.limits import KPI_SYNC_CHUNK_SIZE
+from core.exceptions import BusinessLogicError
+from repositories.kpi_repository import KPIRepository
+from repositories.user_repository import UserRepository
+from utils.db_counter import increment_db_op
+
+logger = logging.getLogger(__name__)
+
+
+class KPISyncService:
+    """Synchronisation KPI ensembliste (N entrées → 3 requêtes par lot)."""
+
+    def __init__(self, kpi_repo: KPIRepository, user_repo: UserRepository):
+        self.kpi_repo = kpi_repo
+        self.user_repo = user_repo
+
+    # ------------------------------------------------------------------
+    # Normalisation
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def normalize_entries(
+        entries: List,
+        default_date: Optional[str],
+        default_store_id: Optional[str],
+    ) -> Dict[Tuple[str, str], Dict]:
+        """
+        Résout date / store_id (niveau entrée > niveau racine) et dédoublonne
+        sur (seller_id, date) : la dernière occurrence du payload l'emporte.
+
+        Raises:
+            BusinessLogicError: date ou store_id absent pour une entrée
+        """
+        normalized: Dict[Tuple[str, str], Dict] = {}
+        for entry in entries:
+            if not entry.seller_id:
+                logger.warning("Skipping entry without seller_id: %s", entry)
+                continue
+            entry_date = entry.date or default_date
+            entry_store_id = entry.store_id or default_store_id
+            if not entry_date:
+                raise BusinessLogicError(
+                    f"Date is required for seller_id {entry.seller_id}. "
+                    "Provide it either at root level or in each kpi_entry."
+                )
+            if not entry_store_id:
+                raise BusinessLogicError(
+                    f"store_id is required for seller_id {entry.seller_id}. "
+                    "Provide it either at root level or in each kpi_entry."
+                )
+            key = (entry.seller_id, entry_date)
+            normalized.pop(key, None)  # conserve l'ordre de la dernière occurrence
+            normalized[key] = {
+                "seller_id": entry.seller_id,
+                "date": entry_date,
+                "store_id": entry_store_id,
+                "ca_journalier": entry.ca_journalier,
+                "nb_ventes": entry.nb_ventes,
+                "nb_articles": entry.nb_articles,
+                "nb_prospects": entry.prospects or 0,
+                "nb_clients": entry.nb_ventes or 0,  # clients = ventes (cohérent avec la saisie manuelle)
+            }
+        return normalized
+
+    @staticmethod
+    def iter_chunks(items: List[Dict], chunk_size: int) -> Iterator[List[Dict]]:
+        """Découpe la liste en lots bornés (mémoire et taille de bulk_write maîtrisées)."""
+        size = max(1, chunk_size)
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
+
+    # ------------------------------------------------------------------
+    # Construction des opérations
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def build_operations(chunk: List[Dict], existing_keys: set) -> List:
+        """InsertOne pour les clés absentes, UpdateOne ciblé (seller_id, date) sinon."""
+        now = datetime.now(timezone.utc)
+        operations = []
+        for item in chunk:
+            kpi_data = {
+                "ca_journalier": item["ca_journalier"],
+                "nb_ventes": item["nb_ventes"],
+                "nb_articles": item["nb_articles"],
+                "nb_prospects": item["nb_prospects"],
+                "nb_clients": item["nb_clients"],
+                "store_id": item["store_id"],
+                "source": "api",
+                "locked": True,
+                "updated_at": now,
+            }
+            key = (item["seller_id"], item["date"])
+            if key in existing_keys:
+                operations.append(UpdateOne(
+                    {"seller_id": item["seller_id"], "date": item["date"]},
+                    {"$set": kpi_data},
+                ))
+            else:
+                kpi_data.update({
+                    "id": str(uuid4()),
+                    "seller_id": item["seller_id"],
+                    "date": item["date"],
+                    "created_at": now,
+                })
+                operations.append(InsertOne(kpi_data))
+        return operations
+
+    # ------------------------------------------------------------------
+    # Exécution
+    # ------------------------------------------------------------------
+
+    async def _check_sellers(self, seller_ids: List[str]) -> None:
+        """Un seul $in sur users ; les vendeurs inconnus sont journalisés mais conservés (comportement historique)."""
+        increment_db_op("db.users.find_by_ids")
+        users = await self.user_repo.find_by_ids(
+            seller_ids, projection={"_id": 0, "id": 1, "role": 1}
+        )
+        roles = {u.get("id"): u.get("role") for u in users}
+        missing = [sid for sid in seller_ids if sid not in roles]
+        not_sellers = [sid for sid, role in roles.items() if role != "seller"]
+        if missing:
+            logger.warning(
+                "KPI sync: %d seller(s) not found in database, continuing: %s",
+                len(missing), missing[:20],
+            )
+        if not_sellers:
+            logger.warning(
+                "KPI sync: %d user(s) are not sellers, continuing: %s",
+                len(not_sellers), not_sellers[:20],
+            )
+
+    async def _sync_chunk(self, chunk: List[Dict]) -> Dict:
+        """Synchronise un lot : 3 requêtes (+ refresh store_daily_kpis en nombre constant), quelle que soit sa taille."""
+        seller_ids = list(dict.fromkeys(item["seller_id"] for item in chunk))
+        dates = list(dict.fromkeys(item["date"] for item in chunk))
+
+        try:
+            await self._check_sellers(seller_ids)
+        except Exception:
+            logger.warning("KPI sync: seller lookup failed, continuing anyway", exc_info=True)
+
+        increment_db_op("db.kpi_entries.find_existing")
+        existing_keys = await self.kpi_repo.find_existing_seller_dates(seller_ids, dates)
+        operations = self.build_operations(chunk, existing_keys)
+
+        increment_db_op("db.kpi_entries.bulk_write")
+        result = await self.kpi_repo.bulk_write(operations)
+        return {
+            "created": result.get("inserted", 0) + result.get("upserted", 0),
+            "updated": result.get("matched", 0),
+        }
+
+    async def sync_entries(
+        self,
+        entries: List,
+        default_date: Optional[str] = None,
+        default_store_id: Optional[str] = None,
+        chunk_size: int = KPI_SYNC_CHUNK_SIZE,
+    ) -> Dict:
+        """
+        Synchronise un payload KPI complet, lot par lot (un lot en échec n'arrête pas les suivants).
+
+        Returns:
+            {
+                "entries_created": int,
+                "entries_updated": int,
+                "entries_failed": int,
+                "total": int,
+                "store_ids": [str],
+                "chunks": [{"index", "entries", "created", "updated", "duration_ms"[, "error"]}],
+            }
+        """
+        normalized = self.normalize_entries(entries, default_date, default_store_id)
+        items = list(normalized.values())
+
+        entries_created = 0
+        entries_updated = 0
+        entries_failed = 0
+        chunks_report = []
+        for index, chunk in enumerate(self.iter_chunks(items, chunk_size)):
+            started = time.perf_counter()
+            try:
+                counts = await self._sync_chunk(chunk)
+            except Exception as e:
+                duration_ms = round((time.perf_counter() - started) * 1000, 2)
+                entries_failed += len(chunk)
+                chunks_report.append({
+                    "index": index,
+                    "entries": len(chunk),
+                    "created": 0,
+                    "updated": 0,
+                    "duration_ms": duration_ms,
+                    "error": str(e),
+                })
+                logger.error("KPI sync chunk %d: %d entries failed: %s", index, len(chunk), e, exc_info=True)
+                continue
+            duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            entries_created += counts["created"]
+            entries_updated += counts["updated"]
+            chunks_report.append({
+                "index": index,
+                "entries": len(chunk),
+                "created": counts["created"],
+                "updated": counts["updated"],
+                "duration_ms": duration_ms,
+            })
+            logger.info(
+                "KPI sync chunk %d: %d entries (%d created, %d updated) in %.1f ms",
+                index, len(chunk), counts["created"], counts["updated"], duration_ms,
+            )
+
+        return {
+            "entries_created": entries_created,
+            "entries_updated": entries_updated,
+            "entries_failed": entries_failed,
+            "total": entries_created + entries_updated,
+            "store_ids": sorted({item["store_id"] for item in items}),
+            "chunks": chunks_report,
+        }
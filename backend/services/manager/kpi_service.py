@@ -3,13 +3,15 @@ Manager - KPI: calculs KPIs, agrégations, bilans équipe.
 Repositories injectés par __init__ (pas de db direct).
 """
 from datetime import datetime, timezone
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
+from core.config import settings
 from models.pagination import PaginatedResponse
 from utils.pagination import paginate
 from repositories.kpi_repository import KPIRepository, ManagerKPIRepository
+from repositories.store_daily_kpi_repository import StoreDailyKpiRepository
 from repositories.team_bilan_repository import TeamBilanRepository
-from utils.kpi_pipeline import build_seller_kpi_pipeline, EMPTY_KPI_METRICS
+from utils.kpi_pipeline import build_seller_kpi_pipeline, build_team_kpi_pipeline, EMPTY_KPI_METRICS
 from core.cache import get_cache_service, CacheKeys
 
 
@@ -21,10 +23,15 @@ class ManagerKpiService:
         kpi_repo: KPIRepository,
         manager_kpi_repo: ManagerKPIRepository,
         team_bilan_repo: TeamBilanRepository,
+        store_daily_kpi_repo: Optional[StoreDailyKpiRepository] = None,
     ):
         self.kpi_repo = kpi_repo
         self.manager_kpi_repo = manager_kpi_repo
         self.team_bilan_repo = team_bilan_repo
+        self.store_daily_kpi_repo = store_daily_kpi_repo
+
+    def _rollup_reads(self) -> bool:
+        return self.store_daily_kpi_repo is not None and settings.KPI_ROLLUP_READS_ENABLED
 
     async def get_kpi_distinct_dates(self, query: Dict) -> List[str]:
         """Dates distinctes des KPIs vendeurs."""
@@ -80,6 +87,44 @@ class ManagerKpiService:
             limit=limit,
         )
 
+    async def get_store_calendar(self, store_id: str, date_filter: Optional[Dict] = None) -> Dict:
+        """
+        Surlignage du calendrier : dates avec données, dates verrouillées (entrées vendeur)
+        et vendeurs verrouillés par date. Lu dans store_daily_kpis (une ligne par jour).
+        """
+        if self._rollup_reads():
+            rows = await self.store_daily_kpi_repo.find_calendar(store_id, date_filter)
+            return {
+                "dates": [row["date"] for row in rows],
+                "lockedDates": [row["date"] for row in rows if row.get("seller_locked")],
+                "lockedSellersByDate": {
+                    row["date"]: row["locked_seller_ids"] for row in rows if row.get("locked_seller_ids")
+                },
+            }
+        query = {"store_id": store_id}
+        if date_filter:
+            query["date"] = date_filter
+        dates = await self.get_kpi_distinct_dates(query)
+        manager_dates = await self.get_manager_kpi_distinct_dates(query)
+        locked_dates = await self.get_kpi_distinct_dates({**query, "locked": True})
+        return {
+            "dates": sorted(set(dates) | set(manager_dates)),
+            "lockedDates": sorted(locked_dates),
+            "lockedSellersByDate": await self.get_locked_seller_ids_by_date(store_id, date_filter=date_filter),
+        }
+
+    async def get_store_available_years(self, store_id: str) -> List[int]:
+        """Années avec données KPI (vendeur ou manager), la plus récente en premier."""
+        if self._rollup_reads():
+            return await self.store_daily_kpi_repo.find_years(store_id)
+        dates = await self.get_kpi_distinct_dates({"store_id": store_id})
+        manager_dates = await self.get_manager_kpi_distinct_dates({"store_id": store_id})
+        years = set()
+        for date_str in set(dates) | set(manager_dates):
+            if date_str and len(date_str) >= 4 and date_str[:4].isdigit():
+                years.add(int(date_str[:4]))
+        return sorted(years, reverse=True)
+
     async def get_locked_seller_ids_by_date(self, store_id: str, date_filter: dict = None) -> dict:
         """Retourne {date: [seller_id, ...]} pour toutes les entrées verrouillées du magasin."""
         query = {"store_id": store_id, "locked": True}
@@ -89,6 +134,7 @@ class ManagerKpiService:
             query,
             {"_id": 0, "date": 1, "seller_id": 1},
             limit=2000,
+            allow_over_limit=True,
         )
         result: dict = {}
         for entry in entries:
@@ -159,6 +205,27 @@ class ManagerKpiService:
         result = await self.kpi_repo.aggregate(pipeline, max_results=1)
         return result[0] if result else dict(EMPTY_KPI_METRICS)
 
+    async def get_team_kpi_metrics(
+        self,
+        seller_ids: List[str],
+        periods: Dict[str, Tuple[str, str]],
+    ) -> Dict[str, Dict[str, Dict]]:
+        """
+        Métriques de get_seller_kpi_metrics pour toute une équipe et plusieurs périodes
+        (voir comparison_periods) en une seule agrégation ($facet par période).
+        Retourne {période: {seller_id: métriques}} — EMPTY_KPI_METRICS pour un vendeur sans saisie.
+        """
+        if not seller_ids:
+            return {name: {} for name in periods}
+        pipeline = build_team_kpi_pipeline(seller_ids, periods)
+        result = await self.kpi_repo.aggregate(pipeline, max_results=1)
+        facets = result[0] if result else {}
+        metrics = {}
+        for name in periods:
+            by_seller = {row.pop("seller_id"): row for row in facets.get(name, [])}
+            metrics[name] = {sid: by_seller.get(sid) or dict(EMPTY_KPI_METRICS) for sid in seller_ids}
+        return metrics
+
     async def get_kpi_entries_paginated(
         self,
         query: Dict,
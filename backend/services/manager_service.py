@@ -3,7 +3,7 @@ Manager Service
 Facade over specialized manager services (store, sellers, KPI, achievements) + remaining repos.
 """
 from __future__ import annotations
-from typing import Dict, List, Optional, Any, TYPE_CHECKING
+from typing import Dict, List, Optional, Any, Tuple, Union, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from services.manager import (
@@ -15,8 +15,8 @@ if TYPE_CHECKING:
 from datetime import datetime, timezone, timedelta
 import logging
 
-from models.pagination import PaginatedResponse
-from utils.pagination import paginate
+from models.pagination import CursorPaginatedResponse, PaginatedResponse
+from utils.pagination import paginate, paginate_keyset
 from repositories.store_repository import StoreRepository
 from repositories.user_repository import UserRepository
 from repositories.manager_diagnostic_repository import ManagerDiagnosticRepository
@@ -163,6 +163,12 @@ class ManagerService:
     async def get_manager_kpi_distinct_dates(self, query: Dict) -> List[str]:
         return await self._kpi.get_manager_kpi_distinct_dates(query)
 
+    async def get_store_calendar(self, store_id: str, date_filter: Optional[Dict] = None) -> Dict:
+        return await self._kpi.get_store_calendar(store_id, date_filter)
+
+    async def get_store_available_years(self, store_id: str) -> List[int]:
+        return await self._kpi.get_store_available_years(store_id)
+
     async def get_manager_kpis_paginated(
         self,
         store_id: str,
@@ -235,6 +241,12 @@ class ManagerService:
         """Source unique de vérité pour les métriques KPI d'un vendeur. Agrégation server-side."""
         return await self._kpi.get_seller_kpi_metrics(seller_id, start_date, end_date)
 
+    async def get_team_kpi_metrics(
+        self, seller_ids: List[str], periods: Dict[str, Tuple[str, str]]
+    ) -> Dict[str, Dict[str, Dict]]:
+        """Métriques KPI de toute l'équipe, plusieurs périodes, une seule agrégation."""
+        return await self._kpi.get_team_kpi_metrics(seller_ids, periods)
+
     async def get_kpi_entries_paginated(
         self,
         query: Dict,
@@ -366,6 +378,24 @@ class ManagerService:
             return None
         return await self.diagnostic_repo.find_by_seller(seller_id)
 
+    async def get_team_profile_sources(
+        self, seller_ids: List[str], debrief_limit: int = 5
+    ) -> Tuple[Dict[str, Dict], Dict[str, List[Dict]]]:
+        """
+        Latest diagnostic and last debriefs of several sellers in 2 queries
+        (instead of 2 per seller): ({seller_id: diagnostic}, {seller_id: [debrief, ...]}).
+        """
+        import asyncio as _asyncio
+
+        async def _none() -> Dict:
+            return {}
+
+        diagnostics, debriefs = await _asyncio.gather(
+            self.diagnostic_repo.find_latest_by_sellers(seller_ids) if self.diagnostic_repo else _none(),
+            self.debrief_repo.find_recent_by_sellers(seller_ids, per_seller=debrief_limit) if self.debrief_repo else _none(),
+        )
+        return diagnostics, debriefs
+
     async def get_team_disc_profiles(self, store_id: str) -> List[Dict]:
         """
         Return [{first_name, disc_style}] for all active sellers in the store.
@@ -380,13 +410,10 @@ class ManagerService:
             )
             if not sellers:
                 return []
-            import asyncio as _asyncio
-            diagnostics = await _asyncio.gather(
-                *[self.diagnostic_repo.find_by_seller(s["id"]) for s in sellers],
-                return_exceptions=True,
-            )
+            diagnostics = await self.diagnostic_repo.find_latest_by_sellers([s["id"] for s in sellers])
             profiles = []
-            for seller, diag in zip(sellers, diagnostics):
+            for seller in sellers:
+                diag = diagnostics.get(seller["id"])
                 first_name = seller.get("name", "").split()[0]
                 disc_style = ""
                 if isinstance(diag, dict):
@@ -408,11 +435,26 @@ class ManagerService:
         )
 
     async def get_debriefs_by_seller_paginated(
-        self, seller_id: str, page: int = 1, size: int = 50
-    ) -> PaginatedResponse:
-        """Get paginated debriefs for seller. Used by manager evaluations routes."""
+        self, seller_id: str, page: int = 1, size: int = 50, cursor: Optional[str] = None
+    ) -> Union[PaginatedResponse, CursorPaginatedResponse]:
+        """
+        Get paginated debriefs for seller. Used by manager evaluations routes.
+        cursor (even empty) switches to keyset pagination (created_at desc, id) with cached total.
+        """
         if not self.debrief_repo:
+            if cursor is not None:
+                return CursorPaginatedResponse(items=[], size=size, has_more=False, total=0)
             return PaginatedResponse(items=[], total=0, page=page, size=size, pages=0)
+        if cursor is not None:
+            return await paginate_keyset(
+                collection=self.debrief_repo.collection,
+                query={"seller_id": seller_id},
+                sort=[("created_at", -1)],
+                size=size,
+                cursor=cursor,
+                projection={"_id": 0},
+                with_total=True,
+            )
         return await paginate(
             collection=self.debrief_repo.collection,
             query={"seller_id": seller_id},
@@ -2,16 +2,55 @@
 Notification Service
 - Achievement notifications (objectives/challenges seen flags)
 - Generic in-app notifications (kpi_saved, silent_seller, …)
+
+Generic notifications are written to Mongo, then (write-behind, best effort):
+- the per-user unread counter in Redis (notif:unread:{user_id}) is adjusted
+  atomically on create / read / read-all; a missing counter is rebuilt from
+  Mongo on the next read, so polling no longer runs count_documents each time;
+- the change is pushed on the user's WebSocket topic (/ws/notifications).
+Redis or WebSocket failures never fail the write: the counter expires after
+NOTIFICATION_UNREAD_TTL_SECONDS and is rebuilt from Mongo.
 """
+import asyncio
 import logging
+from collections import defaultdict
 from datetime import datetime, timezone
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 
+from config.limits import NOTIFICATION_UNREAD_TTL_SECONDS
 from repositories.achievement_notification_repository import AchievementNotificationRepository
-from repositories.notification_repository import NotificationRepository
+from repositories.notification_repository import NotificationRepository, build_notification
 
 logger = logging.getLogger(__name__)
 
+UNREAD_KEY_PREFIX = "notif:unread:"
+
+# +n / -n uniquement si le compteur existe (sinon il sera reconstruit depuis Mongo), jamais < 0
+_ADJUST_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return nil end
+local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+if value < 0 then redis.call('SET', KEYS[1], 0) value = 0 end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return value
+"""
+
+
+def unread_key(user_id: str) -> str:
+    return f"{UNREAD_KEY_PREFIX}{user_id}"
+
+
+async def _default_redis():
+    from core.cache import get_cache_service
+    cache = await get_cache_service()
+    if cache.enabled and cache.redis_client is not None:
+        return cache.redis_client
+    return None
+
+
+async def _default_publisher(user_id: str, event: Dict) -> None:
+    from core.ws_manager import ws_manager
+    await ws_manager.publish_to_user(user_id, event)
+
 
 class NotificationService:
     """Service for achievement + generic in-app notifications."""
@@ -20,9 +59,13 @@ class NotificationService:
         self,
         achievement_notification_repo: AchievementNotificationRepository,
         notification_repo: Optional[NotificationRepository] = None,
+        redis_resolver: Optional[Callable] = None,
+        publisher: Optional[Callable] = None,
     ):
         self.achievement_notification_repo = achievement_notification_repo
         self.notification_repo = notification_repo
+        self._redis_resolver = redis_resolver or _default_redis
+        self._publisher = publisher or _default_publisher
     
     async def check_achievement_notification(self, user_id: str, item_type: str, item_id: str) -> bool:
         """
@@ -67,17 +110,17 @@ class NotificationService:
             user_id: User ID (seller or manager)
             item_type: "objective" or "challenge"
         """
+        achieved_ids = [
+            item.get('id') for item in items
+            if item.get('status') in ['achieved', 'completed'] and item.get('id')
+        ]
+        # Une seule requête $in pour tous les items atteints
+        seen_ids = await self.achievement_notification_repo.find_seen_item_ids(
+            user_id, item_type, achieved_ids
+        ) if achieved_ids else set()
         for item in items:
-            # Check if item is achieved/completed and notification not seen
-            status = item.get('status')
-            is_achieved = status in ['achieved', 'completed']
-            
-            if is_achieved:
-                item_id = item.get('id')
-                has_seen = await self.check_achievement_notification(user_id, item_type, item_id)
-                item['has_unseen_achievement'] = not has_seen
-            else:
-                item['has_unseen_achievement'] = False
+            is_achieved = item.get('status') in ['achieved', 'completed']
+            item['has_unseen_achievement'] = is_achieved and item.get('id') not in seen_ids
 
     # ── Generic in-app notifications ────────────────────────────────────────
 
@@ -86,9 +129,31 @@ class NotificationService:
         if not self.notification_repo:
             return
         try:
-            await self.notification_repo.create(user_id, notif_type, title, message, data)
+            doc = await self.notification_repo.create(user_id, notif_type, title, message, data)
         except Exception:
             logger.exception("Failed to create notification type=%s user=%s", notif_type, user_id)
+            return
+        await self._after_create([doc])
+
+    async def create_many(self, notifications: List[Dict]) -> int:
+        """
+        Bulk create for job fan-out: one insert_many, one counter update per user,
+        one WebSocket push per user. Items: {user_id, type, title, message, data?}.
+        Returns the number of notifications created.
+        """
+        if not self.notification_repo or not notifications:
+            return 0
+        docs = [
+            build_notification(n["user_id"], n["type"], n["title"], n["message"], n.get("data"))
+            for n in notifications
+        ]
+        try:
+            await self.notification_repo.create_many(docs)
+        except Exception:
+            logger.exception("Failed to create %d notifications", len(docs))
+            return 0
+        await self._after_create(docs)
+        return len(docs)
 
     async def get_for_user(self, user_id: str, limit: int = 20) -> List[Dict]:
         if not self.notification_repo:
@@ -96,16 +161,95 @@ class NotificationService:
         return await self.notification_repo.find_for_user(user_id, limit=limit)
 
     async def count_unread(self, user_id: str) -> int:
+        """Unread counter from Redis; on a miss, counted in Mongo and stored."""
         if not self.notification_repo:
             return 0
-        return await self.notification_repo.count_unread(user_id)
+        redis = await self._redis()
+        if redis is not None:
+            try:
+                cached = await redis.get(unread_key(user_id))
+                if cached is not None:
+                    return int(cached)
+            except Exception as e:
+                logger.debug("Unread counter read failed user=%s: %s", user_id, e)
+                redis = None
+        count = await self.notification_repo.count_unread(user_id)
+        if redis is not None:
+            try:
+                # nx : ne pas écraser un compteur recréé entre-temps par un autre worker
+                await redis.set(unread_key(user_id), count, ex=NOTIFICATION_UNREAD_TTL_SECONDS, nx=True)
+            except Exception as e:
+                logger.debug("Unread counter rebuild failed user=%s: %s", user_id, e)
+        return count
 
     async def mark_read(self, notif_id: str, user_id: str) -> bool:
         if not self.notification_repo:
             return False
-        return await self.notification_repo.mark_read(notif_id, user_id)
+        ok = await self.notification_repo.mark_read(notif_id, user_id)
+        if ok:
+            unread = await self._adjust_unread(user_id, -1)
+            await self._push(user_id, {"type": "notifications_read", "ids": [notif_id], "unread_count": unread})
+        return ok
 
     async def mark_all_read(self, user_id: str) -> int:
         if not self.notification_repo:
             return 0
-        return await self.notification_repo.mark_all_read(user_id)
+        count = await self.notification_repo.mark_all_read(user_id)
+        redis = await self._redis()
+        if redis is not None:
+            try:
+                await redis.set(unread_key(user_id), 0, ex=NOTIFICATION_UNREAD_TTL_SECONDS)
+            except Exception as e:
+                logger.debug("Unread counter reset failed user=%s: %s", user_id, e)
+        await self._push(user_id, {"type": "notifications_read", "ids": "all", "unread_count": 0})
+        return count
+
+    # ── Write-behind (Redis counter + WebSocket push) ───────────────────────
+
+    async def _after_create(self, docs: List[Dict]) -> None:
+        by_user: Dict[str, List[Dict]] = defaultdict(list)
+        for doc in docs:
+            by_user[doc["user_id"]].append(doc)
+        unread = await self._adjust_unread_many({user_id: len(user_docs) for user_id, user_docs in by_user.items()})
+        await asyncio.gather(*(
+            self._push(user_id, {
+                "type": "notifications_created", "notifications": user_docs, "unread_count": unread.get(user_id),
+            })
+            for user_id, user_docs in by_user.items()
+        ))
+
+    async def _adjust_unread(self, user_id: str, delta: int) -> Optional[int]:
+        """New counter value, or None if the counter is not cached (rebuilt on next read)."""
+        return (await self._adjust_unread_many({user_id: delta})).get(user_id)
+
+    async def _adjust_unread_many(self, deltas: Dict[str, int]) -> Dict[str, Optional[int]]:
+        """One pipelined round-trip for all users of a fan-out."""
+        redis = await self._redis()
+        if redis is None or not deltas:
+            return {}
+        users = list(deltas)
+        try:
+            pipe = redis.pipeline(transaction=False)
+            for user_id in users:
+                pipe.eval(_ADJUST_SCRIPT, 1, unread_key(user_id), deltas[user_id], NOTIFICATION_UNREAD_TTL_SECONDS)
+            values = await pipe.execute()
+        except Exception as e:
+            logger.warning("Unread counter update failed (%d users): %s", len(users), e)
+            try:
+                await redis.delete(*(unread_key(user_id) for user_id in users))  # rebuilt from Mongo on next read
+            except Exception:
+                pass
+            return {}
+        return {user_id: None if value is None else int(value) for user_id, value in zip(users, values)}
+
+    async def _push(self, user_id: str, event: Dict) -> None:
+        try:
+            await self._publisher(user_id, event)
+        except Exception as e:
+            logger.debug("Notification push failed user=%s: %s", user_id, e)
+
+    async def _redis(self):
+        try:
+            return await self._redis_resolver()
+        except Exception:
+            return None
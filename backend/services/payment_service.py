@@ -7,7 +7,6 @@ Split en mixins :
 - _subscription_webhook_mixin.py : customer.subscription.* + checkout.session.completed
 - _seats_mixin.py             : update_subscription_seats
 """
-import os
 import logging
 import stripe
 from typing import Dict
@@ -37,8 +36,8 @@ class PaymentService(InvoiceWebhookMixin, SubscriptionWebhookMixin, SeatsMixin):
         if stripe_client is not None:
             self.stripe = stripe_client
         else:
-            from services.stripe_client import StripeClient
-            self.stripe = StripeClient(api_key=os.environ.get("STRIPE_API_KEY") or "")
+            from services.stripe_client import get_stripe_gateway
+            self.stripe = get_stripe_gateway()
 
     # ==========================================
     # WEBHOOK EVENT DISPATCHER
@@ -294,7 +294,8 @@ IMPORTANT : Sois CONCIS, DIRECT et PRATIQUE. Évite les longues explications th
                 ai_response = await self.ai_service._send_message(
                     system_message=system_message,
                     user_prompt=user_prompt,
-                    model="gpt-4o"
+                    model="gpt-4o",
+                    cache_feature="relationship_recommendation"
                 )
             except Exception as ai_error:
                 logger.exception(
@@ -3,12 +3,26 @@ import logging
 from datetime import datetime, timezone
 from typing import Dict, List, Optional
 
+from config.limits import CHALLENGE_PROGRESS_FLUSH_SECONDS, CHALLENGE_PROGRESS_MAX_PENDING
 from models.pagination import PaginatedResponse
+from utils.daily_prefix_sums import DailyPrefixSums
 from utils.pagination import paginate
 from core.exceptions import ForbiddenError
+from core.write_behind import DebouncedUpdateWriter
 
 logger = logging.getLogger(__name__)
 
+# Progressions / statuts recalculés pendant les GET : écrits en différé, groupés (un buffer par worker)
+challenge_progress_writer = DebouncedUpdateWriter(
+    "challenges.progress",
+    delay_seconds=CHALLENGE_PROGRESS_FLUSH_SECONDS,
+    max_pending=CHALLENGE_PROGRESS_MAX_PENDING,
+)
+
+_PROGRESS_FIELDS = (
+    "progress_ca", "progress_ventes", "progress_articles", "progress_panier_moyen", "progress_indice_vente",
+)
+
 
 class ChallengesMixin:
 
@@ -165,8 +179,7 @@ class ChallengesMixin:
                     # Visible only to specific sellers, and this seller is in the list
                     filtered_challenges.append(challenge)
 
-        for challenge in filtered_challenges:
-            await self.calculate_challenge_progress(challenge, seller_id)
+        await self.evaluate_challenges_progress(filtered_challenges, seller_id)
         await self.add_achievement_notification_flag(filtered_challenges, seller_id, "challenge")
 
         result = filtered_challenges
@@ -234,9 +247,8 @@ class ChallengesMixin:
                 elif isinstance(visible_to, list) and seller_id in visible_to:
                     filtered_challenges.append(challenge)
 
-        # Calculate progress for each challenge
-        for challenge in filtered_challenges:
-            await self.calculate_challenge_progress(challenge, seller_id)
+        # Calculate progress for all challenges (batch, no write during the read)
+        await self.evaluate_challenges_progress(filtered_challenges, seller_id)
 
         # Add achievement notification flags
         await self.add_achievement_notification_flag(filtered_challenges, seller_id, "challenge")
@@ -318,9 +330,8 @@ class ChallengesMixin:
                     # Visible only to specific sellers, and this seller is in the list
                     filtered_challenges.append(challenge)
 
-        # Calculate progress for each challenge
-        for challenge in filtered_challenges:
-            await self.calculate_challenge_progress(challenge, seller_id)
+        # Calculate progress for all challenges (batch, no write during the read)
+        await self.evaluate_challenges_progress(filtered_challenges, seller_id)
 
         # Add 'achieved' property for frontend compatibility
         for challenge in filtered_challenges:
@@ -330,6 +341,145 @@ class ChallengesMixin:
 
         return filtered_challenges
 
+    def _defer_challenge_update(self, challenge: Dict, update_data: Dict) -> None:
+        """Queue a challenge $set on challenge_progress_writer (same security filter as update_challenge)."""
+        filters = {"id": challenge['id']}
+        if challenge.get('store_id'):
+            filters["store_id"] = challenge['store_id']
+        elif challenge.get('manager_id'):
+            filters["manager_id"] = challenge['manager_id']
+        else:
+            return
+        challenge_progress_writer.submit(self.challenge_repo, filters, update_data)
+
+    async def evaluate_challenges_progress(self, challenges: List[Dict], seller_id: Optional[str] = None) -> None:
+        """
+        Same results as calculate_challenge_progress for a whole listing, in O(1) queries:
+        - per-day KPI totals of every challenge scope (collective store / individual seller)
+          in one $facet aggregation, range totals from prefix sums;
+        - manager KPI fallback in at most one more aggregation;
+        - collective seller ids once per store.
+        Nothing is written during the read: changed progress / status are queued on
+        challenge_progress_writer (one bulk_write per flush).
+        """
+        from utils.db_counter import increment_db_op
+
+        today = datetime.now().strftime('%Y-%m-%d')
+        kpi_challenges = []
+        for challenge in challenges:
+            end_date = challenge.get('end_date') or challenge.get('period_end')
+            # Manual progress (manager or seller): only the status is derived, from current_value
+            if str(challenge.get('data_entry_responsible', '')).lower() in ['manager', 'seller']:
+                current_value = float(challenge.get('current_value') or 0)
+                new_status = self.compute_status(current_value, challenge.get('target_value', 0), end_date)
+                if new_status != challenge.get('status'):
+                    update_data = {"status": new_status}
+                    if new_status in ['achieved', 'completed']:
+                        update_data["completed_at"] = datetime.now(timezone.utc).isoformat()
+                    self._defer_challenge_update(challenge, update_data)
+                challenge['status'] = new_status
+            elif (challenge.get('start_date') or challenge.get('period_start')) and end_date:
+                kpi_challenges.append(challenge)
+            else:
+                for field in _PROGRESS_FIELDS:
+                    challenge[field] = 0
+        if not kpi_challenges:
+            return
+
+        # Scope of each challenge → named query of the $facet aggregation
+        seller_queries: Dict[str, Dict] = {}
+        scope_of: Dict[str, str] = {}
+        for challenge in kpi_challenges:
+            store_id = challenge.get('store_id')
+            if challenge.get('type') == 'collective':
+                scope = f"collective:{store_id or ''}:{'' if store_id else challenge.get('manager_id')}"
+                if scope not in seller_queries:
+                    seller_query = {"role": "seller"}
+                    if store_id:
+                        seller_query["store_id"] = store_id
+                    else:
+                        seller_query["manager_id"] = challenge['manager_id']
+                    increment_db_op("db.users.find (sellers - challenges)")
+                    seller_ids = [uid async for uid in self.user_repo.find_ids_by_query(seller_query)]
+                    kpi_query = {"seller_id": {"$in": seller_ids}}
+                    if store_id:
+                        kpi_query["store_id"] = store_id
+                    seller_queries[scope] = kpi_query
+            else:
+                target_seller_id = seller_id or challenge.get('seller_id')
+                scope = f"individual:{target_seller_id}"
+                seller_queries.setdefault(scope, {"seller_id": target_seller_id})
+            scope_of[challenge['id']] = scope
+
+        date_range = {
+            "$gte": min(c.get('start_date') or c.get('period_start') for c in kpi_challenges),
+            "$lte": max(c.get('end_date') or c.get('period_end') for c in kpi_challenges),
+        }
+        increment_db_op("db.kpi_entries.aggregate (daily totals - challenges)")
+        seller_rows = await self.kpi_repo.aggregate_daily_totals_facets(seller_queries, date_range)
+        seller_sums = {scope: DailyPrefixSums.from_daily_rows(rows) for scope, rows in seller_rows.items()}
+
+        totals: Dict[str, List] = {}
+        manager_queries: Dict[str, Dict] = {}
+        for challenge in kpi_challenges:
+            start_date = challenge.get('start_date') or challenge.get('period_start')
+            end_date = challenge.get('end_date') or challenge.get('period_end')
+            range_totals = seller_sums[scope_of[challenge['id']]].range_totals(start_date, end_date)
+            totals[challenge['id']] = [range_totals['ca_journalier'], range_totals['nb_ventes'], range_totals['nb_articles']]
+            manager_id = challenge.get('manager_id')
+            if manager_id and 0 in totals[challenge['id']]:
+                manager_query = {"manager_id": manager_id}
+                if challenge.get('store_id'):
+                    manager_query["store_id"] = challenge['store_id']
+                manager_queries.setdefault(f"{manager_id}:{challenge.get('store_id') or ''}", manager_query)
+
+        # Fallback to manager KPIs if seller data is missing (one aggregation for every manager)
+        manager_sums = {}
+        if manager_queries:
+            increment_db_op("db.manager_kpis.aggregate (daily totals - challenges)")
+            manager_rows = await self.manager_kpi_repo.aggregate_daily_totals_facets(manager_queries, date_range)
+            manager_sums = {key: DailyPrefixSums.from_daily_rows(rows) for key, rows in manager_rows.items()}
+
+        for challenge in kpi_challenges:
+            start_date = challenge.get('start_date') or challenge.get('period_start')
+            end_date = challenge.get('end_date') or challenge.get('period_end')
+            total_ca, total_ventes, total_articles = totals[challenge['id']]
+            manager_key = f"{challenge.get('manager_id')}:{challenge.get('store_id') or ''}"
+            if manager_key in manager_sums and (total_ca == 0 or total_ventes == 0 or total_articles == 0):
+                manager_totals = manager_sums[manager_key].range_totals(start_date, end_date)
+                if total_ca == 0:
+                    total_ca = manager_totals['ca_journalier']
+                if total_ventes == 0:
+                    total_ventes = manager_totals['nb_ventes']
+                if total_articles == 0:
+                    total_articles = manager_totals['nb_articles']
+
+            panier_moyen = total_ca / total_ventes if total_ventes > 0 else 0
+            indice_vente = total_ca / total_articles if total_articles > 0 else 0
+            progress = dict(zip(_PROGRESS_FIELDS, (total_ca, total_ventes, total_articles, panier_moyen, indice_vente)))
+
+            update_data = {}
+            if today > end_date:
+                if challenge.get('status') == 'active':
+                    completed = True
+                    if challenge.get('ca_target') and total_ca < challenge['ca_target']:
+                        completed = False
+                    if challenge.get('ventes_target') and total_ventes < challenge['ventes_target']:
+                        completed = False
+                    if challenge.get('panier_moyen_target') and panier_moyen < challenge['panier_moyen_target']:
+                        completed = False
+                    if challenge.get('indice_vente_target') and indice_vente < challenge['indice_vente_target']:
+                        completed = False
+                    new_status = 'completed' if completed else 'failed'
+                    update_data = {"status": new_status, "completed_at": datetime.now(timezone.utc).isoformat(), **progress}
+                    challenge['status'] = new_status
+            elif any(challenge.get(field) != value for field, value in progress.items()):
+                # Challenge in progress: save only changed progress values
+                update_data = progress
+            challenge.update(progress)
+            if update_data:
+                self._defer_challenge_update(challenge, update_data)
+
     async def calculate_challenge_progress(self, challenge: dict, seller_id: str = None):
         """Calculate progress for a challenge"""
         # If progress is entered manually by the manager or seller, do NOT overwrite it from KPI aggregates.
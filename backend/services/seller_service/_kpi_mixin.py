@@ -1,10 +1,10 @@
 """KPI-related methods for SellerService."""
 import asyncio
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 
-from models.pagination import PaginatedResponse
-from utils.pagination import paginate
+from models.pagination import CursorPaginatedResponse, PaginatedResponse
+from utils.pagination import paginate, paginate_keyset
 from utils.kpi_pipeline import build_seller_kpi_pipeline, EMPTY_KPI_METRICS
 
 logger = logging.getLogger(__name__)
@@ -17,10 +17,23 @@ class KpiMixin:
         return await self.kpi_repo.distinct_dates(query)
 
     async def get_kpi_entries_paginated(
-        self, seller_id: str, page: int, size: int, projection: Optional[Dict] = None
-    ) -> PaginatedResponse:
-        """Get paginated KPI entries for seller. Used by routes instead of service.kpi_repo.collection."""
+        self, seller_id: str, page: int, size: int, projection: Optional[Dict] = None,
+        cursor: Optional[str] = None,
+    ) -> Union[PaginatedResponse, CursorPaginatedResponse]:
+        """
+        Get paginated KPI entries for seller. Used by routes instead of service.kpi_repo.collection.
+        cursor (even empty) switches to keyset pagination (date desc, id).
+        """
         proj = projection or {"_id": 0}
+        if cursor is not None:
+            return await paginate_keyset(
+                collection=self.kpi_repo.collection,
+                query={"seller_id": seller_id},
+                sort=[("date", -1)],
+                size=size,
+                cursor=cursor,
+                projection=proj,
+            )
         return await paginate(
             collection=self.kpi_repo.collection,
             query={"seller_id": seller_id},
@@ -93,11 +106,21 @@ class KpiMixin:
         end_date: Optional[str],
         page: int = 1,
         size: int = 50,
-    ) -> PaginatedResponse:
-        """Get paginated KPI entries for seller in date range (e.g. for bilan)."""
+        cursor: Optional[str] = None,
+    ) -> Union[PaginatedResponse, CursorPaginatedResponse]:
+        """Get paginated KPI entries for seller in date range (e.g. for bilan). cursor: see get_kpi_entries_paginated."""
         query: Dict = {"seller_id": seller_id}
         if start_date and end_date:
             query["date"] = {"$gte": start_date, "$lte": end_date}
+        if cursor is not None:
+            return await paginate_keyset(
+                collection=self.kpi_repo.collection,
+                query=query,
+                sort=[("date", -1)],
+                size=size,
+                cursor=cursor,
+                projection={"_id": 0},
+            )
         return await paginate(
             collection=self.kpi_repo.collection,
             query=query,
@@ -126,7 +149,9 @@ async def _notify_manager_kpi_saved(entry: dict) -> None:
         from core.database import database
         from repositories.user_repository import UserRepository
         from repositories.kpi_config_repository import KPIConfigRepository
+        from repositories.achievement_notification_repository import AchievementNotificationRepository
         from repositories.notification_repository import NotificationRepository
+        from services.notification_service import NotificationService
 
         db = database.db
         if db is None:
@@ -149,7 +174,7 @@ async def _notify_manager_kpi_saved(entry: dict) -> None:
             return
 
         kpi_date = entry.get("date", "")
-        await NotificationRepository(db).create(
+        await NotificationService(AchievementNotificationRepository(db), NotificationRepository(db)).create(
             user_id=seller["manager_id"],
             notif_type="kpi_saved",
             title="KPI saisi ✅",
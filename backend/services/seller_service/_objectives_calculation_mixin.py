@@ -3,6 +3,8 @@ import logging
 from datetime import datetime, timezone
 from typing import Dict, List, Optional
 
+from utils.daily_prefix_sums import DailyPrefixSums
+
 logger = logging.getLogger(__name__)
 
 
@@ -210,7 +212,8 @@ class ObjectivesCalculationMixin:
     async def calculate_objectives_progress_batch(self, objectives: List[Dict], manager_id: str, store_id: str):
         """
         Calculate progress for multiple objectives in batch (optimized version)
-        Preloads all KPI data once instead of N queries per objective
+        Loads per-day totals once (server-side $group by date) and answers each
+        objective's range from prefix sums, instead of N queries or N scans
 
         Args:
             objectives: List of objective dicts
@@ -266,64 +269,27 @@ class ObjectivesCalculationMixin:
                 objective['status'] = self.compute_status(0, objective.get('target_value', 0), objective.get('period_end'))
             return objectives
 
-        # Preload all KPI entries for the global date range (1 query)
-        kpi_query = {
-            "seller_id": {"$in": seller_ids},
-            "date": {"$gte": min_start, "$lte": max_end}
-        }
+        # Per-day totals for the global date range, grouped server-side (2 queries,
+        # one document per day — raw entries are never loaded)
+        date_range = {"$gte": min_start, "$lte": max_end}
+        kpi_query = {"seller_id": {"$in": seller_ids}}
         if store_id:
             kpi_query["store_id"] = store_id
 
-        increment_db_op("db.kpi_entries.find (batch - objectives)")
-        # ⚠️ SECURITY: Limit to 10,000 documents max to prevent OOM
-        # If more data is needed, use streaming/cursor approach
-        MAX_KPI_BATCH_SIZE = 10000
-        # ✅ PHASE 7: Use repository instead of direct DB access (allow_over_limit for internal batch)
-        all_kpi_entries = await self.kpi_repo.find_many(
-            kpi_query, {"_id": 0}, limit=MAX_KPI_BATCH_SIZE, allow_over_limit=True
+        increment_db_op("db.kpi_entries.aggregate (daily totals - objectives)")
+        seller_sums = DailyPrefixSums.from_daily_rows(
+            await self.kpi_repo.aggregate_daily_totals(kpi_query, date_range)
         )
 
-        if len(all_kpi_entries) == MAX_KPI_BATCH_SIZE:
-            logger.warning(f"KPI entries query hit limit of {MAX_KPI_BATCH_SIZE} documents. Consider using pagination or date range filtering.")
-
-        # Preload all manager KPIs for the global date range (1 query)
-        manager_kpi_query = {
-            "manager_id": manager_id,
-            "date": {"$gte": min_start, "$lte": max_end}
-        }
+        manager_kpi_query = {"manager_id": manager_id}
         if store_id:
             manager_kpi_query["store_id"] = store_id
 
-        increment_db_op("db.manager_kpis.find (batch - objectives)")
-        # ⚠️ SECURITY: Limit to 10,000 documents max to prevent OOM
-        # ✅ PHASE 7: Use repository instead of direct DB access
-        all_manager_kpis = await self.manager_kpi_repo.find_many(
-            manager_kpi_query, {"_id": 0}, limit=MAX_KPI_BATCH_SIZE, allow_over_limit=True
+        increment_db_op("db.manager_kpis.aggregate (daily totals - objectives)")
+        manager_sums = DailyPrefixSums.from_daily_rows(
+            await self.manager_kpi_repo.aggregate_daily_totals(manager_kpi_query, date_range)
         )
 
-        if len(all_manager_kpis) == MAX_KPI_BATCH_SIZE:
-            logger.warning(f"Manager KPIs query hit limit of {MAX_KPI_BATCH_SIZE} documents. Consider using pagination or date range filtering.")
-
-        # Group KPI entries by (seller_id, date) for fast lookup
-        kpi_by_seller_date = {}
-        for entry in all_kpi_entries:
-            seller_id = entry.get('seller_id')
-            date = entry.get('date')
-            if seller_id and date:
-                key = (seller_id, date)
-                if key not in kpi_by_seller_date:
-                    kpi_by_seller_date[key] = []
-                kpi_by_seller_date[key].append(entry)
-
-        # Group manager KPIs by (manager_id, date) for fast lookup
-        manager_kpi_by_date = {}
-        for entry in all_manager_kpis:
-            date = entry.get('date')
-            if date:
-                if date not in manager_kpi_by_date:
-                    manager_kpi_by_date[date] = []
-                manager_kpi_by_date[date].append(entry)
-
         # Calculate progress for each objective using preloaded data
         updates = []
         for objective in objectives:
@@ -352,31 +318,21 @@ class ObjectivesCalculationMixin:
                 objective['status'] = self.compute_status(0, objective.get('target_value', 0), end_date)
                 continue
 
-            # Filter KPI entries for this objective's date range (in-memory filter)
-            objective_kpi_entries = [
-                entry for entry in all_kpi_entries
-                if start_date <= entry.get('date', '') <= end_date
-            ]
-
-            # Filter manager KPIs for this objective's date range (in-memory filter)
-            objective_manager_kpis = [
-                entry for entry in all_manager_kpis
-                if start_date <= entry.get('date', '') <= end_date
-            ]
-
-            # Calculate totals from seller entries
-            total_ca = sum(e.get('ca_journalier', 0) for e in objective_kpi_entries)
-            total_ventes = sum(e.get('nb_ventes', 0) for e in objective_kpi_entries)
-            total_articles = sum(e.get('nb_articles', 0) for e in objective_kpi_entries)
+            # Range totals in O(log n) from the prefix sums
+            seller_totals = seller_sums.range_totals(start_date, end_date)
+            total_ca = seller_totals['ca_journalier']
+            total_ventes = seller_totals['nb_ventes']
+            total_articles = seller_totals['nb_articles']
 
             # Fallback to manager KPIs if seller data is missing
-            if objective_manager_kpis:
+            if total_ca == 0 or total_ventes == 0 or total_articles == 0:
+                manager_totals = manager_sums.range_totals(start_date, end_date)
                 if total_ca == 0:
-                    total_ca = sum(e.get('ca_journalier', 0) for e in objective_manager_kpis if e.get('ca_journalier'))
+                    total_ca = manager_totals['ca_journalier']
                 if total_ventes == 0:
-                    total_ventes = sum(e.get('nb_ventes', 0) for e in objective_manager_kpis if e.get('nb_ventes'))
+                    total_ventes = manager_totals['nb_ventes']
                 if total_articles == 0:
-                    total_articles = sum(e.get('nb_articles', 0) for e in objective_manager_kpis if e.get('nb_articles'))
+                    total_articles = manager_totals['nb_articles']
 
             # Calculate averages
             panier_moyen = total_ca / total_ventes if total_ventes > 0 else 0
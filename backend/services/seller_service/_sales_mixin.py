@@ -57,17 +57,17 @@ class SalesMixin:
             user_id: User ID (seller or manager)
             item_type: "objective" or "challenge"
         """
+        achieved_ids = [
+            item.get('id') for item in items
+            if item.get('status') in ['achieved', 'completed'] and item.get('id')
+        ]
+        # Une seule requête $in pour tous les items atteints
+        seen_ids = await self.achievement_notification_repo.find_seen_item_ids(
+            user_id, item_type, achieved_ids
+        ) if achieved_ids else set()
         for item in items:
-            # Check if item is achieved/completed and notification not seen
-            status = item.get('status')
-            is_achieved = status in ['achieved', 'completed']
-
-            if is_achieved:
-                item_id = item.get('id')
-                has_seen = await self.check_achievement_notification(user_id, item_type, item_id)
-                item['has_unseen_achievement'] = not has_seen
-            else:
-                item['has_unseen_achievement'] = False
+            is_achieved = item.get('status') in ['achieved', 'completed']
+            item['has_unseen_achievement'] = is_achieved and item.get('id') not in seen_ids
 
     async def create_sale(self, seller_id: str, sale_data: Dict) -> Dict:
         """Create a sale for a seller. Used by routes instead of instantiating SaleRepository."""
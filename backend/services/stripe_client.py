@@ -1,27 +1,159 @@
 """
-StripeClient — thin adapter over the Stripe Python SDK.
+StripeClient — async gateway over the Stripe Python SDK.
 
-All stripe.api_key assignments and direct SDK calls go through this class.
+All Stripe API calls go through this class.
 Benefits:
 - API key set once at construction (not scattered across route functions)
-- Single mock point in tests
-- Consistent error surface
+- Non-blocking: requests use the SDK's async methods over one pooled
+  httpx.AsyncClient per worker, instead of a blocking HTTPS round trip
+  inside the event loop (a seat preview no longer freezes other tenants)
+- Bounded: at most STRIPE_MAX_CONCURRENCY calls in flight per worker, each
+  with STRIPE_HTTP_TIMEOUT_SECONDS; a call that cannot get a slot within
+  STRIPE_QUEUE_TIMEOUT_SECONDS fails with a 503 instead of piling up
+- Read-through cache: subscription and customer retrieves are served from
+  Redis for STRIPE_READ_CACHE_TTL_SECONDS; our own writes refresh the entry
+  and the matching webhook events drop it (invalidate_for_event)
+- Single mock point in tests (transport= accepts an httpx ASGI/mock transport)
 """
-import stripe
+import asyncio
+import json
 import logging
-from typing import Optional
+import ssl
+from typing import Any, Dict, Optional
+
+import httpx
+import stripe
+
+from config.limits import STRIPE_READ_CACHE_TTL_SECONDS
+from core.exceptions import ServiceUnavailableError
 
 logger = logging.getLogger(__name__)
 
+CACHE_PREFIX = "stripe:"
+
+
+def _cache_key(kind: str, object_id: str) -> str:
+    return f"{CACHE_PREFIX}{kind}:{object_id}"
+
+
+def _object_id(ref) -> Optional[str]:
+    """Id of a Stripe reference, expanded (object) or not (string)."""
+    if isinstance(ref, str):
+        return ref
+    return ref.get("id") if ref else None
+
+
+class _PooledHTTPXClient(stripe.HTTPXClient):
+    """stripe.HTTPXClient whose AsyncClient has bounded keep-alive pooling (and an optional test transport)."""
+
+    def __init__(self, timeout: float, max_connections: int, transport: Optional[httpx.AsyncBaseTransport] = None):
+        super().__init__(timeout=timeout)
+        self._client_async = httpx.AsyncClient(
+            verify=ssl.create_default_context(cafile=stripe.ca_bundle_path),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+
+    async def aclose(self) -> None:
+        await self._client_async.aclose()
+
 
 class StripeClient:
     """
-    Thin wrapper around the Stripe Python SDK.
-    Sets stripe.api_key once at construction; exposes one method per SDK operation.
+    Async wrapper around the Stripe Python SDK.
+    Exposes one coroutine per SDK operation (construct_event stays synchronous: no I/O).
     """
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        timeout: float = 20.0,
+        max_concurrency: int = 20,
+        queue_timeout: float = 10.0,
+        max_network_retries: int = 2,
+        cache_ttl: int = STRIPE_READ_CACHE_TTL_SECONDS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        base_url: Optional[str] = None,
+    ):
+        # Legacy module-level calls (stripe.Webhook, scripts) still read the global key
         stripe.api_key = api_key
+        self._http = _PooledHTTPXClient(timeout=timeout, max_connections=max_concurrency, transport=transport)
+        self._client = stripe.StripeClient(
+            api_key,
+            http_client=self._http,
+            max_network_retries=max_network_retries,
+            base_addresses={"api": base_url} if base_url else None,
+        )
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._queue_timeout = queue_timeout
+        self._cache_ttl = cache_ttl
+        self._stats = {"calls": 0, "cache_hits": 0, "rejected": 0, "in_flight": 0}
+
+    async def _call(self, operation: str, coro_factory):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self._queue_timeout)
+        except asyncio.TimeoutError:
+            self._stats["rejected"] += 1
+            logger.warning("Stripe gateway saturated, %s rejected", operation)
+            raise ServiceUnavailableError("Service de paiement momentanément saturé, veuillez réessayer")
+        self._stats["calls"] += 1
+        self._stats["in_flight"] += 1
+        try:
+            return await coro_factory()
+        finally:
+            self._stats["in_flight"] -= 1
+            self._slots.release()
+
+    # ─── Read-through cache ───────────────────────────────────────────────────
+
+    async def _cached_retrieve(self, kind: str, object_id: str, fetch):
+        from core.cache import get_cache_service
+
+        cache = await get_cache_service()
+        key = _cache_key(kind, object_id)
+        if cache.enabled and self._cache_ttl > 0:
+            cached = await cache.get(key)
+            if cached is not None:
+                self._stats["cache_hits"] += 1
+                return self._client.deserialize(cached, api_mode="V1")
+        obj = await self._call(f"{kind}.retrieve", fetch)
+        await self._remember(kind, obj)
+        return obj
+
+    async def _remember(self, kind: str, obj) -> None:
+        """Write-through after a retrieve or one of our own updates (the response is the new state)."""
+        from core.cache import get_cache_service
+
+        object_id = getattr(obj, "id", None)
+        if not object_id or self._cache_ttl <= 0:
+            return
+        cache = await get_cache_service()
+        if cache.enabled:
+            await cache.set(_cache_key(kind, object_id), json.loads(str(obj)), ttl=self._cache_ttl)
+
+    async def invalidate(self, kind: str, object_id: Optional[str]) -> None:
+        from core.cache import get_cache_service
+
+        if not object_id:
+            return
+        cache = await get_cache_service()
+        if cache.enabled:
+            await cache.delete(_cache_key(kind, object_id))
+
+    async def invalidate_for_event(self, event) -> None:
+        """Drop the cached subscription / customer touched by a webhook event."""
+        event_type = event.get("type") or ""
+        obj = (event.get("data") or {}).get("object") or {}
+        if event_type.startswith("customer.subscription."):
+            await self.invalidate("subscription", obj.get("id"))
+        elif event_type.startswith("invoice."):
+            # paiement / échec de facture : le statut de l'abonnement change
+            await self.invalidate("subscription", _object_id(obj.get("subscription")))
+        if event_type in ("customer.updated", "customer.deleted"):
+            await self.invalidate("customer", obj.get("id"))
+        elif obj.get("customer"):
+            await self.invalidate("customer", _object_id(obj.get("customer")))
 
     # ─── Webhook ──────────────────────────────────────────────────────────────
 
@@ -31,65 +163,128 @@ class StripeClient:
 
     # ─── Customer ─────────────────────────────────────────────────────────────
 
-    def retrieve_customer(self, customer_id: str) -> stripe.Customer:
-        return stripe.Customer.retrieve(customer_id)
+    async def retrieve_customer(self, customer_id: str) -> stripe.Customer:
+        return await self._cached_retrieve(
+            "customer", customer_id, lambda: self._client.v1.customers.retrieve_async(customer_id)
+        )
+
+    async def create_customer(self, email: str, name: str, metadata: Optional[dict] = None) -> stripe.Customer:
+        customer = await self._call("customer.create", lambda: self._client.v1.customers.create_async(
+            {"email": email, "name": name, "metadata": metadata or {}}
+        ))
+        await self._remember("customer", customer)
+        return customer
 
-    def create_customer(self, email: str, name: str, metadata: Optional[dict] = None) -> stripe.Customer:
-        return stripe.Customer.create(email=email, name=name, metadata=metadata or {})
+    async def modify_customer(self, customer_id: str, **kwargs) -> stripe.Customer:
+        customer = await self._call(
+            "customer.update", lambda: self._client.v1.customers.update_async(customer_id, kwargs)
+        )
+        await self._remember("customer", customer)
+        return customer
 
     # ─── Subscription ─────────────────────────────────────────────────────────
 
-    def retrieve_subscription(self, subscription_id: str) -> stripe.Subscription:
-        return stripe.Subscription.retrieve(subscription_id)
+    async def retrieve_subscription(self, subscription_id: str) -> stripe.Subscription:
+        return await self._cached_retrieve(
+            "subscription", subscription_id, lambda: self._client.v1.subscriptions.retrieve_async(subscription_id)
+        )
 
-    def modify_subscription(self, subscription_id: str, **kwargs) -> stripe.Subscription:
-        return stripe.Subscription.modify(subscription_id, **kwargs)
+    async def modify_subscription(self, subscription_id: str, **kwargs) -> stripe.Subscription:
+        subscription = await self._call(
+            "subscription.update", lambda: self._client.v1.subscriptions.update_async(subscription_id, kwargs)
+        )
+        await self._remember("subscription", subscription)
+        return subscription
 
-    def delete_subscription(self, subscription_id: str) -> stripe.Subscription:
-        return stripe.Subscription.delete(subscription_id)
+    async def delete_subscription(self, subscription_id: str) -> stripe.Subscription:
+        subscription = await self._call(
+            "subscription.cancel", lambda: self._client.v1.subscriptions.cancel_async(subscription_id)
+        )
+        await self._remember("subscription", subscription)
+        return subscription
 
     # ─── SubscriptionItem ─────────────────────────────────────────────────────
 
-    def modify_subscription_item(
+    async def modify_subscription_item(
         self,
         item_id: str,
         quantity: int,
         proration_behavior: str = 'create_prorations',
     ) -> stripe.SubscriptionItem:
-        return stripe.SubscriptionItem.modify(
-            item_id,
-            quantity=quantity,
-            proration_behavior=proration_behavior,
-        )
+        item = await self._call("subscription_item.update", lambda: self._client.v1.subscription_items.update_async(
+            item_id, {"quantity": quantity, "proration_behavior": proration_behavior}
+        ))
+        await self.invalidate("subscription", getattr(item, "subscription", None))
+        return item
 
     # ─── Billing Portal ───────────────────────────────────────────────────────
 
-    def create_billing_portal_session(
+    async def create_billing_portal_session(
         self, customer_id: str, return_url: str
     ) -> stripe.billing_portal.Session:
-        return stripe.billing_portal.Session.create(
-            customer=customer_id,
-            return_url=return_url,
-        )
+        return await self._call("billing_portal.create", lambda: self._client.v1.billing_portal.sessions.create_async(
+            {"customer": customer_id, "return_url": return_url}
+        ))
 
     # ─── Checkout ─────────────────────────────────────────────────────────────
 
-    def create_checkout_session(self, **kwargs) -> stripe.checkout.Session:
-        return stripe.checkout.Session.create(**kwargs)
+    async def create_checkout_session(self, **kwargs) -> stripe.checkout.Session:
+        return await self._call(
+            "checkout.create", lambda: self._client.v1.checkout.sessions.create_async(kwargs)
+        )
 
     # ─── Invoice ──────────────────────────────────────────────────────────────
 
-    def upcoming_invoice(self, subscription_id: str) -> dict:
-        return stripe.Invoice.upcoming(subscription=subscription_id)
+    async def upcoming_invoice(self, subscription_id: str) -> stripe.Invoice:
+        # Invoice.upcoming n'existe plus dans le SDK : create_preview le remplace
+        return await self._call(
+            "invoice.preview", lambda: self._client.v1.invoices.create_preview_async({"subscription": subscription_id})
+        )
 
-    def create_invoice_preview(
+    async def create_invoice_preview(
         self,
         customer_id: str,
         subscription_id: str,
         subscription_details: dict,
     ) -> stripe.Invoice:
-        return stripe.Invoice.create_preview(
-            customer=customer_id,
-            subscription=subscription_id,
-            subscription_details=subscription_details,
+        return await self._call("invoice.preview", lambda: self._client.v1.invoices.create_preview_async({
+            "customer": customer_id,
+            "subscription": subscription_id,
+            "subscription_details": subscription_details,
+        }))
+
+    async def list_invoices(self, **params) -> Any:
+        return await self._call("invoice.list", lambda: self._client.v1.invoices.list_async(params))
+
+    # ─── Lifecycle ────────────────────────────────────────────────────────────
+
+    def stats(self) -> Dict:
+        return dict(self._stats)
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+
+_gateway: Optional[StripeClient] = None
+
+
+def get_stripe_gateway() -> StripeClient:
+    """Process-wide StripeClient configured from settings (one HTTP pool per worker)."""
+    global _gateway
+    if _gateway is None:
+        from core.config import settings
+        _gateway = StripeClient(
+            api_key=settings.STRIPE_API_KEY or "",
+            timeout=settings.STRIPE_HTTP_TIMEOUT_SECONDS,
+            max_concurrency=settings.STRIPE_MAX_CONCURRENCY,
+            queue_timeout=settings.STRIPE_QUEUE_TIMEOUT_SECONDS,
+            max_network_retries=settings.STRIPE_MAX_NETWORK_RETRIES,
         )
+    return _gateway
+
+
+async def shutdown_stripe_gateway() -> None:
+    global _gateway
+    if _gateway is not None:
+        await _gateway.aclose()
+        _gateway = None
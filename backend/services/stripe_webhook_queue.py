@@ -0,0 +1,249 @@
+"""
+Stripe webhook work queue (Mongo, stripe_events) — replaces BackgroundTasks.
+
+The webhook route only verifies the signature and enqueues the event
+(insert into stripe_events, unique on event_id): the 200 goes back to Stripe
+once the event is durable. If Mongo is down the route fails and Stripe
+redelivers. A consumer loop in every worker drains the queue:
+
+- Ordering   : events are grouped by ordering_key (the Stripe customer, else
+  the subscription, else the event itself). One worker at a time holds a
+  key's lease (stripe_event_locks) and processes its events in Stripe
+  creation order; a customer's subscription.updated never overtakes the
+  subscription.created that precedes it.
+- Parallelism: different keys are drained concurrently, up to
+  STRIPE_WEBHOOK_CONCURRENCY per worker and across all workers.
+- Leases     : an event left 'processing' by a dead worker is taken over once
+  its key lease expires (STRIPE_WEBHOOK_LEASE_SECONDS).
+- Retries    : a failing handler reschedules the event with exponential backoff
+  (jitter), blocking the later events of the same key; after
+  STRIPE_WEBHOOK_MAX_ATTEMPTS it is parked as 'failed' and the key moves on.
+- Replay     : requeue() (admin route / replay_stripe_events.py) puts stored
+  events back to pending; handlers are idempotent and ordering-protected.
+- Metrics    : counts per status, age of the oldest open event, p50/p95 of
+  receive → processed lag.
+"""
+import asyncio
+import copy
+import logging
+import os
+import random
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+from uuid import uuid4
+
+from core.scheduler import SystemClock
+from repositories.stripe_event_repository import StripeEventLockRepository, StripeEventRepository
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_MAX_ATTEMPTS = 8
+DEFAULT_BACKOFF_BASE_SECONDS = 2.0
+DEFAULT_BACKOFF_MAX_SECONDS = 600.0
+DEFAULT_POLL_SECONDS = 2.0
+MAX_EVENTS_PER_KEY_PASS = 50
+
+
+def _ref_id(ref) -> Optional[str]:
+    if isinstance(ref, str):
+        return ref
+    return ref.get("id") if isinstance(ref, dict) else None
+
+
+def ordering_key(event: Dict) -> str:
+    """Serialization key of an event: its customer, else its subscription, else itself."""
+    obj = (event.get("data") or {}).get("object") or {}
+    if obj.get("object") == "customer" and obj.get("id"):
+        return f"cus:{obj['id']}"
+    customer = _ref_id(obj.get("customer"))
+    if customer:
+        return f"cus:{customer}"
+    subscription = obj.get("id") if obj.get("object") == "subscription" else _ref_id(obj.get("subscription"))
+    if subscription:
+        return f"sub:{subscription}"
+    return f"evt:{event.get('id')}"
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    # Motor renvoie des datetimes naïfs (UTC)
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class StripeWebhookQueue:
+    """Durable, per-customer ordered consumer of stripe_events."""
+
+    def __init__(
+        self,
+        db,
+        handler: Callable[[Dict], Awaitable[Dict]],
+        *,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        lease_seconds: int = DEFAULT_LEASE_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        backoff_base: float = DEFAULT_BACKOFF_BASE_SECONDS,
+        backoff_max: float = DEFAULT_BACKOFF_MAX_SECONDS,
+        poll_seconds: float = DEFAULT_POLL_SECONDS,
+        clock=None,
+        owner: Optional[str] = None,
+    ):
+        self.repo = StripeEventRepository(db)
+        self.locks = StripeEventLockRepository(db)
+        self.handler = handler
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_seconds = poll_seconds
+        self.clock = clock or SystemClock()
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._counters = {"processed": 0, "retried": 0, "failed": 0}
+
+    # ----- producteur -----
+
+    async def enqueue(self, event: Dict) -> bool:
+        """Persist a verified event (False = duplicate delivery) and wake the local consumer."""
+        created = await self.repo.enqueue(event, ordering_key(event), self.clock.now())
+        self._wakeup.set()
+        return created
+
+    async def requeue(self, filters: Dict) -> int:
+        """Replay stored events matching filters (e.g. {"status": "failed"} or {"event_id": {...}})."""
+        count = await self.repo.requeue(filters, self.clock.now())
+        self._wakeup.set()
+        return count
+
+    # ----- consommateur -----
+
+    async def run_once(self) -> int:
+        """One pass: drain up to `concurrency` ready keys in parallel. Returns events processed."""
+        keys = await self.repo.ready_keys(self.clock.now(), self.concurrency)
+        if not keys:
+            return 0
+        results = await asyncio.gather(*(self._drain_key(key) for key in keys), return_exceptions=True)
+        processed = 0
+        for key, result in zip(keys, results):
+            if isinstance(result, Exception):
+                logger.error("Stripe webhook queue: key %s failed: %s", key, result)
+            else:
+                processed += result
+        return processed
+
+    async def _drain_key(self, key: str) -> int:
+        now = self.clock.now()
+        if not await self.locks.try_acquire(key, self.owner, now, now + timedelta(seconds=self.lease_seconds)):
+            return 0  # un autre worker traite ce client
+        processed = 0
+        try:
+            while processed < MAX_EVENTS_PER_KEY_PASS:
+                head = await self.repo.head_of(key)
+                if head is None:
+                    break
+                now = self.clock.now()
+                if head["status"] == "pending" and _aware(head.get("available_at")) > now:
+                    break  # en attente de retry : les suivants attendent aussi
+                lease_until = now + timedelta(seconds=self.lease_seconds)
+                if not await self.locks.renew(key, self.owner, lease_until):
+                    break  # bail perdu (pause > lease_seconds) : un autre worker a repris la clé
+                if not await self.repo.claim(head["event_id"], self.owner, lease_until):
+                    break
+                if not await self._process(head):
+                    break
+                processed += 1
+        finally:
+            await self.locks.release(key, self.owner)
+        return processed
+
+    async def _process(self, doc: Dict) -> bool:
+        event_id = doc["event_id"]
+        try:
+            result = await self.handler(copy.deepcopy(doc["payload"]))
+        except Exception as e:
+            attempts = doc.get("attempts", 0) + 1
+            if attempts >= self.max_attempts:
+                await self.repo.fail(event_id, attempts, repr(e), retry_at=None)
+                self._counters["failed"] += 1
+                logger.error("Stripe webhook %s (%s) failed %d times, parked", event_id, doc.get("event_type"), attempts)
+                return True  # la clé n'est plus bloquée
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+            await self.repo.fail(event_id, attempts, repr(e), retry_at=self.clock.now() + timedelta(seconds=delay))
+            self._counters["retried"] += 1
+            logger.warning("Stripe webhook %s failed (attempt %d), retry in %.0fs: %s", event_id, attempts, delay, e)
+            return False
+        received_at = _aware(doc.get("received_at")) or self.clock.now()
+        lag_ms = int((self.clock.now() - received_at).total_seconds() * 1000)
+        await self.repo.complete(event_id, (result or {}).get("status"), lag_ms)
+        self._counters["processed"] += 1
+        logger.info("✅ Webhook processed: %s → %s (lag %d ms)", doc.get("event_type"), (result or {}).get("status"), lag_ms)
+        return True
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                processed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Stripe webhook queue pass failed: %s", e)
+                processed = 0
+            if processed:
+                continue  # d'autres événements sont peut-être prêts
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info("Stripe webhook queue consumer started (owner %s)", self.owner)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def metrics(self) -> Dict:
+        return {
+            **await self.repo.queue_metrics(self.clock.now()),
+            "worker": {**self._counters, "owner": self.owner, "running": self._task is not None},
+        }
+
+
+_queue: Optional[StripeWebhookQueue] = None
+
+
+def get_stripe_webhook_queue(db) -> StripeWebhookQueue:
+    """Per-worker queue bound to PaymentService.handle_webhook_event, configured from settings."""
+    global _queue
+    if _queue is None:
+        from core.config import settings
+        from services.payment_service import PaymentService
+
+        _queue = StripeWebhookQueue(
+            db,
+            PaymentService(db).handle_webhook_event,
+            concurrency=settings.STRIPE_WEBHOOK_CONCURRENCY,
+            lease_seconds=settings.STRIPE_WEBHOOK_LEASE_SECONDS,
+            max_attempts=settings.STRIPE_WEBHOOK_MAX_ATTEMPTS,
+        )
+    return _queue
+
+
+async def shutdown_stripe_webhook_queue() -> None:
+    global _queue
+    if _queue is not None:
+        await _queue.stop()
+        _queue = None
@@ -0,0 +1,218 @@
+"""
+Tests unitaires — gouverneur des appels OpenAI (core/ai_governor.py)
+et son intégration dans CoreMixin._complete.
+
+Le backend Redis est exercé via l'état local (mêmes règles) ; les pannes Redis
+sont simulées par un client qui lève à chaque appel.
+
+Couvre :
+- concurrence globale et par tenant, libération du slot
+- budget de tokens par minute, correction par l'usage réel, requête isolée trop grosse admise
+- file équitable : un tenant en rafale ne bloque pas les autres
+- expiration de la file → AIQueueTimeout ; _complete renvoie (None, 0)
+- retries : permis pris et rendu à chaque tentative, aucun slot tenu pendant le backoff
+- disjoncteur partagé entre instances AIService, repli local si Redis échoue
+"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from core.ai_governor import AIGovernor, AIQueueTimeout, estimate_tokens
+
+
+def _governor(**kwargs):
+    kwargs.setdefault("redis_resolver", AsyncMock(return_value=None))
+    return AIGovernor(**kwargs)
+
+
+class BrokenRedis:
+    async def eval(self, *args):
+        raise ConnectionError("redis down")
+
+    async def get(self, key):
+        raise ConnectionError("redis down")
+
+    async def delete(self, *keys):
+        raise ConnectionError("redis down")
+
+
+# ---------------------------------------------------------------------------
+# Permis
+# ---------------------------------------------------------------------------
+
+class TestPermits:
+
+    @pytest.mark.anyio
+    async def test_tenant_limit_queues_until_release(self):
+        governor = _governor(tenant_max_concurrency=1, queue_timeout_seconds=1)
+        first = await governor.acquire("ws1", 10)
+
+        waiting = asyncio.ensure_future(governor.acquire("ws1", 10))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        other = await governor.acquire("ws2", 10)  # autre tenant : pas bloqué
+
+        await first.release()
+        second = await asyncio.wait_for(waiting, 1)
+        assert second.tenant == "ws1"
+        assert (await governor.stats())["in_flight"] == 2
+        await other.release()
+        await second.release()
+
+    @pytest.mark.anyio
+    async def test_tokens_per_minute_budget(self):
+        now = [60.0]
+        governor = _governor(tenant_tokens_per_minute=1000, queue_timeout_seconds=0.1, clock=lambda: now[0])
+
+        big = await governor.acquire("ws1", 5000)  # fenêtre vide : admise malgré sa taille
+        await big.release(actual_tokens=5000)
+        with pytest.raises(AIQueueTimeout):
+            await governor.acquire("ws1", 10)
+
+        now[0] = 120.0  # minute suivante
+        permit = await governor.acquire("ws1", 900)
+        await permit.release(actual_tokens=100)  # estimation corrigée : 800 tokens rendus
+        assert await governor.acquire("ws1", 850)
+
+    @pytest.mark.anyio
+    async def test_fair_scheduling_across_tenants(self):
+        governor = _governor(max_concurrency=1, queue_timeout_seconds=2)
+        holder = await governor.acquire("busy", 1)
+        order = []
+
+        async def call(tenant):
+            permit = await governor.acquire(tenant, 1)
+            order.append(tenant)
+            await asyncio.sleep(0)
+            await permit.release()
+
+        tasks = [asyncio.ensure_future(call("busy")) for _ in range(4)]
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.ensure_future(call("quiet")))
+        await asyncio.sleep(0.01)
+        await holder.release()
+        await asyncio.wait_for(asyncio.gather(*tasks), 2)
+
+        assert order.index("quiet") <= 1
+        assert (await governor.stats())["waiting"] == 0
+
+    def test_estimate_tokens_grows_with_prompt(self):
+        assert estimate_tokens("gpt-4o-mini", "a" * 3000) > estimate_tokens("gpt-4o-mini", "a" * 30) > 0
+
+
+# ---------------------------------------------------------------------------
+# Disjoncteur
+# ---------------------------------------------------------------------------
+
+class TestBreaker:
+
+    @pytest.mark.anyio
+    async def test_opens_after_threshold_and_success_closes(self):
+        now = [1000.0]
+        governor = _governor(breaker_threshold=3, breaker_cooldown_seconds=60, clock=lambda: now[0])
+
+        assert not await governor.record_failure()
+        assert not await governor.record_failure()
+        assert await governor.record_failure() == 1060.0
+        assert await governor.circuit_open_until() == 1060.0
+        now[0] = 1061.0
+        assert await governor.circuit_open_until() == 0.0
+
+        await governor.record_failure()
+        await governor.record_success()
+        assert not await governor.record_failure()  # compteur remis à zéro
+
+    @pytest.mark.anyio
+    async def test_redis_failure_falls_back_to_local_state(self):
+        governor = _governor(breaker_threshold=1, redis_resolver=AsyncMock(return_value=BrokenRedis()))
+
+        permit = await governor.acquire("ws1", 10)
+        await governor.record_failure()
+
+        assert await governor.circuit_open_until() > 0
+        assert (await governor.stats())["backend_errors"] >= 3
+        await permit.release()
+
+
+# ---------------------------------------------------------------------------
+# CoreMixin._complete
+# ---------------------------------------------------------------------------
+
+class FailingCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        raise ValueError("boom")
+
+
+def _ai_service(governor, completions):
+    from services.ai_service import AIService
+
+    service = AIService.__new__(AIService)
+    service.available = True
+    service._governor = governor
+    service.DEFAULT_TIMEOUT = 30.0
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return service
+
+
+class TestCompleteIntegration:
+
+    @pytest.mark.anyio
+    async def test_breaker_is_shared_between_service_instances(self):
+        governor = _governor(breaker_threshold=2)
+        completions = FailingCompletions()
+
+        for _ in range(2):
+            assert await _ai_service(governor, completions)._send_message("S", "U") is None
+        # Nouvelle instance (nouvelle requête) : le circuit est déjà ouvert
+        assert await _ai_service(governor, completions)._send_message("S", "U") is None
+        assert completions.calls == 2
+        assert (await governor.stats())["in_flight"] == 0
+
+    @pytest.mark.anyio
+    async def test_queue_timeout_returns_none(self):
+        governor = _governor(max_concurrency=1, queue_timeout_seconds=0.05)
+        holder = await governor.acquire("other", 1)
+        completions = FailingCompletions()
+
+        assert await _ai_service(governor, completions)._complete("S", "U", "gpt-4o-mini", 0.7) == (None, 0)
+        assert completions.calls == 0
+        await holder.release()
+
+    @pytest.mark.anyio
+    async def test_permit_is_released_between_retries(self, monkeypatch):
+        import httpx
+        from openai import APIConnectionError
+        from services.ai_service import AIService
+
+        governor = _governor(max_concurrency=1)
+        in_flight_during_backoff = []
+
+        async def backoff(seconds):
+            in_flight_during_backoff.append((await governor.stats())["in_flight"])
+
+        monkeypatch.setattr(AIService._send_message_with_retry.retry, "sleep", backoff)
+
+        class FlakyCompletions:
+            def __init__(self):
+                self.calls = 0
+
+            async def create(self, **kwargs):
+                self.calls += 1
+                if self.calls < 3:
+                    raise APIConnectionError(request=httpx.Request("POST", "https://api.openai.com"))
+                return SimpleNamespace(
+                    choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+                    usage=SimpleNamespace(total_tokens=10, prompt_tokens=5, completion_tokens=5),
+                )
+
+        completions = FlakyCompletions()
+        assert await _ai_service(governor, completions)._complete("S", "U", "gpt-4o-mini", 0.7) == ("ok", 10)
+        assert completions.calls == 3
+        assert in_flight_during_backoff == [0, 0]
+        assert (await governor.stats())["in_flight"] == 0
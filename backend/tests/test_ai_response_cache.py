@@ -0,0 +1,236 @@
+"""
+Tests unitaires — cache des réponses IA (core/ai_response_cache.py)
+et son intégration dans CoreMixin._send_message (cache_feature).
+
+Redis est remplacé par un CacheService en mémoire (get/set + hash de compteurs),
+OpenAI par un client factice qui compte les appels.
+
+Couvre :
+- empreinte insensible à la mise en forme du prompt, sensible au modèle / température / prompt système
+- L1 (LRU + TTL) puis L2 partagé entre workers, tokens économisés
+- single-flight : N requêtes identiques concurrentes → 1 appel OpenAI
+- réponses vides et fonctionnalités sans TTL jamais mises en cache
+- compteurs plateforme (hash Redis) : cumulés en mémoire, envoyés en arrière-plan par intervalle
+"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from core.ai_governor import AIGovernor
+from core.ai_response_cache import AIResponseCache, normalize_prompt, prompt_fingerprint
+
+
+class FakePipeline:
+    def __init__(self, hashes):
+        self.hashes = hashes
+        self.ops = []
+
+    def hincrby(self, key, field, value):
+        self.ops.append((key, field, value))
+
+    async def execute(self):
+        for key, field, value in self.ops:
+            bucket = self.hashes.setdefault(key, {})
+            bucket[field] = bucket.get(field, 0) + value
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self.hashes)
+
+    async def hgetall(self, key):
+        return {k: str(v) for k, v in self.hashes.get(key, {}).items()}
+
+
+class FakeCache:
+    def __init__(self):
+        self.store = {}
+        self.enabled = True
+        self.redis_client = FakeRedis()
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ttl=300):
+        self.store[key] = value
+        return True
+
+
+@pytest.fixture
+def shared_cache():
+    cache = FakeCache()
+    with patch("core.ai_response_cache.get_cache_service", AsyncMock(return_value=cache)):
+        yield cache
+
+
+class Generator:
+    def __init__(self, text="réponse", tokens=120, delay=0.0):
+        self.text = text
+        self.tokens = tokens
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.text, self.tokens
+
+
+TTLS = {"debrief": 3600}
+
+
+# ---------------------------------------------------------------------------
+# Empreinte
+# ---------------------------------------------------------------------------
+
+class TestFingerprint:
+
+    def test_formatting_differences_share_a_key(self):
+        a = prompt_fingerprint("gpt-4o", 0.4, "Tu es un coach.", "Vendeur : Léa\n\n  CA : 120€ ")
+        b = prompt_fingerprint("gpt-4o", 0.4, "  Tu es un coach.\n", "Vendeur :   Léa\nCA : 120€")
+        assert a == b
+        assert normalize_prompt("e\u0301") == "\u00e9"  # NFD → NFC
+
+    def test_model_temperature_and_system_prompt_are_part_of_the_key(self):
+        base = prompt_fingerprint("gpt-4o", 0.4, "S", "U")
+        assert base != prompt_fingerprint("gpt-4o-mini", 0.4, "S", "U")
+        assert base != prompt_fingerprint("gpt-4o", 0.5, "S", "U")
+        assert base != prompt_fingerprint("gpt-4o", 0.4, "S v2", "U")
+        assert base != prompt_fingerprint("gpt-4o", 0.4, "S", "U2")
+
+
+# ---------------------------------------------------------------------------
+# AIResponseCache
+# ---------------------------------------------------------------------------
+
+class TestAIResponseCache:
+
+    @pytest.mark.anyio
+    async def test_local_then_shared_hits_count_saved_tokens(self, shared_cache):
+        worker_a, worker_b = AIResponseCache(TTLS), AIResponseCache(TTLS)
+        generate = Generator()
+
+        assert await worker_a.get_or_generate("debrief", "k", generate) == "réponse"
+        assert await worker_a.get_or_generate("debrief", "k", generate) == "réponse"
+        assert await worker_b.get_or_generate("debrief", "k", generate) == "réponse"
+
+        assert generate.calls == 1
+        assert worker_a.stats()["features"]["debrief"] == {"misses": 1, "tokens_used": 120, "local_hits": 1, "tokens_saved": 120}
+        assert worker_b.stats()["features"]["debrief"] == {"redis_hits": 1, "tokens_saved": 120}
+        await worker_a.flush_stats()
+        assert (await worker_b.global_stats())["debrief"] == {
+            "misses": 1, "tokens_used": 120, "local_hits": 1, "redis_hits": 1, "tokens_saved": 240,
+        }
+
+    @pytest.mark.anyio
+    async def test_hits_never_wait_on_redis_counters(self, shared_cache):
+        now = [0.0]
+        cache = AIResponseCache(TTLS, clock=lambda: now[0], stats_flush_seconds=10)
+        generate = Generator()
+        for _ in range(5):
+            await cache.get_or_generate("debrief", "k", generate)
+        assert shared_cache.redis_client.hashes == {}  # cumulés en mémoire
+
+        now[0] = 11
+        await cache.get_or_generate("debrief", "k", generate)  # déclenche l'envoi, sans l'attendre
+        await cache._stats_flush_task
+        assert shared_cache.redis_client.hashes["ai_response_stats"] == {
+            "debrief:misses": 1, "debrief:tokens_used": 120, "debrief:local_hits": 5, "debrief:tokens_saved": 600,
+        }
+        assert cache._pending_stats == {}
+
+    @pytest.mark.anyio
+    async def test_concurrent_identical_requests_share_one_call(self, shared_cache):
+        cache = AIResponseCache(TTLS)
+        generate = Generator(delay=0.05)
+
+        results = await asyncio.gather(*(cache.get_or_generate("debrief", "k", generate) for _ in range(10)))
+
+        assert results == ["réponse"] * 10
+        assert generate.calls == 1
+        assert cache.stats()["features"]["debrief"]["coalesced"] == 9
+        assert cache.stats()["inflight"] == 0
+
+    @pytest.mark.anyio
+    async def test_empty_response_and_uncached_feature(self, shared_cache):
+        cache = AIResponseCache(TTLS)
+        empty = Generator(text=None, tokens=0)
+        await cache.get_or_generate("debrief", "k", empty)
+        await cache.get_or_generate("debrief", "k", empty)
+        assert empty.calls == 2 and shared_cache.store == {}
+
+        other = Generator()
+        await cache.get_or_generate("admin_chat", "k2", other)
+        await cache.get_or_generate("admin_chat", "k2", other)
+        assert other.calls == 2
+
+    @pytest.mark.anyio
+    async def test_local_ttl_and_lru_bound(self):
+        now = [0.0]
+        cache = AIResponseCache(TTLS, max_local_entries=2, clock=lambda: now[0])
+        local_only = FakeCache()
+        local_only.enabled, local_only.redis_client = False, None
+        local_only.set = AsyncMock(return_value=False)
+        generate = Generator()
+        with patch("core.ai_response_cache.get_cache_service", AsyncMock(return_value=local_only)):
+            for key in ("a", "b", "c"):
+                await cache.get_or_generate("debrief", key, generate)
+            assert cache.stats()["local_entries"] == 2
+            await cache.get_or_generate("debrief", "a", generate)  # évincée
+            assert generate.calls == 4
+            now[0] = 3601
+            await cache.get_or_generate("debrief", "c", generate)  # expirée
+            assert generate.calls == 5
+
+
+# ---------------------------------------------------------------------------
+# CoreMixin._send_message
+# ---------------------------------------------------------------------------
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=f"analyse {self.calls}"))],
+            usage=SimpleNamespace(total_tokens=300, prompt_tokens=200, completion_tokens=100),
+        )
+
+
+@pytest.fixture
+def ai_service(shared_cache, monkeypatch):
+    from core import ai_response_cache
+    from services.ai_service import AIService
+
+    monkeypatch.setattr(ai_response_cache, "_ai_response_cache", AIResponseCache(TTLS))
+    service = AIService.__new__(AIService)
+    service.available = True
+    service._governor = AIGovernor(redis_resolver=AsyncMock(return_value=None))
+    service.DEFAULT_TIMEOUT = 30.0
+    service.completions = FakeCompletions()
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=service.completions))
+    return service
+
+
+class TestSendMessageCache:
+
+    @pytest.mark.anyio
+    async def test_cache_feature_reuses_response(self, ai_service):
+        first = await ai_service._send_message("S", "U", model="gpt-4o", temperature=0.4, cache_feature="debrief")
+        second = await ai_service._send_message("S", " U\n", model="gpt-4o", temperature=0.4, cache_feature="debrief")
+
+        assert first == second == "analyse 1"
+        assert ai_service.completions.calls == 1
+
+    @pytest.mark.anyio
+    async def test_without_cache_feature_every_call_reaches_openai(self, ai_service):
+        await ai_service._send_message("S", "U")
+        assert await ai_service._send_message("S", "U") == "analyse 2"
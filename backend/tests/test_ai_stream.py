@@ -0,0 +1,173 @@
+"""
+Tests unitaires — diffusion SSE des générations IA (core/ai_stream.py)
+et mode streaming de CoreMixin._send_message.
+
+OpenAI est remplacé par un client factice : réponse complète, ou flux de chunks
+(delta.content + usage final) quand stream=True.
+
+Couvre :
+- événements delta puis result ; le texte accumulé est celui parsé / renvoyé
+- brief matinal : _parse_brief_to_structured appliqué au texte accumulé
+- sans flux SSE, appel OpenAI classique (pas de stream=True)
+- erreurs métier → événement error ; heartbeat pendant l'attente
+- déconnexion du client : la génération (et sa persistance) va à son terme
+- reset après une nouvelle tentative
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from core.ai_governor import AIGovernor
+from core.ai_stream import AIStreamSink, iter_ai_events, wants_event_stream
+from core.exceptions import BusinessLogicError
+
+BRIEF = (
+    "### ⚡ Humeur du jour\nBonne énergie !\n"
+    "### 🎯 Mission du jour\n- Proposer un accessoire\n- Sourire\n"
+    "### 🚀 On y va\nAllez l'équipe !"
+)
+
+
+def _chunk(text=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=text))] if text is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class FakeCompletions:
+    def __init__(self, text, pieces=8, delay=0.0):
+        self.text = text
+        self.pieces = pieces
+        self.delay = delay
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if not kwargs.get("stream"):
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=self.text))],
+                usage=SimpleNamespace(total_tokens=50, prompt_tokens=30, completion_tokens=20),
+            )
+        return self._stream()
+
+    async def _stream(self):
+        size = max(1, len(self.text) // self.pieces)
+        for start in range(0, len(self.text), size):
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield _chunk(self.text[start:start + size])
+        yield _chunk(usage=SimpleNamespace(total_tokens=50))
+
+
+def _ai_service(completions):
+    from services.ai_service import AIService
+
+    service = AIService.__new__(AIService)
+    service.available = True
+    service._governor = AIGovernor(redis_resolver=AsyncMock(return_value=None))
+    service.DEFAULT_TIMEOUT = 30.0
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return service
+
+
+async def _events(generate, **kwargs):
+    events = []
+    async for raw in iter_ai_events(generate, **kwargs):
+        if raw.startswith(":"):
+            events.append(("comment", raw.strip()))
+            continue
+        head, data = raw.strip().split("\n")
+        events.append((head[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+class TestStreamedGeneration:
+
+    @pytest.mark.anyio
+    async def test_deltas_then_result_built_from_accumulated_text(self):
+        completions = FakeCompletions(BRIEF)
+        service = _ai_service(completions)
+
+        events = await _events(lambda: service.generate_morning_brief(
+            stats={"ca_yesterday": 1200}, manager_name="Alex", store_name="Paris",
+        ))
+
+        names = [name for name, _ in events]
+        assert names[0] == "comment" and names[-1] == "result"
+        deltas = "".join(data["text"] for name, data in events if name == "delta")
+        assert deltas == BRIEF and names.count("delta") > 1
+        result = events[-1][1]
+        assert result["brief"] == BRIEF
+        assert result["structured"]["booster"] == "Allez l'équipe !"
+        assert result["structured"]["examples"] == ["Proposer un accessoire", "Sourire"]
+        assert completions.calls[0]["stream"] is True
+
+    @pytest.mark.anyio
+    async def test_without_event_stream_the_call_is_not_streamed(self):
+        completions = FakeCompletions(BRIEF)
+        service = _ai_service(completions)
+
+        assert await service._send_message("S", "U") == BRIEF
+        assert "stream" not in completions.calls[0]
+
+    @pytest.mark.anyio
+    async def test_business_error_becomes_error_event(self):
+        async def generate():
+            raise BusinessLogicError("Quota IA atteint")
+
+        events = await _events(generate)
+
+        assert events[-1] == ("error", {"detail": "Quota IA atteint", "error_code": "BUSINESS_LOGIC_ERROR", "status_code": 422})
+
+    @pytest.mark.anyio
+    async def test_heartbeat_while_waiting(self):
+        async def generate():
+            await asyncio.sleep(0.05)
+            return {"ok": True}
+
+        events = await _events(generate, heartbeat_seconds=0.01)
+
+        assert ("comment", ": ping") in events
+        assert events[-1] == ("result", {"ok": True})
+
+    @pytest.mark.anyio
+    async def test_client_disconnect_does_not_cancel_generation(self):
+        saved = []
+        service = _ai_service(FakeCompletions(BRIEF, delay=0.01))
+
+        async def generate():
+            text = await service._send_message("S", "U")
+            saved.append(text)
+            return {"brief": text}
+
+        stream = iter_ai_events(generate)
+        assert (await stream.__anext__()).startswith(":")
+        assert (await stream.__anext__()).startswith("event: delta")
+        await stream.aclose()  # le client part
+
+        for _ in range(50):
+            if saved:
+                break
+            await asyncio.sleep(0.01)
+        assert saved == [BRIEF]
+
+
+class TestSink:
+
+    def test_reset_only_after_deltas(self):
+        sink = AIStreamSink()
+        sink.restart()
+        assert sink.queue.empty()
+        sink.delta("abc")
+        sink.restart()
+        assert [sink.queue.get_nowait() for _ in range(2)] == [("delta", "abc"), ("reset", None)]
+
+    def test_wants_event_stream(self):
+        def request(query=None, accept=""):
+            return SimpleNamespace(query_params=query or {}, headers={"accept": accept})
+
+        assert wants_event_stream(request({"stream": "true"}))
+        assert wants_event_stream(request(accept="text/event-stream"))
+        assert not wants_event_stream(request(accept="application/json"))
@@ -0,0 +1,199 @@
+"""
+Tests unitaires — cache de vérification des clés API (core/api_key_cache.py).
+
+Couvre :
+- empreinte HMAC (stable, ne contient pas la clé)
+- hit L1 sans Redis, invalidation par id de clé
+- TTL borné par expires_at (clé expirée jamais mise en cache)
+- Redis fait autorité : entrée L2 supprimée → hit L1 refusé
+- pierre tombale : une vérification terminée après la révocation ne remet pas la clé en cache
+- IntegrationService.verify_api_key : un seul bcrypt pour N appels
+"""
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+class _FakeRedis:
+    """Stand-in minimal de redis.asyncio pour les opérations utilisées par le cache."""
+
+    def __init__(self):
+        self.store = {}
+        self.sets = {}
+
+    async def exists(self, key):
+        return 1 if key in self.store else 0
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    async def sadd(self, key, member):
+        self.sets.setdefault(key, set()).add(member)
+
+    async def expire(self, key, ttl):
+        return True
+
+    async def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+            self.sets.pop(key, None)
+
+
+def _cache_service(redis_client=None):
+    cache = MagicMock()
+    cache.enabled = redis_client is not None
+    cache.redis_client = redis_client
+    store = redis_client.store if redis_client is not None else {}
+
+    async def _get(key):
+        return store.get(key)
+
+    async def _set(key, value, ttl=300):
+        store[key] = value
+        return True
+
+    cache.get = AsyncMock(side_effect=_get)
+    cache.set = AsyncMock(side_effect=_set)
+    return cache
+
+
+def _key_doc(**overrides):
+    doc = {"id": "key1", "key_hash": "$2b$secret", "permissions": ["write:kpi"],
+           "tenant_id": "g1", "active": True, "expires_at": None}
+    doc.update(overrides)
+    return doc
+
+
+class TestFingerprint:
+
+    def test_stable_and_opaque(self):
+        from core.api_key_cache import api_key_fingerprint
+        fp = api_key_fingerprint("sk_live_abc")
+        assert fp == api_key_fingerprint("sk_live_abc")
+        assert fp != api_key_fingerprint("sk_live_abd")
+        assert "sk_live" not in fp
+        assert len(fp) == 64
+
+
+class TestLocalCache:
+
+    @pytest.mark.anyio
+    async def test_hit_after_set_without_redis(self):
+        from core.api_key_cache import APIKeyVerificationCache
+        cache = APIKeyVerificationCache("test", ttl_seconds=300, local_ttl_seconds=30)
+        with patch("core.api_key_cache.get_cache_service", AsyncMock(return_value=_cache_service())):
+            assert await cache.get("sk_live_x") is None
+            await cache.set("sk_live_x", _key_doc())
+            cached = await cache.get("sk_live_x")
+        assert cached["id"] == "key1"
+        assert "key_hash" not in cached
+        assert cache.stats()["hits"] == 1
+
+    @pytest.mark.anyio
+    async def test_invalidate_by_key_id(self):
+        from core.api_key_cache import APIKeyVerificationCache
+        cache = APIKeyVerificationCache("test", ttl_seconds=300, local_ttl_seconds=30)
+        with patch("core.api_key_cache.get_cache_service", AsyncMock(return_value=_cache_service())):
+            await cache.set("sk_live_x", _key_doc())
+            await cache.invalidate("key1")
+            assert await cache.get("sk_live_x") is None
+
+    @pytest.mark.anyio
+    async def test_expired_key_not_cached(self):
+        from core.api_key_cache import APIKeyVerificationCache
+        cache = APIKeyVerificationCache("test", ttl_seconds=300, local_ttl_seconds=30)
+        with patch("core.api_key_cache.get_cache_service", AsyncMock(return_value=_cache_service())):
+            await cache.set("sk_live_x", _key_doc(expires_at=time.time() - 10))
+            assert await cache.get("sk_live_x") is None
+
+    def test_ttl_capped_by_expiration(self):
+        from core.api_key_cache import APIKeyVerificationCache
+        cache = APIKeyVerificationCache("test", ttl_seconds=300, local_ttl_seconds=30)
+        ttl = cache._remaining_ttl(_key_doc(expires_at=time.time() + 20))
+        assert 0 < ttl <= 20
+
+
+class TestRedisAuthority:
+
+    @pytest.mark.anyio
+    async def test_revocation_visible_across_workers(self):
+        """Worker A invalide la clé : le L1 de worker B est refusé au prochain appel."""
+        from core.api_key_cache import APIKeyVerificationCache
+        redis_client = _FakeRedis()
+        service = _cache_service(redis_client)
+        worker_a = APIKeyVerificationCache("test", ttl_seconds=300, local_ttl_seconds=30)
+        worker_b = APIKeyVerificationCache("test", ttl_seconds=300, local_ttl_seconds=30)
+        with patch("core.api_key_cache.get_cache_service", AsyncMock(return_value=service)):
+            await worker_b.set("sk_live_x", _key_doc())
+            assert await worker_a.get("sk_live_x") is not None  # hit L2
+            await worker_a.invalidate("key1")
+            assert await worker_b.get("sk_live_x") is None
+
+
+class TestRevocationRace:
+
+    @pytest.mark.anyio
+    async def test_verification_finishing_after_revocation_is_not_cached(self):
+        """Worker B a lu la clé (active) avant la révocation par worker A, puis termine son bcrypt."""
+        from core.api_key_cache import APIKeyVerificationCache
+        redis_client = _FakeRedis()
+        worker_a = APIKeyVerificationCache("test", ttl_seconds=300, local_ttl_seconds=30)
+        worker_b = APIKeyVerificationCache("test", ttl_seconds=300, local_ttl_seconds=30)
+        with patch("core.api_key_cache.get_cache_service", AsyncMock(return_value=_cache_service(redis_client))):
+            await worker_a.invalidate("key1")
+            await worker_b.set("sk_live_x", _key_doc())
+            assert await worker_b.get("sk_live_x") is None
+            assert await worker_a.get("sk_live_x") is None
+
+        local_only = APIKeyVerificationCache("test", ttl_seconds=300, local_ttl_seconds=30)
+        with patch("core.api_key_cache.get_cache_service", AsyncMock(return_value=_cache_service())):
+            await local_only.invalidate("key1")
+            await local_only.set("sk_live_x", _key_doc())
+            assert await local_only.get("sk_live_x") is None
+
+    @pytest.mark.anyio
+    async def test_revocation_between_check_and_write_is_rolled_back(self):
+        """La révocation lit l'index avant le SADD de set() : l'entrée écrite est retirée par set()."""
+        from core.api_key_cache import APIKeyVerificationCache
+        redis_client = _FakeRedis()
+        service = _cache_service(redis_client)
+        worker_a = APIKeyVerificationCache("test", ttl_seconds=300, local_ttl_seconds=30)
+        worker_b = APIKeyVerificationCache("test", ttl_seconds=300, local_ttl_seconds=30)
+        write = service.set.side_effect
+
+        async def _set_then_revoke(key, value, ttl=300):
+            await write(key, value, ttl)
+            await worker_a.invalidate("key1")
+
+        service.set = AsyncMock(side_effect=_set_then_revoke)
+        with patch("core.api_key_cache.get_cache_service", AsyncMock(return_value=service)):
+            await worker_b.set("sk_live_x", _key_doc())
+            assert not [k for k in redis_client.store if k.startswith("api_key:")]
+            assert await worker_b.get("sk_live_x") is None
+
+
+class TestIntegrationServiceVerify:
+
+    @pytest.mark.anyio
+    async def test_bcrypt_runs_once_for_repeated_calls(self):
+        from core.api_key_cache import integration_api_key_cache
+        from services.integration_service import IntegrationService
+
+        repo = MagicMock()
+        repo.find_api_keys_by_prefix = AsyncMock(return_value=([_key_doc(id="key-bcrypt")], 1))
+        repo.api_keys.update_one = AsyncMock()
+        service = IntegrationService(integration_repo=repo, user_repo=MagicMock())
+        verify = MagicMock(return_value=True)
+
+        with patch("core.api_key_cache.get_cache_service", AsyncMock(return_value=_cache_service())), \
+             patch("services.integration_service.verify_password", verify):
+            for _ in range(5):
+                doc = await service.verify_api_key("sk_live_repeated")
+                assert doc["id"] == "key-bcrypt"
+            await integration_api_key_cache.invalidate("key-bcrypt")
+
+        assert verify.call_count == 1
+        assert repo.find_api_keys_by_prefix.await_count == 1
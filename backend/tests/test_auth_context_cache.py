@@ -0,0 +1,282 @@
+"""
+Tests unitaires — cache d'authentification par worker (core/auth_context_cache.py)
+et son branchement dans core/security.py / core/cache.py.
+
+Mongo, Redis (cache + pub/sub) et le décodage JWT sont remplacés par des fakes
+en mémoire ; l'horloge du cache est injectée.
+
+Couvre :
+- TTL, éviction LRU, copies (la mutation par requête ne pollue pas le cache)
+- invalidation ciblée : user, store (store_owner:*:{id}), workspace (+ gerant_ws)
+- invalidate_* publient sur auth:invalidate ; un message reçu vide les entrées locales
+- listener : vidage complet à la reconnexion après une coupure Redis
+- rafale de requêtes : une seule lecture Redis/Mongo, relue après invalidate_user_cache
+- propriété d'un magasin : succès mis en cache, refus toujours revérifié
+"""
+import asyncio
+import json
+import sys
+from collections import Counter
+from unittest.mock import AsyncMock
+
+import pytest
+
+import core.auth_context_cache as auth_cache_module
+import core.database  # noqa: F401  (module patché via sys.modules : core.database est aussi l'instance Database)
+from core.auth_context_cache import INVALIDATION_CHANNEL, AuthContextCache
+from core.exceptions import ForbiddenError
+
+
+# ---------------------------------------------------------------------------
+# Stand-ins
+# ---------------------------------------------------------------------------
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeCollection:
+    def __init__(self, name, queries):
+        self.name = name
+        self.docs = []
+        self.queries = queries
+
+    async def find_one(self, filters, projection=None):
+        self.queries[self.name] += 1
+        for doc in self.docs:
+            if all(doc.get(k) == v for k, v in filters.items()):
+                return dict(doc)
+        return None
+
+
+class FakeDB(dict):
+    def __init__(self):
+        super().__init__()
+        self.queries = Counter()
+
+    def __missing__(self, name):
+        self[name] = FakeCollection(name, self.queries)
+        return self[name]
+
+
+class FakeCache:
+    enabled = True
+
+    def __init__(self):
+        self.data = {}
+        self.gets = 0
+
+    async def get(self, key):
+        self.gets += 1
+        return self.data.get(key)
+
+    async def set(self, key, value, ttl=300):
+        self.data[key] = value
+        return True
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+        return True
+
+
+class RecordingRedis:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+def _message(kind, entity_id):
+    return {"type": "message", "channel": INVALIDATION_CHANNEL.encode(),
+            "data": json.dumps({"kind": kind, "id": entity_id}).encode()}
+
+
+@pytest.fixture
+def env(monkeypatch):
+    """Cache local neuf + Redis/Mongo factices branchés dans core.security."""
+    local = AuthContextCache(ttl_seconds=5, max_entries=100)
+    monkeypatch.setattr(auth_cache_module, "_auth_context_cache", local)
+    db, cache = FakeDB(), FakeCache()
+    monkeypatch.setattr(sys.modules["core.database"], "get_db", AsyncMock(return_value=db))
+    monkeypatch.setattr("core.cache.get_cache_service", AsyncMock(return_value=cache))
+    monkeypatch.setattr("core.security.decode_token", lambda token: {"user_id": token})
+    return local, db, cache
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+class TestAuthContextCache:
+
+    def test_ttl_lru_and_copies(self):
+        clock = Clock()
+        cache = AuthContextCache(ttl_seconds=5, max_entries=2, clock=clock)
+
+        cache.set("user:a", {"id": "a"})
+        cache.get("user:a")["space"] = {"id": "w"}
+        assert cache.get("user:a") == {"id": "a"}
+
+        cache.set("user:b", {"id": "b"})
+        cache.get("user:a")  # b devient le moins récemment utilisé
+        cache.set("user:c", {"id": "c"})
+        assert cache.get("user:b") is None and cache.get("user:a") == {"id": "a"}
+
+        clock.now += 5
+        assert cache.get("user:a") is None
+        assert cache.stats()["evictions"] == 1
+
+    def test_disabled_with_zero_ttl(self):
+        cache = AuthContextCache(ttl_seconds=0)
+        cache.set("user:a", {"id": "a"})
+        assert cache.get("user:a") is None and not cache.enabled
+
+    def test_targeted_invalidation(self):
+        cache = AuthContextCache()
+        cache.set("user:g1", {"id": "g1"})
+        cache.set("gerant_ws:g1", {"id": "w1"})
+        cache.set("gerant_ws:g2", {"id": "w2"})
+        cache.set("workspace:w1", {"id": "w1"})
+        cache.set("store_owner:g1:s1", True)
+        cache.set("store_owner:g1:s2", True)
+        cache.set("store_owner:g2:s1", True)
+
+        cache.invalidate_local("store", "s1")
+        assert cache.get("store_owner:g1:s1") is None and cache.get("store_owner:g2:s1") is None
+        assert cache.get("store_owner:g1:s2") is True
+
+        cache.invalidate_local("workspace", "w1")
+        assert cache.get("workspace:w1") is None and cache.get("gerant_ws:g1") is None
+        assert cache.get("gerant_ws:g2") == {"id": "w2"}
+
+        cache.invalidate_local("user", "g1")
+        assert cache.get("user:g1") is None and cache.get("store_owner:g1:s2") is None
+
+
+# ---------------------------------------------------------------------------
+# Pub/sub
+# ---------------------------------------------------------------------------
+
+class FakePubSub:
+    def __init__(self, script):
+        self.script = script
+
+    async def subscribe(self, channel):
+        assert channel == INVALIDATION_CHANNEL
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+        await asyncio.sleep(0)
+        if not self.script:
+            await asyncio.sleep(3600)
+        step = self.script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        return step
+
+    async def aclose(self):
+        pass
+
+
+class TestBroadcast:
+
+    @pytest.mark.anyio
+    async def test_invalidate_publishes_and_remote_message_applies(self, env):
+        local, _, cache = env
+        redis = RecordingRedis()
+        local._redis_client = redis
+        local.set("user:u1", {"id": "u1"})
+        cache.data["user:u1"] = {"id": "u1"}
+
+        from core.cache import invalidate_user_cache
+        await invalidate_user_cache("u1")
+
+        assert local.get("user:u1") is None and "user:u1" not in cache.data
+        assert redis.published == [(INVALIDATION_CHANNEL, '{"kind":"user","id":"u1"}')]
+
+        other = AuthContextCache()
+        other.set("workspace:w1", {"id": "w1"})
+        other._handle_message(_message("workspace", "w1"))
+        other._handle_message({"type": "message", "data": b"not json"})
+        assert other.get("workspace:w1") is None
+        assert other.stats()["remote_invalidations"] == 1
+
+    @pytest.mark.anyio
+    async def test_listener_flushes_after_reconnect(self, monkeypatch):
+        monkeypatch.setattr(auth_cache_module, "RECONNECT_MIN_SECONDS", 0)
+        cache = AuthContextCache()
+        pubsubs = [
+            FakePubSub([_message("user", "u1"), ConnectionError("redis gone")]),
+            FakePubSub([]),
+        ]
+
+        class Redis(RecordingRedis):
+            def pubsub(self):
+                return pubsubs.pop(0)
+
+        cache.set("user:u1", {"id": "u1"})
+        await cache.start(Redis())
+        cache.set("user:u2", {"id": "u2"})
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+        assert not pubsubs  # reconnecté
+        assert cache.get("user:u2") is None  # vidé : des invalidations ont pu être manquées
+        assert cache.stats()["remote_invalidations"] == 1 and cache.stats()["listening"]
+        await cache.stop()
+        assert not cache.stats()["listening"]
+
+
+# ---------------------------------------------------------------------------
+# Branchement core.security
+# ---------------------------------------------------------------------------
+
+class TestSecurityIntegration:
+
+    @pytest.mark.anyio
+    async def test_burst_of_requests_resolves_once(self, env):
+        from core.security import _get_current_user_from_token
+        from core.cache import invalidate_user_cache
+
+        local, db, cache = env
+        db["users"].docs.append({"id": "g1", "role": "gerant", "name": "Gé"})
+        db["workspaces"].docs.append({"id": "w1", "gerant_id": "g1", "status": "active", "stripe_customer_id": "x"})
+
+        for _ in range(5):
+            user = await _get_current_user_from_token("g1")
+            assert user["space"]["id"] == "w1" and "stripe_customer_id" not in user["space"]
+        assert db.queries == Counter({"users": 1, "workspaces": 1})
+        assert cache.gets == 1
+
+        db["users"].docs[0]["name"] = "Gérant"
+        await invalidate_user_cache("g1")
+        user = await _get_current_user_from_token("g1")
+        assert user["name"] == "Gérant"
+        assert db.queries == Counter({"users": 2, "workspaces": 2})
+
+    @pytest.mark.anyio
+    async def test_store_ownership_caches_success_only(self, env):
+        from core.security import verify_store_ownership
+        from repositories.store_repository import StoreRepository
+
+        _, db, _ = env
+        repo = StoreRepository(db)
+        gerant = {"id": "g1", "role": "gerant"}
+
+        for _ in range(2):
+            with pytest.raises(ForbiddenError):
+                await verify_store_ownership(gerant, "s1", store_repo=repo)
+        db["stores"].docs.append({"id": "s1", "gerant_id": "g1", "active": True})
+        for _ in range(3):
+            await verify_store_ownership(gerant, "s1", store_repo=repo)
+        assert db.queries["stores"] == 3
+
+        db["stores"].docs[0]["active"] = False
+        from core.cache import invalidate_store_cache
+        await invalidate_store_cache("s1")
+        with pytest.raises(ForbiddenError):
+            await verify_store_ownership(gerant, "s1", store_repo=repo)
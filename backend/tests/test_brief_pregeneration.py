@@ -0,0 +1,305 @@
+"""
+Tests unitaires — pré-génération nocturne des briefs matinaux
+(services/brief_pregeneration_service.py).
+
+Base en mémoire qui compte les allers-retours Mongo ; les agrégations
+(jours par magasin, dernier diagnostic, CA de la semaine) sont rejouées en Python.
+OpenAI est remplacé par un AIService factice.
+
+Couvre :
+- stats identiques à ManagerService.get_yesterday_stats_for_brief
+- briefs enregistrés là où get_cached_morning_brief les cherche
+- magasins déjà couverts ignorés, brief de secours non mis en cache
+- concurrence bornée, rapport (couverture, latences)
+- nombre de requêtes constant quand le nombre de magasins augmente
+"""
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from services.brief_pregeneration_service import BriefPregenerationService, build_brief_stats
+
+TODAY = datetime.now(timezone.utc).date()
+
+
+def _day(n):
+    return (TODAY - timedelta(days=n)).isoformat()
+
+
+# ---------------------------------------------------------------------------
+# Stand-ins
+# ---------------------------------------------------------------------------
+
+def _matches(doc, filters):
+    for key, cond in filters.items():
+        if key == "$or":
+            if not any(_matches(doc, sub) for sub in cond):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(cond, dict):
+            for op, arg in cond.items():
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$gte" and (value is None or not value >= arg):
+                    return False
+                if op == "$lte" and (value is None or not value <= arg):
+                    return False
+                if op == "$gt" and (value is None or not value > arg):
+                    return False
+        elif value != cond:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    fields = [k for k, v in (projection or {}).items() if v and k != "_id"]
+    return {k: doc[k] for k in fields if k in doc} if fields else dict(doc)
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, spec):
+        return self
+
+    def skip(self, n):
+        self.docs = self.docs[n:]
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n] if n else self.docs
+        return self
+
+    async def to_list(self, n):
+        return list(self.docs)
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class CountingCollection:
+    def __init__(self, name, queries):
+        self.name = name
+        self.docs = []
+        self.queries = queries
+
+    def find(self, filters, projection=None):
+        self.queries[self.name] += 1
+        return _Cursor([_project(d, projection) for d in self.docs if _matches(d, filters)])
+
+    async def find_one(self, filters, projection=None):
+        self.queries[self.name] += 1
+        for doc in self.docs:
+            if _matches(doc, filters):
+                return _project(doc, projection)
+        return None
+
+    async def distinct(self, field, filters):
+        self.queries[self.name] += 1
+        return list({d.get(field) for d in self.docs if _matches(d, filters)})
+
+    async def insert_one(self, doc):
+        self.docs.append(dict(doc))
+        return SimpleNamespace(inserted_id=len(self.docs))
+
+    def aggregate(self, pipeline):
+        self.queries[self.name] += 1
+        rows = [d for d in self.docs if _matches(d, pipeline[0]["$match"])]
+        group = pipeline[1].get("$group", {})
+        if self.name == "diagnostics":
+            latest = {}
+            for doc in sorted(rows, key=lambda d: d.get("created_at", ""), reverse=True):
+                latest.setdefault(doc["seller_id"], dict(doc))
+            return _Cursor(list(latest.values()))
+        if group.get("_id") is None:  # CA de la semaine (get_yesterday_stats_for_brief)
+            return _Cursor([{"_id": None, "total_ca": sum(d.get("ca_journalier", 0) or 0 for d in rows)}] if rows else [])
+        days = {}
+        for doc in rows:
+            day = days.setdefault((doc["store_id"], doc["date"]), {
+                "_id": {"store_id": doc["store_id"], "date": doc["date"]},
+                "ca": 0, "ventes": 0, "articles": 0, "prospects": 0, "sellers": [],
+            })
+            day["ca"] += doc.get("ca_journalier", 0) or 0
+            day["ventes"] += doc.get("nb_ventes", 0) or 0
+            day["articles"] += doc.get("nb_articles", 0) or 0
+            day["prospects"] += doc.get("nb_prospects", 0) or 0
+            day["sellers"].append({"seller_id": doc.get("seller_id"), "ca": doc.get("ca_journalier", 0) or 0})
+        return _Cursor(list(days.values()))
+
+
+class CountingDB(dict):
+    def __init__(self):
+        super().__init__()
+        self.queries = Counter()
+
+    def __missing__(self, name):
+        self[name] = CountingCollection(name, self.queries)
+        return self[name]
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+def _seed_store(db, i, subscription="active", with_manager=True, sellers=3):
+    gerant_id, store_id = f"g{i}", f"s{i}"
+    db["users"].docs.append({"id": gerant_id, "role": "gerant", "status": "active", "name": f"Gérant {i}"})
+    db["billing_profiles"].docs.append({"gerant_id": gerant_id, "subscription_status": subscription})
+    db["stores"].docs.append({
+        "id": store_id, "name": f"Magasin {i}", "gerant_id": gerant_id, "active": True,
+        "objective_daily": 1500, "objective_weekly": 9000,
+    })
+    if with_manager:
+        db["users"].docs.append({"id": f"m{i}", "role": "manager", "status": "active", "store_id": store_id, "name": f"Manager {i}"})
+    for j in range(sellers):
+        seller_id = f"{store_id}-v{j}"
+        db["users"].docs.append({
+            "id": seller_id, "role": "seller", "status": "active", "store_id": store_id, "name": f"Vendeur{j} Nom",
+        })
+        db["diagnostics"].docs.append({"seller_id": seller_id, "created_at": "2025-01-01", "profile": {"style": "D"}})
+        for back, ca in ((2, 300 + 10 * j), (3, 200), (9, 100)):
+            db["kpi_entries"].docs.append({
+                "store_id": store_id, "seller_id": seller_id, "date": _day(back),
+                "ca_journalier": ca, "nb_ventes": 4, "nb_articles": 7, "nb_prospects": 10,
+            })
+    return store_id
+
+
+class FakeAIService:
+    def __init__(self, delay=0.0, fallback_for=()):
+        self.available = True
+        self.delay = delay
+        self.fallback_for = set(fallback_for)
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_morning_brief(self, stats, manager_name, store_name, **kwargs):
+        self.calls.append({"stats": stats, "manager_name": manager_name, "store_name": store_name, **kwargs})
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        fallback = store_name in self.fallback_for
+        return {
+            "success": True, "brief": f"Brief {store_name}", "structured": {"focus": "x"},
+            "date": "aujourd'hui", "data_date": stats.get("data_date"), "fallback": fallback,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Stats
+# ---------------------------------------------------------------------------
+
+class TestBriefStats:
+
+    @pytest.mark.anyio
+    async def test_matches_on_demand_stats(self):
+        from repositories.kpi_repository import KPIRepository
+        from repositories.store_repository import StoreRepository
+        from repositories.user_repository import UserRepository
+        from services.manager_service import ManagerService
+
+        db = CountingDB()
+        store_id = _seed_store(db, 1, sellers=8)
+        manager_service = ManagerService.__new__(ManagerService)
+        manager_service.kpi_repo = KPIRepository(db)
+        manager_service.user_repo = UserRepository(db)
+        manager_service.store_repo = StoreRepository(db)
+        expected = await manager_service.get_yesterday_stats_for_brief(store_id, "m1")
+
+        days = await KPIRepository(db).aggregate_store_days([store_id], _day(36), _day(1))
+        names = {u["id"]: u["name"] for u in db["users"].docs}
+        store = db["stores"].docs[0]
+
+        assert build_brief_stats(store, days[store_id], names, TODAY) == expected
+        assert expected["data_date"] == _day(2)
+        assert expected["top_seller_yesterday"] == "Vendeur7 (370€)"
+        assert expected["team_active_last_day"].endswith("et 2 autres")
+
+    def test_store_without_data(self):
+        stats = build_brief_stats({"objective_daily": 500}, {}, {}, TODAY)
+        assert stats["data_date"] == _day(1)
+        assert stats["ca_yesterday"] == 0 and stats["ca_week"] == 0
+        assert stats["objectif_yesterday"] == 500
+
+
+# ---------------------------------------------------------------------------
+# Pré-génération
+# ---------------------------------------------------------------------------
+
+class TestPregeneration:
+
+    @pytest.mark.anyio
+    async def test_briefs_land_where_the_cache_looks(self):
+        from repositories.morning_brief_repository import MorningBriefRepository
+
+        db = CountingDB()
+        for i in range(3):
+            _seed_store(db, i)
+        _seed_store(db, 9, subscription="canceled")
+        ai = FakeAIService()
+
+        report = await BriefPregenerationService(db, ai_service=ai).run(today=TODAY)
+
+        assert report["eligible_stores"] == 3 and report["generated"] == 3
+        assert report["coverage"] == 1.0 and report["latency_ms"]["p95"] is not None
+        cached = await MorningBriefRepository(db).find_today_uncustomized("s1", TODAY.isoformat())
+        assert cached["brief"] == "Brief Magasin 1" and cached["pregenerated"] is True
+        assert cached["manager_id"] == "m1" and cached["structured"] == {"focus": "x"}
+        assert ai.calls[0]["team_disc_profiles"][0] == {"first_name": "Vendeur0", "disc_style": "D"}
+
+    @pytest.mark.anyio
+    async def test_already_cached_and_fallback_are_skipped(self):
+        db = CountingDB()
+        for i in range(3):
+            _seed_store(db, i)
+        _seed_store(db, 3, with_manager=False)
+        db["morning_briefs"].docs.append({
+            "store_id": "s0", "context": None, "generated_at": f"{TODAY.isoformat()}T06:00:00+00:00",
+        })
+        ai = FakeAIService(fallback_for={"Magasin 2"})
+
+        report = await BriefPregenerationService(db, ai_service=ai).run(today=TODAY)
+
+        assert report["already_cached"] == 1 and report["generated"] == 2 and report["fallback"] == 1
+        assert report["coverage"] == 0.75
+        assert {c["store_name"] for c in ai.calls} == {"Magasin 1", "Magasin 2", "Magasin 3"}
+        assert {c["manager_name"] for c in ai.calls if c["store_name"] == "Magasin 3"} == {"Gérant 3"}
+        assert not any(b.get("store_id") == "s2" for b in db["morning_briefs"].docs)
+
+        again = await BriefPregenerationService(db, ai_service=ai).run(today=TODAY)
+        assert again["already_cached"] == 3 and again["generated"] == 0
+
+    @pytest.mark.anyio
+    async def test_concurrency_is_bounded(self):
+        db = CountingDB()
+        for i in range(10):
+            _seed_store(db, i, sellers=1)
+        ai = FakeAIService(delay=0.01)
+
+        await BriefPregenerationService(db, ai_service=ai, concurrency=3).run(today=TODAY)
+
+        assert len(ai.calls) == 10 and ai.max_in_flight == 3
+
+    @pytest.mark.anyio
+    async def test_query_count_is_constant(self):
+        counts = []
+        for stores in (2, 20):
+            db = CountingDB()
+            for i in range(stores):
+                _seed_store(db, i)
+            await BriefPregenerationService(db, ai_service=FakeAIService()).run(today=TODAY)
+            counts.append(sum(db.queries.values()))
+        assert counts[0] == counts[1]
@@ -0,0 +1,331 @@
+"""
+Tests unitaires — progression des challenges vendeur en batch
+(ChallengesMixin.evaluate_challenges_progress), écriture différée
+(core/write_behind.DebouncedUpdateWriter) et drapeau has_unseen_achievement.
+
+Dépôts en mémoire : chaque branche $facet est rejouée en Python à partir de son
+$match. Les résultats sont comparés à calculate_challenge_progress exécuté
+challenge par challenge.
+
+Couvre :
+- mêmes progress_* / status que l'algorithme unitaire (données aléatoires)
+- nombre de requêtes constant, aucune écriture pendant la lecture
+- seules les valeurs modifiées sont mises en file, puis écrites en un bulk_write
+- fusion par document, y compris entre instances de dépôt (une par requête), flush différé / immédiat
+- drapeaux d'accomplissement résolus en une requête
+"""
+import asyncio
+import copy
+import random
+from collections import Counter
+from datetime import date, timedelta
+
+import pytest
+
+from core.write_behind import DebouncedUpdateWriter
+from utils.kpi_pipeline import DAILY_TOTAL_FIELDS, build_daily_totals_facet_pipeline
+
+
+TODAY = date.today()
+
+
+def _day(offset):
+    return (TODAY + timedelta(days=offset)).isoformat()
+
+
+# ---------------------------------------------------------------------------
+# Stand-ins
+# ---------------------------------------------------------------------------
+
+def _matches(doc, filters):
+    for key, cond in filters.items():
+        if key == "$or":
+            if not any(_matches(doc, sub) for sub in cond):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(cond, dict):
+            if "$in" in cond and value not in cond["$in"]:
+                return False
+            if "$gte" in cond and not value >= cond["$gte"]:
+                return False
+            if "$lte" in cond and not value <= cond["$lte"]:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+class FakeKpiRepo:
+    def __init__(self, entries, calls, name):
+        self.entries = entries
+        self.calls = calls
+        self.name = name
+
+    async def aggregate_totals(self, query, date_range=None):
+        self.calls[self.name] += 1
+        rows = [e for e in self.entries if _matches(e, {**query, "date": date_range})]
+        return {
+            "total_ca": sum(e.get("ca_journalier") or 0 for e in rows),
+            "total_ventes": sum(e.get("nb_ventes") or 0 for e in rows),
+            "total_articles": sum(e.get("nb_articles") or 0 for e in rows),
+        }
+
+    async def aggregate_daily_totals_facets(self, queries, date_range):
+        self.calls[self.name] += 1
+        pipeline = build_daily_totals_facet_pipeline(
+            {name: {**query, "date": date_range} for name, query in queries.items()}
+        )
+        candidates = [e for e in self.entries if _matches(e, pipeline[0]["$match"])]
+        out = {}
+        for name, branch in pipeline[1]["$facet"].items():
+            daily = {}
+            for e in candidates:
+                if _matches(e, branch[0]["$match"]):
+                    row = daily.setdefault(e["date"], {"date": e["date"], **{f: 0 for f in DAILY_TOTAL_FIELDS}})
+                    for f in DAILY_TOTAL_FIELDS:
+                        row[f] += e.get(f) or 0
+            out[name] = [daily[d] for d in sorted(daily)]
+        return out
+
+
+class FakeUserRepo:
+    def __init__(self, seller_ids, calls):
+        self.seller_ids = seller_ids
+        self.calls = calls
+
+    async def find_ids_by_query(self, query):
+        self.calls["users"] += 1
+        for uid in self.seller_ids:
+            yield uid
+
+
+class FakeChallengeRepo:
+    collection_name = "challenges"
+
+    def __init__(self):
+        self.updates = []
+        self.bulk_ops = []
+
+    async def update_challenge(self, challenge_id, update_data, store_id=None, manager_id=None):
+        self.updates.append((challenge_id, update_data))
+
+    async def bulk_write(self, ops):
+        self.bulk_ops.extend(ops)
+
+
+class FakeAchievementRepo:
+    def __init__(self, seen):
+        self.seen = seen
+        self.calls = 0
+
+    async def find_seen_item_ids(self, user_id, item_type, item_ids):
+        self.calls += 1
+        return {i for i in item_ids if (user_id, item_type, i) in self.seen}
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    from services.seller_service import _challenges_mixin
+
+    fresh = DebouncedUpdateWriter("test", delay_seconds=3600, max_pending=10_000)
+    monkeypatch.setattr(_challenges_mixin, "challenge_progress_writer", fresh)
+    return fresh
+
+
+def _service(seller_entries, manager_entries, seller_ids=("s1", "s2", "s3")):
+    from services.seller_service._challenges_mixin import ChallengesMixin
+    from services.seller_service._sales_mixin import SalesMixin
+
+    class Service(ChallengesMixin, SalesMixin):
+        compute_status = staticmethod(lambda current, target, end: "achieved" if current >= (target or 0) else "active")
+
+    calls = Counter()
+    service = Service()
+    service.user_repo = FakeUserRepo(list(seller_ids), calls)
+    service.kpi_repo = FakeKpiRepo(seller_entries, calls, "kpi_entries")
+    service.manager_kpi_repo = FakeKpiRepo(manager_entries, calls, "manager_kpis")
+    service.challenge_repo = FakeChallengeRepo()
+    return service, calls
+
+
+def _random_dataset(seed, n_challenges=40):
+    rng = random.Random(seed)
+    seller_entries = [
+        {"seller_id": seller, "store_id": "st1", "date": _day(offset),
+         "ca_journalier": round(rng.uniform(0, 900), 2), "nb_ventes": rng.randint(0, 12), "nb_articles": rng.randint(0, 25)}
+        for offset in range(-200, 1) for seller in ("s1", "s2", "s3") if rng.random() < 0.6
+    ]
+    # Jours sans saisie vendeur couverts par le manager
+    manager_entries = [
+        {"manager_id": "m1", "store_id": "st1", "date": _day(offset),
+         "ca_journalier": 1000.0, "nb_ventes": 10, "nb_articles": 15}
+        for offset in range(-260, -200)
+    ]
+    challenges = []
+    for i in range(n_challenges):
+        a = rng.randint(-260, 0)
+        b = a + rng.randint(0, 90)
+        challenge = {
+            "id": f"ch{i}", "store_id": "st1", "manager_id": "m1", "status": "active",
+            "type": rng.choice(["collective", "individual"]), "seller_id": "s1",
+            "start_date": _day(a), "end_date": _day(b),
+            "ca_target": rng.choice([None, rng.uniform(1_000, 60_000)]),
+            "ventes_target": rng.choice([None, rng.randint(10, 500)]),
+        }
+        if i % 10 == 0:
+            challenge.update(data_entry_responsible="manager", current_value=rng.randint(0, 100), target_value=50)
+        challenges.append(challenge)
+    return seller_entries, manager_entries, challenges
+
+
+# ---------------------------------------------------------------------------
+# Batch progress
+# ---------------------------------------------------------------------------
+
+class TestBatchProgress:
+
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    async def test_matches_single_challenge_algorithm(self, seed, writer):
+        seller_entries, manager_entries, challenges = _random_dataset(seed)
+        reference = copy.deepcopy(challenges)
+        ref_service, _ = _service(seller_entries, manager_entries)
+        for challenge in reference:
+            await ref_service.calculate_challenge_progress(challenge, "s1")
+
+        service, calls = _service(seller_entries, manager_entries)
+        await service.evaluate_challenges_progress(challenges, "s1")
+
+        for got, expected in zip(challenges, reference):
+            assert got["status"] == expected["status"], got["id"]
+            for field in ("progress_ca", "progress_ventes", "progress_articles",
+                          "progress_panier_moyen", "progress_indice_vente"):
+                assert got.get(field) == pytest.approx(expected.get(field)), (got["id"], field)
+        assert calls == {"users": 1, "kpi_entries": 1, "manager_kpis": 1}
+
+    @pytest.mark.anyio
+    async def test_no_write_during_read_then_one_bulk_write(self, writer):
+        seller_entries, manager_entries, challenges = _random_dataset(4)
+        service, _ = _service(seller_entries, manager_entries)
+
+        await service.evaluate_challenges_progress(challenges, "s1")
+
+        assert service.challenge_repo.updates == [] and service.challenge_repo.bulk_ops == []
+        pending = writer.pending_count()
+        assert pending > 0
+        assert await writer.flush() == pending
+        assert len(service.challenge_repo.bulk_ops) == pending
+        assert {op._filter["store_id"] for op in service.challenge_repo.bulk_ops} == {"st1"}
+
+    @pytest.mark.anyio
+    async def test_unchanged_values_are_not_requeued(self, writer):
+        seller_entries, manager_entries, challenges = _random_dataset(5)
+        service, _ = _service(seller_entries, manager_entries)
+
+        await service.evaluate_challenges_progress(challenges, "s1")
+        await writer.flush()
+        await service.evaluate_challenges_progress(challenges, "s1")
+
+        assert writer.pending_count() == 0
+
+    @pytest.mark.anyio
+    async def test_challenge_without_dates_has_zero_progress(self, writer):
+        service, calls = _service([], [])
+        challenge = {"id": "c", "store_id": "st1", "manager_id": "m1", "status": "active"}
+
+        await service.evaluate_challenges_progress([challenge], "s1")
+
+        assert challenge["progress_ca"] == 0 and challenge["progress_indice_vente"] == 0
+        assert sum(calls.values()) == 0
+
+
+class TestAchievementFlag:
+
+    @pytest.mark.anyio
+    async def test_flags_resolved_with_one_query(self):
+        service, _ = _service([], [])
+        service.achievement_notification_repo = FakeAchievementRepo({("s1", "challenge", "a")})
+        items = [{"id": "a", "status": "completed"}, {"id": "b", "status": "achieved"}, {"id": "c", "status": "active"}]
+
+        await service.add_achievement_notification_flag(items, "s1", "challenge")
+
+        assert [i["has_unseen_achievement"] for i in items] == [False, True, False]
+        assert service.achievement_notification_repo.calls == 1
+
+
+# ---------------------------------------------------------------------------
+# DebouncedUpdateWriter
+# ---------------------------------------------------------------------------
+
+class TestDebouncedUpdateWriter:
+
+    @pytest.mark.anyio
+    async def test_merges_updates_of_same_document(self):
+        repo = FakeChallengeRepo()
+        writer = DebouncedUpdateWriter("t", delay_seconds=3600)
+        writer.submit(repo, {"id": "c1", "store_id": "st1"}, {"progress_ca": 1, "status": "active"})
+        writer.submit(repo, {"store_id": "st1", "id": "c1"}, {"progress_ca": 2})
+        writer.submit(repo, {"id": "c2", "store_id": "st1"}, {"progress_ca": 3})
+
+        assert writer.pending_count() == 2
+        assert await writer.flush() == 2
+        first = repo.bulk_ops[0]
+        assert first._doc == {"$set": {"progress_ca": 2, "status": "active"}}
+        assert writer.stats()["merged"] == 1
+
+    @pytest.mark.anyio
+    async def test_merges_across_repository_instances(self):
+        """get_seller_service crée un ChallengeRepository par requête : la fusion se fait par collection."""
+        from repositories.challenge_repository import ChallengeRepository
+
+        class FakeCollection:
+            def __init__(self):
+                self.calls = []
+
+            async def bulk_write(self, ops, ordered=True):
+                self.calls.append(ops)
+                return type("Result", (), {"inserted_count": 0, "modified_count": len(ops), "matched_count": len(ops),
+                                           "deleted_count": 0, "upserted_count": 0})()
+
+        collection = FakeCollection()
+        db = {"challenges": collection}
+        writer = DebouncedUpdateWriter("t", delay_seconds=3600)
+        writer.submit(ChallengeRepository(db), {"id": "c1", "store_id": "st1"}, {"progress_ca": 1})
+        writer.submit(ChallengeRepository(db), {"id": "c1", "store_id": "st1"}, {"progress_ca": 2})
+
+        assert writer.pending_count() == 1
+        assert await writer.flush() == 1
+        assert len(collection.calls) == 1
+        assert collection.calls[0][0]._doc == {"$set": {"progress_ca": 2}}
+
+    @pytest.mark.anyio
+    async def test_flushes_after_delay(self):
+        repo = FakeChallengeRepo()
+        writer = DebouncedUpdateWriter("t", delay_seconds=0.01)
+        writer.submit(repo, {"id": "c1"}, {"progress_ca": 1})
+        assert repo.bulk_ops == []
+        await asyncio.sleep(0.05)
+        assert len(repo.bulk_ops) == 1 and writer.pending_count() == 0
+
+    @pytest.mark.anyio
+    async def test_flushes_immediately_at_max_pending(self):
+        repo = FakeChallengeRepo()
+        writer = DebouncedUpdateWriter("t", delay_seconds=3600, max_pending=3)
+        for i in range(3):
+            writer.submit(repo, {"id": f"c{i}"}, {"progress_ca": i})
+        await asyncio.sleep(0)
+        assert len(repo.bulk_ops) == 3
+
+    @pytest.mark.anyio
+    async def test_failed_flush_is_counted_and_dropped(self):
+        class FailingRepo:
+            collection_name = "challenges"
+
+            async def bulk_write(self, ops):
+                raise RuntimeError("boom")
+
+        writer = DebouncedUpdateWriter("t", delay_seconds=3600)
+        writer.submit(FailingRepo(), {"id": "c1"}, {"progress_ca": 1})
+        assert await writer.flush() == 0
+        assert writer.stats()["errors"] == 1 and writer.pending_count() == 0
@@ -0,0 +1,378 @@
+"""
+Tests unitaires — core/scheduler.py (leader election + run records + reprise).
+
+Horloge factice + stand-ins en mémoire de Mongo (collections) et Redis,
+aucune dépendance réseau.
+
+Couvre :
+- MongoLeaseLock / RedisLeaseLock : un seul détenteur, expiration du bail
+- ClusterScheduler.run_job : une exécution par (job, jour) quel que soit le nombre de workers
+- run record : statut, durée, items traités
+- reprise : leader mort → bail expiré → reprise depuis le checkpoint
+- retry : run "failed" relancé après backoff, borné par max_attempts
+- perte du bail : le job est annulé et le run marqué "interrupted"
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+
+# ---------------------------------------------------------------------------
+# Stand-ins
+# ---------------------------------------------------------------------------
+
+class FakeClock:
+    def __init__(self, start=None):
+        self.current = start or datetime(2026, 10, 19, 6, 0, tzinfo=timezone.utc)
+
+    def now(self):
+        return self.current
+
+    def advance(self, seconds):
+        self.current += timedelta(seconds=seconds)
+
+
+def _matches(doc, filters):
+    for key, cond in filters.items():
+        if key == "$or":
+            if not any(_matches(doc, sub) for sub in cond):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(cond, dict):
+            for op, arg in cond.items():
+                if value is None:
+                    return False
+                if op == "$lte" and not value <= arg:
+                    return False
+                if op == "$gte" and not value >= arg:
+                    return False
+                if op == "$in" and value not in arg:
+                    return False
+        elif value != cond:
+            return False
+    return True
+
+
+class _Result:
+    def __init__(self, matched=0, deleted=0):
+        self.matched_count = matched
+        self.modified_count = matched
+        self.deleted_count = deleted
+        self.upserted_id = None
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, spec):
+        for field, direction in reversed(spec):
+            self.docs.sort(key=lambda d: d.get(field), reverse=direction == -1)
+        return self
+
+    def skip(self, n):
+        self.docs = self.docs[n:]
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, n):
+        return list(self.docs)
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, filters, projection=None):
+        for doc in self.docs.values():
+            if _matches(doc, filters):
+                return dict(doc)
+        return None
+
+    def find(self, filters, projection=None):
+        return _Cursor([dict(d) for d in self.docs.values() if _matches(d, filters)])
+
+    async def update_one(self, filters, update, upsert=False):
+        for doc in self.docs.values():
+            if _matches(doc, filters):
+                doc.update(update.get("$set", {}))
+                return _Result(matched=1)
+        if upsert:
+            _id = filters["_id"]
+            if _id in self.docs:
+                raise DuplicateKeyError("E11000 duplicate key")
+            self.docs[_id] = {"_id": _id, **update.get("$set", {})}
+        return _Result()
+
+    async def delete_one(self, filters):
+        for _id, doc in list(self.docs.items()):
+            if _matches(doc, filters):
+                del self.docs[_id]
+                return _Result(deleted=1)
+        return _Result()
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+class FakeRedis:
+    """SET NX PX + les deux scripts Lua du scheduler, expiration sur l'horloge factice."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.store = {}
+
+    def _alive(self, key):
+        entry = self.store.get(key)
+        if entry and entry[1] <= self.clock.now():
+            del self.store[key]
+            return None
+        return entry
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and self._alive(key):
+            return None
+        self.store[key] = (value, self.clock.now() + timedelta(milliseconds=px))
+        return True
+
+    async def eval(self, script, numkeys, key, owner, *args):
+        from core.scheduler import _REDIS_RENEW_SCRIPT
+        entry = self._alive(key)
+        if not entry or entry[0] != owner:
+            return 0
+        if script == _REDIS_RENEW_SCRIPT:
+            self.store[key] = (owner, self.clock.now() + timedelta(milliseconds=int(args[0])))
+        else:
+            del self.store[key]
+        return 1
+
+
+# ---------------------------------------------------------------------------
+# Leases
+# ---------------------------------------------------------------------------
+
+class TestLeaseLocks:
+
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("backend", ["mongo", "redis"])
+    async def test_single_holder_until_expiry(self, backend):
+        from core.scheduler import MongoLeaseLock, RedisLeaseLock
+        clock = FakeClock()
+        lock = MongoLeaseLock(FakeDB(), clock=clock) if backend == "mongo" else RedisLeaseLock(FakeRedis(clock))
+
+        assert await lock.acquire("job", "w1", 60) is True
+        assert await lock.acquire("job", "w2", 60) is False
+        clock.advance(61)
+        assert await lock.acquire("job", "w2", 60) is True
+        assert await lock.renew("job", "w1", 60) is False
+
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("backend", ["mongo", "redis"])
+    async def test_release_only_by_owner(self, backend):
+        from core.scheduler import MongoLeaseLock, RedisLeaseLock
+        clock = FakeClock()
+        lock = MongoLeaseLock(FakeDB(), clock=clock) if backend == "mongo" else RedisLeaseLock(FakeRedis(clock))
+
+        await lock.acquire("job", "w1", 60)
+        await lock.release("job", "w2")
+        assert await lock.acquire("job", "w2", 60) is False
+        await lock.release("job", "w1")
+        assert await lock.acquire("job", "w2", 60) is True
+
+
+# ---------------------------------------------------------------------------
+# ClusterScheduler
+# ---------------------------------------------------------------------------
+
+def _cluster(db, clock, owner, lock=None, heartbeat_seconds=3600):
+    from core.scheduler import ClusterScheduler, MongoLeaseLock
+    return ClusterScheduler(
+        db, lock or MongoLeaseLock(db, clock=clock), clock=clock, owner=owner,
+        lease_seconds=60, heartbeat_seconds=heartbeat_seconds,
+        max_attempts=3, retry_backoff_seconds=300,
+    )
+
+
+class TestClusterScheduler:
+
+    @pytest.mark.anyio
+    async def test_runs_once_per_cluster(self):
+        db, clock = FakeDB(), FakeClock()
+        calls = []
+
+        async def job(ctx):
+            calls.append(ctx.run_key)
+            ctx.add_items(3)
+
+        workers = [_cluster(db, clock, f"w{i}") for i in range(4)]
+        for worker in workers:
+            worker.register("recap", job)
+
+        results = await asyncio.gather(*(w.run_job("recap") for w in workers))
+        # Relance après coup (worker en retard) : la période est déjà "completed"
+        late = await workers[0].run_job("recap")
+
+        assert len(calls) == 1
+        assert late is None
+        assert sum(1 for r in results if r is not None) == 1
+        record = db["scheduler_runs"].docs["recap:2026-10-19"]
+        assert record["status"] == "completed"
+        assert record["items_processed"] == 3
+        assert record["duration_ms"] is not None
+
+    @pytest.mark.anyio
+    async def test_failed_job_is_recorded(self):
+        db, clock = FakeDB(), FakeClock()
+
+        async def job(ctx):
+            raise RuntimeError("smtp down")
+
+        worker = _cluster(db, clock, "w1")
+        worker.register("alerts", job)
+        result = await worker.run_job("alerts")
+        assert result["status"] == "failed"
+        assert db["scheduler_runs"].docs["alerts:2026-10-19"]["error"] == "smtp down"
+
+    @pytest.mark.anyio
+    async def test_failed_run_is_retried_after_backoff(self):
+        db, clock = FakeDB(), FakeClock()
+        seen = []
+
+        async def job(ctx):
+            seen.append(dict(ctx.checkpoint))
+            if not ctx.resumed:
+                await ctx.save_checkpoint({"done": ["a@x"]})
+                raise RuntimeError("smtp down")
+
+        worker = _cluster(db, clock, "w1")
+        worker.register("alerts", job)
+        await worker.run_job("alerts")
+        record = db["scheduler_runs"].docs["alerts:2026-10-19"]
+        assert record["retry_at"] == clock.now() + timedelta(seconds=300)
+
+        # Backoff non écoulé : ni le trigger ni le sweep ne relancent
+        assert await worker.run_job("alerts") is None
+        assert await worker.resume_orphaned_runs() == 0
+
+        clock.advance(301)
+        assert await worker.resume_orphaned_runs() == 1
+        record = db["scheduler_runs"].docs["alerts:2026-10-19"]
+        assert record["status"] == "completed"
+        assert record["attempts"] == 2
+        assert record["error"] is None
+        assert seen == [{}, {"done": ["a@x"]}]
+
+    @pytest.mark.anyio
+    async def test_retries_stop_after_max_attempts(self):
+        db, clock = FakeDB(), FakeClock()
+        calls = []
+
+        async def job(ctx):
+            calls.append(1)
+            raise RuntimeError("smtp down")
+
+        worker = _cluster(db, clock, "w1")
+        worker.register("alerts", job)
+        await worker.run_job("alerts")
+        clock.advance(301)   # backoff 300 s après la 1re tentative
+        assert await worker.resume_orphaned_runs() == 1
+        clock.advance(601)   # puis 600 s après la 2e
+        assert await worker.resume_orphaned_runs() == 1
+
+        record = db["scheduler_runs"].docs["alerts:2026-10-19"]
+        assert record["attempts"] == 3
+        assert record["retry_at"] is None
+        clock.advance(3600)
+        assert await worker.resume_orphaned_runs() == 0
+        assert await worker.run_job("alerts") is None
+        assert len(calls) == 3
+
+    @pytest.mark.anyio
+    async def test_lost_lease_interrupts_job(self):
+        from core.scheduler import MongoLeaseLock
+
+        class StolenLeaseLock(MongoLeaseLock):
+            async def renew(self, name, owner, ttl_seconds):
+                return False  # un autre worker a pris le bail
+
+        db, clock = FakeDB(), FakeClock()
+        finished = []
+
+        async def job(ctx):
+            await asyncio.sleep(5)
+            finished.append(1)
+
+        worker = _cluster(db, clock, "w1", lock=StolenLeaseLock(db, clock=clock), heartbeat_seconds=0.01)
+        worker.register("recap", job)
+        result = await asyncio.wait_for(worker.run_job("recap"), timeout=2)
+
+        assert finished == []
+        assert result["status"] == "interrupted"
+        record = db["scheduler_runs"].docs["recap:2026-10-19"]
+        assert record["status"] == "interrupted"
+        assert record["error"] == "lease lost"
+        assert record["retry_at"] is not None
+
+    @pytest.mark.anyio
+    async def test_orphaned_run_resumes_from_checkpoint(self):
+        db, clock = FakeDB(), FakeClock()
+        seen = {}
+
+        async def job(ctx):
+            seen[ctx.resumed] = dict(ctx.checkpoint)
+            if not ctx.resumed:
+                ctx.add_items(2)
+                await ctx.save_checkpoint({"done": ["a@x", "b@x"]})
+                raise asyncio.CancelledError  # le worker meurt en plein job
+
+        leader = _cluster(db, clock, "leader")
+        leader.register("recap", job)
+        with pytest.raises(asyncio.CancelledError):
+            await leader.run_job("recap")
+        # Le leader mort n'a pas clôturé son run record : il reste "running" jusqu'à expiration du bail
+        assert db["scheduler_runs"].docs["recap:2026-10-19"]["status"] == "running"
+
+        successor = _cluster(db, clock, "successor")
+        successor.register("recap", job)
+        assert await successor.resume_orphaned_runs() == 0  # bail encore valide
+
+        clock.advance(61)
+        assert await successor.resume_orphaned_runs() == 1
+        assert seen[True] == {"done": ["a@x", "b@x"]}
+        record = db["scheduler_runs"].docs["recap:2026-10-19"]
+        assert record["status"] == "completed"
+        assert record["attempts"] == 2
+        assert record["items_processed"] == 2
+
+    @pytest.mark.anyio
+    async def test_redis_lease_backend(self):
+        from core.scheduler import RedisLeaseLock
+        db, clock = FakeDB(), FakeClock()
+        redis = FakeRedis(clock)
+        calls = []
+
+        async def job(ctx):
+            calls.append(1)
+
+        workers = [_cluster(db, clock, f"w{i}", lock=RedisLeaseLock(redis)) for i in range(3)]
+        for worker in workers:
+            worker.register("recap", job)
+        await asyncio.gather(*(w.run_job("recap") for w in workers))
+        assert len(calls) == 1
+        assert db["scheduler_runs"].docs["recap:2026-10-19"]["lock_backend"] == "redis"
+
+    def test_run_key_uses_paris_day(self):
+        db = FakeDB()
+        clock = FakeClock(datetime(2026, 10, 18, 23, 30, tzinfo=timezone.utc))  # 01:30 à Paris le 19
+        worker = _cluster(db, clock, "w1")
+        worker.register("recap", None)
+        assert worker.current_run_key("recap") == "2026-10-19"
@@ -0,0 +1,144 @@
+"""
+Tests unitaires — core/email_dispatcher.py (envoi en masse des e-mails).
+
+Transport InMemoryEmailTransport (aucun appel Brevo), sleep factice pour
+les backoffs.
+
+Couvre :
+- token bucket : débit respecté (horloge factice)
+- retry avec backoff puis succès, dead letter après épuisement / erreur permanente
+- fan-out : milliers d'e-mails en parallèle borné
+- rendu des e-mails des jobs (templates)
+"""
+import time
+
+import pytest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeDeadLetters:
+    def __init__(self):
+        self.records = []
+
+    async def record(self, message, error, attempts, status_code=None):
+        self.records.append({**message, "error": error, "attempts": attempts, "status_code": status_code})
+        return "dl"
+
+
+async def _no_sleep(seconds):
+    return None
+
+
+def _dispatcher(transport, dead_letters=None, **kwargs):
+    from core.email_dispatcher import EmailDispatcher, TokenBucket
+    kwargs.setdefault("rate_limiter", TokenBucket(1_000_000))
+    return EmailDispatcher(transport, dead_letters=dead_letters, sleep=_no_sleep, **kwargs)
+
+
+def _msg(i, **kwargs):
+    from core.email_dispatcher import EmailMessage
+    return EmailMessage(f"user{i}@example.com", f"Sujet {i}", f"<p>{i}</p>", **kwargs)
+
+
+class TestTokenBucket:
+
+    @pytest.mark.anyio
+    async def test_rate_is_respected(self):
+        from core.email_dispatcher import TokenBucket
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=5, clock=clock, sleep=clock.sleep)
+        for _ in range(25):
+            await bucket.acquire()
+        # 5 en rafale puis 20 à 10/s
+        assert clock.now == pytest.approx(2.0)
+
+
+class TestRetryAndDeadLetters:
+
+    @pytest.mark.anyio
+    async def test_retryable_error_then_success(self):
+        from core.email_dispatcher import EmailTransportError, InMemoryEmailTransport
+        transport = InMemoryEmailTransport(failures={
+            "user0@example.com": [EmailTransportError("429", True, 429), EmailTransportError("503", True, 503)],
+        })
+        report = await _dispatcher(transport, max_attempts=3).dispatch([_msg(0)])
+        assert report.sent == 1
+        assert report.retries == 2
+        assert transport.calls == 3
+
+    @pytest.mark.anyio
+    async def test_exhausted_and_permanent_errors_are_dead_lettered(self):
+        from core.email_dispatcher import EmailTransportError, InMemoryEmailTransport
+        dead = FakeDeadLetters()
+        transport = InMemoryEmailTransport(failures={
+            "user0@example.com": [EmailTransportError("503", True, 503)] * 5,
+            "user1@example.com": [EmailTransportError("400 invalid email", False, 400)],
+        })
+        results = []
+
+        async def on_result(message, ok):
+            results.append((message.to_email, ok))
+
+        report = await _dispatcher(transport, dead, max_attempts=3).dispatch(
+            [_msg(0), _msg(1), _msg(2)], on_result=on_result
+        )
+        assert report.sent == 1
+        assert report.failed == 2
+        by_email = {r["to_email"]: r for r in dead.records}
+        assert by_email["user0@example.com"]["attempts"] == 3
+        assert by_email["user1@example.com"]["attempts"] == 1
+        assert by_email["user1@example.com"]["status_code"] == 400
+        assert sorted(results) == [("user0@example.com", False), ("user1@example.com", False),
+                                   ("user2@example.com", True)]
+
+
+class TestFanOut:
+
+    @pytest.mark.anyio
+    async def test_thousands_of_emails_in_parallel(self):
+        from core.email_dispatcher import InMemoryEmailTransport
+        transport = InMemoryEmailTransport(latency_seconds=0.005)
+        messages = [_msg(i) for i in range(3000)]
+        started = time.perf_counter()
+        report = await _dispatcher(transport, concurrency=100).dispatch(messages)
+        elapsed = time.perf_counter() - started
+        assert report.sent == 3000
+        assert report.api_calls == transport.calls == 3000
+        # Séquentiel : 3000 × 5 ms = 15 s
+        assert elapsed < 5
+
+
+class TestJobMessages:
+
+    def test_weekly_recap_renders(self):
+        from services.email_jobs import build_weekly_gerant_recap
+        message = build_weekly_gerant_recap("g@example.com", "Alice", {
+            "week_start": "05/10", "week_end": "11/10/2026", "total_ca": 12500.0,
+            "total_evolution": -3.2,
+            "stores": [{"name": "Paris", "ca": 12500.0, "ventes": 40, "evolution": None}],
+            "top_seller": {"name": "Bob", "store": "Paris", "ca": 4000},
+        })
+        assert message.subject == "📊 Récap semaine du 05/10 — 12,500 €"
+        assert "Bonjour <strong>Alice</strong>" in message.html_content
+        assert "&#9660; -3.2%" in message.html_content
+        assert "Top vendeur" in message.html_content
+        assert message.category == "weekly-gerant-recap"
+
+    def test_silent_seller_alert_renders(self):
+        from services.email_jobs import build_silent_seller_alert
+        message = build_silent_seller_alert("m@example.com", "Chloé", {
+            "sellers": [{"name": "Dan", "days_ago": 3}, {"name": "Eve", "days_ago": 1}],
+        })
+        assert message.subject == "⚠️ 2 vendeurs sans saisie KPI"
+        assert "il y a 3 jours" in message.html_content
+        assert "il y a 1 jour<" in message.html_content
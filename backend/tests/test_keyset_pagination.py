@@ -0,0 +1,271 @@
+"""
+Tests unitaires — pagination par curseur (keyset) de utils/pagination.py
+et son branchement sur les logs système et les KPI vendeur.
+
+Collection en mémoire qui rejoue filtre ($and / $or / $lt / $gt), tri, limite
+et projection, et qui enregistre les requêtes reçues (aucun skip attendu).
+
+Couvre :
+- parcours complet sans doublon ni trou, y compris avec des clés de tri égales
+- curseur signé : altéré ou issu d'un autre tri → ValidationError
+- tie-breaker _id (ObjectId) pour les logs sans champ id
+- champs de tri exclus de la projection puis retirés des items
+- total optionnel mis en cache (estimation sur un second appel)
+- réponse des logs système avec cursor (next_cursor / has_more au lieu de page / pages)
+- fenêtre des logs arrondie à la minute : même requête, total en cache réutilisé
+"""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+from bson import ObjectId
+
+from core.exceptions import ValidationError
+from utils.pagination import encode_cursor, keyset_filter, paginate_keyset
+
+
+# ---------------------------------------------------------------------------
+# Stand-ins
+# ---------------------------------------------------------------------------
+
+def _matches(doc, filters):
+    for key, cond in filters.items():
+        if key == "$and":
+            if not all(_matches(doc, sub) for sub in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches(doc, sub) for sub in cond):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(cond, dict):
+            for op, arg in cond.items():
+                if op == "$lt" and not (value is not None and value < arg):
+                    return False
+                if op == "$gt" and not (value is not None and value > arg):
+                    return False
+                if op == "$gte" and not (value is not None and value >= arg):
+                    return False
+                if op == "$in" and value not in arg:
+                    return False
+        elif value != cond:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if any(v for k, v in projection.items() if k != "_id"):
+        keep = [k for k, v in projection.items() if v]
+        out = {k: doc[k] for k in keep if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+        return out
+    return {k: v for k, v in doc.items() if projection.get(k, 1)}
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, spec):
+        for field, direction in reversed(spec):
+            self.docs.sort(key=lambda d: d.get(field), reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, n):
+        return [dict(d) for d in self.docs]
+
+
+class FakeCollection:
+    def __init__(self, docs, name="things"):
+        self.docs = docs
+        self.name = name
+        self.finds = []
+        self.counts = 0
+
+    def find(self, filters, projection):
+        self.finds.append((filters, projection))
+        return _Cursor([_project(d, projection) for d in self.docs if _matches(d, filters)])
+
+    async def count_documents(self, filters):
+        self.counts += 1
+        return sum(1 for d in self.docs if _matches(d, filters))
+
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+
+class FakeCache:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ttl=300):
+        self.data[key] = value
+        return True
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    fake = FakeCache()
+    monkeypatch.setattr("core.cache.get_cache_service", AsyncMock(return_value=fake))
+    return fake
+
+
+def _kpis(n, seller="s1"):
+    # plusieurs saisies par date : le tie-breaker id départage
+    return [
+        {"id": f"k{i:03d}", "seller_id": seller, "date": f"2025-01-{1 + i // 3:02d}", "ca": i}
+        for i in range(n)
+    ]
+
+
+async def _walk(collection, query, size, sort=(("date", -1),), **kwargs):
+    pages, cursor = [], ""
+    while cursor is not None:
+        page = await paginate_keyset(collection, query, sort=list(sort), size=size, cursor=cursor, **kwargs)
+        pages.append(page)
+        cursor = page.next_cursor
+    return pages
+
+
+# ---------------------------------------------------------------------------
+# Moteur
+# ---------------------------------------------------------------------------
+
+class TestKeysetEngine:
+
+    @pytest.mark.anyio
+    async def test_walks_every_item_once_in_order(self):
+        docs = _kpis(25) + _kpis(5, seller="other")
+        coll = FakeCollection(docs)
+
+        pages = await _walk(coll, {"seller_id": "s1"}, size=4)
+
+        ids = [item["id"] for page in pages for item in page.items]
+        expected = [d["id"] for d in sorted(docs[:25], key=lambda d: (d["date"], d["id"]), reverse=True)]
+        assert ids == expected
+        assert len(pages) == 7 and not pages[-1].has_more and pages[0].has_more
+        assert pages[0].total is None
+        assert all("$skip" not in str(f) for f, _ in coll.finds)
+
+    def test_keyset_filter_shape(self):
+        sort = [("date", -1), ("id", -1)]
+        assert keyset_filter(sort, ["2025-01-05", "k9"]) == {"$or": [
+            {"date": {"$lt": "2025-01-05"}},
+            {"date": "2025-01-05", "id": {"$lt": "k9"}},
+        ]}
+
+    @pytest.mark.anyio
+    async def test_tampered_or_foreign_cursor_is_rejected(self):
+        coll = FakeCollection(_kpis(10))
+        page = await paginate_keyset(coll, {}, sort=[("date", -1)], size=3)
+
+        encoded, signature = page.next_cursor.split(".")
+        forged = encode_cursor(["2099-01-01", "zzz"], [("date", 1), ("id", 1)])
+        for bad in (f"{encoded}.AAAA{signature[4:]}", forged, "garbage"):
+            with pytest.raises(ValidationError):
+                await paginate_keyset(coll, {}, sort=[("date", -1)], size=3, cursor=bad)
+
+    @pytest.mark.anyio
+    async def test_object_id_tie_breaker_and_hidden_sort_fields(self):
+        start = datetime(2025, 3, 1, tzinfo=timezone.utc)
+        logs = [
+            {"_id": ObjectId(), "timestamp": (start + timedelta(minutes=i // 2)).isoformat(), "msg": i}
+            for i in range(9)
+        ]
+        coll = FakeCollection(logs)
+
+        pages = await _walk(coll, {}, size=2, sort=[("timestamp", -1)], projection={"_id": 0}, tie_breaker="_id")
+        items = [item for page in pages for item in page.items]
+
+        assert sorted(item["msg"] for item in items) == list(range(9))
+        assert all("_id" not in item for item in items)
+        assert coll.finds[0][1] == {}  # _id gardé pour le curseur
+
+    @pytest.mark.anyio
+    async def test_total_is_cached(self, cache):
+        coll = FakeCollection(_kpis(12))
+
+        first = await paginate_keyset(coll, {"seller_id": "s1"}, sort=[("date", -1)], size=5, with_total=True)
+        second = await paginate_keyset(
+            coll, {"seller_id": "s1"}, sort=[("date", -1)], size=5, cursor=first.next_cursor, with_total=True
+        )
+
+        assert (first.total, first.total_is_estimate) == (12, False)
+        assert (second.total, second.total_is_estimate) == (12, True)
+        assert coll.counts == 1
+
+    @pytest.mark.anyio
+    async def test_size_is_validated(self):
+        with pytest.raises(ValidationError):
+            await paginate_keyset(FakeCollection([]), {}, sort=[("date", -1)], size=0)
+
+
+# ---------------------------------------------------------------------------
+# Branchement
+# ---------------------------------------------------------------------------
+
+class FakeDB(dict):
+    def __getattr__(self, name):
+        return self[name]
+
+
+class TestOptIn:
+
+    @pytest.mark.anyio
+    async def test_system_logs_cursor_mode(self, cache):
+        from repositories.admin_repository import AdminRepository
+        from services.admin_service._stats_mixin import StatsMixin
+
+        now = datetime.now(timezone.utc)
+        logs = [
+            {"_id": ObjectId(), "timestamp": (now - timedelta(minutes=i)).isoformat(), "level": "info", "message": f"m{i}"}
+            for i in range(7)
+        ]
+        service = StatsMixin()
+        service.admin_repo = AdminRepository.__new__(AdminRepository)
+        service.admin_repo.db = FakeDB(system_logs=FakeCollection(logs, "system_logs"), logs=FakeCollection([], "logs"))
+
+        first = await service.get_system_logs(hours=1, size=5, cursor="")
+        second = await service.get_system_logs(hours=1, size=5, cursor=first["next_cursor"])
+
+        assert "page" not in first and first["has_more"] and first["total"] == 7
+        assert [log["message"] for log in first["items"] + second["items"]] == [f"m{i}" for i in range(7)]
+        assert second["next_cursor"] is None
+
+    @pytest.mark.anyio
+    async def test_logs_window_is_stable_within_a_minute(self, cache):
+        from services.admin_service._stats_mixin import _window_start
+
+        now = datetime(2026, 10, 17, 9, 30, 12, 345678, tzinfo=timezone.utc)
+        start = _window_start(now, 24)
+        assert start == datetime(2026, 10, 16, 9, 30, tzinfo=timezone.utc)
+        assert _window_start(now + timedelta(seconds=40), 24) == start
+
+        coll = FakeCollection(_kpis(12))
+        for second in (0, 40):
+            query = {"timestamp": {"$gte": _window_start(now + timedelta(seconds=second), 24).isoformat()}}
+            await paginate_keyset(coll, query, sort=[("date", -1)], size=5, with_total=True)
+        assert coll.counts == 1 and len(cache.data) == 1
+
+    @pytest.mark.anyio
+    async def test_seller_kpi_entries_cursor_mode(self):
+        from types import SimpleNamespace
+        from services.seller_service._kpi_mixin import KpiMixin
+
+        service = KpiMixin()
+        service.kpi_repo = SimpleNamespace(collection=FakeCollection(_kpis(6), "kpi_entries"))
+
+        page = await service.get_kpi_entries_paginated("s1", page=1, size=4, cursor="")
+        rest = await service.get_kpi_entries_paginated("s1", page=1, size=4, cursor=page.next_cursor)
+
+        assert [d["id"] for d in page.items] == ["k005", "k004", "k003", "k002"]
+        assert [d["id"] for d in rest.items] == ["k001", "k000"] and not rest.has_more
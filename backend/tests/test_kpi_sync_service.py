@@ -0,0 +1,151 @@
+"""
+Tests unitaires — KPISyncService (POST /integrations/kpi/sync).
+
+Couvre :
+- normalisation (date / store_id racine vs entrée, dédoublonnage seller_id+date)
+- nombre de requêtes constant par lot (pas de N+1)
+- InsertOne pour les clés absentes, UpdateOne pour les clés existantes
+- compteurs created / updated lus dans le résultat du bulk_write
+- découpage en lots et rapport de timings
+- lot en échec : les suivants sont écrits, compteurs partiels et store_ids renvoyés
+"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from pymongo import InsertOne, UpdateOne
+
+
+def _entry(seller_id, date=None, store_id=None, ca=100.0):
+    return SimpleNamespace(
+        seller_id=seller_id, date=date, store_id=store_id,
+        ca_journalier=ca, nb_ventes=2, nb_articles=3, prospects=None,
+    )
+
+
+def _make_service(existing=None):
+    from services.kpi_sync_service import KPISyncService
+
+    kpi_repo = MagicMock()
+    kpi_repo.find_existing_seller_dates = AsyncMock(return_value=set(existing or []))
+
+    async def _bulk_write(ops):
+        inserted = sum(1 for op in ops if isinstance(op, InsertOne))
+        return {"inserted": inserted, "updated": 0, "matched": len(ops) - inserted,
+                "deleted": 0, "upserted": 0}
+
+    kpi_repo.bulk_write = AsyncMock(side_effect=_bulk_write)
+    user_repo = MagicMock()
+    user_repo.find_by_ids = AsyncMock(return_value=[{"id": "s1", "role": "seller"}])
+    return KPISyncService(kpi_repo=kpi_repo, user_repo=user_repo), kpi_repo, user_repo
+
+
+class TestNormalizeEntries:
+
+    def test_root_defaults_applied(self):
+        from services.kpi_sync_service import KPISyncService
+        result = KPISyncService.normalize_entries([_entry("s1")], "2026-01-05", "store1")
+        item = result[("s1", "2026-01-05")]
+        assert item["store_id"] == "store1"
+        assert item["nb_prospects"] == 0
+        assert item["nb_clients"] == 2
+
+    def test_entry_level_overrides_root(self):
+        from services.kpi_sync_service import KPISyncService
+        result = KPISyncService.normalize_entries(
+            [_entry("s1", date="2026-01-06", store_id="store2")], "2026-01-05", "store1"
+        )
+        assert ("s1", "2026-01-06") in result
+        assert result[("s1", "2026-01-06")]["store_id"] == "store2"
+
+    def test_duplicates_last_wins(self):
+        from services.kpi_sync_service import KPISyncService
+        result = KPISyncService.normalize_entries(
+            [_entry("s1", ca=1.0), _entry("s1", ca=2.0)], "2026-01-05", "store1"
+        )
+        assert len(result) == 1
+        assert result[("s1", "2026-01-05")]["ca_journalier"] == 2.0
+
+    def test_missing_date_raises(self):
+        from services.kpi_sync_service import KPISyncService
+        from core.exceptions import BusinessLogicError
+        with pytest.raises(BusinessLogicError):
+            KPISyncService.normalize_entries([_entry("s1")], None, "store1")
+
+    def test_entry_without_seller_is_skipped(self):
+        from services.kpi_sync_service import KPISyncService
+        result = KPISyncService.normalize_entries([_entry(None)], "2026-01-05", "store1")
+        assert result == {}
+
+
+class TestSyncEntries:
+
+    @pytest.mark.anyio
+    async def test_query_count_is_constant_per_chunk(self):
+        """1 120 entrées en un lot = 1 lookup vendeurs + 1 lookup existants + 1 bulk_write."""
+        service, kpi_repo, user_repo = _make_service()
+        entries = [_entry(f"s{i % 40}", date=f"2026-01-{(i // 40) % 28 + 1:02d}") for i in range(1120)]
+        await service.sync_entries(entries, None, "store1", chunk_size=5000)
+        assert user_repo.find_by_ids.await_count == 1
+        assert kpi_repo.find_existing_seller_dates.await_count == 1
+        assert kpi_repo.bulk_write.await_count == 1
+
+    @pytest.mark.anyio
+    async def test_existing_keys_become_updates(self):
+        service, kpi_repo, _ = _make_service(existing={("s1", "2026-01-05")})
+        result = await service.sync_entries(
+            [_entry("s1"), _entry("s2")], "2026-01-05", "store1"
+        )
+        ops = kpi_repo.bulk_write.call_args[0][0]
+        assert isinstance(ops[0], UpdateOne)
+        assert ops[0]._filter == {"seller_id": "s1", "date": "2026-01-05"}
+        assert isinstance(ops[1], InsertOne)
+        assert ops[1]._doc["seller_id"] == "s2"
+        assert result["entries_created"] == 1
+        assert result["entries_updated"] == 1
+        assert result["total"] == 2
+
+    @pytest.mark.anyio
+    async def test_chunks_are_bounded_and_reported(self):
+        service, kpi_repo, _ = _make_service()
+        entries = [_entry(f"s{i}") for i in range(25)]
+        result = await service.sync_entries(entries, "2026-01-05", "store1", chunk_size=10)
+        assert kpi_repo.bulk_write.await_count == 3
+        assert [c["entries"] for c in result["chunks"]] == [10, 10, 5]
+        assert all("duration_ms" in c for c in result["chunks"])
+        assert result["store_ids"] == ["store1"]
+
+    @pytest.mark.anyio
+    async def test_empty_payload_writes_nothing(self):
+        service, kpi_repo, _ = _make_service()
+        result = await service.sync_entries([], "2026-01-05", "store1")
+        kpi_repo.bulk_write.assert_not_awaited()
+        assert result["chunks"] == []
+        assert result["total"] == 0
+
+    @pytest.mark.anyio
+    async def test_seller_lookup_failure_does_not_block_sync(self):
+        service, kpi_repo, user_repo = _make_service()
+        user_repo.find_by_ids = AsyncMock(side_effect=RuntimeError("boom"))
+        result = await service.sync_entries([_entry("s1")], "2026-01-05", "store1")
+        assert result["entries_created"] == 1
+
+    @pytest.mark.anyio
+    async def test_failed_chunk_does_not_stop_the_others(self):
+        service, kpi_repo, _ = _make_service()
+        write = kpi_repo.bulk_write.side_effect
+
+        async def _bulk_write(ops):
+            if kpi_repo.bulk_write.await_count == 2:
+                raise RuntimeError("write concern timeout")
+            return await write(ops)
+
+        kpi_repo.bulk_write = AsyncMock(side_effect=_bulk_write)
+        entries = [_entry(f"s{i}", store_id="store2" if i >= 10 else None) for i in range(25)]
+        result = await service.sync_entries(entries, "2026-01-05", "store1", chunk_size=10)
+
+        assert kpi_repo.bulk_write.await_count == 3
+        assert (result["entries_created"], result["entries_failed"], result["total"]) == (15, 10, 15)
+        assert result["chunks"][1]["error"] == "write concern timeout"
+        assert "error" not in result["chunks"][2]
+        assert result["store_ids"] == ["store1", "store2"]
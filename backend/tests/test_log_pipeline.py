@@ -0,0 +1,195 @@
+"""
+Tests unitaires — pipeline de logs non bloquant (core/logging.py, middleware/log_sanitizer.py,
+middleware/logging.py).
+
+Sortie sur un StringIO ; le root logger est restauré après chaque test.
+
+Couvre :
+- sanitize_string : même résultat que les cinq re.sub d'origine, en une passe
+- sanitize_dict : classification des clés mise en cache, structures imbriquées
+- pipeline : request_id capturé et message fusionné côté appelant (args mutés ensuite sans effet),
+  nettoyage + formatage sur le thread d'écriture,
+  JSON pour get_logger(), texte pour les autres
+- file pleine : enregistrement abandonné et compté, jamais bloquant
+- échantillonnage des logs d'accès : préfixe le plus long, erreurs / requêtes lentes toujours gardées
+- LoggingMiddleware : route échantillonnée à 0 non journalisée, erreur journalisée
+"""
+import io
+import json
+import logging
+import queue
+import re
+import threading
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+import core.logging as core_logging
+import middleware.log_sanitizer as log_sanitizer
+from core.logging import NonBlockingQueueHandler, get_logger, request_id_var, setup_logging, shutdown_logging
+from middleware.log_sanitizer import is_sensitive_key, sanitize_dict, sanitize_string
+from middleware.logging import AccessLogSampler, LoggingMiddleware
+
+_LEGACY_PATTERNS = [
+    (r'Bearer\s+[\w\-\.]+', 'Bearer [REDACTED]'),
+    (r'password["\']?\s*[:=]\s*["\']?[^"\']+', 'password: [REDACTED]'),
+    (r'token["\']?\s*[:=]\s*["\']?[^"\']+', 'token: [REDACTED]'),
+    (r'api[_-]?key["\']?\s*[:=]\s*["\']?[^"\']+', 'api_key: [REDACTED]'),
+    (r'secret["\']?\s*[:=]\s*["\']?[^"\']+', 'secret: [REDACTED]'),
+]
+
+
+def _legacy_sanitize(text):
+    for pattern, replacement in _LEGACY_PATTERNS:
+        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    return text
+
+
+@pytest.fixture
+def pipeline():
+    """Pipeline installé sur un StringIO ; root logger et loggers restaurés ensuite."""
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    stream = io.StringIO()
+    yield stream
+    shutdown_logging()
+    core_logging._output = None
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in saved_handlers:
+        root.addHandler(handler)
+    root.setLevel(saved_level)
+
+
+# ---------------------------------------------------------------------------
+# Sanitizer
+# ---------------------------------------------------------------------------
+
+class TestSanitizer:
+
+    @pytest.mark.parametrize("text", [
+        "Authorization: Bearer eyJhbGciOi.J9-x ok",
+        '{"password": "hunter2", "email": "a@b.c"}',
+        "login failed password=hunter2",
+        "API-KEY: abc123 and Secret='s3'",
+        "refresh token: xyz then Bearer abc",
+        "{'access_token': 'abc', 'items': [{'api_key': 'k', 'qty': 2}]}",
+        "Stripe webhook evt_1 processed: customer.subscription.updated -> success",
+        "",
+    ])
+    def test_single_pass_matches_legacy_patterns(self, text):
+        assert sanitize_string(text) == _legacy_sanitize(text)
+
+    def test_sanitize_dict_and_key_cache(self):
+        is_sensitive_key.cache_clear()
+        data = {"user": {"refresh_token": "a", "name": "b"}, "Session_Id": 1, "items": [{"X-API-Key": "k", "qty": 2}]}
+        for _ in range(3):
+            assert sanitize_dict(data) == {
+                "user": {"refresh_token": "[REDACTED]", "name": "b"},
+                "Session_Id": "[REDACTED]",
+                "items": [{"X-API-Key": "[REDACTED]", "qty": 2}],
+            }
+        info = is_sensitive_key.cache_info()
+        assert info.misses == 7 and info.hits == 14  # une classification par clé distincte
+
+
+# ---------------------------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------------------------
+
+class TestPipeline:
+
+    def test_records_are_sanitized_and_formatted_on_the_writer_thread(self, pipeline, monkeypatch):
+        threads = set()
+        original = log_sanitizer.sanitize_record
+
+        def spy(record):
+            threads.add(threading.current_thread().name)
+            original(record)
+
+        monkeypatch.setattr(core_logging, "sanitize_record", spy)
+        monkeypatch.setattr(log_sanitizer, "sanitize_record", spy)
+        setup_logging(stream=pipeline)
+
+        token = request_id_var.set("req-42")
+        try:
+            get_logger("tests.pipeline.json").info(
+                "Login for %s", {"email": "a@b.c", "password": "x"}, extra={"endpoint": "/api/auth/login"})
+            logging.getLogger("tests.pipeline.text").warning("Stripe call with Bearer sk_live_123")
+        finally:
+            request_id_var.reset(token)
+        shutdown_logging()
+
+        json_line, text_line = pipeline.getvalue().splitlines()
+        entry = json.loads(json_line)
+        assert entry["request_id"] == "req-42" and entry["endpoint"] == "/api/auth/login"
+        assert "[REDACTED]" in entry["message"] and "'x'" not in entry["message"]
+        assert text_line.endswith("tests.pipeline.text - WARNING - Stripe call with Bearer [REDACTED]")
+        assert threads and threading.main_thread().name not in threads
+
+    def test_message_is_merged_on_the_caller_side(self):
+        handler = NonBlockingQueueHandler(queue.Queue())
+        state = {"step": 1, "Session_Id": "s-1"}
+        record = logging.LogRecord("x", logging.INFO, __file__, 1, "state %s", (state,), None)
+        handler.handle(record)
+        state["step"] = 2  # l'appelant continue de muter son objet
+
+        queued = handler.queue.get_nowait()
+        assert queued.args is None
+        assert queued.getMessage() == "state {'step': 1, 'Session_Id': '[REDACTED]'}"
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        for i in range(3):
+            handler.handle(logging.LogRecord("x", logging.INFO, __file__, 1, "msg %d", (i,), None))
+        assert handler.dropped == 2 and handler.queue.qsize() == 1
+
+    def test_synchronous_mode_and_late_records(self, pipeline):
+        setup_logging(async_logging=False, stream=pipeline)
+        assert core_logging.pipeline_stats() == {"async": False, "queued": 0, "dropped": 0}
+        logging.getLogger("tests.pipeline.sync").info("token=abc")
+        assert pipeline.getvalue().rstrip().endswith("token: [REDACTED]")
+
+
+# ---------------------------------------------------------------------------
+# Logs d'accès
+# ---------------------------------------------------------------------------
+
+class TestAccessLogs:
+
+    def test_sampler(self, monkeypatch):
+        sampler = AccessLogSampler({"/api": 0.5, "/api/health": 0.0}, default_rate=1.0, slow_ms=1000)
+        monkeypatch.setattr("middleware.logging.random.random", lambda: 0.4)
+
+        assert sampler.sample("/api/health", 200, 5) is None
+        assert sampler.sample("/api/kpi/s1", 200, 5) == 0.5
+        assert sampler.sample("/docs", 200, 5) == 1.0
+        assert sampler.sample("/api/health", 503, 5) == 1.0
+        assert sampler.sample("/api/health", 200, 1500) == 1.0
+        monkeypatch.setattr("middleware.logging.random.random", lambda: 0.6)
+        assert sampler.sample("/api/kpi/s1", 200, 5) is None
+
+    @pytest.mark.anyio
+    async def test_middleware(self, monkeypatch, caplog):
+        monkeypatch.setattr("middleware.logging._sampler", AccessLogSampler({"/health": 0.0}))
+        app = FastAPI()
+        app.add_middleware(LoggingMiddleware)
+
+        @app.get("/health")
+        async def health():
+            return {"status": "ok"}
+
+        @app.get("/api/fail")
+        async def fail():
+            raise RuntimeError("boom")
+
+        caplog.set_level(logging.INFO, logger="middleware.logging")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+                                     base_url="http://test") as client:
+            ok = await client.get("/health")
+            await client.get("/api/fail")
+
+        assert ok.headers["X-Request-ID"]
+        records = [r for r in caplog.records if r.name == "middleware.logging"]
+        assert [(r.getMessage(), r.endpoint) for r in records] == [("Request failed", "/api/fail")]
@@ -0,0 +1,342 @@
+"""
+Tests unitaires — notifications in-app : compteurs de non-lues en Redis,
+création en lot et push WebSocket (services/notification_service.py,
+JobsService.compute_objective_expiring_alerts, WsManager.publish_to_user).
+
+Mongo et Redis sont remplacés par des fakes en mémoire (le script Lua
+d'ajustement est rejoué en Python).
+
+Couvre :
+- polling : un seul count_documents, ensuite le compteur Redis
+- create / mark_read / mark_all_read mettent le compteur à jour et poussent l'événement
+- compteur absent non recréé par un incrément (reconstruit à la lecture)
+- create_many : un insert_many, un push par utilisateur
+- Redis indisponible : repli Mongo, l'écriture n'échoue pas
+- alertes d'objectifs : nombre de requêtes constant, pas de doublon
+- canal Redis notif:user:{id} pour les topics utilisateur
+"""
+import json
+from collections import Counter
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from repositories.notification_repository import NotificationRepository
+from services.notification_service import NotificationService, unread_key
+
+
+# ---------------------------------------------------------------------------
+# Stand-ins
+# ---------------------------------------------------------------------------
+
+def _get(doc, path):
+    for part in path.split("."):
+        doc = (doc or {}).get(part)
+    return doc
+
+
+def _matches(doc, filters):
+    for key, cond in filters.items():
+        value = _get(doc, key)
+        if isinstance(cond, dict):
+            for op, arg in cond.items():
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$gte" and (value is None or value < arg):
+                    return False
+        elif value != cond:
+            return False
+    return True
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, spec):
+        return self
+
+    def skip(self, n):
+        return self
+
+    def limit(self, n):
+        return self
+
+    async def to_list(self, n):
+        return [dict(d) for d in self.docs]
+
+    def __aiter__(self):
+        self._it = iter([dict(d) for d in self.docs])
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, name, queries):
+        self.name = name
+        self.docs = []
+        self.queries = queries
+
+    def find(self, filters, projection=None):
+        self.queries[self.name] += 1
+        return _Cursor([{k: v for k, v in d.items() if k != "_id"} for d in self.docs if _matches(d, filters)])
+
+    async def count_documents(self, filters, **kwargs):
+        self.queries[f"{self.name}.count"] += 1
+        return sum(1 for d in self.docs if _matches(d, filters))
+
+    async def insert_one(self, doc):
+        self.queries[f"{self.name}.insert"] += 1
+        doc["_id"] = len(self.docs)
+        self.docs.append(dict(doc))
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs, ordered=True):
+        self.queries[f"{self.name}.insert"] += 1
+        for doc in docs:
+            doc["_id"] = len(self.docs)
+            self.docs.append(dict(doc))
+
+    async def _update(self, filters, update, many):
+        modified = 0
+        for doc in self.docs:
+            if _matches(doc, filters):
+                doc.update(update.get("$set", {}))
+                modified += 1
+                if not many:
+                    break
+        return SimpleNamespace(modified_count=modified, upserted_id=None)
+
+    async def update_one(self, filters, update, upsert=False):
+        return await self._update(filters, update, many=False)
+
+    async def update_many(self, filters, update):
+        return await self._update(filters, update, many=True)
+
+
+class FakeDB(dict):
+    def __init__(self):
+        super().__init__()
+        self.queries = Counter()
+
+    def __missing__(self, name):
+        self[name] = FakeCollection(name, self.queries)
+        return self[name]
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+class FakeRedis:
+    def __init__(self, broken=False):
+        self.data = {}
+        self.broken = broken
+
+    def _check(self):
+        if self.broken:
+            raise ConnectionError("redis down")
+
+    async def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        self._check()
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value)
+        return True
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def _adjust(self, key, delta):
+        if key not in self.data:
+            return None
+        value = max(int(self.data[key]) + int(delta), 0)
+        self.data[key] = str(value)
+        return value
+
+    def pipeline(self, transaction=True):
+        redis, calls = self, []
+
+        class _Pipe:
+            def eval(self, script, numkeys, key, delta, ttl):
+                calls.append((key, delta))
+
+            async def execute(self):
+                redis._check()
+                return [redis._adjust(key, delta) for key, delta in calls]
+
+        return _Pipe()
+
+
+def _service(db, redis=None, pushed=None):
+    async def resolver():
+        return redis
+
+    async def publisher(user_id, event):
+        pushed.append((user_id, event))
+
+    return NotificationService(
+        achievement_notification_repo=None,
+        notification_repo=NotificationRepository(db),
+        redis_resolver=resolver,
+        publisher=publisher if pushed is not None else None,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Compteurs
+# ---------------------------------------------------------------------------
+
+class TestUnreadCounter:
+
+    @pytest.mark.anyio
+    async def test_polling_hits_redis_after_first_count(self):
+        db, redis, pushed = FakeDB(), FakeRedis(), []
+        service = _service(db, redis, pushed)
+        await service.create("u1", "kpi_saved", "KPI", "msg")  # compteur absent : pas recréé
+
+        assert unread_key("u1") not in redis.data
+        assert pushed[0][1]["unread_count"] is None
+        for _ in range(3):
+            assert await service.count_unread("u1") == 1
+        assert db.queries["notifications.count"] == 1
+
+        await service.create("u1", "kpi_saved", "KPI", "msg 2")
+        assert await service.count_unread("u1") == 2
+        assert pushed[-1][1]["type"] == "notifications_created" and pushed[-1][1]["unread_count"] == 2
+        assert db.queries["notifications.count"] == 1
+
+    @pytest.mark.anyio
+    async def test_read_and_read_all_update_counter(self):
+        db, redis, pushed = FakeDB(), FakeRedis(), []
+        service = _service(db, redis, pushed)
+        for i in range(3):
+            await service.create("u1", "kpi_saved", "KPI", f"m{i}")
+        await service.count_unread("u1")
+        notif_id = db["notifications"].docs[0]["id"]
+
+        assert await service.mark_read(notif_id, "u1") is True
+        assert await service.mark_read(notif_id, "u1") is False  # déjà lue : pas de double décrément
+        assert await service.count_unread("u1") == 2
+        assert pushed[-1][1] == {"type": "notifications_read", "ids": [notif_id], "unread_count": 2}
+
+        assert await service.mark_all_read("u1") == 2
+        assert await service.count_unread("u1") == 0
+        assert db.queries["notifications.count"] == 1
+
+    @pytest.mark.anyio
+    async def test_redis_down_falls_back_to_mongo(self):
+        db, pushed = FakeDB(), []
+        service = _service(db, FakeRedis(broken=True), pushed)
+
+        await service.create("u1", "kpi_saved", "KPI", "msg")
+
+        assert await service.count_unread("u1") == 1
+        assert len(pushed) == 1 and len(db["notifications"].docs) == 1
+
+
+# ---------------------------------------------------------------------------
+# Lots
+# ---------------------------------------------------------------------------
+
+class TestBulk:
+
+    @pytest.mark.anyio
+    async def test_create_many_single_insert_and_push_per_user(self):
+        db, redis, pushed = FakeDB(), FakeRedis(), []
+        service = _service(db, redis, pushed)
+        redis.data[unread_key("m1")] = "4"
+
+        created = await service.create_many([
+            {"user_id": "m1", "type": "t", "title": "a", "message": "x"},
+            {"user_id": "m1", "type": "t", "title": "b", "message": "y"},
+            {"user_id": "m2", "type": "t", "title": "c", "message": "z"},
+        ])
+
+        assert created == 3 and db.queries["notifications.insert"] == 1
+        assert len({d["id"] for d in db["notifications"].docs}) == 3
+        events = dict(pushed)
+        assert len(pushed) == 2 and events["m1"]["unread_count"] == 6
+        assert [n["title"] for n in events["m1"]["notifications"]] == ["a", "b"]
+        assert all("_id" not in n for n in events["m1"]["notifications"])
+
+    @pytest.mark.anyio
+    async def test_objective_expiring_alerts(self, monkeypatch):
+        from services.jobs_service import JobsService
+
+        db = FakeDB()
+        today = date.today()
+        for i in range(4):
+            db["users"].docs.append({"id": f"m{i}", "role": "manager"})
+            db["objectives"].docs.append({
+                "id": f"o{i}", "manager_id": f"m{i}", "status": "active", "title": f"Obj {i}",
+                "period_end": (today + timedelta(days=i % 2)).isoformat(),
+            })
+        db["users"].docs.append({"id": "x", "role": "seller"})
+        db["objectives"].docs.append({"id": "ox", "manager_id": "x", "status": "active", "period_end": today.isoformat()})
+        db["objectives"].docs.append({"id": "old", "manager_id": "m0", "status": "active", "period_end": "2020-01-01"})
+        db["notifications"].docs.append({
+            "user_id": "m3", "type": "objective_expiring", "data": {"objective_id": "o3"},
+            "created_at": f"{today.isoformat()}T08:00:00",
+        })
+
+        jobs = JobsService(db)
+        pushed = []
+        jobs.notification_service = _service(db, FakeRedis(), pushed)
+
+        assert await jobs.compute_objective_expiring_alerts() == 3
+        assert db.queries["notifications.insert"] == 1
+        assert db.queries["objectives"] == 1 and db.queries["users"] == 1 and db.queries["notifications"] == 1
+        titles = {e["notifications"][0]["user_id"]: e["notifications"][0]["title"] for _, e in pushed}
+        assert titles == {
+            "m0": "Objectif se termine aujourd'hui ⏰",
+            "m1": "Objectif se termine demain ⏰",
+            "m2": "Objectif se termine aujourd'hui ⏰",
+        }
+
+
+# ---------------------------------------------------------------------------
+# WebSocket
+# ---------------------------------------------------------------------------
+
+class RecordingRedis:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+class TestUserTopic:
+
+    @pytest.mark.anyio
+    async def test_publish_to_user_channel(self):
+        from core.ws_manager import WsManager, user_topic
+
+        manager = WsManager()
+        manager._redis_client = RecordingRedis()
+        await manager.publish_to_user("u1", {"type": "notifications_read", "ids": "all"})
+
+        channel, message = manager._redis_client.published[0]
+        assert channel == "notif:user:u1"
+        assert json.loads(message)["ids"] == "all"
+
+        delivered = []
+
+        async def broadcast(topic, msg):
+            delivered.append(topic)
+
+        manager._connections[user_topic("u1")] = {object()}
+        manager.broadcast_to_store = broadcast
+        await manager._handle_pubsub_message({"type": "message", "channel": b"notif:user:u1", "data": b"{}"})
+        assert delivered == ["user:u1"]
@@ -0,0 +1,221 @@
+"""
+Tests unitaires — progression des objectifs en batch
+(SellerService.calculate_objectives_progress_batch) et DailyPrefixSums.
+
+Dépôts en mémoire : le $group par date est rejoué en Python à partir du $match.
+Les résultats sont comparés à l'ancien algorithme (filtrage de toutes les
+entrées pour chaque objectif).
+
+Couvre :
+- totaux de plage : bornes incluses, plages vides ou hors données, flottants
+- mêmes progress_* / status que l'algorithme de référence (données aléatoires)
+- fallback sur les KPI manager quand les données vendeur manquent
+- 2 requêtes KPI quel que soit le nombre d'objectifs
+"""
+import random
+from collections import Counter
+from datetime import date, timedelta
+
+import pytest
+
+from utils.daily_prefix_sums import DailyPrefixSums
+from utils.kpi_pipeline import DAILY_TOTAL_FIELDS, build_daily_totals_pipeline
+
+
+START = date(2026, 1, 1)
+
+
+def _day(offset):
+    return (START + timedelta(days=offset)).isoformat()
+
+
+# ---------------------------------------------------------------------------
+# Stand-ins
+# ---------------------------------------------------------------------------
+
+def _matches(doc, filters):
+    for key, cond in filters.items():
+        value = doc.get(key)
+        if isinstance(cond, dict):
+            if "$in" in cond and value not in cond["$in"]:
+                return False
+            if "$gte" in cond and not value >= cond["$gte"]:
+                return False
+            if "$lte" in cond and not value <= cond["$lte"]:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+class FakeKpiRepo:
+    def __init__(self, entries, calls, name):
+        self.entries = entries
+        self.calls = calls
+        self.name = name
+
+    async def aggregate_daily_totals(self, query, date_range):
+        self.calls[self.name] += 1
+        pipeline = build_daily_totals_pipeline({**query, "date": date_range})
+        match = pipeline[0]["$match"]
+        daily = {}
+        for e in self.entries:
+            if _matches(e, match):
+                row = daily.setdefault(e["date"], {"date": e["date"], **{f: 0 for f in DAILY_TOTAL_FIELDS}})
+                for f in DAILY_TOTAL_FIELDS:
+                    row[f] += e.get(f) or 0
+        return [daily[d] for d in sorted(daily)]
+
+
+class FakeUserRepo:
+    def __init__(self, seller_ids):
+        self.seller_ids = seller_ids
+
+    async def find_ids_by_query(self, query):
+        for uid in self.seller_ids:
+            yield uid
+
+
+class FakeObjectiveRepo:
+    def __init__(self):
+        self.bulk_ops = []
+
+    async def bulk_write(self, ops):
+        self.bulk_ops.extend(ops)
+
+
+def _service(seller_entries, manager_entries, seller_ids=("s1", "s2")):
+    from services.seller_service._objectives_calculation_mixin import ObjectivesCalculationMixin
+
+    calls = Counter()
+    service = ObjectivesCalculationMixin()
+    service.user_repo = FakeUserRepo(list(seller_ids))
+    service.kpi_repo = FakeKpiRepo(seller_entries, calls, "kpi_entries")
+    service.manager_kpi_repo = FakeKpiRepo(manager_entries, calls, "manager_kpis")
+    service.objective_repo = FakeObjectiveRepo()
+    return service, calls
+
+
+def _reference_totals(objective, seller_entries, manager_entries):
+    """Ancien algorithme : filtrage complet des listes pour chaque objectif."""
+    start, end = objective["period_start"], objective["period_end"]
+    seller = [e for e in seller_entries if start <= e.get("date", "") <= end]
+    manager = [e for e in manager_entries if start <= e.get("date", "") <= end]
+    ca = sum(e.get("ca_journalier", 0) for e in seller)
+    ventes = sum(e.get("nb_ventes", 0) for e in seller)
+    articles = sum(e.get("nb_articles", 0) for e in seller)
+    if manager:
+        if ca == 0:
+            ca = sum(e.get("ca_journalier", 0) for e in manager if e.get("ca_journalier"))
+        if ventes == 0:
+            ventes = sum(e.get("nb_ventes", 0) for e in manager if e.get("nb_ventes"))
+        if articles == 0:
+            articles = sum(e.get("nb_articles", 0) for e in manager if e.get("nb_articles"))
+    return ca, ventes, articles
+
+
+# ---------------------------------------------------------------------------
+# DailyPrefixSums
+# ---------------------------------------------------------------------------
+
+class TestDailyPrefixSums:
+
+    def test_inclusive_bounds_and_empty_ranges(self):
+        sums = DailyPrefixSums.from_entries([
+            {"date": _day(0), "ca_journalier": 100, "nb_ventes": 2, "nb_articles": 3},
+            {"date": _day(0), "ca_journalier": 50, "nb_ventes": 1, "nb_articles": 1},
+            {"date": _day(2), "ca_journalier": 10, "nb_ventes": None},
+            {"date": _day(5), "ca_journalier": 1, "nb_ventes": 1, "nb_articles": 1},
+        ])
+        assert len(sums) == 3
+        assert sums.range_totals(_day(0), _day(2)) == {"ca_journalier": 160, "nb_ventes": 3, "nb_articles": 4}
+        assert sums.range_totals(_day(2), _day(2))["ca_journalier"] == 10
+        assert sums.range_totals(_day(3), _day(4)) == {"ca_journalier": 0, "nb_ventes": 0, "nb_articles": 0}
+        assert sums.range_totals(_day(9), _day(1)) == {"ca_journalier": 0, "nb_ventes": 0, "nb_articles": 0}
+        assert sums.range_totals("2025-01-01", "2027-01-01")["ca_journalier"] == 161
+
+    def test_float_prefix_differences_are_clean(self):
+        sums = DailyPrefixSums.from_entries(
+            [{"date": _day(i), "ca_journalier": 0.1} for i in range(30)]
+        )
+        assert sums.range_totals(_day(10), _day(12))["ca_journalier"] == 0.3
+
+    def test_daily_totals_pipeline_groups_by_date(self):
+        pipeline = build_daily_totals_pipeline({"store_id": "st1"})
+        assert pipeline[0] == {"$match": {"store_id": "st1"}}
+        assert pipeline[1]["$group"]["_id"] == "$date"
+        assert set(pipeline[1]["$group"]) == {"_id", *DAILY_TOTAL_FIELDS}
+
+
+# ---------------------------------------------------------------------------
+# Batch progress
+# ---------------------------------------------------------------------------
+
+def _random_dataset(seed, n_objectives=60, days=365):
+    rng = random.Random(seed)
+    seller_entries = []
+    for offset in range(days):
+        for seller in ("s1", "s2"):
+            if rng.random() < 0.7:
+                seller_entries.append({
+                    "seller_id": seller, "store_id": "st1", "date": _day(offset),
+                    "ca_journalier": round(rng.uniform(0, 900), 2),
+                    "nb_ventes": rng.randint(0, 12), "nb_articles": rng.randint(0, 25),
+                })
+    # Jours sans saisie vendeur couverts par le manager
+    manager_entries = [
+        {"manager_id": "m1", "store_id": "st1", "date": _day(offset),
+         "ca_journalier": 1000.0, "nb_ventes": 10, "nb_articles": 15}
+        for offset in range(days, days + 30)
+    ]
+    objectives = []
+    for i in range(n_objectives):
+        a = rng.randint(0, days + 25)
+        b = min(a + rng.randint(0, 120), days + 29)
+        objectives.append({
+            "id": f"obj{i}", "store_id": "st1",
+            "period_start": _day(a), "period_end": _day(b),
+            "objective_type": "kpi_standard",
+            "kpi_name": rng.choice(["ca", "ventes", "articles", "panier_moyen", "indice_vente"]),
+            "target_value": rng.uniform(100, 50_000),
+        })
+    return seller_entries, manager_entries, objectives
+
+
+class TestBatchProgress:
+
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    async def test_matches_reference_algorithm(self, seed):
+        seller_entries, manager_entries, objectives = _random_dataset(seed)
+        service, calls = _service(seller_entries, manager_entries)
+
+        await service.calculate_objectives_progress_batch(objectives, "m1", "st1")
+
+        for obj in objectives:
+            ca, ventes, articles = _reference_totals(obj, seller_entries, manager_entries)
+            assert obj["progress_ca"] == pytest.approx(ca)
+            assert obj["progress_ventes"] == ventes
+            assert obj["progress_articles"] == articles
+            assert obj["progress_panier_moyen"] == pytest.approx(ca / ventes if ventes else 0)
+        assert len(service.objective_repo.bulk_ops) == len(objectives)
+        assert calls == {"kpi_entries": 1, "manager_kpis": 1}
+
+    @pytest.mark.anyio
+    async def test_manager_fallback_and_manual_objectives(self):
+        manager_entries = [{"manager_id": "m1", "store_id": "st1", "date": _day(1),
+                            "ca_journalier": 500.0, "nb_ventes": 5, "nb_articles": 8}]
+        objectives = [
+            {"id": "auto", "period_start": _day(0), "period_end": _day(3),
+             "objective_type": "kpi_standard", "kpi_name": "ca", "target_value": 400},
+            {"id": "manual", "period_start": _day(0), "period_end": _day(3),
+             "data_entry_responsible": "seller", "current_value": 10, "target_value": 400},
+        ]
+        service, _ = _service([], manager_entries)
+
+        await service.calculate_objectives_progress_batch(objectives, "m1", "st1")
+
+        assert objectives[0]["progress_ca"] == 500.0
+        assert objectives[0]["status"] == "achieved"
+        assert "progress_ca" not in objectives[1]
+        assert len(service.objective_repo.bulk_ops) == 1
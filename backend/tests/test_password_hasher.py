@@ -0,0 +1,187 @@
+"""
+Tests unitaires — hachage des mots de passe hors boucle d'événements
+(core/password_hasher.py) et sa mise à jour au login (AuthService.login).
+
+Les tests tournent en mode thread (workers=0) avec un coût bcrypt bas ;
+un test exerce le vrai pool de processus.
+
+Couvre :
+- hash / verify, hash mal formé refusé sans exception
+- file bornée : au-delà de max_pending → ServiceUnavailableError (503)
+- hash_many : ordre conservé, découpage en chunks, au plus la moitié du pool
+- needs_rehash / rehash au login quand le coût a changé, ignoré si le pool est chargé
+- statistiques (compteurs, percentiles)
+"""
+import asyncio
+from unittest.mock import AsyncMock
+
+import bcrypt
+import pytest
+
+from core.exceptions import ServiceUnavailableError, UnauthorizedError
+from core.password_hasher import BATCH_CHUNK_SIZE, PasswordHasher, bcrypt_cost
+
+
+def _hasher(**kwargs):
+    kwargs.setdefault("rounds", 4)
+    kwargs.setdefault("workers", 0)
+    return PasswordHasher(**kwargs)
+
+
+# ---------------------------------------------------------------------------
+# Hash / verify
+# ---------------------------------------------------------------------------
+
+class TestHashVerify:
+
+    @pytest.mark.anyio
+    async def test_round_trip(self):
+        hasher = _hasher()
+        hashed = await hasher.hash("s3cret!")
+
+        assert bcrypt_cost(hashed) == 4
+        assert await hasher.verify("s3cret!", hashed)
+        assert not await hasher.verify("wrong", hashed)
+        assert not await hasher.verify("s3cret!", None)
+        hasher.shutdown()
+
+    @pytest.mark.anyio
+    async def test_malformed_hash_is_rejected(self):
+        hasher = _hasher()
+        assert not await hasher.verify("s3cret!", "not-a-bcrypt-hash")
+        hasher.shutdown()
+
+    @pytest.mark.anyio
+    async def test_saturated_queue_returns_503(self):
+        hasher = _hasher(max_pending=2)
+        hasher._pending = 2  # deux hachages déjà en attente
+
+        with pytest.raises(ServiceUnavailableError) as exc:
+            await hasher.hash("x")
+        assert exc.value.status_code == 503
+        assert hasher.stats()["rejected"] == 1
+        hasher.shutdown()
+
+    @pytest.mark.anyio
+    async def test_process_pool(self):
+        hasher = PasswordHasher(rounds=4, workers=1)
+        try:
+            hashed = await hasher.hash("s3cret!")
+            assert await hasher.verify("s3cret!", hashed)
+            assert hasher.stats()["pool"] == "process"
+        finally:
+            hasher.shutdown()
+
+
+# ---------------------------------------------------------------------------
+# Lot (imports)
+# ---------------------------------------------------------------------------
+
+class TestHashMany:
+
+    @pytest.mark.anyio
+    async def test_order_and_chunks(self):
+        hasher = _hasher(workers=0)
+        passwords = [f"pw-{i}" for i in range(BATCH_CHUNK_SIZE * 2 + 3)]
+        submitted = []
+        original = hasher._submit
+
+        async def spy(job, *args, **kwargs):
+            submitted.append(kwargs.get("items"))
+            return await original(job, *args, **kwargs)
+
+        hasher._submit = spy
+        hashes = await hasher.hash_many(passwords)
+
+        assert submitted == [BATCH_CHUNK_SIZE, BATCH_CHUNK_SIZE, 3]
+        assert all(bcrypt.checkpw(p.encode(), h.encode()) for p, h in zip(passwords, hashes))
+        assert hasher.stats()["hashed"] == len(passwords)
+        hasher.shutdown()
+
+    @pytest.mark.anyio
+    async def test_uses_at_most_half_of_the_pool(self):
+        hasher = _hasher(workers=4)
+        in_flight, peak = 0, 0
+
+        async def slow_submit(job, chunk, rounds, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return [f"h-{p}" for p in chunk]
+
+        hasher._submit = slow_submit
+        hashes = await hasher.hash_many([str(i) for i in range(BATCH_CHUNK_SIZE * 6)])
+
+        assert peak == 2
+        assert hashes[0] == "h-0" and hashes[-1] == f"h-{BATCH_CHUNK_SIZE * 6 - 1}"
+
+
+# ---------------------------------------------------------------------------
+# Rehash au login
+# ---------------------------------------------------------------------------
+
+class TestRehashOnLogin:
+
+    def test_needs_rehash(self):
+        hasher = _hasher(rounds=5)
+        old = bcrypt.hashpw(b"pw", bcrypt.gensalt(rounds=4)).decode()
+        assert hasher.needs_rehash(old)
+        assert not hasher.needs_rehash(old.replace("$04$", "$05$"))
+        assert not hasher.needs_rehash("garbage")
+
+    @pytest.mark.anyio
+    async def test_skipped_when_pool_is_busy(self):
+        hasher = _hasher(rounds=5, max_pending=4)
+        old = bcrypt.hashpw(b"pw", bcrypt.gensalt(rounds=4)).decode()
+        hasher._pending = 2
+
+        assert await hasher.rehash_if_needed("pw", old) is None
+        hasher._pending = 0
+        assert bcrypt_cost(await hasher.rehash_if_needed("pw", old)) == 5
+        hasher.shutdown()
+
+    @pytest.mark.anyio
+    async def test_login_upgrades_hash(self, monkeypatch):
+        import services.auth_service as auth_module
+        from services.auth_service import AuthService
+
+        hasher = _hasher(rounds=5)
+        monkeypatch.setattr(auth_module, "get_password_hasher", lambda: hasher)
+        monkeypatch.setattr(auth_module, "create_token", lambda *args: "token")
+        user = {
+            "id": "u1", "email": "a@b.fr", "role": "gerant", "name": "A",
+            "password": bcrypt.hashpw(b"pw", bcrypt.gensalt(rounds=4)).decode(),
+        }
+        user_repo = AsyncMock()
+        user_repo.find_one.return_value = dict(user)
+        service = AuthService(user_repo, AsyncMock(), AsyncMock(), AsyncMock(), AsyncMock())
+
+        result = await service.login("a@b.fr", "pw")
+
+        assert result["token"] == "token" and "password" not in result["user"]
+        update = user_repo.update_one.await_args.args
+        assert update[0] == {"id": "u1"}
+        assert bcrypt_cost(update[1]["$set"]["password"]) == 5
+        assert hasher.stats()["rehashed"] == 1
+
+        user_repo.find_one.return_value = dict(user)
+        with pytest.raises(UnauthorizedError):
+            await service.login("a@b.fr", "wrong")
+        hasher.shutdown()
+
+
+class TestStats:
+
+    @pytest.mark.anyio
+    async def test_counters_and_percentiles(self):
+        hasher = _hasher()
+        hashed = await hasher.hash("pw")
+        await hasher.verify("pw", hashed)
+
+        stats = hasher.stats()
+        assert stats["hashed"] == 1 and stats["verified"] == 1 and stats["pending"] == 0
+        assert stats["pool"] == "thread"
+        assert stats["hash_ms"]["p50"] is not None and stats["queue_wait_ms"]["p95"] is not None
+        hasher.shutdown()
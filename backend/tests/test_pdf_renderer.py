@@ -0,0 +1,155 @@
+"""
+Tests unitaires — service de rendu PDF (core/pdf_renderer.py).
+
+Fonctions de rendu factices exécutées dans un ThreadPoolExecutor injecté
+(rendu lent simulé), plus un aller-retour réel markdown → PDF dans le pool de processus.
+
+Couvre :
+- cache mémoire puis disque (partagé entre instances), clé = contenu + template
+- single-flight : N requêtes concurrentes → 1 rendu
+- la boucle d'événements reste libre pendant un rendu
+- erreurs de rendu : PdfRenderError, rien de mis en cache
+- ETag / If-None-Match
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.pdf_renderer import (
+    PdfRenderError,
+    PdfRenderer,
+    etag_matches,
+    format_etag,
+)
+
+_calls = []
+_lock = threading.Lock()
+
+
+def fake_render(source, delay=0.0):
+    with _lock:
+        _calls.append(source)
+    if delay:
+        time.sleep(delay)
+    return b"%PDF-fake " + source.encode()
+
+
+def failing_render(source):
+    raise ValueError("broken document")
+
+
+@pytest.fixture
+def executor():
+    _calls.clear()
+    pool = ThreadPoolExecutor(max_workers=4)
+    yield pool
+    pool.shutdown(wait=True)
+
+
+class TestCache:
+
+    @pytest.mark.anyio
+    async def test_second_render_served_from_memory(self, executor):
+        renderer = PdfRenderer(executor=executor)
+        first = await renderer.render("k1", fake_render, "doc")
+        second = await renderer.render("k1", fake_render, "doc")
+
+        assert first.source == "render" and second.source == "memory"
+        assert second.content == b"%PDF-fake doc"
+        assert _calls == ["doc"]
+        assert renderer.stats()["memory_hits"] == 1
+
+    @pytest.mark.anyio
+    async def test_disk_cache_shared_between_instances(self, executor, tmp_path):
+        await PdfRenderer(cache_dir=str(tmp_path), executor=executor).render("k1", fake_render, "doc")
+        other = PdfRenderer(cache_dir=str(tmp_path), executor=executor)
+        result = await other.render("k1", fake_render, "doc")
+
+        assert result.source == "disk"
+        assert _calls == ["doc"]
+        assert list(tmp_path.glob("*.tmp")) == []
+
+    @pytest.mark.anyio
+    async def test_memory_cache_is_bounded(self, executor):
+        renderer = PdfRenderer(executor=executor, memory_max_bytes=40)
+        for key in ("a", "b", "c"):
+            await renderer.render(key, fake_render, key * 10)
+        stats = renderer.stats()
+        assert stats["memory_bytes"] <= 40
+        assert stats["memory_entries"] == 2
+        # LRU : la plus ancienne entrée ("a") a été évincée
+        assert (await renderer.render("a", fake_render, "a" * 10)).source == "render"
+
+    def test_key_depends_on_source_title_and_template(self):
+        base = PdfRenderer.markdown_key("# Doc", "Titre")
+        assert PdfRenderer.markdown_key("# Doc", "Titre") == base
+        assert PdfRenderer.markdown_key("# Doc v2", "Titre") != base
+        assert PdfRenderer.markdown_key("# Doc", "Autre") != base
+        assert PdfRenderer.html_key("# Doc") != base
+
+
+class TestConcurrency:
+
+    @pytest.mark.anyio
+    async def test_concurrent_requests_render_once(self, executor):
+        renderer = PdfRenderer(executor=executor)
+        results = await asyncio.gather(*[
+            renderer.render("k1", fake_render, "doc", 0.1) for _ in range(10)
+        ])
+        assert _calls == ["doc"]
+        assert {r.content for r in results} == {b"%PDF-fake doc"}
+        assert renderer.stats()["inflight"] == 0
+
+    @pytest.mark.anyio
+    async def test_event_loop_stays_responsive(self, executor):
+        renderer = PdfRenderer(executor=executor)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await renderer.render("slow", fake_render, "doc", 0.3)
+        task.cancel()
+        assert ticks >= 10
+
+    @pytest.mark.anyio
+    async def test_render_error_is_not_cached(self, executor):
+        renderer = PdfRenderer(executor=executor)
+        with pytest.raises(PdfRenderError):
+            await renderer.render("bad", failing_render, "doc")
+        assert renderer.stats()["render_errors"] == 1
+        assert renderer.stats()["memory_entries"] == 0
+        assert renderer.stats()["inflight"] == 0
+
+
+class TestProcessPool:
+
+    @pytest.mark.anyio
+    async def test_markdown_rendered_in_process_pool(self, tmp_path):
+        pytest.importorskip("xhtml2pdf")
+        renderer = PdfRenderer(cache_dir=str(tmp_path), max_workers=1)
+        try:
+            pdf = await renderer.render_markdown("# Notice\n\n| a | b |\n|---|---|\n| 1 | 2 |", "Notice")
+        finally:
+            renderer.shutdown()
+        assert pdf.content.startswith(b"%PDF")
+        assert (tmp_path / f"{pdf.key}.pdf").read_bytes() == pdf.content
+
+
+class TestEtag:
+
+    def test_if_none_match(self):
+        etag = format_etag("a" * 64)
+        assert etag == '"' + "a" * 32 + '"'
+        assert etag_matches(etag, etag)
+        assert etag_matches(f'"other", W/{etag}', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches('"other"', etag)
+        assert not etag_matches(None, etag)
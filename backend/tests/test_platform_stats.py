@@ -0,0 +1,284 @@
+"""
+Tests unitaires — stats plateforme super-admin (AdminService.get_platform_stats)
+et SnapshotCache (core/snapshot_cache.py).
+
+Collections en mémoire qui comptent les allers-retours Mongo ; les $facet sont
+rejoués en Python ($project, $match, $count, $group).
+
+Couvre :
+- mêmes chiffres que les count_documents d'origine, en 4 requêtes concurrentes
+- snapshot frais : aucun accès base ; périmé : servi + 1 recalcul en arrière-plan
+- recalcul unique pour des appels concurrents, erreur → snapshot périmé conservé
+- adoption d'un snapshot plus récent calculé par un autre worker (Redis)
+"""
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from core.snapshot_cache import SnapshotCache
+
+
+# ---------------------------------------------------------------------------
+# Stand-ins
+# ---------------------------------------------------------------------------
+
+def _matches(doc, filters):
+    for key, cond in filters.items():
+        value = doc.get(key)
+        if isinstance(cond, dict):
+            arg = cond["$gte"]
+            # Comparaison BSON : types différents → pas de correspondance
+            if value is None or type(value) is not type(arg) or not value >= arg:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+def _run_stages(docs, stages):
+    for stage in stages:
+        if "$project" in stage:
+            fields = [k for k, v in stage["$project"].items() if v and k != "_id"]
+            docs = [{k: d[k] for k in fields if k in d} for d in docs]
+        elif "$match" in stage:
+            docs = [d for d in docs if _matches(d, stage["$match"])]
+        elif "$count" in stage:
+            docs = [{stage["$count"]: len(docs)}] if docs else []
+        elif "$group" in stage:
+            field = stage["$group"]["_id"].lstrip("$")
+            counts = Counter(d.get(field) for d in docs)
+            docs = [{"_id": k, "n": v} for k, v in counts.items()]
+        elif "$facet" in stage:
+            docs = [{name: _run_stages(docs, sub) for name, sub in stage["$facet"].items()}]
+    return docs
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class FakeCollection:
+    def __init__(self, name, calls, docs=()):
+        self.name = name
+        self.calls = calls
+        self.docs = list(docs)
+
+    def aggregate(self, pipeline):
+        self.calls[self.name] += 1
+        return _Cursor(_run_stages(self.docs, pipeline))
+
+    async def count_documents(self, filters):
+        self.calls[self.name] += 1
+        return len([d for d in self.docs if _matches(d, filters)])
+
+    async def estimated_document_count(self):
+        self.calls[self.name] += 1
+        return len(self.docs)
+
+
+class FakeDB:
+    def __init__(self, users, workspaces, diagnostics=0, consultations=0):
+        self.calls = Counter()
+        self.users = FakeCollection("users", self.calls, users)
+        self.workspaces = FakeCollection("workspaces", self.calls, workspaces)
+        self.stores = FakeCollection("stores", self.calls)
+        self.diagnostics = FakeCollection("diagnostics", self.calls, [{}] * diagnostics)
+        self.relationship_consultations = FakeCollection(
+            "relationship_consultations", self.calls, [{}] * consultations
+        )
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+def _dataset():
+    now = datetime.now(timezone.utc)
+    recent, old = now - timedelta(days=2), now - timedelta(days=30)
+    users = [
+        {"role": "gerant", "status": "active", "created_at": recent},
+        {"role": "manager", "status": "active", "created_at": old},
+        {"role": "manager", "status": "suspended", "created_at": old},
+        {"role": "seller", "status": "active", "created_at": recent.isoformat()},
+        {"role": "seller", "status": "active", "created_at": old.isoformat()},
+        {"role": "seller", "status": "suspended", "created_at": recent},
+    ]
+    workspaces = (
+        [{"subscription_status": "active"}] * 3
+        + [{"subscription_status": "trialing"}] * 2
+        + [{"subscription_status": "canceled"}, {}]
+    )
+    return users, workspaces
+
+
+class FakeCache:
+    def __init__(self):
+        self.store = {}
+        self.enabled = True
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ttl=300):
+        self.store[key] = value
+        return True
+
+
+@pytest.fixture
+def shared_cache():
+    cache = FakeCache()
+    with patch("core.snapshot_cache.get_cache_service", AsyncMock(return_value=cache)):
+        yield cache
+
+
+@pytest.fixture
+def fresh_stats_cache():
+    from services.admin_service import _stats_mixin
+    _stats_mixin._platform_stats_cache.invalidate()
+    yield _stats_mixin._platform_stats_cache
+    _stats_mixin._platform_stats_cache.invalidate()
+
+
+def _service(db):
+    from repositories.admin_repository import AdminRepository
+    from services.admin_service._stats_mixin import StatsMixin
+
+    service = StatsMixin()
+    service.admin_repo = AdminRepository(db)
+    return service
+
+
+# ---------------------------------------------------------------------------
+# Platform stats
+# ---------------------------------------------------------------------------
+
+class TestPlatformStats:
+
+    @pytest.mark.anyio
+    async def test_counts_match_and_use_constant_round_trips(self, shared_cache, fresh_stats_cache):
+        users, workspaces = _dataset()
+        db = FakeDB(users, workspaces, diagnostics=4, consultations=7)
+
+        stats = await _service(db).get_platform_stats()
+
+        assert stats["workspaces"] == {"total": 7, "active": 3, "trial": 2}
+        assert stats["users"] == {"total_active": 4, "active_managers": 1, "active_sellers": 2, "inactive": 2}
+        assert stats["usage"]["diagnostics"] == 4
+        assert stats["usage"]["total_ai_operations"] == 7
+        assert stats["revenue"]["active_subscriptions"] == 3
+        assert stats["revenue"]["trial_subscriptions"] == 2
+        assert stats["activity"] == {"recent_signups_7d": 2, "recent_analyses_7d": 1}
+        assert stats["cache"]["stale"] is False
+        assert db.calls == {"users": 1, "workspaces": 1, "diagnostics": 1, "relationship_consultations": 1}
+
+    @pytest.mark.anyio
+    async def test_dashboard_polling_hits_snapshot(self, shared_cache, fresh_stats_cache):
+        users, workspaces = _dataset()
+        db = FakeDB(users, workspaces)
+        service = _service(db)
+
+        await asyncio.gather(*[service.get_platform_stats() for _ in range(20)])
+        for _ in range(20):
+            await service.get_platform_stats()
+
+        assert sum(db.calls.values()) == 4
+
+
+# ---------------------------------------------------------------------------
+# SnapshotCache
+# ---------------------------------------------------------------------------
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Loader:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("mongo down")
+        return {"version": self.calls}
+
+
+class TestSnapshotCache:
+
+    @pytest.mark.anyio
+    async def test_fresh_then_stale_while_revalidate(self, shared_cache):
+        clock, loader = Clock(), Loader()
+        cache = SnapshotCache("t", ttl_seconds=10, max_age_seconds=60, clock=clock)
+
+        assert (await cache.get(loader))[0] == {"version": 1}
+        clock.now += 5
+        assert (await cache.get(loader))[0] == {"version": 1}
+        assert loader.calls == 1
+
+        clock.now += 10  # périmé : ancienne valeur servie, recalcul lancé
+        value, meta = await cache.get(loader)
+        assert value == {"version": 1} and meta["stale"] is True
+        await asyncio.sleep(0)
+        assert loader.calls == 2
+        assert (await cache.get(loader))[0] == {"version": 2}
+
+    @pytest.mark.anyio
+    async def test_expired_snapshot_waits_for_single_refresh(self, shared_cache):
+        clock, loader = Clock(), Loader(delay=0.05)
+        cache = SnapshotCache("t", ttl_seconds=10, max_age_seconds=60, clock=clock)
+
+        results = await asyncio.gather(*[cache.get(loader) for _ in range(10)])
+        assert loader.calls == 1
+        assert all(value == {"version": 1} for value, _ in results)
+
+        clock.now += 120
+        assert (await cache.get(loader))[0] == {"version": 2}
+
+    @pytest.mark.anyio
+    async def test_refresh_error_keeps_stale_snapshot(self, shared_cache):
+        clock, loader = Clock(), Loader()
+        cache = SnapshotCache("t", ttl_seconds=10, max_age_seconds=60, clock=clock)
+        await cache.get(loader)
+
+        loader.fail = True
+        clock.now += 20
+        assert (await cache.get(loader))[0] == {"version": 1}
+        await asyncio.sleep(0)
+        assert cache.stats()["refresh_errors"] == 1
+        assert (await cache.get(loader))[0] == {"version": 1}
+
+    @pytest.mark.anyio
+    async def test_first_load_error_propagates(self, shared_cache):
+        loader = Loader()
+        loader.fail = True
+        cache = SnapshotCache("t", ttl_seconds=10, max_age_seconds=60, clock=Clock())
+        with pytest.raises(RuntimeError):
+            await cache.get(loader)
+
+    @pytest.mark.anyio
+    async def test_adopts_snapshot_from_other_worker(self, shared_cache):
+        clock = Clock()
+        worker_a = SnapshotCache("t", ttl_seconds=10, max_age_seconds=60, clock=clock)
+        worker_b = SnapshotCache("t", ttl_seconds=10, max_age_seconds=60, clock=clock)
+        loader_a, loader_b = Loader(), Loader()
+
+        await worker_a.get(loader_a)
+        value, _ = await worker_b.get(loader_b)
+
+        assert value == {"version": 1}
+        assert loader_b.calls == 0
+        assert worker_b.stats()["shared_hits"] == 1
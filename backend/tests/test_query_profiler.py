@@ -0,0 +1,251 @@
+"""
+Tests unitaires — profiler de formes de requêtes et conseiller d'index (core/query_profiler.py).
+
+Collection Motor factice (find / explain / bulk_write), horloge injectée ;
+le profiler est branché via BaseRepository.
+
+Couvre :
+- forme de requête : égalité / plage / autres, $and / $or, aucune valeur conservée
+- parse_explain : COLLSCAN, SORT bloquant, index utilisés, moteur SBE (queryPlan)
+- BaseRepository : enregistrement des appels, explain au premier passage puis après cooldown
+- flush : $inc par forme dans query_shapes, deltas remis à zéro
+- désactivé (défaut) : aucun enregistrement
+- rapport : classement, suggestion d'index absent d'INDEXES (challenges par période),
+  index déclaré mais non utilisé par le plan, index jamais utilisés ($indexStats ou plans)
+"""
+import asyncio
+
+import pytest
+
+import core.query_profiler as query_profiler_module
+from core.indexes import INDEXES
+from core.query_profiler import QueryProfiler, build_report, parse_explain, query_shape
+from repositories.base_repository import BaseRepository
+
+
+# ---------------------------------------------------------------------------
+# Stand-ins
+# ---------------------------------------------------------------------------
+
+def _explain(*stages, docs_examined=0, n_returned=0, index=None):
+    node = None
+    for stage in reversed(stages):
+        node = {"stage": stage, **({"inputStage": node} if node else {})}
+        if stage == "IXSCAN":
+            node["indexName"] = index
+    return {
+        "queryPlanner": {"winningPlan": node},
+        "executionStats": {"totalDocsExamined": docs_examined, "nReturned": n_returned, "totalKeysExamined": 0},
+    }
+
+
+class FakeCursor:
+    def __init__(self, collection, filters):
+        self.collection = collection
+        self.filters = filters
+
+    def sort(self, spec):
+        return self
+
+    def skip(self, n):
+        return self
+
+    def limit(self, n):
+        return self
+
+    async def to_list(self, n):
+        return [dict(d) for d in self.collection.docs]
+
+    async def explain(self):
+        self.collection.explained.append(self.filters)
+        return self.collection.plan
+
+
+class FakeCollection:
+    def __init__(self, name, docs=(), plan=None):
+        self.name = name
+        self.docs = list(docs)
+        self.plan = plan or _explain("COLLSCAN", docs_examined=1000, n_returned=2)
+        self.explained = []
+        self.bulk = []
+
+    def find(self, filters, projection=None):
+        return FakeCursor(self, filters)
+
+    async def find_one(self, filters, projection=None):
+        return dict(self.docs[0]) if self.docs else None
+
+    async def count_documents(self, filters, **kwargs):
+        return len(self.docs)
+
+    async def bulk_write(self, operations, ordered=True):
+        self.bulk.extend(operations)
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection(name)
+        return self[name]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def profiler(monkeypatch):
+    clock = Clock()
+    instance = QueryProfiler(enabled=True, explain_sample_rate=1.0, explain_cooldown_seconds=600, clock=clock)
+    monkeypatch.setattr(query_profiler_module, "_profiler", instance)
+    return instance, clock
+
+
+async def _drain():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+# ---------------------------------------------------------------------------
+# Formes et plans
+# ---------------------------------------------------------------------------
+
+class TestShapes:
+
+    def test_query_shape_groups_fields_and_drops_values(self):
+        shape = query_shape({
+            "store_id": "s1",
+            "status": {"$in": ["active", "draft"]},
+            "$and": [{"start_date": {"$lte": "2026-10-19"}}, {"end_date": {"$gte": "2026-10-19"}}],
+            "$or": [{"seller_id": "u1"}, {"visible": True}],
+            "tags": {"$elemMatch": {"a": 1}},
+        })
+        assert shape == {
+            "eq": ["status", "store_id"],
+            "range": ["end_date", "start_date"],
+            "other": ["$or(seller_id|visible)", "tags:$elemMatch"],
+        }
+        assert "s1" not in repr(shape) and "u1" not in repr(shape)
+
+    def test_parse_explain(self):
+        plan = parse_explain(_explain("SORT", "FETCH", "IXSCAN", index="store_status_idx", docs_examined=40, n_returned=4))
+        assert plan["stages"] == ["SORT", "FETCH", "IXSCAN"] and plan["indexes"] == ["store_status_idx"]
+        assert plan["in_memory_sort"] and not plan["collscan"]
+        assert (plan["docs_examined"], plan["n_returned"]) == (40, 4)
+
+        sbe = parse_explain({"queryPlanner": {"winningPlan": {"queryPlan": {"stage": "COLLSCAN"}}}})
+        assert sbe["collscan"] and sbe["docs_examined"] is None
+
+
+# ---------------------------------------------------------------------------
+# Enregistrement
+# ---------------------------------------------------------------------------
+
+class TestRecorder:
+
+    @pytest.mark.anyio
+    async def test_repository_calls_are_recorded_and_explained_once(self, profiler):
+        instance, clock = profiler
+        db = FakeDB()
+        db["challenges"] = FakeCollection("challenges", docs=[{"id": "c1"}, {"id": "c2"}])
+        repo = BaseRepository(db, "challenges")
+
+        for store in ("s1", "s2", "s3"):
+            await repo.find_many({"store_id": store, "start_date": {"$lte": "2026-10-19"}}, sort=[("created_at", -1)])
+        await _drain()
+        assert len(db["challenges"].explained) == 1  # premier passage, puis cooldown
+
+        clock.now += 601
+        await repo.find_many({"store_id": "s4", "start_date": {"$lte": "2026-10-20"}}, sort=[("created_at", -1)])
+        await repo.count({"store_id": "s4"})
+        await _drain()
+        assert len(db["challenges"].explained) == 3  # forme find re-échantillonnée + nouvelle forme count
+
+        assert await instance.flush(db) == 2
+        updates = {op._doc["$setOnInsert"]["op"]: op._doc for op in db["query_shapes"].bulk}
+        find = updates["find"]
+        assert find["$inc"]["count"] == 4 and find["$inc"]["returned"] == 8
+        assert find["$setOnInsert"]["shape"] == {"eq": ["store_id"], "range": ["start_date"], "other": []}
+        assert find["$setOnInsert"]["sort"] == [["created_at", -1]]
+        assert find["$set"]["explain"]["collscan"] is True
+        assert "s1" not in repr(db["query_shapes"].bulk)
+
+        db["query_shapes"].bulk.clear()
+        assert await instance.flush(db) == 0  # deltas remis à zéro
+        assert instance.stats()["recorded"] == 5 and instance.stats()["explains"] == 3
+
+    @pytest.mark.anyio
+    async def test_disabled_by_default(self, monkeypatch):
+        instance = QueryProfiler()
+        monkeypatch.setattr(query_profiler_module, "_profiler", instance)
+        db = FakeDB()
+        await BaseRepository(db, "users").find_one({"id": "u1"})
+        await _drain()
+        assert instance.stats()["recorded"] == 0 and not db["users"].explained
+
+
+# ---------------------------------------------------------------------------
+# Rapport
+# ---------------------------------------------------------------------------
+
+def _shape_doc(collection, eq, rng=(), sort=(), total_ms=100.0, count=10, explain=None):
+    return {
+        "_id": f"{collection}-{'-'.join(eq)}", "collection": collection, "op": "find",
+        "shape": {"eq": list(eq), "range": list(rng), "other": []}, "sort": [list(s) for s in sort],
+        "projection": [], "count": count, "total_ms": total_ms, "max_ms": 30.0, "returned": count * 2,
+        "explain": explain,
+    }
+
+
+class TestReport:
+
+    def test_suggests_missing_index_and_flags_unapplied_ones(self):
+        challenges = _shape_doc(
+            "challenges", ["store_id"], ["end_date", "start_date"], total_ms=900.0,
+            explain=parse_explain(_explain("FETCH", "IXSCAN", index="store_status_idx", docs_examined=500, n_returned=3)),
+        )
+        notifications = _shape_doc(
+            "notifications", ["read", "user_id"], sort=[("created_at", -1)], total_ms=400.0,
+            explain=parse_explain(_explain("SORT", "COLLSCAN", docs_examined=80, n_returned=20)),
+        )
+        fast = _shape_doc(
+            "users", ["id"], total_ms=50.0,
+            explain=parse_explain(_explain("FETCH", "IXSCAN", index="id_unique", docs_examined=1, n_returned=1)),
+        )
+
+        report = build_report([fast, notifications, challenges], INDEXES, top=2)
+
+        assert [row["id"] for row in report["hot"]] == ["challenges-store_id", "notifications-read-user_id"]
+        assert report["hot"][0]["flags"] == ["EXAMINED_RATIO"]
+        assert report["hot"][0]["suggested_index"] == [["store_id", 1], ["end_date", 1], ["start_date", 1]]
+        # (user_id, read, created_at) est déclaré : le plan COLLSCAN signale un index absent de la base
+        assert report["hot"][1]["flags"] == ["COLLSCAN", "IN_MEMORY_SORT", "DECLARED_INDEX_NOT_USED"]
+        assert [s["collection"] for s in report["suggestions"]] == ["challenges"]
+        assert report["suggestions"][0]["reasons"] == ["EXAMINED_RATIO"]
+
+    def test_unused_declared_indexes(self):
+        index_stats = {
+            "challenges": [
+                {"name": "_id_", "accesses": {"ops": 0}},
+                {"name": "store_status_idx", "accesses": {"ops": 0}},
+            ],
+            "users": [
+                {"name": "id_unique", "accesses": {"ops": 0}},
+                {"name": "gerant_id_idx", "accesses": {"ops": 12}},
+                {"name": "store_role_idx", "accesses": {"ops": 0}},
+            ],
+        }
+        report = build_report([], INDEXES, index_stats)
+        assert {(i["collection"], i["name"]) for i in report["unused_indexes"]} == {
+            ("challenges", "store_status_idx"), ("users", "store_role_idx"),
+        }  # index uniques / TTL exclus
+
+        sampled = _shape_doc("challenges", ["store_id", "status"], explain=parse_explain(
+            _explain("FETCH", "IXSCAN", index="store_status_idx", docs_examined=2, n_returned=2)))
+        other = _shape_doc("stores", ["id"], explain=parse_explain(
+            _explain("FETCH", "IXSCAN", index="id_unique", docs_examined=1, n_returned=1)))
+        fallback = build_report([sampled, other], INDEXES)["unused_indexes"]
+        assert fallback == [{"collection": "stores", "name": "gerant_id_idx", "source": "sampled_plans"}]
@@ -0,0 +1,370 @@
+"""
+Tests unitaires — rollup store_daily_kpis (utils/kpi_rollup.py,
+StoreDailyKpiRepository, hooks d'écriture de KPIRepository / ManagerKPIRepository).
+
+Collections en mémoire (find / distinct / écritures / bulk_write) : les KPI sont
+écrits par les vrais repositories, le rollup est donc maintenu par les hooks.
+Les lectures rollup sont comparées au chemin historique (données brutes).
+
+Couvre :
+- historique, calendrier et années : mêmes résultats que le calcul sur données brutes
+- refresh sur insert / update (changement de date) / delete / bulk_write de sync
+- check_store : lignes manquantes, orphelines, divergentes ; rebuild_store les répare
+- un échec du rollup ne fait pas échouer l'écriture KPI
+"""
+import random
+from collections import Counter
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from pymongo import DeleteOne, InsertOne, ReplaceOne, UpdateOne
+
+
+START = date(2026, 3, 1)
+
+
+def _day(offset):
+    return (START + timedelta(days=offset)).isoformat()
+
+
+# ---------------------------------------------------------------------------
+# Stand-ins
+# ---------------------------------------------------------------------------
+
+def _matches(doc, filters):
+    for key, cond in filters.items():
+        if key == "$or":
+            if not any(_matches(doc, sub) for sub in cond):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(cond, dict):
+            if "$in" in cond and value not in cond["$in"]:
+                return False
+            if "$gte" in cond and (value is None or not value >= cond["$gte"]):
+                return False
+            if "$lte" in cond and (value is None or not value <= cond["$lte"]):
+                return False
+            if "$lt" in cond and (value is None or not value < cond["$lt"]):
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    fields = [k for k, v in (projection or {}).items() if v and k != "_id"]
+    if not fields:
+        return {k: v for k, v in doc.items() if k != "_id"}
+    return {k: doc[k] for k in fields if k in doc}
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, spec):
+        for field, direction in reversed(spec):
+            self.docs.sort(key=lambda d: d.get(field), reverse=direction < 0)
+        return self
+
+    def skip(self, n):
+        self.docs = self.docs[n:]
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+    def __aiter__(self):
+        return self._gen()
+
+    async def _gen(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+        self.docs = []
+
+    def find(self, filters, projection=None):
+        self.calls[self.name, "find"] += 1
+        return _Cursor([_project(d, projection) for d in self.docs if _matches(d, filters)])
+
+    async def distinct(self, field, filters):
+        self.calls[self.name, "distinct"] += 1
+        return list(dict.fromkeys(d.get(field) for d in self.docs if _matches(d, filters)))
+
+    async def insert_one(self, document):
+        self.docs.append(dict(document))
+        return SimpleNamespace(inserted_id=len(self.docs))
+
+    async def insert_many(self, documents, ordered=True):
+        for doc in documents:
+            self.docs.append(dict(doc))
+
+    def _update(self, doc, update):
+        doc.update(update.get("$set", {}))
+
+    async def update_one(self, filters, update, upsert=False):
+        for doc in self.docs:
+            if _matches(doc, filters):
+                self._update(doc, update)
+                return SimpleNamespace(modified_count=1, upserted_id=None)
+        if upsert:
+            self.docs.append({**filters, **update.get("$set", {})})
+            return SimpleNamespace(modified_count=0, upserted_id=1)
+        return SimpleNamespace(modified_count=0, upserted_id=None)
+
+    async def update_many(self, filters, update):
+        matched = [d for d in self.docs if _matches(d, filters)]
+        for doc in matched:
+            self._update(doc, update)
+        return SimpleNamespace(modified_count=len(matched))
+
+    async def delete_one(self, filters):
+        for doc in self.docs:
+            if _matches(doc, filters):
+                self.docs.remove(doc)
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def delete_many(self, filters):
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if not _matches(d, filters)]
+        return SimpleNamespace(deleted_count=before - len(self.docs))
+
+    async def bulk_write(self, operations, ordered=False):
+        self.calls[self.name, "bulk_write"] += 1
+        for op in operations:
+            if isinstance(op, InsertOne):
+                self.docs.append(dict(op._doc))
+            elif isinstance(op, UpdateOne):
+                await self.update_one(op._filter, op._doc, upsert=op._upsert)
+            elif isinstance(op, ReplaceOne):
+                self.docs = [d for d in self.docs if not _matches(d, op._filter)]
+                self.docs.append(dict(op._doc))
+            elif isinstance(op, DeleteOne):
+                await self.delete_one(op._filter)
+        return SimpleNamespace(inserted_count=0, modified_count=0, matched_count=0, deleted_count=0, upserted_count=0)
+
+
+class FakeDB:
+    def __init__(self):
+        self.calls = Counter()
+        self.collections = {}
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(name, self.calls)
+        return self.collections[name]
+
+
+def _repos(db):
+    from repositories.kpi_repository import KPIRepository, ManagerKPIRepository
+    from repositories.store_daily_kpi_repository import StoreDailyKpiRepository
+    return KPIRepository(db), ManagerKPIRepository(db), StoreDailyKpiRepository(db)
+
+
+def _gerant(db, rollup=True):
+    from services.gerant_service._kpi_mixin import KpiMixin
+
+    kpi_repo, manager_kpi_repo, rollup_repo = _repos(db)
+    service = KpiMixin()
+    service.store_repo = SimpleNamespace(find_one=AsyncMock(return_value={"id": "st1"}))
+    service.kpi_repo = kpi_repo
+    service.manager_kpi_repo = manager_kpi_repo
+    service.store_daily_kpi_repo = rollup_repo if rollup else None
+    return service
+
+
+def _manager(db, rollup=True):
+    from services.manager.kpi_service import ManagerKpiService
+
+    kpi_repo, manager_kpi_repo, rollup_repo = _repos(db)
+    return ManagerKpiService(kpi_repo, manager_kpi_repo, None, store_daily_kpi_repo=rollup_repo if rollup else None)
+
+
+async def _seed(db, seed, days=40):
+    """Saisies vendeur / manager aléatoires via les repositories (doublons, verrous, autre magasin)."""
+    rng = random.Random(seed)
+    kpi_repo, manager_kpi_repo, _ = _repos(db)
+    for offset in range(days):
+        for seller in ("s1", "s2", "s3"):
+            if rng.random() < 0.6:
+                await kpi_repo.insert_one({
+                    "id": f"{seller}-{offset}", "seller_id": seller, "store_id": "st1", "date": _day(offset),
+                    "created_by": rng.choice(["seller", None]), "locked": rng.random() < 0.2,
+                    "ca_journalier": round(rng.uniform(0, 800), 2), "nb_ventes": rng.randint(0, 9),
+                    "nb_clients": rng.randint(0, 12), "nb_articles": rng.randint(0, 20), "nb_prospects": rng.randint(0, 5),
+                })
+            if rng.random() < 0.15:  # version manager du même vendeur / jour
+                await kpi_repo.insert_one({
+                    "id": f"m-{seller}-{offset}", "seller_id": seller, "store_id": "st1", "date": _day(offset),
+                    "created_by": "manager", "seller_ca": round(rng.uniform(0, 800), 2), "nb_ventes": rng.randint(0, 9),
+                })
+        if rng.random() < 0.3:
+            await manager_kpi_repo.insert_one({
+                "id": f"mk-{offset}", "manager_id": "m1", "store_id": "st1", "date": _day(offset),
+                "nb_prospects": rng.randint(0, 30), "locked": rng.random() < 0.3,
+            })
+        await kpi_repo.insert_one({"id": f"other-{offset}", "seller_id": "x", "store_id": "st2",
+                                   "date": _day(offset), "ca_journalier": 1.0})
+
+
+# ---------------------------------------------------------------------------
+# Lectures : rollup == données brutes
+# ---------------------------------------------------------------------------
+
+class TestRollupReads:
+
+    @pytest.fixture(autouse=True)
+    def rollup_reads(self, monkeypatch):
+        from core.config import settings
+        monkeypatch.setattr(settings, "KPI_ROLLUP_READS_ENABLED", True)
+
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    async def test_history_matches_raw_path(self, seed):
+        db = FakeDB()
+        await _seed(db, seed)
+
+        args = ("st1", "u1", 30, _day(3), _day(35))
+        raw = await _gerant(db, rollup=False).get_store_kpi_history(*args)
+        db.calls.clear()
+        rolled = await _gerant(db).get_store_kpi_history(*args)
+
+        assert rolled == pytest.approx(raw)
+        assert db.calls == {("store_daily_kpis", "find"): 1}
+
+    @pytest.mark.anyio
+    async def test_calendar_and_years_match_raw_path(self):
+        db = FakeDB()
+        await _seed(db, 7)
+        month = {"$gte": _day(5), "$lt": _day(25)}
+
+        raw = await _manager(db, rollup=False).get_store_calendar("st1", month)
+        rolled = await _manager(db).get_store_calendar("st1", month)
+
+        assert rolled["dates"] == raw["dates"]
+        assert rolled["lockedDates"] == raw["lockedDates"]
+        assert rolled["lockedSellersByDate"] == {d: sorted(set(s)) for d, s in raw["lockedSellersByDate"].items()}
+        assert await _manager(db).get_store_available_years("st1") == [2026]
+        assert (await _gerant(db).get_store_available_years("st1", "u1")) == {"years": [2026]}
+
+    @pytest.mark.anyio
+    async def test_reads_fall_back_to_raw_when_disabled(self, monkeypatch):
+        from core.config import settings
+
+        db = FakeDB()
+        await _seed(db, 4, days=5)
+        monkeypatch.setattr(settings, "KPI_ROLLUP_READS_ENABLED", False)
+        db.calls.clear()
+
+        await _gerant(db).get_store_kpi_history("st1", "u1", 30, _day(0), _day(4))
+
+        assert ("store_daily_kpis", "find") not in db.calls
+
+
+# ---------------------------------------------------------------------------
+# Maintenance sur écriture
+# ---------------------------------------------------------------------------
+
+class TestWriteHooks:
+
+    @pytest.mark.anyio
+    async def test_manual_entry_update_and_delete(self):
+        db = FakeDB()
+        kpi_repo, manager_kpi_repo, rollup = _repos(db)
+
+        await kpi_repo.insert_one({"id": "k1", "seller_id": "s1", "store_id": "st1", "date": _day(0), "ca_journalier": 100})
+        await kpi_repo.insert_one({"id": "k2", "seller_id": "s1", "store_id": "st1", "date": _day(0),
+                                   "created_by": "manager", "ca_journalier": 150})
+        row = (await rollup.find_range("st1"))[0]
+        assert (row["ca_journalier"], row["seller_entries"], row["raw_entries"]) == (150, 1, 2)
+
+        # Déplacement de date : l'ancien jour et le nouveau sont recalculés
+        await kpi_repo.update_one({"id": "k2"}, {"$set": {"date": _day(1), "locked": True}})
+        rows = {r["date"]: r for r in await rollup.find_range("st1")}
+        assert rows[_day(0)]["ca_journalier"] == 100
+        assert rows[_day(1)]["locked_seller_ids"] == ["s1"]
+
+        await manager_kpi_repo.update_one({"store_id": "st1", "date": _day(2)}, {"$set": {"nb_prospects": 7}}, upsert=True)
+        assert (await rollup.find_range("st1", _day(2), _day(2)))[0]["nb_prospects"] == 7
+
+        await kpi_repo.delete_many({"seller_id": "s1"})
+        assert [r["date"] for r in await rollup.find_range("st1")] == [_day(2)]
+
+    @pytest.mark.anyio
+    async def test_sync_bulk_write_refreshes_in_constant_queries(self):
+        from services.kpi_sync_service import KPISyncService
+
+        db = FakeDB()
+        kpi_repo, _, rollup = _repos(db)
+        for i in range(30):
+            await kpi_repo.insert_one({"id": f"k{i}", "seller_id": f"s{i}", "store_id": "st1", "date": _day(i % 3), "nb_ventes": 1})
+        chunk = [
+            {"seller_id": f"s{i}", "store_id": "st1", "date": _day(i % 3), "ca_journalier": 10.0,
+             "nb_ventes": 2, "nb_articles": 3, "nb_prospects": 0, "nb_clients": 2}
+            for i in range(60)
+        ]
+        operations = KPISyncService.build_operations(chunk, {(f"s{i}", _day(i % 3)) for i in range(30)})
+        db.calls.clear()
+
+        await kpi_repo.bulk_write(operations)
+
+        # 1 lookup des clés + 1 bulk KPI + (2 finds + 1 bulk) de refresh
+        assert db.calls == {("kpi_entries", "find"): 2, ("kpi_entries", "bulk_write"): 1,
+                            ("manager_kpis", "find"): 1, ("store_daily_kpis", "bulk_write"): 1}
+        assert [r["nb_ventes"] for r in await rollup.find_range("st1")] == [40, 40, 40]
+        assert (await rollup.find_range("st1"))[0]["locked_seller_ids"]
+
+    @pytest.mark.anyio
+    async def test_rollup_failure_does_not_fail_the_write(self, caplog):
+        db = FakeDB()
+        kpi_repo, _, _ = _repos(db)
+        kpi_repo._rollup.refresh = AsyncMock(side_effect=RuntimeError("rollup down"))
+
+        await kpi_repo.insert_one({"id": "k1", "seller_id": "s1", "store_id": "st1", "date": _day(0)})
+
+        assert len(db["kpi_entries"].docs) == 1
+        assert "store_daily_kpis refresh failed" in caplog.text
+
+
+# ---------------------------------------------------------------------------
+# Contrôle de cohérence / reconstruction
+# ---------------------------------------------------------------------------
+
+class TestCheckAndRebuild:
+
+    @pytest.mark.anyio
+    async def test_check_detects_drift_and_rebuild_repairs_it(self):
+        db = FakeDB()
+        await _seed(db, 5, days=10)
+        _, _, rollup = _repos(db)
+        assert await rollup.check_store("st1") == []
+
+        rows = db["store_daily_kpis"].docs
+        st1 = [r for r in rows if r["store_id"] == "st1"]
+        st1[0]["ca_journalier"] += 1
+        rows.remove(st1[1])
+        rows.append({**st1[2], "date": "2025-12-31", "year": 2025})
+
+        problems = {(p["date"], p["problem"]): p["fields"] for p in await rollup.check_store("st1")}
+        assert problems == {
+            (st1[0]["date"], "mismatch"): ["ca_journalier"],
+            (st1[1]["date"], "missing"): [],
+            ("2025-12-31", "orphan"): [],
+        }
+
+        await rollup.rebuild_store("st1")
+        assert await rollup.check_store("st1") == []
+        assert await rollup.find_years("st1") == [2026]
@@ -0,0 +1,211 @@
+"""
+Tests unitaires — passerelle Stripe asynchrone (services/stripe_client.py).
+
+Un faux serveur Stripe (application ASGI locale, branchée par transport httpx)
+répond aux endpoints utilisés et compte les appels ; Redis est remplacé par
+un cache en mémoire.
+
+Couvre :
+- lecture abonnement / client : un seul appel HTTP, servie ensuite par le cache
+- écriture (update) : la réponse remplace l'entrée en cache
+- webhooks : customer.subscription.* / invoice.* / customer.updated invalident l'entrée
+- non bloquant : deux prévisualisations lentes en parallèle, la boucle continue de tourner
+- plafond de concurrence : file pleine → 503 (ServiceUnavailableError)
+- upcoming_invoice passe par invoices/create_preview
+"""
+import asyncio
+import time
+from collections import Counter
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+
+from core.exceptions import ServiceUnavailableError
+from services.stripe_client import StripeClient
+
+
+# ---------------------------------------------------------------------------
+# Faux serveur Stripe
+# ---------------------------------------------------------------------------
+
+def _subscription(sub_id, quantity=3, status="active"):
+    return {
+        "id": sub_id, "object": "subscription", "status": status, "customer": "cus_1",
+        "items": {"object": "list", "data": [{
+            "id": "si_1", "object": "subscription_item", "quantity": quantity,
+            "price": {"id": "price_m", "object": "price", "unit_amount": 2900, "recurring": {"interval": "month"}},
+        }]},
+    }
+
+
+def fake_stripe_app(preview_delay=0.0):
+    app = FastAPI()
+    app.state.calls = Counter()
+    app.state.subscriptions = {"sub_1": _subscription("sub_1")}
+
+    @app.get("/v1/subscriptions/{sub_id}")
+    async def retrieve_subscription(sub_id: str):
+        app.state.calls["subscription.retrieve"] += 1
+        return app.state.subscriptions[sub_id]
+
+    @app.post("/v1/subscriptions/{sub_id}")
+    async def update_subscription(sub_id: str, request: Request):
+        app.state.calls["subscription.update"] += 1
+        form = await request.form()
+        sub = app.state.subscriptions[sub_id]
+        if "cancel_at_period_end" in form:
+            sub["cancel_at_period_end"] = form["cancel_at_period_end"] == "true"
+        return sub
+
+    @app.get("/v1/customers/{customer_id}")
+    async def retrieve_customer(customer_id: str):
+        app.state.calls["customer.retrieve"] += 1
+        return {"id": customer_id, "object": "customer", "email": "g@example.com"}
+
+    @app.post("/v1/invoices/create_preview")
+    async def create_preview(request: Request):
+        app.state.calls["invoice.preview"] += 1
+        form = await request.form()
+        await asyncio.sleep(preview_delay)
+        return {
+            "id": None, "object": "invoice", "amount_due": 4350, "subscription": form.get("subscription"),
+            "lines": {"object": "list", "data": [{"object": "line_item", "type": "subscription", "amount": 4350}]},
+        }
+
+    return app
+
+
+class FakeCache:
+    enabled = True
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ttl=300):
+        self.data[key] = value
+        return True
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+        return True
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    fake = FakeCache()
+    monkeypatch.setattr("core.cache.get_cache_service", AsyncMock(return_value=fake))
+    return fake
+
+
+def _gateway(app, **kwargs):
+    return StripeClient(
+        "sk_test_fake", transport=httpx.ASGITransport(app=app), base_url="http://stripe.local",
+        max_network_retries=0, **kwargs,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Cache de lecture
+# ---------------------------------------------------------------------------
+
+class TestReadThroughCache:
+
+    @pytest.mark.anyio
+    async def test_retrieves_are_cached_and_invalidated_by_webhooks(self, cache):
+        app = fake_stripe_app()
+        gateway = _gateway(app)
+
+        for _ in range(3):
+            sub = await gateway.retrieve_subscription("sub_1")
+            assert sub["items"].data[0].price.recurring.interval == "month"
+            customer = await gateway.retrieve_customer("cus_1")
+            assert customer.email == "g@example.com"
+        assert app.state.calls == Counter({"subscription.retrieve": 1, "customer.retrieve": 1})
+
+        app.state.subscriptions["sub_1"]["status"] = "past_due"
+        await gateway.invalidate_for_event({
+            "type": "invoice.payment_failed",
+            "data": {"object": {"object": "invoice", "subscription": "sub_1", "customer": {"id": "cus_1"}}},
+        })
+        assert (await gateway.retrieve_subscription("sub_1")).status == "past_due"
+        await gateway.retrieve_customer("cus_1")
+        assert app.state.calls == Counter({"subscription.retrieve": 2, "customer.retrieve": 2})
+
+        await gateway.invalidate_for_event({"type": "customer.subscription.updated", "data": {"object": {"id": "sub_1"}}})
+        await gateway.invalidate_for_event({"type": "customer.updated", "data": {"object": {"id": "cus_1", "object": "customer"}}})
+        assert not cache.data
+        await gateway.aclose()
+
+    @pytest.mark.anyio
+    async def test_update_writes_through(self, cache):
+        app = fake_stripe_app()
+        gateway = _gateway(app)
+
+        updated = await gateway.modify_subscription("sub_1", cancel_at_period_end=True)
+        cached = await gateway.retrieve_subscription("sub_1")
+
+        assert updated.cancel_at_period_end is True and cached.cancel_at_period_end is True
+        assert app.state.calls == Counter({"subscription.update": 1})
+        await gateway.aclose()
+
+    @pytest.mark.anyio
+    async def test_upcoming_invoice_uses_preview(self, cache):
+        app = fake_stripe_app()
+        gateway = _gateway(app)
+
+        upcoming = await gateway.upcoming_invoice("sub_1")
+
+        assert upcoming.get("amount_due") == 4350 and upcoming.subscription == "sub_1"
+        assert app.state.calls == Counter({"invoice.preview": 1})
+        await gateway.aclose()
+
+
+# ---------------------------------------------------------------------------
+# Concurrence
+# ---------------------------------------------------------------------------
+
+class TestNonBlocking:
+
+    @pytest.mark.anyio
+    async def test_previews_do_not_block_the_loop(self, cache):
+        app = fake_stripe_app(preview_delay=0.2)
+        gateway = _gateway(app)
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        beat = asyncio.create_task(heartbeat())
+        start = time.monotonic()
+        previews = await asyncio.gather(*[
+            gateway.create_invoice_preview("cus_1", "sub_1", {"items": [{"id": "si_1", "quantity": n}]})
+            for n in (4, 5)
+        ])
+        elapsed = time.monotonic() - start
+        beat.cancel()
+
+        assert [p.amount_due for p in previews] == [4350, 4350]
+        assert elapsed < 0.35 and ticks >= 10
+        await gateway.aclose()
+
+    @pytest.mark.anyio
+    async def test_saturated_gateway_rejects_with_503(self, cache):
+        app = fake_stripe_app(preview_delay=0.3)
+        gateway = _gateway(app, max_concurrency=1, queue_timeout=0.05)
+
+        slow = asyncio.create_task(gateway.create_invoice_preview("cus_1", "sub_1", {}))
+        await asyncio.sleep(0.02)
+        with pytest.raises(ServiceUnavailableError):
+            await gateway.retrieve_subscription("sub_1")
+        await slow
+
+        assert gateway.stats()["rejected"] == 1 and gateway.stats()["in_flight"] == 0
+        await gateway.aclose()
@@ -0,0 +1,373 @@
+"""
+Tests unitaires — file durable des webhooks Stripe (services/stripe_webhook_queue.py,
+repositories/stripe_event_repository.py).
+
+Horloge factice + stand-in Mongo en mémoire (stripe_events, stripe_event_locks).
+
+Couvre :
+- ordering_key : client, sinon abonnement, sinon l'événement lui-même
+- enqueue : doublon de livraison Stripe → False, un seul document
+- ordre : les événements d'un client sont traités dans l'ordre de création Stripe
+- parallélisme : clients différents en parallèle, jamais deux événements d'un même client
+- retry : backoff, les suivants du client attendent ; après max_attempts → failed, la clé avance
+- ready_keys : une clé par client, un client bloqué en backoff ne prive pas les autres
+- bail : événement 'processing' d'un worker mort repris après expiration
+- rejeu (requeue) et métriques (compteurs, latence p50/p95)
+"""
+import asyncio
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from services.stripe_webhook_queue import StripeWebhookQueue, ordering_key
+
+
+# ---------------------------------------------------------------------------
+# Stand-ins
+# ---------------------------------------------------------------------------
+
+class FakeClock:
+    def __init__(self):
+        self.current = datetime(2026, 10, 19, 6, 0, tzinfo=timezone.utc)
+
+    def now(self):
+        return self.current
+
+    def advance(self, seconds):
+        self.current += timedelta(seconds=seconds)
+
+
+def _matches(doc, filters):
+    for key, cond in filters.items():
+        if key == "$or":
+            if not any(_matches(doc, sub) for sub in cond):
+                return False
+            continue
+        value = doc.get(key)
+        if not isinstance(cond, dict):
+            if value != cond:
+                return False
+            continue
+        for op, arg in cond.items():
+            if op == "$exists":
+                if (key in doc) != arg:
+                    return False
+            elif op == "$in":
+                if value not in arg:
+                    return False
+            elif value is None:
+                return False
+            elif op == "$lte" and not value <= arg:
+                return False
+            elif op == "$gte" and not value >= arg:
+                return False
+    return True
+
+
+def _apply(doc, update):
+    doc.update(update.get("$set", {}))
+    for field in update.get("$unset", {}):
+        doc.pop(field, None)
+
+
+class _Result:
+    def __init__(self, matched=0):
+        self.matched_count = matched
+        self.modified_count = matched
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, spec):
+        for field, direction in reversed(spec):
+            self.docs.sort(key=lambda d: d.get(field), reverse=direction == -1)
+        return self
+
+    def skip(self, n):
+        self.docs = self.docs[n:]
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, n):
+        return list(self.docs)
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    """Index unique sur `key` (event_id pour stripe_events, _id pour les baux)."""
+
+    def __init__(self, key):
+        self.key = key
+        self.docs = {}
+
+    async def find_one(self, filters, projection=None):
+        for doc in self.docs.values():
+            if _matches(doc, filters):
+                return dict(doc)
+        return None
+
+    def find(self, filters, projection=None):
+        return _Cursor([dict(d) for d in self.docs.values() if _matches(d, filters)])
+
+    def aggregate(self, pipeline):
+        """$match / $sort / $group ($first) / $limit, ce qu'utilise ready_keys."""
+        docs = [dict(d) for d in self.docs.values()]
+        for stage in pipeline:
+            (op, arg), = stage.items()
+            if op == "$match":
+                docs = [d for d in docs if _matches(d, arg)]
+            elif op == "$sort":
+                docs = _Cursor(docs).sort(list(arg.items())).docs
+            elif op == "$group":
+                groups = {}
+                for doc in docs:
+                    key = doc.get(arg["_id"][1:])
+                    if key not in groups:
+                        groups[key] = {"_id": key, **{
+                            field: doc.get(expr["$first"][1:]) for field, expr in arg.items() if field != "_id"
+                        }}
+                docs = list(groups.values())
+            elif op == "$limit":
+                docs = docs[:arg]
+        return _Cursor(docs)
+
+    async def count_documents(self, filters, **kwargs):
+        return sum(1 for d in self.docs.values() if _matches(d, filters))
+
+    async def insert_one(self, doc):
+        if doc[self.key] in self.docs:
+            raise DuplicateKeyError("E11000 duplicate key")
+        self.docs[doc[self.key]] = dict(doc)
+
+    async def update_one(self, filters, update, upsert=False):
+        for doc in self.docs.values():
+            if _matches(doc, filters):
+                _apply(doc, update)
+                return _Result(matched=1)
+        if upsert:
+            key = filters[self.key]
+            if key in self.docs:
+                raise DuplicateKeyError("E11000 duplicate key")
+            self.docs[key] = {self.key: key, **update.get("$setOnInsert", {}), **update.get("$set", {})}
+        return _Result()
+
+    async def update_many(self, filters, update):
+        matched = [d for d in self.docs.values() if _matches(d, filters)]
+        for doc in matched:
+            _apply(doc, update)
+        return _Result(matched=len(matched))
+
+    async def delete_one(self, filters):
+        for key, doc in list(self.docs.items()):
+            if _matches(doc, filters):
+                del self.docs[key]
+                return _Result(matched=1)
+        return _Result()
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection("event_id" if name == "stripe_events" else "_id")
+        return self[name]
+
+
+def _event(event_id, customer, created, event_type="customer.subscription.updated"):
+    return {
+        "id": event_id, "type": event_type, "created": created,
+        "data": {"object": {"id": f"sub_{customer}", "object": "subscription", "customer": customer}},
+    }
+
+
+class Recorder:
+    """Handler de test : enregistre l'ordre, peut échouer ou ralentir par événement."""
+
+    def __init__(self, fail_times=None, delay=0.0):
+        self.calls = []
+        self.fail_times = dict(fail_times or {})
+        self.delay = delay
+        self.active = defaultdict(int)
+        self.max_active_per_key = 0
+
+    async def __call__(self, event):
+        key = ordering_key(event)
+        self.active[key] += 1
+        self.max_active_per_key = max(self.max_active_per_key, self.active[key])
+        try:
+            await asyncio.sleep(self.delay)
+            self.calls.append(event["id"])
+            if self.fail_times.get(event["id"], 0) > 0:
+                self.fail_times[event["id"]] -= 1
+                raise RuntimeError("mongo timeout")
+            return {"status": "success"}
+        finally:
+            self.active[key] -= 1
+
+
+def _queue(db, clock, handler, owner="w1", **kwargs):
+    kwargs.setdefault("max_attempts", 5)
+    return StripeWebhookQueue(db, handler, clock=clock, owner=owner, backoff_base=10, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# Ordre et doublons
+# ---------------------------------------------------------------------------
+
+class TestOrdering:
+
+    def test_ordering_key(self):
+        assert ordering_key(_event("evt_1", "cus_1", 1)) == "cus:cus_1"
+        assert ordering_key({"id": "evt_2", "data": {"object": {"object": "customer", "id": "cus_2"}}}) == "cus:cus_2"
+        assert ordering_key({"id": "evt_3", "data": {"object": {"object": "invoice", "subscription": "sub_9"}}}) == "sub:sub_9"
+        assert ordering_key({"id": "evt_4", "data": {"object": {"object": "checkout.session"}}}) == "evt:evt_4"
+
+    @pytest.mark.anyio
+    async def test_customer_events_in_stripe_order_and_duplicates_ignored(self):
+        db, clock, handler = FakeDB(), FakeClock(), Recorder()
+        queue = _queue(db, clock, handler)
+
+        assert await queue.enqueue(_event("evt_b", "cus_1", 200)) is True
+        assert await queue.enqueue(_event("evt_a", "cus_1", 100)) is True
+        assert await queue.enqueue(_event("evt_b", "cus_1", 200)) is False  # redélivrance Stripe
+        await queue.enqueue(_event("evt_c", "cus_2", 150))
+
+        assert await queue.run_once() == 3
+        assert handler.calls.index("evt_a") < handler.calls.index("evt_b")
+        assert len(db["stripe_events"].docs) == 3
+        assert {d["status"] for d in db["stripe_events"].docs.values()} == {"processed"}
+        assert not db["stripe_event_locks"].docs
+        assert await queue.run_once() == 0
+
+    @pytest.mark.anyio
+    async def test_keys_run_in_parallel_never_within_a_key(self):
+        db, clock, handler = FakeDB(), FakeClock(), Recorder(delay=0.1)
+        workers = [_queue(db, clock, handler, owner=f"w{i}", concurrency=4) for i in range(2)]
+        for i in range(4):
+            await workers[0].enqueue(_event(f"evt_{i}_1", f"cus_{i}", 1))
+            await workers[0].enqueue(_event(f"evt_{i}_2", f"cus_{i}", 2))
+
+        start = time.monotonic()
+        processed = await asyncio.gather(*(w.run_once() for w in workers))
+        elapsed = time.monotonic() - start
+
+        assert sum(processed) == 8
+        assert elapsed < 0.35  # 4 clients × 2 événements de 0.1s, en parallèle
+        assert handler.max_active_per_key == 1
+
+
+# ---------------------------------------------------------------------------
+# Échecs
+# ---------------------------------------------------------------------------
+
+class TestFailures:
+
+    @pytest.mark.anyio
+    async def test_retry_with_backoff_blocks_later_events_of_the_customer(self):
+        db, clock = FakeDB(), FakeClock()
+        handler = Recorder(fail_times={"evt_a": 1})
+        queue = _queue(db, clock, handler)
+        await queue.enqueue(_event("evt_a", "cus_1", 100))
+        await queue.enqueue(_event("evt_b", "cus_1", 200))
+
+        assert await queue.run_once() == 0
+        doc = db["stripe_events"].docs["evt_a"]
+        assert doc["status"] == "pending" and doc["attempts"] == 1 and "mongo timeout" in doc["last_error"]
+        assert doc["available_at"] >= clock.now() + timedelta(seconds=8)
+        assert handler.calls == ["evt_a"]
+
+        assert await queue.run_once() == 0  # backoff pas écoulé : evt_b attend
+        clock.advance(13)
+        assert await queue.run_once() == 2
+        assert handler.calls == ["evt_a", "evt_a", "evt_b"]
+        assert (await queue.metrics())["worker"]["retried"] == 1
+
+    @pytest.mark.anyio
+    async def test_customer_in_backoff_does_not_starve_other_keys(self):
+        db, clock = FakeDB(), FakeClock()
+        handler = Recorder(fail_times={"evt_a_0": 1})
+        queue = _queue(db, clock, handler, concurrency=2)
+        for i in range(40):
+            await queue.enqueue(_event(f"evt_a_{i}", "cus_a", i))
+        assert await queue.run_once() == 0  # tête de cus_a en backoff, 39 événements derrière
+
+        clock.advance(1)
+        await queue.enqueue(_event("evt_b", "cus_b", 1))
+        await queue.enqueue(_event("evt_c", "cus_c", 1))
+        assert await queue.repo.ready_keys(clock.now(), 2) == ["cus:cus_b", "cus:cus_c"]
+        assert await queue.run_once() == 2
+        assert handler.calls == ["evt_a_0", "evt_b", "evt_c"]
+
+    @pytest.mark.anyio
+    async def test_exhausted_event_is_parked_and_key_moves_on(self):
+        db, clock = FakeDB(), FakeClock()
+        handler = Recorder(fail_times={"evt_a": 99})
+        queue = _queue(db, clock, handler, max_attempts=2)
+        await queue.enqueue(_event("evt_a", "cus_1", 100))
+        await queue.enqueue(_event("evt_b", "cus_1", 200))
+
+        await queue.run_once()
+        clock.advance(13)
+        await queue.run_once()
+
+        assert db["stripe_events"].docs["evt_a"]["status"] == "failed"
+        assert db["stripe_events"].docs["evt_b"]["status"] == "processed"
+        assert handler.calls == ["evt_a", "evt_a", "evt_b"]
+
+    @pytest.mark.anyio
+    async def test_dead_worker_lease_is_taken_over(self):
+        db, clock, handler = FakeDB(), FakeClock(), Recorder()
+        dead = _queue(db, clock, handler, owner="dead", lease_seconds=60)
+        await dead.enqueue(_event("evt_a", "cus_1", 100))
+        # Le worker "dead" a pris le bail et réclamé l'événement, puis a disparu
+        lease_until = clock.now() + timedelta(seconds=60)
+        await dead.locks.try_acquire("cus:cus_1", "dead", clock.now(), lease_until)
+        await dead.repo.claim("evt_a", "dead", lease_until)
+
+        survivor = _queue(db, clock, handler, owner="w2", lease_seconds=60)
+        assert await survivor.run_once() == 0
+        clock.advance(61)
+        assert await survivor.run_once() == 1
+        assert handler.calls == ["evt_a"]
+        assert db["stripe_events"].docs["evt_a"]["status"] == "processed"
+
+
+# ---------------------------------------------------------------------------
+# Rejeu et métriques
+# ---------------------------------------------------------------------------
+
+class TestReplayAndMetrics:
+
+    @pytest.mark.anyio
+    async def test_requeue_failed_and_metrics(self):
+        db, clock = FakeDB(), FakeClock()
+        handler = Recorder(fail_times={"evt_a": 1})
+        queue = _queue(db, clock, handler, max_attempts=1)
+        await queue.enqueue(_event("evt_a", "cus_1", 100))
+        await queue.enqueue(_event("evt_b", "cus_2", 100))
+        # événement antérieur à la file (pas de payload) : jamais rejoué
+        await queue.repo.mark_processed("evt_legacy", "invoice.paid", 50)
+
+        clock.advance(2)
+        await queue.run_once()
+        metrics = await queue.metrics()
+        assert metrics["failed"] == 1 and metrics["pending"] == 0
+        assert metrics["lag_ms_p50"] == 2000 and metrics["lag_sample"] == 1
+
+        assert await queue.requeue({"status": "failed"}) == 1
+        assert (await queue.metrics())["pending"] == 1
+        assert await queue.run_once() == 1
+        assert await queue.requeue({"event_id": {"$in": ["evt_legacy"]}}) == 0
+        assert await queue.repo.exists("evt_a") and await queue.repo.exists("evt_legacy")
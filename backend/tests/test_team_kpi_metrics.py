@@ -0,0 +1,236 @@
+"""
+Tests unitaires — métriques KPI d'équipe en une agrégation
+(utils/kpi_pipeline.build_team_kpi_pipeline, ManagerKpiService.get_team_kpi_metrics)
+et sources des profils d'équipe (diagnostics / debriefs en batch).
+
+Les pipelines sont rejoués en Python par un mini-évaluateur ($match, $group,
+$project, $facet, $sort, $replaceRoot) : les totaux d'équipe sont comparés au
+pipeline vendeur historique exécuté une fois par vendeur.
+
+Couvre :
+- totaux identiques au pipeline par vendeur, pour chaque période comparée
+- 1 seule agrégation quel que soit le nombre de vendeurs / périodes
+- vendeur sans saisie → EMPTY_KPI_METRICS
+- périodes de comparaison (précédente, N-1, 29 février)
+- dernier diagnostic et 5 derniers debriefs par vendeur en 2 requêtes
+"""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from utils.kpi_pipeline import (
+    EMPTY_KPI_METRICS,
+    build_seller_kpi_pipeline,
+    build_team_kpi_pipeline,
+    comparison_periods,
+)
+
+
+# ---------------------------------------------------------------------------
+# Mini-évaluateur d'agrégation
+# ---------------------------------------------------------------------------
+
+def _expr(doc, expr):
+    if isinstance(expr, str) and expr.startswith("$"):
+        return doc if expr == "$$ROOT" else doc.get(expr[1:])
+    if isinstance(expr, dict):
+        (op, args), = expr.items()
+        values = [_expr(doc, a) for a in args] if isinstance(args, list) else None
+        if op == "$ifNull":
+            return values[0] if values[0] is not None else values[1]
+        if op == "$cond":
+            return values[1] if values[0] else values[2]
+        if op == "$gt":
+            return values[0] > values[1]
+        if op == "$divide":
+            return values[0] / values[1]
+        if op == "$multiply":
+            return values[0] * values[1]
+        raise NotImplementedError(op)
+    return expr
+
+
+def _matches(doc, filters):
+    for key, cond in filters.items():
+        if key == "$or":
+            if not any(_matches(doc, sub) for sub in cond):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(cond, dict):
+            if "$in" in cond and value not in cond["$in"]:
+                return False
+            if "$gte" in cond and not value >= cond["$gte"]:
+                return False
+            if "$lte" in cond and not value <= cond["$lte"]:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+def _group(docs, spec):
+    groups = {}
+    for doc in docs:
+        groups.setdefault(_expr(doc, spec["_id"]), []).append(doc)
+    out = []
+    for key, members in groups.items():
+        row = {"_id": key}
+        for field, acc in spec.items():
+            if field == "_id":
+                continue
+            (op, arg), = acc.items()
+            if op == "$sum":
+                row[field] = sum(_expr(d, arg) for d in members)
+            elif op == "$first":
+                row[field] = _expr(members[0], arg)
+            elif op == "$topN":
+                (sort_field, direction), = arg["sortBy"].items()
+                ordered = sorted(members, key=lambda d: d.get(sort_field), reverse=direction < 0)
+                row[field] = [_expr(d, arg["output"]) for d in ordered[:arg["n"]]]
+        out.append(row)
+    return out
+
+
+def run_pipeline(docs, pipeline):
+    for stage in pipeline:
+        (op, spec), = stage.items()
+        if op == "$match":
+            docs = [d for d in docs if _matches(d, spec)]
+        elif op == "$group":
+            docs = _group(docs, spec)
+        elif op == "$project":
+            projected = []
+            for d in docs:
+                row = {} if spec.get("_id") == 0 else {"_id": d.get("_id")}
+                if all(v == 0 for v in spec.values()):
+                    row = {k: v for k, v in d.items() if k not in spec}
+                else:
+                    for k, v in spec.items():
+                        if k != "_id":
+                            row[k] = d.get(k) if v == 1 else _expr(d, v)
+                projected.append(row)
+            docs = projected
+        elif op == "$facet":
+            docs = [{name: run_pipeline(docs, sub) for name, sub in spec.items()}]
+        elif op == "$sort":
+            for field, direction in reversed(list(spec.items())):
+                docs = sorted(docs, key=lambda d: d.get(field), reverse=direction < 0)
+        elif op == "$replaceRoot":
+            docs = [_expr(d, spec["newRoot"]) for d in docs]
+        else:
+            raise NotImplementedError(op)
+    return docs
+
+
+class FakeAggregateRepo:
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = 0
+
+    async def aggregate(self, pipeline, max_results=10000):
+        self.calls += 1
+        return run_pipeline(self.docs, pipeline)[:max_results]
+
+
+# ---------------------------------------------------------------------------
+# Données
+# ---------------------------------------------------------------------------
+
+START = date(2025, 1, 1)
+
+
+def _entries(seed, sellers, days=500):
+    rng = random.Random(seed)
+    entries = []
+    for offset in range(days):
+        for seller in sellers:
+            if rng.random() < 0.6:
+                entry = {"seller_id": seller, "store_id": "st1", "date": (START + timedelta(days=offset)).isoformat()}
+                for field in ("ca_journalier", "nb_ventes", "nb_articles", "nb_prospects"):
+                    if rng.random() < 0.9:  # champs parfois absents ($ifNull)
+                        entry[field] = round(rng.uniform(0, 900), 2) if field == "ca_journalier" else rng.randint(0, 15)
+                entries.append(entry)
+    return entries
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+class TestComparisonPeriods:
+
+    def test_previous_and_last_year(self):
+        assert comparison_periods("2026-03-01", "2026-03-31") == {
+            "current": ("2026-03-01", "2026-03-31"),
+            "previous": ("2026-01-29", "2026-02-28"),
+            "last_year": ("2025-03-01", "2025-03-31"),
+        }
+
+    def test_leap_day_maps_to_february_28(self):
+        assert comparison_periods("2024-02-29", "2024-02-29")["last_year"] == ("2023-02-28", "2023-02-28")
+
+
+class TestTeamKpiMetrics:
+
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("seed", [1, 2])
+    async def test_matches_per_seller_pipeline_in_one_query(self, seed):
+        from services.manager.kpi_service import ManagerKpiService
+
+        sellers = [f"s{i}" for i in range(30)]
+        entries = _entries(seed, sellers[:-1])  # s29 n'a aucune saisie
+        repo = FakeAggregateRepo(entries)
+        service = ManagerKpiService(repo, None, None)
+        periods = comparison_periods("2026-04-01", "2026-04-30")
+
+        team = await service.get_team_kpi_metrics(sellers, periods)
+
+        assert repo.calls == 1
+        for name, (start, end) in periods.items():
+            for sid in sellers:
+                reference = run_pipeline(entries, build_seller_kpi_pipeline(sid, start, end))
+                expected = reference[0] if reference else dict(EMPTY_KPI_METRICS)
+                assert team[name][sid] == pytest.approx(expected), (name, sid)
+        assert team["current"]["s29"] == EMPTY_KPI_METRICS
+
+    def test_single_match_on_seller_and_period_ranges(self):
+        pipeline = build_team_kpi_pipeline(["a", "b"], {"current": ("2026-01-01", "2026-01-31")})
+        assert pipeline[0]["$match"] == {
+            "seller_id": {"$in": ["a", "b"]},
+            "$or": [{"date": {"$gte": "2026-01-01", "$lte": "2026-01-31"}}],
+        }
+        assert list(pipeline[1]["$facet"]) == ["current"]
+
+
+class TestTeamProfileSources:
+
+    @pytest.mark.anyio
+    async def test_latest_diagnostic_and_recent_debriefs(self):
+        from repositories.debrief_repository import DebriefRepository
+        from repositories.diagnostic_repository import DiagnosticRepository
+
+        diagnostics = FakeAggregateRepo([
+            {"_id": 1, "seller_id": "s1", "created_at": "2026-01-01", "level": "old"},
+            {"_id": 2, "seller_id": "s1", "created_at": "2026-02-01", "level": "new"},
+            {"_id": 3, "seller_id": "s2", "created_at": "2026-01-15", "level": "only"},
+            {"_id": 4, "seller_id": "other", "created_at": "2026-03-01", "level": "x"},
+        ])
+        debriefs = FakeAggregateRepo([
+            {"_id": i, "seller_id": "s1", "created_at": f"2026-01-{i + 1:02d}", "score_accueil": i}
+            for i in range(8)
+        ])
+        diag_repo = DiagnosticRepository.__new__(DiagnosticRepository)
+        diag_repo.aggregate = diagnostics.aggregate
+        debrief_repo = DebriefRepository.__new__(DebriefRepository)
+        debrief_repo.aggregate = debriefs.aggregate
+
+        latest = await diag_repo.find_latest_by_sellers(["s1", "s2", "s3"])
+        recent = await debrief_repo.find_recent_by_sellers(["s1", "s2"], per_seller=5)
+
+        assert {sid: d["level"] for sid, d in latest.items()} == {"s1": "new", "s2": "only"}
+        assert "_id" not in latest["s1"]
+        assert [d["score_accueil"] for d in recent["s1"]] == [7, 6, 5, 4, 3]
+        assert "s2" not in recent
+        assert diagnostics.calls == debriefs.calls == 1
@@ -63,6 +63,7 @@ class TestWsManagerConnections:
         await mgr.connect("store_1", ws1)
         await mgr.connect("store_1", ws2)
         await mgr.broadcast_to_store("store_1", '{"type":"test"}')
+        await mgr.flush()
         ws1.send_text.assert_called_once_with('{"type":"test"}')
         ws2.send_text.assert_called_once_with('{"type":"test"}')
 
@@ -82,6 +83,7 @@ class TestWsManagerConnections:
         await mgr.connect("store_1", ws_ok)
         await mgr.connect("store_1", ws_dead)
         await mgr.broadcast_to_store("store_1", "msg")
+        await mgr.flush()
         assert ws_dead not in mgr._connections.get("store_1", set())
         assert ws_ok in mgr._connections.get("store_1", set())
 
@@ -124,6 +126,7 @@ class TestWsManagerPublish:
         await mgr.connect("store_1", ws)
 
         await mgr.publish("store_1", {"type": "kpi_entry_saved"})
+        await mgr.flush()
         ws.send_text.assert_called_once()
 
     @pytest.mark.anyio
@@ -140,6 +143,7 @@ class TestWsManagerPublish:
         await mgr.connect("store_1", ws)
 
         await mgr.publish("store_1", {"type": "test"})
+        await mgr.flush()
         ws.send_text.assert_called_once()
 
     @pytest.mark.anyio
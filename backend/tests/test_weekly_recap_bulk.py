@@ -0,0 +1,210 @@
+"""
+Tests unitaires — moteur bulk du récap hebdomadaire gérants
+(JobsService.compute_weekly_gerant_recaps).
+
+Base en mémoire qui compte les allers-retours Mongo (find / aggregate) ;
+l'agrégation $facet des KPI est rejouée en Python à partir du $match.
+
+Couvre :
+- forme des recaps (CA, évolution, ventes, top vendeur) inchangée
+- règles d'exclusion : gérant récent, abonnement inactif, aucune donnée
+- benchmark : nombre de requêtes constant quand le nombre de tenants augmente
+"""
+from collections import Counter
+from datetime import date, timedelta
+
+import pytest
+
+
+TODAY = date.today()
+LAST_MONDAY = TODAY - timedelta(days=TODAY.weekday() + 7)
+PREV_MONDAY = LAST_MONDAY - timedelta(days=7)
+
+
+# ---------------------------------------------------------------------------
+# Stand-ins
+# ---------------------------------------------------------------------------
+
+def _matches(doc, filters):
+    for key, cond in filters.items():
+        value = doc.get(key)
+        if isinstance(cond, dict):
+            for op, arg in cond.items():
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$gte" and (value is None or not value >= arg):
+                    return False
+                if op == "$lte" and (value is None or not value <= arg):
+                    return False
+        elif value != cond:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    fields = [k for k, v in (projection or {}).items() if v and k != "_id"]
+    return {k: doc[k] for k in fields if k in doc} if fields else dict(doc)
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, spec):
+        return self
+
+    def skip(self, n):
+        self.docs = self.docs[n:]
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n] if n else self.docs
+        return self
+
+    async def to_list(self, n):
+        return list(self.docs)
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def _ca(doc):
+    return doc.get("seller_ca", doc.get("ca_journalier", 0)) or 0
+
+
+class CountingCollection:
+    def __init__(self, name, queries):
+        self.name = name
+        self.docs = []
+        self.queries = queries
+
+    def find(self, filters, projection=None):
+        self.queries[self.name] += 1
+        return _Cursor([_project(d, projection) for d in self.docs if _matches(d, filters)])
+
+    async def find_one(self, filters, projection=None):
+        self.queries[self.name] += 1
+        for doc in self.docs:
+            if _matches(doc, filters):
+                return _project(doc, projection)
+        return None
+
+    def aggregate(self, pipeline):
+        """Rejoue l'agrégation $facet de KPIRepository.aggregate_weekly_store_recap."""
+        self.queries[self.name] += 1
+        match = pipeline[0]["$match"]
+        week_start = pipeline[1]["$facet"]["top_sellers"][0]["$match"]["date"]["$gte"]
+        rows = [d for d in self.docs if _matches(d, match)]
+        stores, sellers = {}, {}
+        for doc in rows:
+            entry = stores.setdefault(doc["store_id"], {"_id": doc["store_id"], "ca": 0, "ventes": 0, "ca_prev": 0})
+            if doc["date"] >= week_start:
+                entry["ca"] += _ca(doc)
+                entry["ventes"] += doc.get("nb_ventes", 0)
+                key = (doc["store_id"], doc["seller_id"])
+                sellers[key] = sellers.get(key, 0) + _ca(doc)
+            else:
+                entry["ca_prev"] += _ca(doc)
+        top = {}
+        for (store_id, seller_id), ca in sorted(sellers.items(), key=lambda kv: (-kv[1], kv[0][1])):
+            top.setdefault(store_id, {"_id": store_id, "seller_id": seller_id, "ca": ca})
+        return _Cursor([{"stores": list(stores.values()), "top_sellers": list(top.values())}])
+
+
+class CountingDB(dict):
+    def __init__(self):
+        super().__init__()
+        self.queries = Counter()
+
+    def __missing__(self, name):
+        self[name] = CountingCollection(name, self.queries)
+        return self[name]
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+def _seed_tenant(db, i, status="active", created=None, with_kpis=True):
+    gerant_id = f"g{i}"
+    db["users"].docs.append({
+        "id": gerant_id, "role": "gerant", "status": "active",
+        "name": f"Gérant {i}", "email": f"g{i}@example.com",
+        "created_at": created or "2025-01-01T00:00:00",
+    })
+    db["billing_profiles"].docs.append({"gerant_id": gerant_id, "subscription_status": status})
+    for s in range(2):
+        store_id = f"{gerant_id}-s{s}"
+        db["stores"].docs.append({"id": store_id, "name": f"Magasin {s}", "gerant_id": gerant_id, "active": True})
+        for v in range(2):
+            seller_id = f"{store_id}-v{v}"
+            db["users"].docs.append({"id": seller_id, "role": "seller", "name": f"Vendeur {v}"})
+            if not with_kpis:
+                continue
+            for week_start, amount in ((LAST_MONDAY, 100 * (v + 1) * (s + 1)), (PREV_MONDAY, 50)):
+                db["kpi_entries"].docs.append({
+                    "store_id": store_id, "seller_id": seller_id,
+                    "date": (week_start + timedelta(days=1)).isoformat(),
+                    "seller_ca": amount, "nb_ventes": 2,
+                })
+
+
+def _service(db):
+    from services.jobs_service import JobsService
+    return JobsService(db)
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+class TestWeeklyRecapShape:
+
+    @pytest.mark.anyio
+    async def test_recap_values(self):
+        db = CountingDB()
+        _seed_tenant(db, 0)
+        recaps = await _service(db).compute_weekly_gerant_recaps()
+
+        assert len(recaps) == 1
+        recap = recaps[0]
+        assert recap["email"] == "g0@example.com"
+        assert recap["week_start"] == LAST_MONDAY.strftime("%d/%m")
+        # Magasin 0 : 100 + 200, Magasin 1 : 200 + 400 ; semaine précédente 2 × 50 par magasin
+        assert [s["ca"] for s in recap["stores"]] == [300, 600]
+        assert [s["ventes"] for s in recap["stores"]] == [4, 4]
+        assert recap["stores"][0]["evolution"] == 200.0
+        assert recap["total_ca"] == 900
+        assert recap["total_evolution"] == 350.0
+        assert recap["top_seller"] == {"name": "Vendeur 1", "store": "Magasin 1", "ca": 400}
+
+    @pytest.mark.anyio
+    async def test_exclusions(self):
+        db = CountingDB()
+        _seed_tenant(db, 0, status="canceled")
+        _seed_tenant(db, 1, created=TODAY.isoformat())
+        _seed_tenant(db, 2, with_kpis=False)
+        _seed_tenant(db, 3)
+        recaps = await _service(db).compute_weekly_gerant_recaps()
+        assert [r["email"] for r in recaps] == ["g3@example.com"]
+
+
+class TestWeeklyRecapQueryCount:
+
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("tenants", [1, 10, 100])
+    async def test_query_count_is_constant(self, tenants):
+        db = CountingDB()
+        for i in range(tenants):
+            _seed_tenant(db, i)
+        recaps = await _service(db).compute_weekly_gerant_recaps()
+
+        assert len(recaps) == tenants
+        # gérants + noms vendeurs, billing $in, stores $in, 1 agrégation KPI
+        assert dict(db.queries) == {"users": 2, "billing_profiles": 1, "stores": 1, "kpi_entries": 1}
@@ -0,0 +1,115 @@
+"""
+Test de charge — WsManager.broadcast_to_store (fan-out parallele, back-pressure).
+
+Clients WebSocket simules (latence d'envoi configurable), aucun serveur.
+
+Couvre :
+- centaines de clients : la diffusion ne bloque pas sur les clients lents
+- client lent : deconnecte (timeout d'envoi ou file pleine), les autres recoivent tout
+- coalescing des kpi_entry_saved pour un meme (vendeur, date)
+- compteurs par store (connexions, lag, drops)
+"""
+import asyncio
+import json
+import time
+
+import pytest
+
+
+class SimulatedClient:
+    """WebSocket simule : send_text attend `latency` secondes (ou indefiniment si blocked)."""
+
+    def __init__(self, latency=0.0, blocked=False):
+        self.latency = latency
+        self.blocked = blocked
+        self.received = []
+        self.closed_with = None
+        self.release = asyncio.Event()
+
+    async def accept(self):
+        return None
+
+    async def send_text(self, message):
+        if self.blocked:
+            await self.release.wait()
+        elif self.latency:
+            await asyncio.sleep(self.latency)
+        self.received.append(message)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def _event(seller_id="s1", date="2026-10-19", ca=100):
+    return json.dumps({"type": "kpi_entry_saved", "store_id": "store_1",
+                       "seller_id": seller_id, "date": date, "data": {"seller_ca": ca}})
+
+
+class TestBroadcastLoad:
+
+    @pytest.mark.anyio
+    async def test_hundreds_of_clients_with_stalled_tablets(self):
+        from core.ws_manager import WsManager
+        mgr = WsManager(send_timeout=0.2)
+        fast = [SimulatedClient(latency=0.001) for _ in range(400)]
+        stalled = [SimulatedClient(blocked=True) for _ in range(5)]
+        for ws in fast + stalled:
+            await mgr.connect("store_1", ws)
+
+        started = time.perf_counter()
+        for i in range(30):
+            await mgr.broadcast_to_store("store_1", _event(seller_id=f"s{i}"))
+        enqueue_seconds = time.perf_counter() - started
+        # Diffusion = empilement : indépendante de la latence des clients
+        assert enqueue_seconds < 1.0
+
+        await asyncio.sleep(0.4)  # > send_timeout : les tablettes bloquées sont coupées
+        await mgr.flush(timeout=5)
+
+        assert all(len(ws.received) == 30 for ws in fast)
+        assert all(ws.received[0] == _event(seller_id="s0") for ws in fast)
+        stats = mgr.stats()["stores"]["store_1"]
+        assert stats["connections"] == 400
+        assert stats["dropped_slow"] == 5
+        assert stats["sent"] == 400 * 30
+        assert all(ws.closed_with == 1013 for ws in stalled)
+
+    @pytest.mark.anyio
+    async def test_full_queue_drops_client_without_waiting(self):
+        from core.ws_manager import WsManager
+        mgr = WsManager(max_queue_size=4, send_timeout=60)
+        slow, ok = SimulatedClient(blocked=True), SimulatedClient()
+        await mgr.connect("store_1", slow)
+        await mgr.connect("store_1", ok)
+
+        for i in range(10):
+            await mgr.broadcast_to_store("store_1", f"msg-{i}")
+            await asyncio.sleep(0)
+        await mgr.flush(timeout=1)
+
+        assert slow not in mgr._connections["store_1"]
+        assert ok.received == [f"msg-{i}" for i in range(10)]
+        assert mgr.stats()["stores"]["store_1"]["dropped_slow"] == 1
+
+    @pytest.mark.anyio
+    async def test_rapid_kpi_events_are_coalesced(self):
+        from core.ws_manager import WsManager
+        mgr = WsManager(max_queue_size=8, send_timeout=5)
+        ws = SimulatedClient(blocked=True)
+        await mgr.connect("store_1", ws)
+
+        await mgr.broadcast_to_store("store_1", _event(ca=1))
+        await asyncio.sleep(0)  # le 1er envoi est en cours (bloqué)
+        for ca in range(2, 7):
+            await mgr.broadcast_to_store("store_1", _event(ca=ca))
+        await mgr.broadcast_to_store("store_1", _event(seller_id="s2", ca=9))
+
+        stats = mgr.stats()["stores"]["store_1"]
+        assert stats["queued"] == 2
+        assert stats["coalesced"] == 4
+        assert stats["max_lag_ms"] >= 0
+
+        ws.blocked = False
+        ws.release.set()
+        await mgr.flush(timeout=1)
+        assert [json.loads(m)["data"]["seller_ca"] for m in ws.received] == [1, 6, 9]
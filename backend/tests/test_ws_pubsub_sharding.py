@@ -0,0 +1,200 @@
+"""
+Tests unitaires — abonnements Redis pub/sub par store (core/ws_manager.py).
+
+Broker Redis en memoire partage par plusieurs WsManager (un par worker simule),
+redis.asyncio.from_url remplace par une fabrique de clients factices.
+
+Couvre :
+- abonnement au premier client local d'un store, desabonnement au dernier
+- un worker ne recoit que les stores qu'il sert (recus == diffuses)
+- encodage compact zlib (aller-retour, cohabitation avec JSON)
+- reconnexion apres panne Redis et reabonnement des stores locaux
+"""
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+
+class FakeBroker:
+    def __init__(self):
+        self.subscribers = set()
+        self.published = 0
+
+    async def publish(self, channel, data):
+        self.published += 1
+        if isinstance(channel, str):
+            channel = channel.encode()
+        if isinstance(data, str):
+            data = data.encode()
+        for sub in list(self.subscribers):
+            if channel in sub.channels:
+                sub.inbox.put_nowait({"type": "message", "channel": channel, "data": data})
+
+
+class FakePubSub:
+    def __init__(self, broker):
+        self.broker = broker
+        self.channels = set()
+        self.inbox = asyncio.Queue()
+        self.fail_next = False
+        broker.subscribers.add(self)
+
+    @property
+    def subscribed(self):
+        return bool(self.channels)
+
+    async def subscribe(self, *channels):
+        self.channels.update(c.encode() for c in channels)
+
+    async def unsubscribe(self, *channels):
+        self.channels.difference_update(c.encode() for c in channels)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+        if self.fail_next:
+            self.fail_next = False
+            raise ConnectionError("Redis connection lost")
+        try:
+            return await asyncio.wait_for(self.inbox.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        self.broker.subscribers.discard(self)
+
+
+class FakeRedisClient:
+    def __init__(self, broker):
+        self.broker = broker
+        self.pubsubs = []
+
+    def pubsub(self):
+        ps = FakePubSub(self.broker)
+        self.pubsubs.append(ps)
+        return ps
+
+    async def publish(self, channel, data):
+        await self.broker.publish(channel, data)
+
+    async def aclose(self):
+        return None
+
+
+class Client:
+    def __init__(self):
+        self.received = []
+
+    async def accept(self):
+        return None
+
+    async def send_text(self, message):
+        self.received.append(message)
+
+
+@pytest.fixture
+def broker():
+    b = FakeBroker()
+    with patch("redis.asyncio.from_url", side_effect=lambda *a, **k: FakeRedisClient(b)):
+        yield b
+
+
+async def _worker(encoding="json"):
+    from core.ws_manager import WsManager
+    mgr = WsManager()
+    await mgr.start_redis_listener("redis://fake", encoding=encoding)
+    return mgr
+
+
+async def _settle(*managers):
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+    for mgr in managers:
+        await mgr.flush(timeout=1)
+
+
+class TestPerStoreSubscriptions:
+
+    @pytest.mark.anyio
+    async def test_subscribe_on_first_client_unsubscribe_on_last(self, broker):
+        mgr = await _worker()
+        ws1, ws2 = Client(), Client()
+        await mgr.connect("store_1", ws1)
+        await mgr.connect("store_1", ws2)
+        assert mgr._pubsub.channels == {b"kpi:store:store_1"}
+
+        await mgr.disconnect("store_1", ws1)
+        assert mgr._pubsub.channels == {b"kpi:store:store_1"}
+        await mgr.disconnect("store_1", ws2)
+        assert mgr._pubsub.channels == set()
+        assert mgr.pubsub_stats()["subscriptions"] == 0
+        await mgr.stop()
+
+    @pytest.mark.anyio
+    async def test_worker_only_receives_its_stores(self, broker):
+        workers = [await _worker() for _ in range(3)]
+        clients = {}
+        for i, mgr in enumerate(workers):
+            clients[i] = Client()
+            await mgr.connect(f"store_{i}", clients[i])
+
+        for store in range(50):
+            await workers[0].publish(f"store_{store % 10}", {"type": "kpi_entry_saved", "seller_id": f"s{store}"})
+        await _settle(*workers)
+
+        for i, mgr in enumerate(workers):
+            stats = mgr.pubsub_stats()
+            # 5 événements par store servi, aucun message d'un autre store reçu
+            assert stats["received"] == 5
+            assert stats["delivered"] == 5
+            assert stats["discarded"] == 0
+            assert len(clients[i].received) == 5
+        for mgr in workers:
+            await mgr.stop()
+
+
+class TestCompactEncoding:
+
+    def test_round_trip_and_json_compatibility(self):
+        from core.ws_manager import decode_pubsub_message, encode_pubsub_message
+        message = json.dumps({"type": "kpi_entry_saved", "data": {"seller_ca": 1234.5}})
+        packed = encode_pubsub_message(message, "zlib")
+        assert isinstance(packed, bytes) and packed.startswith(b"\x00z")
+        assert decode_pubsub_message(packed) == message
+        assert decode_pubsub_message(message.encode()) == message
+
+    @pytest.mark.anyio
+    async def test_zlib_worker_delivers_text(self, broker):
+        mgr = await _worker(encoding="zlib")
+        ws = Client()
+        await mgr.connect("store_1", ws)
+        await mgr.publish("store_1", {"type": "kpi_entry_saved", "seller_id": "s1"})
+        await _settle(mgr)
+        assert json.loads(ws.received[0])["seller_id"] == "s1"
+        await mgr.stop()
+
+
+class TestReconnect:
+
+    @pytest.mark.anyio
+    async def test_resubscribes_local_stores_after_failure(self, broker):
+        mgr = await _worker()
+        ws = Client()
+        await mgr.connect("store_1", ws)
+        first = mgr._pubsub
+        first.fail_next = True
+
+        # Panne → backoff initial (1 s) → reconnexion
+        for _ in range(150):
+            await asyncio.sleep(0.02)
+            if mgr._pubsub is not None and mgr._pubsub is not first:
+                break
+
+        assert mgr._pubsub is not first
+        assert mgr._pubsub.channels == {b"kpi:store:store_1"}
+        assert mgr.pubsub_stats()["reconnects"] == 1
+
+        await mgr.publish("store_1", {"type": "kpi_entry_saved", "seller_id": "s1"})
+        await _settle(mgr)
+        assert len(ws.received) == 1
+        await mgr.stop()
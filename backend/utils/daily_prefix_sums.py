@@ -0,0 +1,62 @@
+"""
+Date-indexed prefix sums of daily KPI totals.
+
+Built once per request from per-day totals (server-side $group by date, see
+utils.kpi_pipeline.build_daily_totals_pipeline) or from raw entries; each
+[start, end] range total is then two bisects on the sorted dates — O(log n) —
+instead of a scan of every entry for every objective / challenge.
+
+Dates are "YYYY-MM-DD" strings (lexicographic order == chronological order).
+"""
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, List, Sequence
+
+from utils.kpi_pipeline import DAILY_TOTAL_FIELDS
+
+
+class DailyPrefixSums:
+    """Range totals per metric over sorted dates (inclusive bounds)."""
+
+    def __init__(self, daily_totals: Dict[str, Dict[str, float]], fields: Sequence[str] = DAILY_TOTAL_FIELDS):
+        self.fields = tuple(fields)
+        self.dates: List[str] = sorted(daily_totals)
+        # prefix[field][i] = somme des i premiers jours (prefix[field][0] == 0)
+        self._prefix: Dict[str, List[float]] = {
+            field: [0, *accumulate(daily_totals[d].get(field) or 0 for d in self.dates)]
+            for field in self.fields
+        }
+
+    @classmethod
+    def from_daily_rows(cls, rows: Iterable[Dict], fields: Sequence[str] = DAILY_TOTAL_FIELDS) -> "DailyPrefixSums":
+        """Rows of build_daily_totals_pipeline ({"date": ..., <field>: total})."""
+        daily: Dict[str, Dict[str, float]] = {}
+        for row in rows:
+            date = row.get("date")
+            if not date:
+                continue
+            day = daily.setdefault(date, {})
+            for field in fields:
+                day[field] = day.get(field, 0) + (row.get(field) or 0)
+        return cls(daily, fields)
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict], fields: Sequence[str] = DAILY_TOTAL_FIELDS) -> "DailyPrefixSums":
+        """Raw KPI entries (several per date allowed) — one pass."""
+        return cls.from_daily_rows(entries, fields)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def range_totals(self, start: str, end: str) -> Dict[str, float]:
+        """Sum of each field over start <= date <= end."""
+        lo = bisect_left(self.dates, start)
+        hi = bisect_right(self.dates, end)
+        if hi <= lo:
+            return {field: 0 for field in self.fields}
+        return {field: _clean(self._prefix[field][hi] - self._prefix[field][lo]) for field in self.fields}
+
+
+def _clean(value: float) -> float:
+    """Drop the float noise of a prefix difference (1234.5000000001 → 1234.5)."""
+    return round(value, 6) if isinstance(value, float) else value
@@ -4,7 +4,8 @@ Shared MongoDB aggregation pipeline for seller KPI metrics.
 Single source of truth — imported by both SellerService and ManagerKpiService
 so that dashboard vendeur and dashboard manager always produce identical totals.
 """
-from typing import Dict, List
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
 
 
 EMPTY_KPI_METRICS: Dict = {
@@ -19,6 +20,50 @@ EMPTY_KPI_METRICS: Dict = {
 }
 
 
+# Totaux additifs d'une période ($group) — partagés par les pipelines vendeur et équipe
+_KPI_TOTALS_GROUP: Dict = {
+    "nb_jours":        {"$sum": 1},
+    "total_ca":        {"$sum": {"$ifNull": ["$ca_journalier", 0]}},
+    "total_ventes":    {"$sum": {"$ifNull": ["$nb_ventes", 0]}},
+    "total_articles":  {"$sum": {"$ifNull": ["$nb_articles", 0]}},
+    "total_prospects": {"$sum": {"$ifNull": ["$nb_prospects", 0]}},
+}
+
+# Métriques dérivées des totaux ($project)
+_KPI_METRICS_PROJECTION: Dict = {
+    "_id": 0,
+    "nb_jours": 1,
+    "ca":        "$total_ca",
+    "ventes":    "$total_ventes",
+    "articles":  "$total_articles",
+    "prospects": "$total_prospects",
+    "panier_moyen": {
+        "$cond": [
+            {"$gt": ["$total_ventes", 0]},
+            {"$divide": ["$total_ca", "$total_ventes"]},
+            0,
+        ]
+    },
+    "indice_vente": {
+        "$cond": [
+            {"$gt": ["$total_ventes", 0]},
+            {"$divide": ["$total_articles", "$total_ventes"]},
+            0,
+        ]
+    },
+    "taux_transformation": {
+        "$cond": [
+            {"$gt": ["$total_prospects", 0]},
+            {"$multiply": [
+                {"$divide": ["$total_ventes", "$total_prospects"]},
+                100,
+            ]},
+            0,
+        ]
+    },
+}
+
+
 def build_seller_kpi_pipeline(seller_id: str, start_date: str, end_date: str) -> List[Dict]:
     """
     Return a MongoDB aggregation pipeline that computes all KPI metrics
@@ -35,48 +80,98 @@ def build_seller_kpi_pipeline(seller_id: str, start_date: str, end_date: str) ->
                 "date": {"$gte": start_date, "$lte": end_date},
             }
         },
+        {"$group": {"_id": None, **_KPI_TOTALS_GROUP}},
+        {"$project": dict(_KPI_METRICS_PROJECTION)},
+    ]
+
+
+# Périodes de comparaison de l'API équipe (see comparison_periods)
+TEAM_KPI_PERIODS = ("current", "previous", "last_year")
+
+
+def _shift_year(day: date) -> date:
+    try:
+        return day.replace(year=day.year - 1)
+    except ValueError:  # 29 février
+        return day.replace(year=day.year - 1, day=28)
+
+
+def comparison_periods(start_date: str, end_date: str) -> Dict[str, Tuple[str, str]]:
+    """
+    Periods keyed by TEAM_KPI_PERIODS for [start_date, end_date]:
+    current, previous (same length, just before) and last_year (same dates, one year earlier).
+    """
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    length = end - start + timedelta(days=1)
+    return {
+        "current": (start_date, end_date),
+        "previous": ((start - length).isoformat(), (start - timedelta(days=1)).isoformat()),
+        "last_year": (_shift_year(start).isoformat(), _shift_year(end).isoformat()),
+    }
+
+
+def build_team_kpi_pipeline(seller_ids: List[str], periods: Dict[str, Tuple[str, str]]) -> List[Dict]:
+    """
+    Same metrics as build_seller_kpi_pipeline for several sellers and periods in one
+    aggregation: one $match on the (seller_id, date) index, then one $facet branch
+    per period grouped by seller_id.
+
+    Output: a single document {period_name: [{seller_id, nb_jours, ca, ...}, ...]}
+    (sellers without entries in a period are absent from its list).
+    """
+    return [
         {
-            "$group": {
-                "_id": None,
-                "nb_jours":        {"$sum": 1},
-                "total_ca":        {"$sum": {"$ifNull": ["$ca_journalier", 0]}},
-                "total_ventes":    {"$sum": {"$ifNull": ["$nb_ventes", 0]}},
-                "total_articles":  {"$sum": {"$ifNull": ["$nb_articles", 0]}},
-                "total_prospects": {"$sum": {"$ifNull": ["$nb_prospects", 0]}},
+            "$match": {
+                "seller_id": {"$in": list(seller_ids)},
+                "$or": [{"date": {"$gte": start, "$lte": end}} for start, end in periods.values()],
             }
         },
         {
-            "$project": {
-                "_id": 0,
-                "nb_jours": 1,
-                "ca":        "$total_ca",
-                "ventes":    "$total_ventes",
-                "articles":  "$total_articles",
-                "prospects": "$total_prospects",
-                "panier_moyen": {
-                    "$cond": [
-                        {"$gt": ["$total_ventes", 0]},
-                        {"$divide": ["$total_ca", "$total_ventes"]},
-                        0,
-                    ]
-                },
-                "indice_vente": {
-                    "$cond": [
-                        {"$gt": ["$total_ventes", 0]},
-                        {"$divide": ["$total_articles", "$total_ventes"]},
-                        0,
-                    ]
-                },
-                "taux_transformation": {
-                    "$cond": [
-                        {"$gt": ["$total_prospects", 0]},
-                        {"$multiply": [
-                            {"$divide": ["$total_ventes", "$total_prospects"]},
-                            100,
-                        ]},
-                        0,
-                    ]
-                },
+            "$facet": {
+                name: [
+                    {"$match": {"date": {"$gte": start, "$lte": end}}},
+                    {"$group": {"_id": "$seller_id", **_KPI_TOTALS_GROUP}},
+                    {"$project": {**_KPI_METRICS_PROJECTION, "seller_id": "$_id"}},
+                ]
+                for name, (start, end) in periods.items()
             }
         },
     ]
+
+
+# Additive metrics summed per day by build_daily_totals_pipeline
+DAILY_TOTAL_FIELDS = ("ca_journalier", "nb_ventes", "nb_articles")
+
+
+def build_daily_totals_pipeline(match: Dict) -> List[Dict]:
+    """
+    Return a pipeline that sums DAILY_TOTAL_FIELDS per date for the documents
+    matching `match` (kpi_entries or manager_kpis), sorted by date.
+
+    Output documents: {"date": "YYYY-MM-DD", "ca_journalier": ..., "nb_ventes": ..., "nb_articles": ...}
+    — one per day with data, never the raw entries.
+    """
+    return [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": "$date",
+                **{field: {"$sum": {"$ifNull": [f"${field}", 0]}} for field in DAILY_TOTAL_FIELDS},
+            }
+        },
+        {"$sort": {"_id": 1}},
+        {"$project": {"_id": 0, "date": "$_id", **{field: 1 for field in DAILY_TOTAL_FIELDS}}},
+    ]
+
+
+def build_daily_totals_facet_pipeline(matches: Dict[str, Dict]) -> List[Dict]:
+    """
+    build_daily_totals_pipeline for several filters in one aggregation: a single
+    $match on the union ($or) then one $facet branch per filter.
+
+    Output: one document {name: [daily rows as build_daily_totals_pipeline]}.
+    """
+    return [
+        {"$match": {"$or": list(matches.values())}},
+        {"$facet": {name: build_daily_totals_pipeline(match) for name, match in matches.items()}},
+    ]
@@ -0,0 +1,141 @@
+"""
+Store daily KPI rollup — pure resolution rules (no I/O).
+
+One row per (store_id, date), computed from the raw kpi_entries and manager_kpis
+of that store and day with the same rules as the historical in-Python merge:
+
+- anti-doublon : one seller entry per (seller_id, date); created_by='manager'
+  wins over a seller entry, otherwise the first one read is kept;
+- CA : seller_ca, else ca_journalier;
+- manager_kpis only contribute nb_prospects (global prospects);
+- locked : a locked seller entry or a locked manager KPI locks the day.
+
+Shared by the write-path refresh, the rebuild command and the consistency check,
+so the three can never disagree.
+"""
+from typing import Dict, Iterable, List, Tuple
+
+ROLLUP_METRICS = ("ca_journalier", "nb_ventes", "nb_clients", "nb_articles", "nb_prospects")
+
+# Champs comparés par le contrôle de cohérence (hors métadonnées)
+ROLLUP_COMPARED_FIELDS = (
+    *ROLLUP_METRICS,
+    "locked",
+    "seller_locked",
+    "locked_seller_ids",
+    "seller_entries",
+    "manager_entries",
+)
+
+
+def resolve_seller_entries(entries: Iterable[Dict]) -> List[Dict]:
+    """One entry per (seller_id, date), the manager's version first."""
+    resolved: Dict[Tuple[str, str], Dict] = {}
+    for entry in entries:
+        seller_id = entry.get("seller_id")
+        date = entry.get("date")
+        if not seller_id or not date:
+            continue
+        key = (seller_id, date)
+        existing = resolved.get(key)
+        if existing is None:
+            resolved[key] = entry
+        elif entry.get("created_by") == "manager" and existing.get("created_by") != "manager":
+            resolved[key] = entry
+    return list(resolved.values())
+
+
+def _empty_row(store_id: str, date: str) -> Dict:
+    return {
+        "store_id": store_id,
+        "date": date,
+        "year": int(date[:4]) if date[:4].isdigit() else None,
+        **{metric: 0 for metric in ROLLUP_METRICS},
+        "locked": False,
+        "seller_locked": False,
+        "locked_seller_ids": [],
+        "seller_entries": 0,
+        "manager_entries": 0,
+        "raw_entries": 0,
+    }
+
+
+def build_store_daily_rows(
+    store_id: str,
+    seller_entries: Iterable[Dict],
+    manager_kpis: Iterable[Dict],
+) -> Dict[str, Dict]:
+    """
+    Rollup rows keyed by date for one store.
+
+    A row exists for every date with at least one raw document (calendar
+    "dates with data"); seller_entries / manager_entries count what the history
+    actually aggregates.
+    """
+    rows: Dict[str, Dict] = {}
+    raw_seller_entries = []
+    for entry in seller_entries:
+        date = entry.get("date")
+        if not date:
+            continue
+        row = rows.setdefault(date, _empty_row(store_id, date))
+        row["raw_entries"] += 1
+        if entry.get("locked"):
+            row["seller_locked"] = True
+            seller_id = entry.get("seller_id")
+            if seller_id and seller_id not in row["locked_seller_ids"]:
+                row["locked_seller_ids"].append(seller_id)
+        raw_seller_entries.append(entry)
+
+    for kpi in manager_kpis:
+        date = kpi.get("date")
+        if not date:
+            continue
+        row = rows.setdefault(date, _empty_row(store_id, date))
+        row["raw_entries"] += 1
+        row["manager_entries"] += 1
+        row["nb_prospects"] += kpi.get("nb_prospects") or 0
+        if kpi.get("locked"):
+            row["locked"] = True
+
+    for entry in resolve_seller_entries(raw_seller_entries):
+        row = rows[entry["date"]]
+        row["seller_entries"] += 1
+        row["ca_journalier"] += entry.get("seller_ca") or entry.get("ca_journalier") or 0
+        row["nb_ventes"] += entry.get("nb_ventes") or 0
+        row["nb_clients"] += entry.get("nb_clients") or 0
+        row["nb_articles"] += entry.get("nb_articles") or 0
+        row["nb_prospects"] += entry.get("nb_prospects") or 0
+        if entry.get("locked"):
+            row["locked"] = True
+
+    for row in rows.values():
+        row["locked_seller_ids"].sort()
+    return rows
+
+
+def history_row(row: Dict) -> Dict:
+    """Shape returned by get_store_kpi_history for one rollup row."""
+    return {
+        "date": row["date"],
+        **{metric: row.get(metric, 0) for metric in ROLLUP_METRICS},
+        "locked": bool(row.get("locked")),
+    }
+
+
+def is_history_row(row: Dict) -> bool:
+    """The history only lists days with a manager KPI or a resolved seller entry."""
+    return bool(row.get("seller_entries") or row.get("manager_entries"))
+
+
+def rows_differ(expected: Dict, stored: Dict) -> List[str]:
+    """Names of the compared fields whose values differ (floats within 1e-6)."""
+    diffs = []
+    for field in ROLLUP_COMPARED_FIELDS:
+        a, b = expected.get(field), stored.get(field)
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)) and not isinstance(a, bool):
+            if abs(a - b) > 1e-6:
+                diffs.append(field)
+        elif a != b:
+            diffs.append(field)
+    return diffs
@@ -3,14 +3,27 @@ Pagination Utilities
 
 Helper functions for paginated database queries.
 Uses asyncio.gather for parallel execution of count and find operations.
+
+Two modes:
+- Offset (paginate, paginate_aggregation): page/size, skip + count_documents.
+  Cost grows with the page number; fine for short lists.
+- Keyset (paginate_keyset): opaque signed cursor built from the sort key + a
+  unique tie-breaker. Each page is a range query on an index, so latency stays
+  flat at any depth; the total is optional and cached.
 """
 import asyncio
+import base64
+import hashlib
+import hmac
+import json
 import logging
+from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorCollection
 
-from models.pagination import PaginatedResponse, PaginationParams
-from config.limits import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from models.pagination import CursorPaginatedResponse, PaginatedResponse, PaginationParams
+from config.limits import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, PAGINATION_TOTAL_CACHE_TTL
 from core.exceptions import ValidationError
 
 logger = logging.getLogger(__name__)
@@ -229,3 +242,214 @@ async def paginate_aggregation(
         size=size,
         pages=pages
     )
+
+
+# ===== KEYSET (CURSOR) PAGINATION =====
+
+def _validate_size(size: Optional[int]) -> int:
+    if size is None:
+        return DEFAULT_PAGE_SIZE
+    if size > MAX_PAGE_SIZE:
+        raise ValidationError(f"Page size cannot exceed {MAX_PAGE_SIZE}, got {size}")
+    if size < 1:
+        raise ValidationError(f"Page size must be >= 1, got {size}")
+    return size
+
+
+def _keyset_sort(sort: List[Tuple[str, int]], tie_breaker: str) -> List[Tuple[str, int]]:
+    """Sort spec + unique tie-breaker (same direction as the last key) so the order is total."""
+    if not sort:
+        raise ValidationError("Keyset pagination requires a sort")
+    if any(field == tie_breaker for field, _ in sort):
+        return list(sort)
+    return list(sort) + [(tie_breaker, sort[-1][1])]
+
+
+def _sort_signature(sort: List[Tuple[str, int]]) -> str:
+    return ",".join(f"{field}:{direction}" for field, direction in sort)
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "$dt" in value:
+            return datetime.fromisoformat(value["$dt"])
+        if "$oid" in value:
+            return ObjectId(value["$oid"])
+    return value
+
+
+def _signature(payload: bytes) -> str:
+    from core.config import settings
+    digest = hmac.new(settings.JWT_SECRET.encode("utf-8"), payload, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:16]).decode("ascii").rstrip("=")
+
+
+def encode_cursor(values: List[Any], sort: List[Tuple[str, int]]) -> str:
+    """
+    Opaque cursor "<payload>.<hmac>" for the position after a document.
+
+    The sort spec is part of the signed payload: a cursor is only valid for the
+    listing (sort) that produced it.
+    """
+    payload = json.dumps(
+        {"v": [_encode_value(v) for v in values], "s": _sort_signature(sort)},
+        separators=(",", ":"),
+        default=str,
+    ).encode("utf-8")
+    return f"{base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')}.{_signature(payload)}"
+
+
+def decode_cursor(cursor: str, sort: List[Tuple[str, int]]) -> List[Any]:
+    """Values of the sort key stored in a cursor. Raises ValidationError if tampered or foreign."""
+    try:
+        encoded, signature = cursor.split(".", 1)
+        payload = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+        if not hmac.compare_digest(signature, _signature(payload)):
+            raise ValueError("bad signature")
+        data = json.loads(payload)
+        if data.get("s") != _sort_signature(sort) or len(data.get("v", [])) != len(sort):
+            raise ValueError("cursor from another listing")
+        return [_decode_value(v) for v in data["v"]]
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.debug("Invalid pagination cursor: %s", e)
+        raise ValidationError("Curseur de pagination invalide")
+
+
+def keyset_filter(sort: List[Tuple[str, int]], values: List[Any]) -> Dict[str, Any]:
+    """
+    Documents strictly after `values` in `sort` order:
+    (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... ($lt for descending keys).
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort[:i])}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[i]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def _keyset_projection(
+    projection: Dict[str, int], fields: List[str]
+) -> Tuple[Dict[str, int], List[str]]:
+    """Projection that keeps the sort fields (needed for the next cursor) + fields to strip afterwards."""
+    projection = dict(projection)
+    inclusive = any(v for k, v in projection.items() if k != "_id")
+    hidden = []
+    for field in fields:
+        if projection.get(field) == 0:
+            del projection[field]
+            hidden.append(field)
+        elif inclusive and field != "_id" and field not in projection:
+            projection[field] = 1
+            hidden.append(field)
+    return projection, hidden
+
+
+async def _cached_total(collection: AsyncIOMotorCollection, query: Dict[str, Any]) -> Tuple[int, bool]:
+    """
+    (total, is_estimate). Exact count cached PAGINATION_TOTAL_CACHE_TTL seconds in Redis
+    (a cache hit may be slightly stale); empty filter → estimated_document_count (metadata).
+    """
+    if not query:
+        return await collection.estimated_document_count(), True
+    from core.cache import get_cache_service
+
+    fingerprint = hashlib.sha1(json.dumps(query, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    key = f"pagination_total:{collection.name}:{fingerprint}"
+    cache = await get_cache_service()
+    cached = await cache.get(key)
+    if cached is not None:
+        return int(cached), True
+    total = await collection.count_documents(query)
+    await cache.set(key, total, ttl=PAGINATION_TOTAL_CACHE_TTL)
+    return total, False
+
+
+async def paginate_keyset(
+    collection: AsyncIOMotorCollection,
+    query: Dict[str, Any],
+    sort: List[Tuple[str, int]],
+    size: Optional[int] = None,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, int]] = None,
+    tie_breaker: str = "id",
+    with_total: bool = False,
+) -> CursorPaginatedResponse[Dict[str, Any]]:
+    """
+    Paginate a MongoDB collection query by keyset (seek) instead of skip.
+
+    Each page is `query AND after(cursor)` sorted and limited: with an index on
+    (filter fields, sort fields, tie_breaker) Mongo starts right at the cursor,
+    so page 1000 costs the same as page 1.
+
+    Args:
+        collection: MongoDB collection to query
+        query: MongoDB query filter
+        sort: List of (field, direction) tuples; every document must have these fields
+        size: Number of items per page (default: DEFAULT_PAGE_SIZE, max: MAX_PAGE_SIZE)
+        cursor: next_cursor of the previous page (None or "" for the first page)
+        projection: MongoDB projection dict (default: {"_id": 0})
+        tie_breaker: Unique field appended to the sort ("id", or "_id" for collections without id)
+        with_total: Also return the (cached) total number of items
+
+    Returns:
+        CursorPaginatedResponse with items, size, next_cursor, has_more and optional total
+
+    Raises:
+        ValidationError: If size is out of bounds or the cursor is invalid
+
+    Example:
+        ```python
+        first = await paginate_keyset(db.debriefs, {"seller_id": sid}, sort=[("created_at", -1)])
+        second = await paginate_keyset(
+            db.debriefs, {"seller_id": sid}, sort=[("created_at", -1)], cursor=first.next_cursor
+        )
+        ```
+    """
+    size = _validate_size(size)
+    full_sort = _keyset_sort(sort, tie_breaker)
+    fields = [field for field, _ in full_sort]
+
+    find_query = query
+    if cursor:
+        find_query = {"$and": [query, keyset_filter(full_sort, decode_cursor(cursor, full_sort))]}
+    find_projection, hidden = _keyset_projection(
+        {"_id": 0} if projection is None else projection, fields
+    )
+
+    # size + 1 : le document en trop indique s'il reste une page, sans count
+    items_task = collection.find(find_query, find_projection).sort(full_sort).limit(size + 1).to_list(size + 1)
+    if with_total:
+        items, (total, estimated) = await asyncio.gather(items_task, _cached_total(collection, query))
+    else:
+        items, total, estimated = await items_task, None, False
+
+    has_more = len(items) > size
+    items = items[:size]
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor([items[-1].get(field) for field in fields], full_sort)
+    for item in items:
+        for field in hidden:
+            item.pop(field, None)
+
+    logger.debug(
+        f"Keyset query: size={size}, cursor={'yes' if cursor else 'no'}, items_returned={len(items)}, has_more={has_more}"
+    )
+
+    return CursorPaginatedResponse(
+        items=items,
+        size=size,
+        next_cursor=next_cursor,
+        has_more=has_more,
+        total=total,
+        total_is_estimate=estimated,
+    )